@@ -3065,6 +3065,9 @@ class TranslationWorker(QObject):
 
                     # Shutdown async generators
                     loop.run_until_complete(loop.shutdown_asyncgens())
+                    # 关闭绑定在该事件循环上的共享 HTTP 会话（翻译器连接池）
+                    from manga_translator.translators.http_pool import close_loop_sessions
+                    close_loop_sessions(loop)
                 except Exception as e:
                     self.log_received.emit(f"--- ERROR during asyncio cleanup: {e}")
                 finally:
@@ -3338,6 +3341,9 @@ class TranslationRunnable(QRunnable):
                     if tasks:
                         loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
                     loop.run_until_complete(loop.shutdown_asyncgens())
+                    # 关闭绑定在该事件循环上的共享 HTTP 会话（翻译器连接池）
+                    from manga_translator.translators.http_pool import close_loop_sessions
+                    close_loop_sessions(loop)
                 except Exception as e:
                     self._emit_log(f"--- ERROR during asyncio cleanup: {e}")
                 finally:
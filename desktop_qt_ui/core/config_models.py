@@ -12,8 +12,12 @@ class TranslatorSettings(BaseModel):
     high_quality_prompt_path: Optional[str] = "dict/prompt_example.json"
     extract_glossary: bool = False
     max_requests_per_minute: int = 0
+    max_tokens_per_minute: int = 0  # 每分钟token数上限（估算值），0 表示不限制
+    max_concurrent_requests: int = 4  # 同一API地址+模型同时进行中的请求数上限
+    request_chunk_size: int = 0  # 每个请求最多包含的文本数，超出时分块并发请求，0 表示不分块
     attempts: int = -1  # 翻译重试次数，-1 表示无限重试
     use_custom_api_params: bool = False  # 是否使用自定义API参数配置文件
+    translation_memory: bool = False  # 翻译记忆（需显式开启，且 context_size 为 0）：相同原文（同翻译器、模型、提示词）直接复用已保存的译文
 
 class OcrSettings(BaseModel):
     use_mocr_merge: bool = False
@@ -26,6 +30,9 @@ class OcrSettings(BaseModel):
     merge_gamma: float = 0.8
     merge_sigma: float = 2.5
     merge_edge_ratio_threshold: float = 0.0
+    ocr_batch_size: int = 16
+    ocr_beam_size: int = 5
+    cross_page_ocr_batch: bool = False
 
 class DetectorSettings(BaseModel):
     detector: str = "default"
@@ -49,6 +56,8 @@ class InpainterSettings(BaseModel):
     inpainting_precision: str = "fp32"
     inpainting_split_ratio: float = 3.0
     force_use_torch_inpainting: bool = False
+    inpainting_mask_crop: bool = False
+    inpainting_crop_margin: int = 64
 
 class RenderSettings(BaseModel):
     renderer: str = "default"
@@ -77,12 +86,14 @@ class RenderSettings(BaseModel):
     stroke_width: float = 0.07
     enable_template_alignment: bool = False  # 启用模板匹配对齐（替换翻译模式）- 直接提取翻译图文字
     paste_mask_dilation_pixels: int = 10  # 粘贴模式蒙版膨胀大小（像素），设为0禁用膨胀
+    render_workers: int = 1  # 并行渲染文本区域的线程数，1为逐个渲染，0为CPU核心数
 
 class UpscaleSettings(BaseModel):
     upscaler: str = "esrgan"
     upscale_ratio: Optional[Union[int, str]] = None  # 可以是数字或字符串(mangajanai: x2, x4, DAT2 x4)
     realcugan_model: Optional[str] = None
     tile_size: Optional[int] = None
+    tile_batch_size: int = 0  # 每个推理批次的分块数，0为自动（GPU 4，CPU 1），显存不足时自动减半
     revert_upscaling: bool = False
 
 class ColorizerSettings(BaseModel):
@@ -105,6 +116,10 @@ class CliSettings(BaseModel):
     save_quality: int = 100
     batch_size: int = 1
     batch_concurrent: bool = False
+    pipeline_queue_size: int = 0  # 并发流水线每个阶段队列的容量，满时上游阻塞等待（0 为不限）
+    pipeline_memory_budget_mb: int = 0  # 并发流水线中未完成页面图片的内存上限（MB），超出时暂停检测（0 为不限）
+    pipeline_inpaint_workers: int = 1  # 并发流水线修复线程数（0 为 CPU 核心数，GPU 推理仍串行）
+    pipeline_render_workers: int = 1  # 并发流水线渲染线程数（0 为 CPU 核心数）
     generate_and_export: bool = False
     colorize_only: bool = False
     upscale_only: bool = False  # 仅超分模式
@@ -114,6 +129,9 @@ class CliSettings(BaseModel):
     psd_font: Optional[str] = None  # PSD导出使用的字体名称 (PostScript名称)
     psd_script_only: bool = False  # 仅生成JSX脚本而不执行Photoshop
     replace_translation: bool = False  # 替换翻译模式：将一张图的翻译应用到另一张生肉图上
+    stage_cache: bool = False  # 缓存检测/OCR/蒙版/修复结果，换翻译器或字体重翻时跳过这些阶段
+    stage_cache_dir: Optional[str] = None  # 阶段缓存目录（默认 cache/stages）
+    stage_cache_size_mb: int = 2048  # 阶段缓存大小上限（MB），超出时淘汰最久未使用的条目
 
 class AppSection(BaseModel):
     last_open_dir: str = '.'
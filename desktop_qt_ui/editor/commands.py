@@ -1,6 +1,8 @@
 
 import copy
-from typing import Any, Dict, TYPE_CHECKING
+import logging
+import zlib
+from typing import Any, Dict, Optional, Tuple, TYPE_CHECKING
 
 import numpy as np
 from PyQt6.QtGui import QUndoCommand
@@ -8,6 +10,9 @@ from PyQt6.QtGui import QUndoCommand
 if TYPE_CHECKING:
     from desktop_qt_ui.editor.editor_model import EditorModel
 
+# 撤销栈中蒙版编辑数据的内存上限（字节），超出时从最旧的蒙版编辑开始释放
+MASK_UNDO_MAX_BYTES = 64 * 1024 * 1024
+
 class UpdateRegionCommand(QUndoCommand):
     """用于更新单个区域数据的通用命令。"""
     def __init__(self, model: "EditorModel", region_index: int, old_data: Dict[str, Any], new_data: Dict[str, Any], description: str = "Update Region"):
@@ -119,15 +124,104 @@ class DeleteRegionCommand(QUndoCommand):
             self._model.set_selection([self._index])
 
 class MaskEditCommand(QUndoCommand):
-    """用于处理蒙版编辑的命令。"""
-    def __init__(self, model: "EditorModel", old_mask: np.ndarray, new_mask: np.ndarray):
+    """
+    用于处理蒙版编辑的命令。
+
+    不保存整张蒙版，只保存变化区域（包围盒）内编辑前后的像素（zlib 压缩），
+    撤销/重做时原地写回当前蒙版。没有旧蒙版或尺寸不一致时退化为保存整张压缩蒙版。
+    """
+    def __init__(self, model: "EditorModel", old_mask: Optional[np.ndarray], new_mask: np.ndarray,
+                 bounds: Optional[Tuple[int, int, int, int]] = None):
+        """
+        Args:
+            bounds: 可选的变化范围提示 (x0, y0, x1, y1)，只在该范围内查找变化像素
+        """
         super().__init__("Edit Mask")
         self._model = model
-        self._old_mask = old_mask
-        self._new_mask = new_mask
+        self._had_old_mask = old_mask is not None
+        self._roi = None  # (y0, y1, x0, x1)
+        self._old_data = None
+        self._new_data = None
+        self._full = old_mask is None or old_mask.shape != new_mask.shape
+        self._discarded = False
+
+        if self._full:
+            self._old_data = _pack_mask(old_mask) if old_mask is not None else None
+            self._new_data = _pack_mask(new_mask)
+            return
+
+        self._roi = _changed_bbox(old_mask, new_mask, bounds)
+        if self._roi is not None:
+            y0, y1, x0, x1 = self._roi
+            self._old_data = _pack_mask(old_mask[y0:y1, x0:x1])
+            self._new_data = _pack_mask(new_mask[y0:y1, x0:x1])
+
+    @property
+    def nbytes(self) -> int:
+        """撤销历史中保存的数据大小（字节）"""
+        return sum(len(data[0]) for data in (self._old_data, self._new_data) if data is not None)
+
+    def discard(self):
+        """
+        释放保存的数据（撤销栈超出内存上限时调用）。
+        之后撤销/重做此命令不再改变蒙版，并在到达时被 QUndoStack 移除。
+        """
+        self._discarded = True
+        self._old_data = None
+        self._new_data = None
+        self.setObsolete(True)
+
+    def _apply(self, data):
+        if self._discarded:
+            return
+        if self._full:
+            self._model.set_refined_mask(_unpack_mask(data) if data is not None else None)
+            return
+        if self._roi is None:
+            return  # 笔画没有改变任何像素
+        mask = self._model.get_refined_mask()
+        y0, y1, x0, x1 = self._roi
+        if mask is None or mask.shape[0] < y1 or mask.shape[1] < x1:
+            logging.warning("Mask changed outside of undo history, cannot apply mask edit")
+            return
+        mask[y0:y1, x0:x1] = _unpack_mask(data)
+        self._model.set_refined_mask(mask)
 
     def redo(self):
-        self._model.set_refined_mask(self._new_mask)
+        self._apply(self._new_data)
 
     def undo(self):
-        self._model.set_refined_mask(self._old_mask)
+        if self._full and not self._had_old_mask and not self._discarded:
+            self._model.set_refined_mask(None)
+            return
+        self._apply(self._old_data)
+
+
+def _changed_bbox(old_mask: np.ndarray, new_mask: np.ndarray,
+                  bounds: Optional[Tuple[int, int, int, int]] = None) -> Optional[Tuple[int, int, int, int]]:
+    """两张蒙版差异的包围盒 (y0, y1, x0, x1)，没有差异时返回 None"""
+    h, w = new_mask.shape[:2]
+    bx0, by0, bx1, by1 = (0, 0, w, h) if bounds is None else bounds
+    bx0, by0 = max(0, int(bx0)), max(0, int(by0))
+    bx1, by1 = min(w, int(np.ceil(bx1))), min(h, int(np.ceil(by1)))
+    if bx0 >= bx1 or by0 >= by1:
+        return None
+    diff = old_mask[by0:by1, bx0:bx1] != new_mask[by0:by1, bx0:bx1]
+    if diff.ndim == 3:
+        diff = diff.any(axis=2)
+    rows = np.flatnonzero(diff.any(axis=1))
+    if rows.size == 0:
+        return None
+    cols = np.flatnonzero(diff[rows[0]:rows[-1] + 1].any(axis=0))
+    return (by0 + int(rows[0]), by0 + int(rows[-1]) + 1, bx0 + int(cols[0]), bx0 + int(cols[-1]) + 1)
+
+
+def _pack_mask(mask: np.ndarray) -> Tuple[bytes, Tuple[int, ...], str]:
+    """压缩蒙版数据（蒙版大多是大片的 0/255，压缩率很高）"""
+    mask = np.ascontiguousarray(mask)
+    return zlib.compress(mask.tobytes(), 1), mask.shape, mask.dtype.str
+
+
+def _unpack_mask(data: Tuple[bytes, Tuple[int, ...], str]) -> np.ndarray:
+    payload, shape, dtype = data
+    return np.frombuffer(zlib.decompress(payload), dtype=np.dtype(dtype)).reshape(shape).copy()
@@ -10,7 +10,7 @@ import torch
 from PIL import Image
 from PyQt6.QtCore import QObject, QTimer, pyqtSignal, pyqtSlot
 
-from editor.commands import UpdateRegionCommand
+from editor.commands import MASK_UNDO_MAX_BYTES, MaskEditCommand, UpdateRegionCommand
 from services import (
     get_async_service,
     get_config_service,
@@ -1708,25 +1708,25 @@ class EditorController(QObject):
             if hasattr(self.view, 'toolbar') and self.view.toolbar:
                 self.view.toolbar.update_undo_redo_state(can_undo, can_redo)
 
-    def _limit_undo_stack_memory(self, max_items=50):
+    def _limit_undo_stack_memory(self, max_bytes=MASK_UNDO_MAX_BYTES):
         """
-        限制撤销栈的内存占用
-        由于QUndoStack默认没有限制，我们需要手动清理
+        按字节数限制撤销栈中蒙版编辑的内存占用
+        QUndoStack 不能删除最旧的命令（非空时 setUndoLimit 无效），超出上限时从最旧的已执行蒙版编辑开始释放数据，
+        释放后的命令撤销时不再改变蒙版，并由 QUndoStack 移除
         """
-        if hasattr(self.history_service, 'undo_stack'):
-            stack = self.history_service.undo_stack
-            if stack.count() > max_items:
-                # 这是一个hack：QUndoStack没有直接删除旧命令的方法
-                # 我们只能通过设置新的limit来强制清理
-                current_limit = stack.undoLimit()
-                # 临时减小limit以触发清理
-                stack.setUndoLimit(max_items)
-                # 恢复原来的limit (或者就保持这个limit)
-                # stack.setUndoLimit(current_limit)
-                
-                # 触发垃圾回收
-                import gc
-                gc.collect()
+        if not hasattr(self.history_service, 'undo_stack'):
+            return
+        stack = self.history_service.undo_stack
+        current_index = stack.index()
+        total = 0
+        # 从最新到最旧累计，超出上限后更旧的蒙版编辑全部释放（只释放已执行的命令，保证重做链完整）
+        for i in range(stack.count() - 1, -1, -1):
+            command = stack.command(i)
+            if not isinstance(command, MaskEditCommand):
+                continue
+            total += command.nbytes
+            if total > max_bytes and i < current_index:
+                command.discard()
 
     @pyqtSlot()
     def open_file_dialog_and_load(self):
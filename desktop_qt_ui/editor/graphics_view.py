@@ -1439,6 +1439,12 @@ class GraphicsView(QGraphicsView):
         painter.drawPath(self._current_draw_path)
         painter.end()
 
+        # 笔画影响的范围（路径包围盒 + 笔刷半径），撤销历史只保存该范围内的变化
+        margin = self._brush_size / 2 + 2
+        path_rect = self._current_draw_path.boundingRect()
+        stroke_bounds = (path_rect.left() - margin, path_rect.top() - margin,
+                         path_rect.right() + margin, path_rect.bottom() + margin)
+
         # Clear the preview immediately
         self._clear_preview()
 
@@ -1456,7 +1462,8 @@ class GraphicsView(QGraphicsView):
         command = MaskEditCommand(
             model=self.model,
             old_mask=old_mask_np,
-            new_mask=new_mask_np.copy()
+            new_mask=new_mask_np,
+            bounds=stroke_bounds
         )
         
         # Access controller through model's controller reference
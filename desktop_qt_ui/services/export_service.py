@@ -765,6 +765,8 @@ class ExportService:
                 self.logger.error(f"完整堆栈:\n{traceback.format_exc()}")
                 raise
             finally:
+                from manga_translator.translators.http_pool import close_loop_sessions
+                close_loop_sessions(loop)
                 loop.close()
 
         except Exception as e:
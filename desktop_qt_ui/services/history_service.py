@@ -44,7 +44,8 @@ class EditorStateManager:
     def __init__(self):
         # 使用 Qt 原生的 QUndoStack
         self.undo_stack = QUndoStack()
-        self.undo_stack.setUndoLimit(50)  # 限制历史记录数量
+        # 限制历史记录数量（蒙版编辑另按字节数限制，见 EditorController._limit_undo_stack_memory）
+        self.undo_stack.setUndoLimit(200)
         
         # 保留剪贴板功能
         self.clipboard = ClipboardManager()
@@ -191,6 +191,8 @@ class RenderConfig(BaseModel):
     """Enable template matching alignment for replace translation mode. Directly extracts text from translated image and pastes to raw image."""
     paste_mask_dilation_pixels: int = 10
     """Mask dilation size in pixels for paste mode. Default is 10. Set to 0 to disable dilation. Actual dilation = pixels // 3 iterations with 3x3 kernel."""
+    render_workers: int = 1
+    """Number of threads used to rasterize text regions in parallel. 1 renders regions one by one, 0 uses the CPU count."""
     _font_color_fg = None
     _font_color_bg = None
     @property
@@ -228,6 +230,8 @@ class UpscaleConfig(BaseModel):
     """Real-CUGAN model to use when upscaler is set to realcugan"""
     tile_size: Optional[int] = None
     """Tile size for Real-CUGAN upscaling (default: 400, 0 = process full image without tiling)"""
+    tile_batch_size: int = 0
+    """Number of equally sized tiles upscaled per inference batch for Real-CUGAN / MangaJaNai (0 = auto: 4 on GPU, 1 on CPU; halved automatically on out-of-memory)"""
 
 class TranslatorConfig(BaseModel):
     translator: Translator = Translator.openai_hq
@@ -263,6 +267,12 @@ class TranslatorConfig(BaseModel):
     # API请求频率限制配置
     max_requests_per_minute: int = 0
     """Maximum API requests per minute. 0 means no limit."""
+    max_tokens_per_minute: int = 0
+    """Maximum estimated API tokens per minute (prompt tokens, images counted approximately). 0 means no limit."""
+    max_concurrent_requests: int = 4
+    """Maximum number of in-flight API requests per API base + model for the OpenAI/Gemini translators. Halved temporarily on HTTP 429"""
+    request_chunk_size: int = 0
+    """Maximum number of texts per API request for the OpenAI/Gemini text translators; larger batches are split into chunks that are sent concurrently. 0 means no chunking"""
     
     # 自定义API参数配置
     use_custom_api_params: bool = False
@@ -278,6 +288,10 @@ class TranslatorConfig(BaseModel):
     post_check_target_lang_threshold: float = 0.5  
     """Minimum ratio of target language in translation text for ratio check"""
     
+    # 翻译记忆
+    translation_memory: bool = False
+    """Opt-in for context-free translation: reuse stored translations for exact repeats of the same source text (same translator, model and prompt) and translate duplicate lines of one request only once. Lines served from memory are left out of the prompt, so the model sees less of the page. Also requires context_size = 0 (the default is 3)"""
+    
     # 使用 PrivateAttr 确保每个实例有独立的缓存
     _translator_gen: Any = PrivateAttr(default=None)
 
@@ -340,6 +354,10 @@ class InpainterConfig(BaseModel):
     """Aspect ratio threshold for splitting image into tiles (e.g., 3.0 means split if width/height > 3 or height/width > 3)"""
     force_use_torch_inpainting: bool = False
     """Force use PyTorch for inpainting instead of ONNX (useful if ONNX has memory issues)"""
+    inpainting_mask_crop: bool = False
+    """Only inpaint padded crops around connected mask regions at native resolution instead of the whole (downscaled) page"""
+    inpainting_crop_margin: int = 64
+    """Context margin in pixels kept around each mask region when inpainting_mask_crop is enabled"""
 
 class ColorizerConfig(BaseModel):
     colorization_size: int = 576
@@ -363,6 +381,14 @@ class CliConfig(BaseModel):
     """Batch size for processing"""
     batch_concurrent: bool = False
     """Enable concurrent pipeline (Detection, OCR, Inpainting, Translation in parallel)"""
+    pipeline_queue_size: int = 0
+    """Capacity of each concurrent pipeline stage queue, upstream stages block when a queue is full. 0 means unbounded"""
+    pipeline_memory_budget_mb: int = 0
+    """Pause detection in the concurrent pipeline while in-flight page images exceed this many MB. 0 disables the budget"""
+    pipeline_inpaint_workers: int = 1
+    """Number of inpainting threads in the concurrent pipeline. 0 means the number of CPU cores. GPU inference is still serialized"""
+    pipeline_render_workers: int = 1
+    """Number of rendering threads in the concurrent pipeline. 0 means the number of CPU cores"""
     format: Optional[str] = None
     """Output format"""
     save_quality: int = 100
@@ -383,6 +409,12 @@ class CliConfig(BaseModel):
     """Only generate JSX script without executing Photoshop"""
     replace_translation: bool = False
     """Replace translation mode: apply translation from one image to another raw image"""
+    stage_cache: bool = False
+    """Cache detection, OCR, mask and inpainting results on disk, so re-translating the same images with another translator or font skips those stages"""
+    stage_cache_dir: Optional[str] = None
+    """Stage cache directory (default: cache/stages)"""
+    stage_cache_size_mb: int = 2048
+    """Stage cache size limit in MB, least recently used entries are evicted"""
 
 class OcrConfig(BaseModel):
     use_mocr_merge: bool = False
@@ -405,6 +437,12 @@ class OcrConfig(BaseModel):
     """Textline merge deviation tolerance, higher is more tolerant."""
     merge_edge_ratio_threshold: float = 0.0
     """If a box has two neighbors with edge distance ratio > this value, disconnect the larger distance edge. 0 means disabled."""
+    ocr_batch_size: int = 16
+    """Number of textline crops per inference batch for the 48px OCR model."""
+    ocr_beam_size: int = 5
+    """Beam width of the 48px OCR decoder. 1 means greedy decoding (fastest, slightly less accurate)."""
+    cross_page_ocr_batch: bool = False
+    """Collect textline crops from all pages of a translation batch and run OCR on them together (48px OCR only)."""
 
 class Config(BaseModel):
     # General
@@ -99,6 +99,45 @@ def get_detector_instance(key: str, detector_class):
     return detector_cache[key]
 
 
+def _boxes_aabb(boxes: List[Quadrilateral]) -> np.ndarray:
+    """一次性计算所有框的AABB，返回 (N, 4) 数组：[min_x, min_y, max_x, max_y]"""
+    if len(boxes) == 0:
+        return np.zeros((0, 4), dtype=np.float64)
+    pts = np.stack([box.pts for box in boxes]).astype(np.float64)
+    return np.concatenate([pts.min(axis=1), pts.max(axis=1)], axis=1)
+
+
+def _aabb_overlap_matrix(yolo_aabb: np.ndarray, main_aabb: np.ndarray):
+    """
+    批量计算YOLO框与主检测器框之间的重叠关系
+
+    Returns:
+        overlaps: (Y, M) bool，AABB是否相交（边界接触也算相交）
+        contains: (Y, M) bool，YOLO框是否完全包含主检测器框
+        overlap_ratio: (Y, M) float，交集面积 / 较小框面积（不相交为0）
+    """
+    y_min_x, y_min_y, y_max_x, y_max_y = (yolo_aabb[:, i:i + 1] for i in range(4))
+    m_min_x, m_min_y, m_max_x, m_max_y = (main_aabb[None, :, i] for i in range(4))
+    yolo_area = (y_max_x - y_min_x) * (y_max_y - y_min_y)
+    main_area = (m_max_x - m_min_x) * (m_max_y - m_min_y)
+
+    overlaps = ~((y_max_x < m_min_x) | (y_min_x > m_max_x) |
+                 (y_max_y < m_min_y) | (y_min_y > m_max_y))
+    contains = overlaps & ((y_min_x <= m_min_x) & (y_max_x >= m_max_x) &
+                           (y_min_y <= m_min_y) & (y_max_y >= m_max_y))
+
+    inter_area = ((np.minimum(y_max_x, m_max_x) - np.maximum(y_min_x, m_min_x)) *
+                  (np.minimum(y_max_y, m_max_y) - np.maximum(y_min_y, m_min_y)))
+    min_area = np.minimum(yolo_area, main_area)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        overlap_ratio = np.where(overlaps & (min_area > 0), inter_area / min_area, 0.0)
+    return overlaps, contains, overlap_ratio
+
+
+# 每次批量处理的YOLO框数量，限制 (Y, M) 中间矩阵的内存占用
+_MERGE_CHUNK_SIZE = 1024
+
+
 def merge_detection_boxes(yolo_boxes: List[Quadrilateral], main_boxes: List[Quadrilateral], overlap_threshold: float = 0.1) -> List[Quadrilateral]:
     """
     合并主检测器和YOLO检测器的框，智能替换逻辑：
@@ -109,6 +148,9 @@ def merge_detection_boxes(yolo_boxes: List[Quadrilateral], main_boxes: List[Quad
     5. 则删除被包含的主检测器框，使用YOLO框替代
     6. 其他情况：如果重叠率 >= overlap_threshold，删除重叠的YOLO框，保留主检测器框
     7. 不重叠或重叠率 < overlap_threshold 的YOLO框直接添加
+
+    所有框的AABB只计算一次，重叠/包含关系通过NumPy矩阵一次性求出，
+    避免逐对的Python双重循环。大量框时按块处理YOLO框以限制内存。
     
     Args:
         yolo_boxes: YOLO OBB检测器的检测框
@@ -123,106 +165,53 @@ def merge_detection_boxes(yolo_boxes: List[Quadrilateral], main_boxes: List[Quad
     
     if len(yolo_boxes) == 0:
         return main_boxes
-    
-    # 标记要移除的主检测器框索引
-    main_boxes_to_remove = set()
-    # 标记要移除的YOLO框索引
-    yolo_boxes_to_remove = set()
-    # 要添加的YOLO框（用于替换）
-    yolo_boxes_to_add_set = set()  # 使用set避免重复
-    
-    for yolo_idx, yolo_box in enumerate(yolo_boxes):
-        # 计算YOLO框的AABB和面积
-        yolo_min_x = np.min(yolo_box.pts[:, 0])
-        yolo_max_x = np.max(yolo_box.pts[:, 0])
-        yolo_min_y = np.min(yolo_box.pts[:, 1])
-        yolo_max_y = np.max(yolo_box.pts[:, 1])
-        yolo_area = (yolo_max_x - yolo_min_x) * (yolo_max_y - yolo_min_y)
-        
-        # 检查这个YOLO框是否满足任何替换条件
-        can_replace = False
-        max_overlap_ratio_with_others = 0.0  # 与其他未替换主框的最大重叠率
-        replaced_main_indices = set()  # 被这个YOLO框替换的主框索引
-        contained_main_boxes_total_area = 0.0  # 被完全包含的主框总面积
-        
-        for main_idx, main_box in enumerate(main_boxes):
-            # 计算主检测器框的AABB和面积
-            main_min_x = np.min(main_box.pts[:, 0])
-            main_max_x = np.max(main_box.pts[:, 0])
-            main_min_y = np.min(main_box.pts[:, 1])
-            main_max_y = np.max(main_box.pts[:, 1])
-            main_area = (main_max_x - main_min_x) * (main_max_y - main_min_y)
-            
-            # 检查是否有重叠
-            if not (yolo_max_x < main_min_x or yolo_min_x > main_max_x or
-                    yolo_max_y < main_min_y or yolo_min_y > main_max_y):
-                # 有重叠，计算重叠面积
-                inter_min_x = max(yolo_min_x, main_min_x)
-                inter_max_x = min(yolo_max_x, main_max_x)
-                inter_min_y = max(yolo_min_y, main_min_y)
-                inter_max_y = min(yolo_max_y, main_max_y)
-                inter_area = (inter_max_x - inter_min_x) * (inter_max_y - inter_min_y)
-                
-                # 计算重叠率（相对于较小框的比例）
-                overlap_ratio = inter_area / min(yolo_area, main_area) if min(yolo_area, main_area) > 0 else 0
-                
-                # 检查YOLO框是否完全包含主检测器框
-                contains = (yolo_min_x <= main_min_x and yolo_max_x >= main_max_x and
-                           yolo_min_y <= main_min_y and yolo_max_y >= main_max_y)
-                
-                if contains:
-                    # YOLO框完全包含这个主检测器框
-                    replaced_main_indices.add(main_idx)
-                    contained_main_boxes_total_area += main_area
-                else:
-                    # 不完全包含，记录与其他主框的重叠率
-                    max_overlap_ratio_with_others = max(max_overlap_ratio_with_others, overlap_ratio)
-        
+
+    yolo_aabb = _boxes_aabb(yolo_boxes)
+    main_aabb = _boxes_aabb(main_boxes)
+    yolo_area = (yolo_aabb[:, 2] - yolo_aabb[:, 0]) * (yolo_aabb[:, 3] - yolo_aabb[:, 1])
+    main_area = (main_aabb[:, 2] - main_aabb[:, 0]) * (main_aabb[:, 3] - main_aabb[:, 1])
+
+    # 标记要移除的主检测器框
+    main_remove_mask = np.zeros(len(main_boxes), dtype=bool)
+    # 标记要移除的YOLO框
+    yolo_remove_mask = np.zeros(len(yolo_boxes), dtype=bool)
+
+    for start in range(0, len(yolo_boxes), _MERGE_CHUNK_SIZE):
+        stop = min(start + _MERGE_CHUNK_SIZE, len(yolo_boxes))
+        _, contains, overlap_ratio = _aabb_overlap_matrix(yolo_aabb[start:stop], main_aabb)
+
+        # 被完全包含的主框数量与总面积
+        contained_count = contains.sum(axis=1)
+        contained_total_area = np.where(contains, main_area[None, :], 0.0).sum(axis=1)
+        # 与其他未被完全包含的主框的最大重叠率
+        max_overlap_with_others = np.where(contains, 0.0, overlap_ratio).max(axis=1)
+
+        has_contained = contained_count > 0
         # 检查面积条件：YOLO框面积 >= 所有被包含的主框总面积 × 2
-        if len(replaced_main_indices) > 0:
-            area_ratio = yolo_area / contained_main_boxes_total_area if contained_main_boxes_total_area > 0 else 0
-            if area_ratio >= 2.0:
-                can_replace = True
-        
-        # 决定这个YOLO框的命运
-        if len(replaced_main_indices) > 0:
-            # YOLO框包含了至少一个主检测器框
-            if can_replace:
-                # 满足了替换条件（面积 >= 2倍），但还需要检查与其他未包含主框的重叠率
-                # 对于满足2倍面积条件的框，允许更高的重叠率（阈值+0.1）
-                adjusted_threshold = overlap_threshold + 0.1
-                if max_overlap_ratio_with_others >= adjusted_threshold:
-                    # 与其他主框重叠率过高，删除这个YOLO框，不进行替换
-                    yolo_boxes_to_remove.add(yolo_idx)
-                else:
-                    # 可以安全替换：删除被替换的主框，添加YOLO框
-                    for main_idx in replaced_main_indices:
-                        main_boxes_to_remove.add(main_idx)
-                    yolo_boxes_to_add_set.add(yolo_idx)
-            else:
-                # 包含了主框但面积条件不满足（< 2倍），说明YOLO框可能检测错了，删除
-                yolo_boxes_to_remove.add(yolo_idx)
-        else:
-            # YOLO框没有完全包含任何主检测器框，按原有逻辑处理
-            if max_overlap_ratio_with_others >= overlap_threshold:
-                # 有重叠且重叠率 >= 阈值，删除这个YOLO框
-                yolo_boxes_to_remove.add(yolo_idx)
-            # else: 没有重叠或重叠率 < 阈值，会在后面作为新框添加
-    
-    # 构建最终结果
-    result = []
-    
-    # 添加未被移除的主检测器框
-    for idx, main_box in enumerate(main_boxes):
-        if idx not in main_boxes_to_remove:
-            result.append(main_box)
-    
-    # 添加YOLO框（替换的 + 不重叠的新框）
-    for idx, yolo_box in enumerate(yolo_boxes):
-        # 如果不在删除列表中，就添加（包括替换框和新框）
-        if idx not in yolo_boxes_to_remove:
-            result.append(yolo_box)
-    
+        with np.errstate(divide='ignore', invalid='ignore'):
+            area_ratio = np.where(contained_total_area > 0, yolo_area[start:stop] / contained_total_area, 0.0)
+        can_replace = has_contained & (area_ratio >= 2.0)
+
+        # 对于满足2倍面积条件的框，允许更高的重叠率（阈值+0.1）
+        adjusted_threshold = overlap_threshold + 0.1
+        replace_ok = can_replace & (max_overlap_with_others < adjusted_threshold)
+
+        remove = np.where(
+            has_contained,
+            # 包含了主框：面积条件不满足，或与其他主框重叠率过高，则删除YOLO框
+            ~replace_ok,
+            # 没有完全包含任何主框：重叠率 >= 阈值则删除
+            max_overlap_with_others >= overlap_threshold,
+        )
+        yolo_remove_mask[start:stop] = remove
+
+        # 可以安全替换：删除被替换的主框
+        if replace_ok.any():
+            main_remove_mask |= contains[replace_ok].any(axis=0)
+
+    # 构建最终结果：未被移除的主检测器框 + YOLO框（替换的 + 不重叠的新框）
+    result = [box for idx, box in enumerate(main_boxes) if not main_remove_mask[idx]]
+    result.extend(box for idx, box in enumerate(yolo_boxes) if not yolo_remove_mask[idx])
     return result
 
 def draw_detection_debug_image(image: np.ndarray, main_boxes: List[Quadrilateral], yolo_boxes: List[Quadrilateral], overlap_threshold: float = 0.1) -> np.ndarray:
@@ -249,37 +238,17 @@ def draw_detection_debug_image(image: np.ndarray, main_boxes: List[Quadrilateral
         cv2.putText(debug_img, "Main", tuple(pts[0]), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 1)
     
     # 绘制YOLO检测器的框（蓝色），并计算重叠率
+    if len(yolo_boxes) > 0 and len(main_boxes) > 0:
+        _, _, overlap_ratio = _aabb_overlap_matrix(_boxes_aabb(yolo_boxes), _boxes_aabb(main_boxes))
+        max_overlap_ratios = overlap_ratio.max(axis=1)
+    else:
+        max_overlap_ratios = np.zeros(len(yolo_boxes))
+
     for yolo_idx, yolo_box in enumerate(yolo_boxes):
         pts = yolo_box.pts.astype(np.int32)
         
-        # 计算与主检测器框的最大重叠率
-        yolo_min_x = np.min(yolo_box.pts[:, 0])
-        yolo_max_x = np.max(yolo_box.pts[:, 0])
-        yolo_min_y = np.min(yolo_box.pts[:, 1])
-        yolo_max_y = np.max(yolo_box.pts[:, 1])
-        yolo_area = (yolo_max_x - yolo_min_x) * (yolo_max_y - yolo_min_y)
-        
-        max_overlap_ratio = 0.0
-        for main_box in main_boxes:
-            main_min_x = np.min(main_box.pts[:, 0])
-            main_max_x = np.max(main_box.pts[:, 0])
-            main_min_y = np.min(main_box.pts[:, 1])
-            main_max_y = np.max(main_box.pts[:, 1])
-            main_area = (main_max_x - main_min_x) * (main_max_y - main_min_y)
-            
-            # 检查是否有重叠
-            if not (yolo_max_x < main_min_x or yolo_min_x > main_max_x or
-                    yolo_max_y < main_min_y or yolo_min_y > main_max_y):
-                # 计算重叠面积
-                inter_min_x = max(yolo_min_x, main_min_x)
-                inter_max_x = min(yolo_max_x, main_max_x)
-                inter_min_y = max(yolo_min_y, main_min_y)
-                inter_max_y = min(yolo_max_y, main_max_y)
-                inter_area = (inter_max_x - inter_min_x) * (inter_max_y - inter_min_y)
-                
-                # 计算重叠率
-                overlap_ratio = inter_area / min(yolo_area, main_area) if min(yolo_area, main_area) > 0 else 0
-                max_overlap_ratio = max(max_overlap_ratio, overlap_ratio)
+        # 与主检测器框的最大重叠率
+        max_overlap_ratio = float(max_overlap_ratios[yolo_idx])
         
         # 根据重叠率选择颜色 (RGB格式)
         if max_overlap_ratio >= overlap_threshold:
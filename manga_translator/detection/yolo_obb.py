@@ -7,12 +7,139 @@ import os
 import numpy as np
 import cv2
 import onnxruntime as ort
-from typing import List, Tuple, Optional
+from typing import Callable, List, Tuple, Optional
 
 from .common import OfflineDetector
 from ..utils import Quadrilateral, det_rearrange_forward
 
 
+def _overlap_pairs(mins: np.ndarray, maxs: np.ndarray, margin: float = 0.0) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    扫描线找出外接矩形（向外扩展 margin）相交的所有框对 (i, j)，i != j 且每对只出现一次
+
+    按 x 最小值排序后用二分查找确定每个框在 x 方向上可能相交的范围，
+    复杂度 O(N log N + K)，K 为 x 方向相交的框对数
+    """
+    n = len(mins)
+    if n < 2:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty
+    order = np.argsort(mins[:, 0], kind='stable')
+    xmin = mins[order, 0]
+    end = np.searchsorted(xmin, maxs[order, 0] + 2 * margin, side='right')
+    start = np.arange(1, n + 1)
+    counts = np.maximum(end - start, 0)
+    total = int(counts.sum())
+    if total == 0:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty
+    a = np.repeat(np.arange(n), counts)
+    # 每个框对应的 j 从 start 开始连续递增
+    offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+    b = np.repeat(start, counts) + offsets
+    a, b = order[a], order[b]
+    y_overlap = (mins[a, 1] <= maxs[b, 1] + 2 * margin) & (mins[b, 1] <= maxs[a, 1] + 2 * margin)
+    return a[y_overlap], b[y_overlap]
+
+
+def _polygon_area(polys: np.ndarray, counts: Optional[np.ndarray] = None) -> np.ndarray:
+    """鞋带公式计算多边形面积（带符号，逆时针为正）；counts 为每个多边形的有效顶点数"""
+    nxt = np.roll(polys, -1, axis=1)
+    if counts is not None:
+        # 最后一个有效顶点与第一个顶点闭合，无效槽位不参与计算
+        idx = np.arange(polys.shape[1])
+        last = idx[None, :] == (counts[:, None] - 1)
+        nxt = np.where(last[..., None], polys[:, :1], nxt)
+        cross = polys[..., 0] * nxt[..., 1] - polys[..., 1] * nxt[..., 0]
+        return 0.5 * np.where(idx[None, :] < counts[:, None], cross, 0.0).sum(axis=1)
+    cross = polys[..., 0] * nxt[..., 1] - polys[..., 1] * nxt[..., 0]
+    return 0.5 * cross.sum(axis=1)
+
+
+def _clip_convex(subject: np.ndarray, counts: np.ndarray, edge_start: np.ndarray, edge_end: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Sutherland–Hodgman 的一步（向量化）：用有向边 edge_start -> edge_end 左侧的半平面裁剪每个多边形
+
+    Args:
+        subject: (P, M, 2) 多边形顶点，每行前 counts[p] 个有效
+        counts: (P,) 有效顶点数
+        edge_start, edge_end: (P, 2) 裁剪边
+
+    Returns:
+        裁剪后的 (P, M, 2) 顶点和 (P,) 顶点数（凸多边形被四边形裁剪不会超过 M=8 个顶点）
+    """
+    p, m = subject.shape[:2]
+    idx = np.arange(m)
+    valid = idx[None, :] < counts[:, None]
+    prev_idx = np.where(idx[None, :] == 0, np.maximum(counts[:, None] - 1, 0), idx[None, :] - 1)
+    prev = np.take_along_axis(subject, prev_idx[..., None], axis=1)
+
+    edge = (edge_end - edge_start)[:, None, :]
+    d_cur = edge[..., 0] * (subject[..., 1] - edge_start[:, None, 1]) - edge[..., 1] * (subject[..., 0] - edge_start[:, None, 0])
+    d_prev = edge[..., 0] * (prev[..., 1] - edge_start[:, None, 1]) - edge[..., 1] * (prev[..., 0] - edge_start[:, None, 0])
+    in_cur = d_cur >= 0
+    in_prev = d_prev >= 0
+    crossing = (in_cur != in_prev) & valid
+
+    denom = d_prev - d_cur
+    t = np.divide(d_prev, denom, out=np.zeros_like(d_prev), where=crossing)
+    inter = prev + t[..., None] * (subject - prev)
+
+    # 每个顶点最多输出两个点：边与裁剪线的交点、在内侧的当前顶点
+    out = np.stack([inter, subject], axis=2).reshape(p, 2 * m, 2)
+    keep = np.stack([crossing, in_cur & valid], axis=2).reshape(p, 2 * m)
+    order = np.argsort(~keep, axis=1, kind='stable')[:, :m]
+    out = np.take_along_axis(out, order[..., None], axis=1)
+    return out, np.minimum(keep.sum(axis=1), m)
+
+
+def _convex_iou(polys_a: np.ndarray, polys_b: np.ndarray) -> np.ndarray:
+    """成对计算凸四边形 (P, 4, 2) 的 IoU（顶点需为逆时针顺序）"""
+    p = len(polys_a)
+    subject = np.zeros((p, 8, 2), dtype=np.float64)
+    subject[:, :4] = polys_a
+    counts = np.full(p, 4, dtype=np.int64)
+    for k in range(4):
+        subject, counts = _clip_convex(subject, counts, polys_b[:, k], polys_b[:, (k + 1) % 4])
+    inter = np.where(counts >= 3, np.abs(_polygon_area(subject, counts)), 0.0)
+    union = np.abs(_polygon_area(polys_a)) + np.abs(_polygon_area(polys_b)) - inter
+    return np.divide(inter, union, out=np.zeros_like(inter), where=union > 0)
+
+
+def _greedy_keep(order: np.ndarray, a: np.ndarray, b: np.ndarray, n: int,
+                 is_conflict: Optional[Callable[[int, np.ndarray], np.ndarray]] = None) -> np.ndarray:
+    """
+    贪心保留：按 order 依次处理，未被抑制的框保留，并抑制与它冲突的所有框
+
+    (a, b) 为冲突框对（对称关系），与"和任一已保留的更高分框冲突则丢弃"的逐对比较结果一致。
+    给出 is_conflict(i, candidates) 时 (a, b) 只是候选框对，
+    冲突只在保留 i 时对仍未处理的候选框计算（被抑制的框不再参与计算）
+    """
+    src = np.concatenate([a, b])
+    dst = np.concatenate([b, a])
+    sort = np.argsort(src, kind='stable')
+    dst = dst[sort]
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(src, minlength=n), out=indptr[1:])
+
+    # 已保留或已被抑制
+    done = np.zeros(n, dtype=bool)
+    keep = []
+    for i in order:
+        if done[i]:
+            continue
+        keep.append(i)
+        done[i] = True
+        neighbors = dst[indptr[i]:indptr[i + 1]]
+        if is_conflict is not None:
+            neighbors = neighbors[~done[neighbors]]
+            if len(neighbors) == 0:
+                continue
+            neighbors = neighbors[is_conflict(i, neighbors)]
+        done[neighbors] = True
+    return np.array(keep, dtype=np.int64)
+
+
 class YOLOOBBDetector(OfflineDetector):
     """YOLO OBB 检测器 - 基于ONNX Runtime"""
     
@@ -283,29 +410,29 @@ class YOLOOBBDetector(OfflineDetector):
         return corners
     
     def nms_rotated(self, boxes: np.ndarray, scores: np.ndarray, iou_threshold: float) -> List[int]:
-        """旋转框的非极大值抑制 (简化版本)"""
+        """
+        旋转框的非极大值抑制
+
+        先用外接矩形筛出可能重叠的框对，再按分数从高到低贪心保留：
+        每保留一个框，对其仍未被抑制的候选框用 Sutherland–Hodgman 裁剪计算精确的多边形 IoU
+        """
         if len(boxes) == 0:
             return []
         
-        # 按分数排序
-        indices = np.argsort(scores)[::-1]
-        keep = []
+        # 按分数排序（从高到低）
+        order = np.argsort(scores)[::-1]
+        corners = self.xywhr2xyxyxyxy(boxes.astype(np.float64))
+        # 统一为逆时针顶点顺序（角度或宽高为负时顺序会反过来）
+        clockwise = _polygon_area(corners) < 0
+        corners[clockwise] = corners[clockwise, ::-1]
         
-        while len(indices) > 0:
-            current = indices[0]
-            keep.append(current)
-            
-            if len(indices) == 1:
-                break
-            
-            # 简化的 IoU 计算（使用外接矩形）
-            _current_box = boxes[current]
-            _other_boxes = boxes[indices[1:]]
-            
-            # 计算边界框重叠（简化版）
-            indices = indices[1:]
+        a, b = _overlap_pairs(corners.min(axis=1), corners.max(axis=1))
+        
+        def is_conflict(i: int, candidates: np.ndarray) -> np.ndarray:
+            polys_a = np.broadcast_to(corners[i], (len(candidates), 4, 2))
+            return _convex_iou(polys_a, corners[candidates]) > iou_threshold
         
-        return keep
+        return _greedy_keep(order, a, b, len(boxes), is_conflict).tolist()
     
     def deduplicate_boxes(
         self,
@@ -315,56 +442,32 @@ class YOLOOBBDetector(OfflineDetector):
         distance_threshold: float = 10.0,
         iou_threshold: float = 0.3
     ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
-        """后处理去重：移除中心点距离很近或高度重叠的框"""
+        """后处理去重：移除中心点距离很近（同类别）或外接矩形高度重叠的框"""
         if len(boxes) == 0:
             return boxes, scores, class_ids
         
-        # 计算每个框的中心点
+        # 计算每个框的中心点和外接矩形
         centers = np.mean(boxes, axis=1)  # (N, 2)
-        
-        keep = []
-        
-        # 按分数排序（从高到低）
-        sorted_indices = np.argsort(scores)[::-1]
-        
-        for i in sorted_indices:
-            should_keep = True
-            
-            for j in keep:
-                # 检查中心点距离
-                dist = np.linalg.norm(centers[i] - centers[j])
-                
-                # 同类别且距离很近，则去重
-                if class_ids[i] == class_ids[j] and dist < distance_threshold:
-                    should_keep = False
-                    break
-                
-                # 计算简化的IoU（使用边界框）
-                box_i_min = np.min(boxes[i], axis=0)
-                box_i_max = np.max(boxes[i], axis=0)
-                box_j_min = np.min(boxes[j], axis=0)
-                box_j_max = np.max(boxes[j], axis=0)
-                
-                # 计算交集
-                inter_min = np.maximum(box_i_min, box_j_min)
-                inter_max = np.minimum(box_i_max, box_j_max)
-                inter_wh = np.maximum(0, inter_max - inter_min)
-                inter_area = inter_wh[0] * inter_wh[1]
-                
-                # 计算并集
-                box_i_area = (box_i_max[0] - box_i_min[0]) * (box_i_max[1] - box_i_min[1])
-                box_j_area = (box_j_max[0] - box_j_min[0]) * (box_j_max[1] - box_j_min[1])
-                union_area = box_i_area + box_j_area - inter_area
-                
-                # 计算IoU
-                if union_area > 0:
-                    iou = inter_area / union_area
-                    if iou > iou_threshold:
-                        should_keep = False
-                        break
-            
-            if should_keep:
-                keep.append(i)
+        box_min = np.min(boxes, axis=1)
+        box_max = np.max(boxes, axis=1)
+        
+        # 候选框对：外接矩形相交，或中心点距离可能小于阈值
+        # （中心点在外接矩形内，外接矩形各向外扩展 distance_threshold/2 后必然相交）
+        a, b = _overlap_pairs(box_min, box_max, margin=distance_threshold / 2)
+        
+        # 同类别且中心点距离很近
+        dist = np.linalg.norm(centers[a] - centers[b], axis=1)
+        close = (class_ids[a] == class_ids[b]) & (dist < distance_threshold)
+        
+        # 外接矩形 IoU
+        inter_wh = np.maximum(0, np.minimum(box_max[a], box_max[b]) - np.maximum(box_min[a], box_min[b]))
+        inter_area = inter_wh[:, 0] * inter_wh[:, 1]
+        area = (box_max[:, 0] - box_min[:, 0]) * (box_max[:, 1] - box_min[:, 1])
+        union_area = area[a] + area[b] - inter_area
+        iou = np.divide(inter_area, union_area, out=np.zeros_like(inter_area, dtype=np.float64), where=union_area > 0)
+        
+        conflict = close | (iou > iou_threshold)
+        keep = _greedy_keep(np.argsort(scores)[::-1], a[conflict], b[conflict], len(boxes))
         
         return boxes[keep], scores[keep], class_ids[keep]
     
@@ -1,5 +1,6 @@
-from typing import Optional
+from typing import List, Optional, Tuple
 
+import cv2
 import numpy as np
 
 from .common import CommonInpainter, OfflineInpainter
@@ -41,6 +42,21 @@ async def dispatch(inpainter_key: Inpainter, image: np.ndarray, mask: np.ndarray
         force_torch = getattr(config, 'force_use_torch_inpainting', False)
         await inpainter.load(device, force_torch=force_torch)
     
+    # 仅修复蒙版附近的区域（原始分辨率），蒙版覆盖面积过大时回退到整页修复
+    if config.inpainting_mask_crop and not isinstance(inpainter, (NoneInpainter, OriginalInpainter)):
+        rects = _mask_crop_rects(mask, config.inpainting_crop_margin)
+        crop_area = sum((x1 - x0) * (y1 - y0) for x0, y0, x1, y1 in rects)
+        if crop_area <= _MASK_CROP_MAX_AREA_RATIO * mask.shape[0] * mask.shape[1]:
+            return await _dispatch_with_mask_crop(inpainter, image, mask, rects, config, inpainting_size, verbose)
+        if verbose:
+            print(f"[Inpainting Crop] Crops cover {crop_area / (mask.shape[0] * mask.shape[1]):.0%} of the page, inpainting full image")
+
+    return await _inpaint_image(inpainter, image, mask, config, inpainting_size, verbose)
+
+async def unload(inpainter_key: Inpainter):
+    inpainter_cache.pop(inpainter_key, None)
+
+async def _inpaint_image(inpainter: CommonInpainter, image: np.ndarray, mask: np.ndarray, config: InpainterConfig, inpainting_size: int, verbose: bool) -> np.ndarray:
     # 检查是否需要切割（极端长宽比）
     h, w = image.shape[:2]
     aspect_ratio = max(w / h, h / w)
@@ -53,8 +69,81 @@ async def dispatch(inpainter_key: Inpainter, image: np.ndarray, mask: np.ndarray
         # 正常处理
         return await inpainter.inpaint(image, mask, config, inpainting_size, verbose)
 
-async def unload(inpainter_key: Inpainter):
-    inpainter_cache.pop(inpainter_key, None)
+# 裁剪区域总面积超过整页的该比例时，直接整页修复更划算
+_MASK_CROP_MAX_AREA_RATIO = 0.6
+# 裁剪区域对齐到该值的倍数，避免模型内部对输入再做缩放/补边
+_MASK_CROP_ALIGN = 64
+
+def _align_rect(rect: Tuple[int, int, int, int], width: int, height: int) -> Tuple[int, int, int, int]:
+    """将矩形向外扩展到 _MASK_CROP_ALIGN 的倍数（不超出图像边界）"""
+    x0, y0, x1, y1 = rect
+    aligned = []
+    for lo, hi, size in ((x0, x1, width), (y0, y1, height)):
+        target = min(size, -(-(hi - lo) // _MASK_CROP_ALIGN) * _MASK_CROP_ALIGN)
+        grow = target - (hi - lo)
+        lo = max(0, lo - grow // 2)
+        hi = lo + target
+        if hi > size:
+            lo, hi = size - target, size
+        aligned.append((lo, hi))
+    (x0, x1), (y0, y1) = aligned
+    return x0, y0, x1, y1
+
+def _mask_crop_rects(mask: np.ndarray, margin: int) -> List[Tuple[int, int, int, int]]:
+    """
+    根据蒙版连通域计算需要修复的裁剪区域
+    
+    蒙版先按 margin 膨胀（相邻文字自然合并为同一连通域，并保留上下文边距），
+    再取各连通域外接矩形，对齐后合并所有相交的矩形，保证结果互不重叠。
+    
+    Returns:
+        [(x0, y0, x1, y1), ...]
+    """
+    height, width = mask.shape[:2]
+    binary = (mask >= 127).astype(np.uint8)
+    if margin > 0:
+        kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (2 * margin + 1, 2 * margin + 1))
+        binary = cv2.dilate(binary, kernel)
+    num_labels, _, stats, _ = cv2.connectedComponentsWithStats(binary, connectivity=8)
+
+    rects = []
+    for x, y, w, h, _ in stats[1:num_labels]:
+        rects.append(_align_rect((int(x), int(y), int(x + w), int(y + h)), width, height))
+
+    # 合并相交的矩形直到稳定（合并后的矩形重新对齐，可能与其它矩形产生新的相交）
+    merged = True
+    while merged:
+        merged = False
+        result = []
+        for rect in rects:
+            for i, other in enumerate(result):
+                if rect[0] < other[2] and other[0] < rect[2] and rect[1] < other[3] and other[1] < rect[3]:
+                    result[i] = _align_rect((min(rect[0], other[0]), min(rect[1], other[1]),
+                                             max(rect[2], other[2]), max(rect[3], other[3])), width, height)
+                    merged = True
+                    break
+            else:
+                result.append(rect)
+        rects = result
+    return rects
+
+async def _dispatch_with_mask_crop(inpainter: CommonInpainter, image: np.ndarray, mask: np.ndarray, rects: List[Tuple[int, int, int, int]], config: InpainterConfig, inpainting_size: int, verbose: bool) -> np.ndarray:
+    """
+    只对蒙版连通域周围的裁剪区域进行修复，然后贴回原图
+    
+    裁剪区域互不重叠，且蒙版外的像素由修复器按原图保留，因此可以直接整块贴回。
+    小于 inpainting_size 的裁剪区域以原始分辨率修复，不会像整页修复那样被缩小。
+    """
+    result = image.copy()
+    if verbose:
+        crop_area = sum((x1 - x0) * (y1 - y0) for x0, y0, x1, y1 in rects)
+        print(f"[Inpainting Crop] {len(rects)} crops, {crop_area / (image.shape[0] * image.shape[1]):.1%} of the page")
+
+    for x0, y0, x1, y1 in rects:
+        crop_inpainted = await _inpaint_image(inpainter, image[y0:y1, x0:x1].copy(), mask[y0:y1, x0:x1].copy(),
+                                              config, inpainting_size, verbose)
+        result[y0:y1, x0:x1] = crop_inpainted
+    return result
 
 async def _dispatch_with_split(inpainter: CommonInpainter, image: np.ndarray, mask: np.ndarray, config: InpainterConfig, inpainting_size: int, verbose: bool) -> np.ndarray:
     """
@@ -15,7 +15,7 @@ from PIL import Image
 from typing import Optional, Any, List
 import py3langid as langid
 
-from .config import Config, Colorizer, Translator, Renderer, Inpainter
+from .config import Config, Colorizer, Translator, Renderer, Inpainter, Ocr
 from .utils import (
     BASE_PATH,
     LANGUAGE_ORIENTATION_PRESETS,
@@ -27,6 +27,7 @@ from .utils import (
     is_valuable_text,
     sort_regions,
     TextBlock,
+    Quadrilateral,
     imwrite_unicode
 )
 from .utils.text_filter import match_filter, ensure_filter_list_exists
@@ -38,17 +39,19 @@ from .utils.path_manager import (
     get_inpainted_path,
     find_json_path
 )
+from .utils.stage_cache import StageCache, hash_array, hash_polygons, model_version
 
-from .detection import dispatch as dispatch_detection, prepare as prepare_detection, unload as unload_detection
+from .detection import DETECTORS, YOLOOBBDetector, dispatch as dispatch_detection, prepare as prepare_detection, unload as unload_detection
 from .upscaling import dispatch as dispatch_upscaling, prepare as prepare_upscaling, unload as unload_upscaling
-from .ocr import dispatch as dispatch_ocr, prepare as prepare_ocr, unload as unload_ocr
+from .ocr import OCRS, dispatch as dispatch_ocr, dispatch_pages as dispatch_ocr_pages, prepare as prepare_ocr, unload as unload_ocr
 from .textline_merge import dispatch as dispatch_textline_merge
 from .mask_refinement import dispatch as dispatch_mask_refinement
-from .inpainting import dispatch as dispatch_inpainting, prepare as prepare_inpainting, unload as unload_inpainting
+from .inpainting import INPAINTERS, dispatch as dispatch_inpainting, prepare as prepare_inpainting, unload as unload_inpainting
 from .translators import (
     dispatch as dispatch_translation,
     prepare as prepare_translation,
     unload as unload_translation,
+    translation_memory,
 )
 from .translators.common import ISO_639_1_TO_VALID_LANGUAGES
 from .colorization import dispatch as dispatch_colorization, prepare as prepare_colorization, unload as unload_colorization
@@ -141,6 +144,7 @@ class MangaTranslator:
     device: Optional[str]
     kernel_size: Optional[int]
     models_ttl: int
+    stage_cache: Optional[StageCache]
     _progress_hooks: list[Any]
     result_sub_folder: str
     batch_size: int
@@ -156,6 +160,7 @@ class MangaTranslator:
         self.ignore_errors = False
         self.verbose = False
         self.models_ttl = 0
+        self.stage_cache = None
         self.batch_size = 1  # 默认不批量处理
 
         self._progress_hooks = []
@@ -163,6 +168,8 @@ class MangaTranslator:
         
         # 取消检查回调（用于Web服务器等场景）
         self._cancel_check_callback = None
+        # 单张图片完成回调（用于Web服务器流式返回结果）
+        self._result_callback = None
 
         params = params or {}
         
@@ -170,6 +177,12 @@ class MangaTranslator:
         self._batch_configs = []   # 存储批量处理的配置
         # batch_concurrent 四并发模式（默认关闭，可通过配置开启）
         self.batch_concurrent = params.get('batch_concurrent', False)
+        # 并发流水线的队列容量和内存上限（0 为不限）
+        self.pipeline_queue_size = params.get('pipeline_queue_size', 0) or 0
+        self.pipeline_memory_budget_mb = params.get('pipeline_memory_budget_mb', 0) or 0
+        # 并发流水线修复/渲染线程数（0 为 CPU 核心数）
+        self.pipeline_inpaint_workers = params.get('pipeline_inpaint_workers', 1)
+        self.pipeline_render_workers = params.get('pipeline_render_workers', 1)
         
         # 添加模型加载状态标志
         self._models_loaded = False
@@ -231,6 +244,12 @@ class MangaTranslator:
             ModelWrapper._MODEL_DIR = params.get('model_dir')
         #todo: fix why is kernel size loaded in the constructor
         self.kernel_size=int(params.get('kernel_size', 3))
+        # 阶段结果缓存（检测、OCR、蒙版细化、修复），同一图片换翻译器/字体重翻时跳过这些阶段
+        if params.get('stage_cache', False):
+            cache_dir = params.get('stage_cache_dir') or os.path.join(BASE_PATH, 'cache', 'stages')
+            self.stage_cache = StageCache(cache_dir, params.get('stage_cache_size_mb', 2048))
+        else:
+            self.stage_cache = None
         # Set input files
         self.input_files = params.get('input', [])
         # Set save_text
@@ -909,6 +928,7 @@ class MangaTranslator:
             tile_size = getattr(config.upscale, 'tile_size', None)
             if tile_size is not None:
                 upscaler_kwargs['tile_size'] = tile_size
+            upscaler_kwargs['tile_batch_size'] = getattr(config.upscale, 'tile_batch_size', 0)
         elif config.upscale.upscaler == 'mangajanai':
             # mangajanai 的 upscale_ratio 可以是字符串 (x2, x4, DAT2 x4) 或数字
             ratio = config.upscale.upscale_ratio
@@ -929,6 +949,7 @@ class MangaTranslator:
             tile_size = getattr(config.upscale, 'tile_size', None)
             if tile_size is not None:
                 upscaler_kwargs['tile_size'] = tile_size
+            upscaler_kwargs['tile_batch_size'] = getattr(config.upscale, 'tile_batch_size', 0)
         
         # 获取实际的数字倍率
         if config.upscale.upscaler == 'mangajanai':
@@ -955,10 +976,64 @@ class MangaTranslator:
         
         return result
 
+    def _stage_cache_enabled(self) -> bool:
+        # verbose 模式下各阶段需要生成调试图，不使用缓存
+        return self.stage_cache is not None and not self.verbose
+
+    def _stage_cache_key(self, stage: str, ctx: Context, *parts) -> Optional[str]:
+        """阶段缓存键：当前图片内容哈希 + 该阶段依赖的输入/配置/模型版本；未启用缓存时返回 None"""
+        if not self._stage_cache_enabled() or ctx.img_rgb is None:
+            return None
+        # img_rgb 在加载后不再改变，哈希只计算一次
+        cached_hash = ctx.img_rgb_hash
+        if cached_hash is None or cached_hash[0] != id(ctx.img_rgb):
+            cached_hash = (id(ctx.img_rgb), hash_array(ctx.img_rgb))
+            ctx.img_rgb_hash = cached_hash
+        return self.stage_cache.make_key(stage, cached_hash[1], *parts)
+
+    def _stage_cache_get(self, stage: str, key: Optional[str]):
+        if key is None:
+            return None
+        result = self.stage_cache.get(stage, key)
+        if result is not None:
+            logger.info(f'Stage cache hit: {stage}')
+        return result
+
+    def _stage_cache_put(self, stage: str, key: Optional[str], result):
+        if key is not None:
+            self.stage_cache.put(stage, key, result)
+
+    def get_stage_cache_stats(self) -> Optional[dict]:
+        """阶段缓存的命中/未命中统计，未启用缓存时返回 None"""
+        return self.stage_cache.stats() if self.stage_cache is not None else None
+
+    def _ocr_cache_key(self, config: Config, ctx: Context) -> Optional[str]:
+        if not self._stage_cache_enabled():
+            return None
+        textlines = ctx.textlines or []
+        models = [model_version(OCRS.get(config.ocr.ocr))]
+        if config.ocr.use_hybrid_ocr:
+            models.append(model_version(OCRS.get(config.ocr.secondary_ocr)))
+        return self._stage_cache_key('ocr', ctx,
+                                     hash_polygons(txtln.pts for txtln in textlines),
+                                     [float(txtln.prob) for txtln in textlines],
+                                     config.ocr.model_dump_json(), models,
+                                     config.render.font_color_fg, config.render.font_color_bg, self.device)
+
     async def _run_detection(self, config: Config, ctx: Context):
         # ✅ 检查停止标志
         await asyncio.sleep(0)
         self._check_cancelled()
+
+        cache_key = None
+        if self._stage_cache_enabled():
+            models = [model_version(DETECTORS.get(config.detector.detector))]
+            if config.detector.use_yolo_obb:
+                models.append(model_version(YOLOOBBDetector))
+            cache_key = self._stage_cache_key('detection', ctx, config.detector.model_dump_json(), models, self.device)
+            cached = self._stage_cache_get('detection', cache_key)
+            if cached is not None:
+                return cached
         
         current_time = time.time()
         self._model_usage_timestamps[("detection", config.detector.detector)] = current_time
@@ -1062,6 +1137,7 @@ class MangaTranslator:
                 pass
         # --- END NON-MAXIMUM SUPPRESSION (NMS) ---
 
+        self._stage_cache_put('detection', cache_key, result)
         return result
     async def _unload_model(self, tool: str, model: str, **kwargs):
         logger.info(f"Unloading {tool} model: {model}")
@@ -1279,10 +1355,22 @@ class MangaTranslator:
                     del self._model_usage_timestamps[(tool, model)]
             await asyncio.sleep(1)
 
-    async def _run_ocr(self, config: Config, ctx: Context):
+    async def _run_ocr(self, config: Config, ctx: Context, primary_textlines: List[Quadrilateral] = None,
+                       cache_key: Optional[str] = None):
+        """
+        对 ctx.textlines 执行OCR（含混合OCR重试和过滤）。
+        primary_textlines 为跨页批量OCR已得到的主OCR结果，传入时跳过主OCR推理，
+        此时 cache_key 为调用方在主OCR之前计算的阶段缓存键。
+        """
         # ✅ 检查停止标志
         await asyncio.sleep(0)
         self._check_cancelled()
+
+        if primary_textlines is None:
+            cache_key = self._ocr_cache_key(config, ctx)
+            cached = self._stage_cache_get('ocr', cache_key)
+            if cached is not None:
+                return cached
         
         current_time = time.time()
         self._model_usage_timestamps[("ocr", config.ocr.ocr)] = current_time
@@ -1310,10 +1398,13 @@ class MangaTranslator:
         
         try:
             # --- Primary OCR run ---
-            primary_ocr_engine = config.ocr.ocr
-            ocr_name = primary_ocr_engine.value if hasattr(primary_ocr_engine, 'value') else primary_ocr_engine
-            logger.info(f"Running primary OCR with: {ocr_name}")
-            textlines = await dispatch_ocr(primary_ocr_engine, ctx.img_rgb, ctx.textlines, config.ocr, self.device, self.verbose)
+            if primary_textlines is not None:
+                textlines = primary_textlines
+            else:
+                primary_ocr_engine = config.ocr.ocr
+                ocr_name = primary_ocr_engine.value if hasattr(primary_ocr_engine, 'value') else primary_ocr_engine
+                logger.info(f"Running primary OCR with: {ocr_name}")
+                textlines = await dispatch_ocr(primary_ocr_engine, ctx.img_rgb, ctx.textlines, config.ocr, self.device, self.verbose)
 
             # --- BEGIN: HYBRID OCR LOGIC ---
             if config.ocr.use_hybrid_ocr:
@@ -1370,8 +1461,85 @@ class MangaTranslator:
                 if config.render.font_color_bg:
                     textline.bg_r, textline.bg_g, textline.bg_b = config.render.font_color_bg
                 new_textlines.append(textline)
+        self._stage_cache_put('ocr', cache_key, new_textlines)
         return new_textlines
 
+    def _use_cross_page_ocr(self, config: Config) -> bool:
+        """是否对当前批次的页面做跨页批量OCR（verbose 模式下按页保存OCR调试图，不跨页）"""
+        return config.ocr.cross_page_ocr_batch and config.ocr.ocr == Ocr.ocr48px and not self.verbose
+
+    async def _run_ocr_pages(self, config: Config, ctxs: List[Context]) -> List[List[Quadrilateral]]:
+        """
+        跨页批量OCR：主OCR对所有页的文本行一起分批推理，混合OCR重试和过滤仍按页进行。
+        返回每页的 textlines，顺序与 ctxs 一致。
+        """
+        await asyncio.sleep(0)
+        self._check_cancelled()
+
+        # 命中阶段缓存的页面不参与本次推理（缓存键需在OCR修改文本行之前计算）
+        results = [None] * len(ctxs)
+        pending = []
+        for index, ctx in enumerate(ctxs):
+            cache_key = self._ocr_cache_key(config, ctx)
+            results[index] = self._stage_cache_get('ocr', cache_key)
+            if results[index] is None:
+                pending.append((index, cache_key))
+        if not pending:
+            return results
+
+        self._model_usage_timestamps[("ocr", config.ocr.ocr)] = time.time()
+        ocr_name = config.ocr.ocr.value if hasattr(config.ocr.ocr, 'value') else config.ocr.ocr
+        logger.info(f"Running primary OCR with: {ocr_name} (cross-page batch, {len(pending)} pages)")
+        pages = [(ctxs[index].img_rgb, ctxs[index].textlines) for index, _ in pending]
+        primary_results = await dispatch_ocr_pages(config.ocr.ocr, pages, config.ocr, self.device, self.verbose)
+        for (index, cache_key), textlines in zip(pending, primary_results):
+            results[index] = await self._run_ocr(config, ctxs[index], primary_textlines=textlines, cache_key=cache_key)
+        return results
+
+    async def _finish_deferred_ocr(self, preprocessed_contexts: List[tuple], deferred_pages: List[tuple]):
+        """
+        为 _translate_until_translation(defer_ocr=True) 推迟了OCR的页面执行跨页批量OCR，
+        然后逐页完成文本行合并等后续步骤。deferred_pages 为 (preprocessed_contexts 下标, image_md5) 列表。
+        """
+        await self._report_progress('ocr')
+
+        # OCR配置相同的页面才能放进同一批
+        groups = {}
+        for index, image_md5 in deferred_pages:
+            _, config = preprocessed_contexts[index]
+            groups.setdefault(config.ocr.model_dump_json(), []).append((index, image_md5))
+
+        for group in groups.values():
+            contexts = [preprocessed_contexts[index][0] for index, _ in group]
+            config = preprocessed_contexts[group[0][0]][1]
+            ocr_error = None
+            try:
+                page_textlines = await self._run_ocr_pages(config, contexts)
+            except Exception as e:
+                logger.error(f"Error during ocr:\n{traceback.format_exc()}")
+                ocr_error = e
+                page_textlines = [[] for _ in contexts]
+
+            for (index, image_md5), textlines in zip(group, page_textlines):
+                ctx, config = preprocessed_contexts[index]
+                try:
+                    if ocr_error is not None and not self.ignore_errors:
+                        raise ocr_error
+                    if not self._restore_image_context(image_md5):
+                        self._set_image_context(config, ctx.input)
+                    ctx.ocr_deferred = False
+                    ctx.textlines = textlines
+                    preprocessed_contexts[index] = (await self._translate_after_ocr(config, ctx), config)
+                except Exception as e:
+                    logger.error(f"Error pre-processing image {index+1} in batch: {e}")
+                    error_ctx = Context()
+                    error_ctx.input = ctx.input
+                    error_ctx.text_regions = []
+                    error_ctx.image_index = ctx.image_index
+                    if ctx.image_name:
+                        error_ctx.image_name = ctx.image_name
+                    preprocessed_contexts[index] = (error_ctx, config)
+
     async def _run_textline_merge(self, config: Config, ctx: Context):
         current_time = time.time()
         self._model_usage_timestamps[("textline_merge", "textline_merge")] = current_time
@@ -1729,7 +1897,7 @@ class MangaTranslator:
 
 
             # OpenAI 需要传递 ctx 参数（用于AI断句）
-            return await translator._translate(ctx.from_lang, config.translator.target_lang, texts, ctx)
+            return await translator._translate_with_memory(ctx.from_lang, config.translator.target_lang, texts, ctx)
         else:
             return await dispatch_translation(
                 config.translator.translator_gen,
@@ -2057,7 +2225,9 @@ class MangaTranslator:
                             try:
                                 # 重新批量翻译
                                 logger.info(f"Retrying translation for {len(original_texts)} regions...")
-                                new_translations = await self._batch_translate_texts(original_texts, config, ctx)
+                                # 译后检查失败的重译不使用翻译记忆中的旧译文
+                                with translation_memory.bypass():
+                                    new_translations = await self._batch_translate_texts(original_texts, config, ctx)
                                 
                                 # 更新翻译结果到regions
                                 for i, region in enumerate(ctx.text_regions):
@@ -2153,19 +2323,41 @@ class MangaTranslator:
         # ✅ 检查停止标志
         await asyncio.sleep(0)
         self._check_cancelled()
-        
-        return await dispatch_mask_refinement(ctx.text_regions, ctx.img_rgb, ctx.mask_raw, 'fit_text',
+
+        # 蒙版只取决于文本框坐标，与译文无关
+        cache_key = None
+        if self._stage_cache_enabled() and ctx.text_regions:
+            cache_key = self._stage_cache_key('mask_refinement', ctx, hash_array(ctx.mask_raw),
+                                              hash_polygons(line for region in ctx.text_regions for line in region.lines),
+                                              'fit_text', config.mask_dilation_offset, config.ocr.ignore_bubble, self.kernel_size)
+            cached = self._stage_cache_get('mask_refinement', cache_key)
+            if cached is not None:
+                return cached
+
+        mask = await dispatch_mask_refinement(ctx.text_regions, ctx.img_rgb, ctx.mask_raw, 'fit_text',
                                               config.mask_dilation_offset, config.ocr.ignore_bubble, self.verbose,self.kernel_size)
+        self._stage_cache_put('mask_refinement', cache_key, mask)
+        return mask
 
     async def _run_inpainting(self, config: Config, ctx: Context):
         # ✅ 检查停止标志
         await asyncio.sleep(0)
         self._check_cancelled()
         
+        cache_key = None
+        if self._stage_cache_enabled() and ctx.mask is not None:
+            cache_key = self._stage_cache_key('inpainting', ctx, hash_array(ctx.mask), config.inpainter.model_dump_json(),
+                                              model_version(INPAINTERS.get(config.inpainter.inpainter)), self.device)
+            cached = self._stage_cache_get('inpainting', cache_key)
+            if cached is not None:
+                return cached
+
         current_time = time.time()
         self._model_usage_timestamps[("inpainting", config.inpainter.inpainter)] = current_time
-        return await dispatch_inpainting(config.inpainter.inpainter, ctx.img_rgb, ctx.mask, config.inpainter, config.inpainter.inpainting_size, self.device,
-                                         self.verbose)
+        img_inpainted = await dispatch_inpainting(config.inpainter.inpainter, ctx.img_rgb, ctx.mask, config.inpainter, config.inpainter.inpainting_size, self.device,
+                                                  self.verbose)
+        self._stage_cache_put('inpainting', cache_key, img_inpainted)
+        return img_inpainted
 
     async def _run_text_rendering(self, config: Config, ctx: Context):
         # ✅ 检查停止标志
@@ -2356,6 +2548,24 @@ class MangaTranslator:
         """设置取消检查回调函数"""
         self._cancel_check_callback = callback
     
+    def set_result_callback(self, callback):
+        """
+        设置单张图片完成回调函数 callback(ctx)，在翻译线程中调用
+
+        用 ctx.image_index（该图片在 translate_batch 输入列表中的序号）对应输入图片；
+        不要依赖 ctx.input 的对象身份，并发流水线会从磁盘重新加载图片。
+        """
+        self._result_callback = callback
+    
+    def _notify_result(self, ctx: Context):
+        """通知单张图片已完成（回调出错不影响翻译）"""
+        if self._result_callback is None or ctx is None:
+            return
+        try:
+            self._result_callback(ctx)
+        except Exception as e:
+            logger.warning(f"Result callback failed: {e}")
+    
     def _check_cancelled(self):
         """检查任务是否被取消"""
         if self._cancel_check_callback and self._cancel_check_callback():
@@ -2512,7 +2722,14 @@ class MangaTranslator:
             # 保存save_info供并发流水线使用
             self._current_save_info = save_info
             
-            pipeline = ConcurrentPipeline(self, batch_size)
+            pipeline = ConcurrentPipeline(
+                self,
+                batch_size,
+                queue_size=self.pipeline_queue_size,
+                memory_budget_mb=self.pipeline_memory_budget_mb,
+                inpaint_workers=self.pipeline_inpaint_workers,
+                render_workers=self.pipeline_render_workers,
+            )
             
             # 提取文件路径和配置
             file_paths = []
@@ -2741,6 +2958,7 @@ class MangaTranslator:
                                 ctx.result = dump_image(ctx.input, ctx.img_rendered, ctx.img_alpha)
                                 ctx = await self._revert_upscale(config, ctx)
                             
+                            ctx.image_index = batch_start + i
                             preprocessed_contexts.append((ctx, config))
                             
                             # ✅ 每处理完一张图片后立即清理内存（保留result）
@@ -2755,6 +2973,7 @@ class MangaTranslator:
                                 ctx.image_name = image.name
                             ctx.translation_error = str(e)
                             ctx.result = image
+                            ctx.image_index = batch_start + i
                             preprocessed_contexts.append((ctx, config))
                     
                     # load_text模式下已经完成了所有处理（包括渲染），直接保存并返回
@@ -2766,6 +2985,7 @@ class MangaTranslator:
                             except Exception as save_err:
                                 logger.error(f"Error saving load_text result for {os.path.basename(ctx.image_name)}: {save_err}")
                         
+                        self._notify_result(ctx)
                         results.append(ctx)
                     
                     # ✅ load_text模式：批次完成后清理批次数据（图片已在循环内清理）
@@ -2782,6 +3002,8 @@ class MangaTranslator:
 
                 # 标准模式：执行检测、OCR等预处理
                 logger.info(f'[阶段] 开始预处理阶段（检测、OCR）')
+                # 推迟OCR、等待跨页批量OCR的页面：(preprocessed_contexts 下标, image_md5)
+                deferred_ocr_pages = []
                 for i, (image, config) in enumerate(current_batch_images):
                     # 检查是否被取消
                     await asyncio.sleep(0)
@@ -2792,9 +3014,12 @@ class MangaTranslator:
                         from .utils.generic import get_image_md5
                         image_md5 = get_image_md5(image)
                         self._save_current_image_context(image_md5)
-                        ctx = await self._translate_until_translation(image, config)
+                        ctx = await self._translate_until_translation(image, config, defer_ocr=self._use_cross_page_ocr(config))
                         if hasattr(image, 'name'):
                             ctx.image_name = image.name
+                        if ctx.ocr_deferred:
+                            deferred_ocr_pages.append((len(preprocessed_contexts), image_md5))
+                        ctx.image_index = batch_start + i
                         preprocessed_contexts.append((ctx, config))
                     except Exception as e:
                         logger.error(f"Error pre-processing image {i+1} in batch: {e}")
@@ -2803,8 +3028,13 @@ class MangaTranslator:
                         ctx.text_regions = []
                         if hasattr(image, 'name'):
                             ctx.image_name = image.name
+                        ctx.image_index = batch_start + i
                         preprocessed_contexts.append((ctx, config))
 
+                # 跨页批量OCR，并完成这些页面的文本行合并
+                if deferred_ocr_pages:
+                    await self._finish_deferred_ocr(preprocessed_contexts, deferred_ocr_pages)
+
                 # --- 阶段2: 翻译 ---
                 logger.info(f'[阶段] 预处理完成，开始翻译阶段')
                 if self.colorize_only or self.upscale_only or self.inpaint_only:
@@ -2949,6 +3179,7 @@ class MangaTranslator:
                             # 使用循环变量中的config，而不是从ctx中获取
                             self._save_text_to_file(ctx.image_name, ctx, config)
 
+                        self._notify_result(ctx)
                         results.append(ctx)
 
                         # ✅ 渲染完一张立即清理这张图片的中间数据（不等整个批次完成）
@@ -2961,6 +3192,7 @@ class MangaTranslator:
 
                     except Exception as e:
                         logger.error(f"Error rendering image in batch: {e}")
+                        self._notify_result(ctx)
                         results.append(ctx)
             
             finally:
@@ -2975,11 +3207,19 @@ class MangaTranslator:
                 logger.debug(f'[MEMORY] Batch {batch_start//batch_size + 1} cleanup completed')
 
         logger.info(f"Batch translation completed: processed {len(results)} images")
+        if self._stage_cache_enabled():
+            stats = self.stage_cache.stats()
+            summary = ', '.join(f"{stage} {counts['hits']}/{counts['hits'] + counts['misses']}"
+                                for stage, counts in stats['stages'].items())
+            logger.info(f"Stage cache hits: {summary} ({stats['entries']} entries, {stats['size_mb']} MB)")
         return results
 
-    async def _translate_until_translation(self, image: Image.Image, config: Config) -> Context:
+    async def _translate_until_translation(self, image: Image.Image, config: Config, defer_ocr: bool = False) -> Context:
         """
         执行翻译之前的所有步骤（彩色化、上采样、检测、OCR、文本行合并）
+
+        defer_ocr=True 时在检测完成后返回（ctx.ocr_deferred 为 True），由调用方跨页批量OCR后
+        调用 _translate_after_ocr 完成剩余步骤。
         """
         
         # ✅ 检查停止标志
@@ -3018,6 +3258,7 @@ class MangaTranslator:
                         upscaler_kwargs['model_name'] = config.upscale.realcugan_model
                     if config.upscale.tile_size is not None:
                         upscaler_kwargs['tile_size'] = config.upscale.tile_size
+                    upscaler_kwargs['tile_batch_size'] = config.upscale.tile_batch_size
                 elif config.upscale.upscaler == 'mangajanai':
                     # mangajanai 的 upscale_ratio 可以是字符串 (x2, x4, DAT2 x4) 或数字
                     ratio = config.upscale.upscale_ratio
@@ -3029,6 +3270,7 @@ class MangaTranslator:
                         upscaler_kwargs['model_name'] = 'x4'
                     if config.upscale.tile_size is not None:
                         upscaler_kwargs['tile_size'] = config.upscale.tile_size
+                    upscaler_kwargs['tile_batch_size'] = config.upscale.tile_batch_size
                 await prepare_upscaling(config.upscale.upscaler, **upscaler_kwargs)
             
             await prepare_detection(config.detector.detector)
@@ -3275,6 +3517,10 @@ class MangaTranslator:
                 cv2.polylines(img_bbox_raw, [txtln.pts], True, color=(255, 0, 0), thickness=2)
             imwrite_unicode(self._result_path('bboxes_unfiltered.png'), cv2.cvtColor(img_bbox_raw, cv2.COLOR_RGB2BGR), logger)
 
+        if defer_ocr:
+            ctx.ocr_deferred = True
+            return ctx
+
         # -- OCR
         await self._report_progress('ocr')
         try:
@@ -3285,6 +3531,12 @@ class MangaTranslator:
                 raise 
             ctx.textlines = []
 
+        return await self._translate_after_ocr(config, ctx)
+
+    async def _translate_after_ocr(self, config: Config, ctx: Context) -> Context:
+        """
+        OCR之后、翻译之前的步骤（文本行合并、过滤列表、译前词典）
+        """
         if not ctx.textlines:
             await self._report_progress('skip-no-text', True)
             ctx.result = ctx.upscaled
@@ -3557,7 +3809,8 @@ class MangaTranslator:
                                     try:
                                         # 重新批量翻译
                                         logger.info(f"Retrying translation for {len(all_original_texts)} regions...")
-                                        new_translations = await self._batch_translate_texts(all_original_texts, sample_config, batch[0][0])
+                                        with translation_memory.bypass():
+                                            new_translations = await self._batch_translate_texts(all_original_texts, sample_config, batch[0][0])
                                         
                                         # 更新翻译结果到各个region
                                         for i, (ctx_idx, region) in enumerate(region_mapping):
@@ -3751,7 +4004,8 @@ class MangaTranslator:
                             original_texts = [region.text for region in ctx.text_regions if hasattr(region, 'text') and region.text]
                             if original_texts:
                                 try:
-                                    new_translations = await self._batch_translate_texts(original_texts, config, ctx)
+                                    with translation_memory.bypass():
+                                        new_translations = await self._batch_translate_texts(original_texts, config, ctx)
                                     
                                     # 更新翻译结果
                                     text_idx = 0
@@ -3945,7 +4199,7 @@ class MangaTranslator:
             # openai_hq, gemini_hq 等需要传递ctx参数
             if config.translator.translator in [Translator.openai_hq, Translator.gemini_hq]:
                 # 所有需要上下文的翻译器都在这里传递ctx
-                return await translator._translate(
+                return await translator._translate_with_memory(
                     ctx.from_lang,
                     config.translator.target_lang,
                     texts,
@@ -3953,7 +4207,7 @@ class MangaTranslator:
                 )
             else:
                 # 普通OpenAI和Gemini需要ctx参数（用于AI断句）
-                return await translator._translate(
+                return await translator._translate_with_memory(
                     ctx.from_lang,
                     config.translator.target_lang,
                     texts,
@@ -4435,14 +4689,15 @@ class MangaTranslator:
                     # 单独重新翻译这个文本区域
                     if config.translator.translator != Translator.none:
                         from .translators import dispatch
-                        retranslated = await dispatch(
-                            config.translator.translator_gen,
-                            [region.text],
-                            config.translator,
-                            False,  # use_mtpe removed
-                            ctx,
-                            'cpu' if self._gpu_limited_memory else self.device
-                        )
+                        with translation_memory.bypass():
+                            retranslated = await dispatch(
+                                config.translator.translator_gen,
+                                [region.text],
+                                config.translator,
+                                False,  # use_mtpe removed
+                                ctx,
+                                'cpu' if self._gpu_limited_memory else self.device
+                            )
                         if retranslated:
                             region.translation = retranslated[0]
                             
@@ -4570,6 +4825,7 @@ class MangaTranslator:
                     ctx = await self._translate_until_translation(image, config)
                     if hasattr(image, 'name'):
                         ctx.image_name = image.name
+                    ctx.image_index = batch_start + i
                     preprocessed_contexts.append((ctx, config))
                 except Exception as e:
                     logger.error(f"Error pre-processing image {i+1} in batch: {e}")
@@ -4578,6 +4834,7 @@ class MangaTranslator:
                     ctx.text_regions = []
                     if hasattr(image, 'name'):
                         ctx.image_name = image.name
+                    ctx.image_index = batch_start + i
                     preprocessed_contexts.append((ctx, config))
 
             # 阶段二：翻译当前批次
@@ -4759,6 +5016,7 @@ class MangaTranslator:
 
                     # ✅ 标记成功
                     ctx.success = True
+                    self._notify_result(ctx)
 
                     # ✅ 清理中间处理图像（保留text_regions等元数据）
                     self._cleanup_context_memory(ctx, keep_result=True)
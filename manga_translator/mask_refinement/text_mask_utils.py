@@ -123,77 +123,108 @@ def refine_mask(rgbimg, rawmask):
     # 直接转换，避免额外复制
     return (res * 255).astype(np.uint8)
 
-# 内存阈值：当 M * mask_size 超过此值时启用切割 (约 100MB)
-MEMORY_THRESHOLD = 100 * 1024 * 1024  
+# bilateralFilter 的邻域直径；只对文本行附近的区域滤波时按其半径向外扩展，保证与整图滤波结果一致
+BILATERAL_DIAMETER = 17
+# 每次批量计算 AABB 相交时处理的连通域数量（限制 连通域×文本行 布尔矩阵的大小）
+_AABB_CHUNK = 4096
 
-def _find_safe_split_points(textlines: List[Quadrilateral], img_height: int, img_width: int, target_chunks: int = 4):
+
+def _textline_bounds(textlines: List[Quadrilateral]) -> np.ndarray:
+    """每个文本行多边形的外接矩形 (min_x, min_y, max_x, max_y)"""
+    if not textlines:
+        return np.zeros((0, 4), dtype=np.float64)
+    return np.array([[*txtln.pts.min(axis=0), *txtln.pts.max(axis=0)] for txtln in textlines], dtype=np.float64)
+
+
+def _aabb_candidates(cc_rects: np.ndarray, tl_bounds: np.ndarray) -> List[np.ndarray]:
     """
-    根据 textlines 的边界找到安全的切割点（不会切到任何文本框）。
-    返回按 Y 轴切割的分界线列表。
+    对每个连通域（x, y, w, h）返回外接矩形与其有正面积交集的文本行下标。
+    不在候选中的文本行与该连通域的多边形交集面积必为 0。
+    """
+    candidates = []
+    for start in range(0, len(cc_rects), _AABB_CHUNK):
+        rects = cc_rects[start:start + _AABB_CHUNK].astype(np.float64)
+        x1, y1 = rects[:, 0:1], rects[:, 1:2]
+        x2, y2 = x1 + rects[:, 2:3], y1 + rects[:, 3:4]
+        hit = (tl_bounds[None, :, 0] < x2) & (tl_bounds[None, :, 2] > x1) \
+            & (tl_bounds[None, :, 1] < y2) & (tl_bounds[None, :, 3] > y1)
+        candidates.extend(np.nonzero(row)[0] for row in hit)
+    return candidates
+
+
+def _overlap_area(poly: Polygon, cc_poly: Polygon) -> float:
+    try:
+        return poly.intersection(cc_poly).area
+    except Exception:
+        try:
+            return poly.buffer(0).intersection(cc_poly.buffer(0)).area
+        except Exception:
+            return 0
+
+
+def _centroid_distances(polys: List[Polygon], cc_poly: Polygon) -> np.ndarray:
+    centroid = cc_poly.centroid
+    dists = np.zeros(len(polys), dtype=np.float32)
+    for i, poly in enumerate(polys):
+        try:
+            dists[i] = poly.distance(centroid)
+        except Exception:
+            dists[i] = float('inf')
+    return dists
+
+
+def _merge_rects(rects: List[Tuple[int, int, int, int]]) -> List[Tuple[int, int, int, int]]:
+    """合并相交的矩形 (x1, y1, x2, y2)，直到互不相交"""
+    merged = sorted(rects)
+    changed = True
+    while changed:
+        changed = False
+        result = []
+        for rect in merged:
+            for i, other in enumerate(result):
+                if rect[0] < other[2] and other[0] < rect[2] and rect[1] < other[3] and other[1] < rect[3]:
+                    result[i] = (min(rect[0], other[0]), min(rect[1], other[1]),
+                                 max(rect[2], other[2]), max(rect[3], other[3]))
+                    changed = True
+                    break
+            else:
+                result.append(rect)
+        merged = result
+    return merged
+
+
+class _FilteredImage:
+    """
+    只在需要的区域上计算 bilateralFilter：
+    相交的区域先合并，每块按滤波半径向外扩展后单独滤波，结果与整图滤波相同。
     """
-    if not textlines:
-        return []
-    
-    # 收集所有 textline 的 y 范围
-    occupied_ranges = []
-    for txtln in textlines:
-        bbox = txtln.aabb
-        y_min = int(bbox.y)
-        y_max = int(bbox.y + bbox.h)
-        occupied_ranges.append((y_min, y_max))
-    
-    # 合并重叠的范围
-    occupied_ranges.sort(key=lambda r: r[0])
-    merged = []
-    for start, end in occupied_ranges:
-        if merged and start <= merged[-1][1] + 10:  # 10px 容差
-            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
-        else:
-            merged.append([start, end])
-    
-    # 找到可以切割的间隙
-    gaps = []
-    for i in range(len(merged) - 1):
-        gap_start = merged[i][1]
-        gap_end = merged[i + 1][0]
-        if gap_end - gap_start > 20:  # 至少 20px 的间隙
-            gaps.append((gap_start + gap_end) // 2)
-    
-    # 如果没有足够的间隙，返回空列表（不切割）
-    if len(gaps) < target_chunks - 1:
-        # 尝试均匀选择可用的间隙
-        if gaps:
-            step = max(1, len(gaps) // (target_chunks - 1))
-            return [gaps[i] for i in range(0, len(gaps), step)][:target_chunks - 1]
-        return []
-    
-    # 均匀选择切割点
-    step = max(1, len(gaps) // (target_chunks - 1))
-    selected_indices = [min(i * step, len(gaps) - 1) for i in range(1, target_chunks)]
-    return [gaps[idx] for idx in selected_indices][:target_chunks - 1]
 
+    def __init__(self, img: np.ndarray, regions: List[Tuple[int, int, int, int]]):
+        self.img = img
+        pad = BILATERAL_DIAMETER // 2 + 1
+        height, width = img.shape[:2]
+        self.blocks = []
+        for x1, y1, x2, y2 in _merge_rects(regions):
+            px1, py1 = max(x1 - pad, 0), max(y1 - pad, 0)
+            px2, py2 = min(x2 + pad, width), min(y2 + pad, height)
+            filtered = cv2.bilateralFilter(np.ascontiguousarray(img[py1:py2, px1:px2]), BILATERAL_DIAMETER, 80, 80)
+            self.blocks.append(((x1, y1, x2, y2), filtered[y1 - py1:y2 - py1, x1 - px1:x2 - px1]))
 
-def _process_chunk(img_chunk: np.ndarray, mask_chunk: np.ndarray, textlines_chunk: List[Quadrilateral], 
-                   y_offset: int, keep_threshold: float, dilation_offset: int, kernel_size: int):
-    """处理单个切割块"""
-    if not textlines_chunk:
-        return np.zeros((mask_chunk.shape[0], mask_chunk.shape[1]), dtype=np.uint8)
-    
-    # 调整 textlines 的坐标到当前块的局部坐标系
-    adjusted_textlines = []
-    for txtln in textlines_chunk:
-        # 创建新的点数组，调整 y 坐标
-        new_pts = txtln.pts.copy()
-        new_pts[:, 1] -= y_offset
-        adjusted_txtln = Quadrilateral(new_pts, txtln.text, txtln.prob)
-        adjusted_txtln.font_size = txtln.font_size
-        adjusted_textlines.append(adjusted_txtln)
-    
-    return _complete_mask_core(img_chunk, mask_chunk, adjusted_textlines, keep_threshold, dilation_offset, kernel_size)
+    def crop(self, x: int, y: int, w: int, h: int) -> np.ndarray:
+        for (x1, y1, x2, y2), block in self.blocks:
+            if x1 <= x and y1 <= y and x + w <= x2 and y + h <= y2:
+                return np.ascontiguousarray(block[y - y1:y - y1 + h, x - x1:x - x1 + w])
+        raise ValueError(f'Region {(x, y, w, h)} was not filtered')
 
 
 def _complete_mask_core(img: np.ndarray, mask: np.ndarray, textlines: List[Quadrilateral], keep_threshold = 1e-2, dilation_offset = 0, kernel_size=3):
-    """complete_mask 的核心实现，处理单个区块"""
+    """
+    complete_mask 的核心实现
+
+    每个文本行只记录分配给它的连通域（标签和外接矩形），在需要时才在文本行附近的裁剪区域上
+    画出，不再为每个文本行分配整页大小的数组；连通域与文本行先做外接矩形相交的向量化预筛，
+    只对可能相交的组合计算多边形交集；bilateralFilter 也只作用于文本行扩展区域的并集。
+    """
     bboxes = [txtln.aabb.xywh for txtln in textlines]
     polys = [Polygon(txtln.pts) for txtln in textlines]
     for (x, y, w, h) in bboxes:
@@ -201,21 +232,19 @@ def _complete_mask_core(img: np.ndarray, mask: np.ndarray, textlines: List[Quadr
     num_labels, labels, stats, centroids = cv2.connectedComponentsWithStats(mask)
 
     M = len(textlines)
-    
-    import logging
+
     logger = logging.getLogger(__name__)
-    logger.debug("--- MASK_REFINEMENT_DEBUG: Entering _complete_mask_core ---")
-    logger.debug(f"--- MASK_REFINEMENT_DEBUG: Number of textlines (M) = {M} ---")
-    logger.debug(f"--- MASK_REFINEMENT_DEBUG: Number of connected components (num_labels) = {num_labels} ---")
-
-    textline_ccs = [np.zeros_like(mask) for _ in range(M)]
-    iinfo = np.iinfo(labels.dtype)
-    textline_rects = np.full(shape = (M, 4), fill_value = [iinfo.max, iinfo.max, iinfo.min, iinfo.min], dtype = labels.dtype)
-    ratio_mat = np.zeros(shape = (num_labels, M), dtype = np.float32)
-    dist_mat = np.zeros(shape = (num_labels, M), dtype = np.float32)
-    valid = False
-    for label in range(1, num_labels):
-        if stats[label, cv2.CC_STAT_AREA] <= 9:
+    logger.debug(f"complete_mask: {M} textlines, {num_labels} connected components")
+
+    # 面积 <= 9 的连通域忽略
+    cc_indices = [label for label in range(1, num_labels) if stats[label, cv2.CC_STAT_AREA] > 9]
+    candidates = _aabb_candidates(stats[cc_indices, :4], _textline_bounds(textlines)) if cc_indices and M else []
+
+    # 每个文本行分配到的连通域：[(label, x, y, w, h)]
+    textline_ccs = [[] for _ in range(M)]
+    for label, tl_candidates in zip(cc_indices, candidates):
+        if len(tl_candidates) == 0:
+            # 与所有文本行的交集均为 0，max_overlap < 0.1
             continue
 
         x1 = stats[label, cv2.CC_STAT_LEFT]
@@ -226,141 +255,78 @@ def _complete_mask_core(img: np.ndarray, mask: np.ndarray, textlines: List[Quadr
         cc_pts = np.array([[x1, y1], [x1 + w1, y1], [x1 + w1, y1 + h1], [x1, y1 + h1]])
         cc_poly = Polygon(cc_pts)
 
-        for tl_idx in range(M):
-            area2 = polys[tl_idx].area
-            try:
-                overlapping_area = polys[tl_idx].intersection(cc_poly).area
-            except Exception as _e:
-                try:
-                    fixed_poly = polys[tl_idx].buffer(0)
-                    fixed_cc_poly = cc_poly.buffer(0)
-                    overlapping_area = fixed_poly.intersection(fixed_cc_poly).area
-                except Exception:
-                    overlapping_area = 0
-            
-            ratio_mat[label, tl_idx] = overlapping_area / min(area1, area2)
-            
-            try:
-                dist_mat[label, tl_idx] = polys[tl_idx].distance(cc_poly.centroid)
-            except Exception:
-                dist_mat[label, tl_idx] = float('inf')
-
-        avg = np.argmax(ratio_mat[label])
-        max_overlap = ratio_mat[label, avg]
-
-        if max_overlap < 0.1:
+        # 非候选文本行的比值为 0，与完整矩阵的 argmax 结果相同
+        ratios = np.zeros(M, dtype=np.float32)
+        for tl_idx in tl_candidates:
+            ratios[tl_idx] = _overlap_area(polys[tl_idx], cc_poly) / min(area1, polys[tl_idx].area)
+
+        avg = np.argmax(ratios)
+        if ratios[avg] < 0.1:
             continue
-            
+
         area2 = polys[avg].area
         if area1 >= area2:
             continue
-        if ratio_mat[label, avg] <= keep_threshold:
-            avg = np.argmin(dist_mat[label])
-            area2 = polys[avg].area
+        if ratios[avg] <= keep_threshold:
+            dists = _centroid_distances(polys, cc_poly)
+            avg = np.argmin(dists)
             unit = max(min([textlines[avg].font_size, w1, h1]), 10)
-            if dist_mat[label, avg] >= 0.5 * unit:
+            if dists[avg] >= 0.5 * unit:
                 continue
 
-        textline_ccs[avg][y1:y1+h1, x1:x1+w1][labels[y1:y1+h1, x1:x1+w1] == label] = 255
-        textline_rects[avg, 0] = min(textline_rects[avg, 0], x1)
-        textline_rects[avg, 1] = min(textline_rects[avg, 1], y1)
-        textline_rects[avg, 2] = max(textline_rects[avg, 2], x1 + w1)
-        textline_rects[avg, 3] = max(textline_rects[avg, 3], y1 + h1)
-        valid = True
+        textline_ccs[avg].append((label, x1, y1, w1, h1))
 
-    if not valid:
+    if not any(textline_ccs):
         return None
-    
-    textline_rects[:, 2] -= textline_rects[:, 0]
-    textline_rects[:, 3] -= textline_rects[:, 1]
-    
-    final_mask = np.zeros_like(mask)
-    img = cv2.bilateralFilter(img, 17, 80, 80)
-    for i, cc in enumerate(tqdm(textline_ccs, '[mask]')):
-        x1, y1, w1, h1 = textline_rects[i]
-        text_size = min(w1, h1, textlines[i].font_size)
-        x1, y1, w1, h1 = extend_rect(x1, y1, w1, h1, img.shape[1], img.shape[0], int(text_size * 0.1))
+
+    height, width = img.shape[:2]
+    # 每个文本行的精修区域 (x1, y1, w1, h1) 和膨胀区域 (x2, y2, w2, h2)
+    plans = []
+    for i, ccs in enumerate(textline_ccs):
+        if not ccs:
+            continue
+        rx1 = min(cc[1] for cc in ccs)
+        ry1 = min(cc[2] for cc in ccs)
+        rw1 = max(cc[1] + cc[3] for cc in ccs) - rx1
+        rh1 = max(cc[2] + cc[4] for cc in ccs) - ry1
+        text_size = min(rw1, rh1, textlines[i].font_size)
+        x1, y1, w1, h1 = extend_rect(rx1, ry1, rw1, rh1, width, height, int(text_size * 0.1))
+        if w1 <= 0 or h1 <= 0:
+            continue
         dilate_size = max((int((text_size + dilation_offset) * 0.3) // 2) * 2 + 1, 3)
+        x2, y2, w2, h2 = extend_rect(x1, y1, w1, h1, width, height, -(-dilate_size // 2))
+        plans.append((i, (x1, y1, w1, h1), (x2, y2, w2, h2), dilate_size))
+
+    filtered = _FilteredImage(img, [(x1, y1, x1 + w1, y1 + h1) for _, (x1, y1, w1, h1), _, _ in plans])
+
+    final_mask = np.zeros_like(mask)
+    for i, (x1, y1, w1, h1), (x2, y2, w2, h2), dilate_size in tqdm(plans, '[mask]'):
+        # 在膨胀区域大小的裁剪上画出该文本行的连通域（膨胀区域包含精修区域）
+        cc = np.zeros((h2, w2), dtype=mask.dtype)
+        for label, cx, cy, cw, ch in textline_ccs[i]:
+            ix1, iy1 = max(cx, x2), max(cy, y2)
+            ix2, iy2 = min(cx + cw, x2 + w2), min(cy + ch, y2 + h2)
+            if ix1 >= ix2 or iy1 >= iy2:
+                continue
+            cc[iy1 - y2:iy2 - y2, ix1 - x2:ix2 - x2][labels[iy1:iy2, ix1:ix2] == label] = 255
+
+        ox, oy = x1 - x2, y1 - y2
+        cc_region = np.ascontiguousarray(cc[oy:oy + h1, ox:ox + w1])
+        cc[oy:oy + h1, ox:ox + w1] = refine_mask(filtered.crop(x1, y1, w1, h1), cc_region)
         kern = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (dilate_size, dilate_size))
-        cc_region = np.ascontiguousarray(cc[y1: y1 + h1, x1: x1 + w1])
-        if cc_region.size == 0:
-            continue
-        img_region = np.ascontiguousarray(img[y1: y1 + h1, x1: x1 + w1])
-        cc_region = refine_mask(img_region, cc_region)
-        cc[y1: y1 + h1, x1: x1 + w1] = cc_region
-        x2, y2, w2, h2 = extend_rect(x1, y1, w1, h1, img.shape[1], img.shape[0], -(-dilate_size // 2))
-        cc[y2:y2+h2, x2:x2+w2] = cv2.dilate(cc[y2:y2+h2, x2:x2+w2], kern)
-        final_mask[y2:y2+h2, x2:x2+w2] = cv2.bitwise_or(final_mask[y2:y2+h2, x2:x2+w2], cc[y2:y2+h2, x2:x2+w2])
+        cc = cv2.dilate(cc, kern)
+        final_mask[y2:y2+h2, x2:x2+w2] = cv2.bitwise_or(final_mask[y2:y2+h2, x2:x2+w2], cc)
     kern = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (kernel_size, kernel_size))
     return cv2.dilate(final_mask, kern)
 
 
 def complete_mask(img: np.ndarray, mask: np.ndarray, textlines: List[Quadrilateral], keep_threshold = 1e-2, dilation_offset = 0, kernel_size=3):
     """
-    完成 mask 精修。对于大图会自动切割处理以避免内存溢出。
+    完成 mask 精修
+
+    内存占用与文本行附近的区域大小成正比，不再随 文本行数 × 整页大小 增长，
+    长图（webtoon）也无需切块处理。
     """
-    import logging
-    logger = logging.getLogger(__name__)
-    
-    M = len(textlines)
-    mask_size = mask.shape[0] * mask.shape[1]
-    estimated_memory = M * mask_size  # 每个 textline 需要一个同样大小的数组
-    
-    # 检查是否需要切割处理
-    if estimated_memory > MEMORY_THRESHOLD and M > 0:
-        logger.info(f"Large image detected ({mask.shape[0]}x{mask.shape[1]}, {M} textlines). Using chunked processing.")
-        
-        # 计算需要的切割数量
-        target_chunks = max(2, int(np.ceil(estimated_memory / MEMORY_THRESHOLD)))
-        target_chunks = min(target_chunks, 8)  # 最多切 8 块
-        
-        # 找到安全的切割点
-        split_points = _find_safe_split_points(textlines, img.shape[0], img.shape[1], target_chunks)
-        
-        if not split_points:
-            logger.warning("Could not find safe split points, falling back to direct processing.")
-            return _complete_mask_core(img, mask.copy(), textlines, keep_threshold, dilation_offset, kernel_size)
-        
-        logger.info(f"Splitting image at Y positions: {split_points}")
-        
-        # 构建切割边界
-        boundaries = [0] + split_points + [img.shape[0]]
-        final_mask = np.zeros((mask.shape[0], mask.shape[1]), dtype=np.uint8)
-        
-        for i in range(len(boundaries) - 1):
-            y_start = boundaries[i]
-            y_end = boundaries[i + 1]
-            
-            # 提取当前块的图像和 mask
-            img_chunk = img[y_start:y_end, :].copy()
-            mask_chunk = mask[y_start:y_end, :].copy()
-            
-            # 找出属于当前块的 textlines
-            textlines_chunk = []
-            for txtln in textlines:
-                bbox = txtln.aabb
-                # 如果 textline 的中心在当前块内
-                center_y = bbox.y + bbox.h / 2
-                if y_start <= center_y < y_end:
-                    textlines_chunk.append(txtln)
-            
-            if not textlines_chunk:
-                continue
-            
-            logger.debug(f"Processing chunk {i+1}/{len(boundaries)-1}: Y={y_start}-{y_end}, {len(textlines_chunk)} textlines")
-            
-            # 处理当前块
-            chunk_result = _process_chunk(img_chunk, mask_chunk, textlines_chunk, y_start, 
-                                          keep_threshold, dilation_offset, kernel_size)
-            
-            if chunk_result is not None:
-                final_mask[y_start:y_end, :] = cv2.bitwise_or(final_mask[y_start:y_end, :], chunk_result)
-        
-        if np.max(final_mask) == 0:
-            return None
-        return final_mask
-    
-    # 正常处理（不需要切割）
     return _complete_mask_core(img, mask, textlines, keep_threshold, dilation_offset, kernel_size)
 
 
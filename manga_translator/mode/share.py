@@ -9,6 +9,14 @@ from pydantic import BaseModel
 from starlette.responses import StreamingResponse
 
 from manga_translator import MangaTranslator
+from manga_translator.mode.share_transport import (
+    FIELDS_HEADER,
+    TRANSPORT_HEADER,
+    TRANSPORT_INLINE,
+    TRANSPORT_LOCAL,
+    encode_result,
+    parse_fields,
+)
 
 class MethodCall(BaseModel):
     method_name: str
@@ -48,25 +56,40 @@ class MangaShare:
             if progress[0] != 1:
                 break
 
-    async def run_method(self, method, **attributes):
+    def encode_result(self, result, transport: str = None, fields=None) -> bytes:
+        """
+        编码返回给服务器的结果
+
+        transport 为 None 时（旧版服务器未声明支持的传输方式）保持整包 pickle。
+        """
+        # 检查是否使用占位符，如果是则创建最小化的结果对象
+        if hasattr(result, 'use_placeholder') and result.use_placeholder:
+            # 创建一个最小的Context对象，只包含占位符图片，避免传输大量数据
+            from manga_translator import Context
+            from PIL import Image
+            minimal_result = Context()
+            minimal_result.result = Image.new('RGB', (1, 1), color='white')
+            minimal_result.use_placeholder = True
+            result = minimal_result
+
+        if transport in (TRANSPORT_LOCAL, TRANSPORT_INLINE):
+            return encode_result(result, transport, fields)
+        return pickle.dumps(result)
+
+    def get_result_options(self, request: Request):
+        transport = request.headers.get(TRANSPORT_HEADER)
+        if transport not in (TRANSPORT_LOCAL, TRANSPORT_INLINE):
+            transport = None
+        return transport, parse_fields(request.headers.get(FIELDS_HEADER))
+
+    async def run_method(self, method, transport: str = None, fields=None, **attributes):
         try:
             if asyncio.iscoroutinefunction(method):
                 result = await method(**attributes)
             else:
                 result = method(**attributes)
 
-            # 检查是否使用占位符，如果是则创建最小化的结果对象
-            if hasattr(result, 'use_placeholder') and result.use_placeholder:
-                # 创建一个最小的Context对象，只包含占位符图片，避免传输大量数据
-                from manga_translator import Context
-                from PIL import Image
-                minimal_result = Context()
-                minimal_result.result = Image.new('RGB', (1, 1), color='white')
-                minimal_result.use_placeholder = True
-                result_bytes = pickle.dumps(minimal_result)
-            else:
-                result_bytes = pickle.dumps(result)
-
+            result_bytes = self.encode_result(result, transport, fields)
             encoded_result = b'\x00' + len(result_bytes).to_bytes(4, 'big') + result_bytes
             await self.progress_queue.put(encoded_result)
         except Exception as e:
@@ -110,13 +133,14 @@ class MangaShare:
             self.check_lock()
             method = self.get_fn(method_name)
             attr = pickle.loads(await request.body())
+            transport, fields = self.get_result_options(request)
             try:
                 if asyncio.iscoroutinefunction(method):
                     result = await method(**attr)
                 else:
                     result = method(**attr)
                 self.lock.release()
-                result_bytes = pickle.dumps(result)
+                result_bytes = self.encode_result(result, transport, fields)
                 return Response(content=result_bytes, media_type="application/octet-stream")
             except Exception as e:
                 self.lock.release()
@@ -128,10 +152,11 @@ class MangaShare:
             self.check_lock()
             method = self.get_fn(method_name)
             attr = pickle.loads(await request.body())
+            transport, fields = self.get_result_options(request)
 
             # streaming response
             streaming_response = StreamingResponse(self.progress_stream(), media_type="application/octet-stream")
-            asyncio.create_task(self.run_method(method, **attr))
+            asyncio.create_task(self.run_method(method, transport, fields, **attr))
             return streaming_response
 
         config = uvicorn.Config(
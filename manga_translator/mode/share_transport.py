@@ -0,0 +1,248 @@
+"""
+shared 模式（MangaShare）与 Web 服务器之间的结果传输协议
+
+旧协议直接 pickle 整个 Context（img_rgb、img_inpainted、mask、PIL 图片等全尺寸数据），
+4K 页面单次响应可达数十 MB。新协议把大数组放到 pickle 之外：
+
+- 元数据（文本区域、配置等小对象）仍然 pickle，大于 OOB_MIN_BYTES 的 numpy 数组和
+  RGB/RGBA/L 模式的 PIL 图片只在 pickle 中留下引用（persistent_id），数据本身另行传输
+- transport=local：数据写入共享内存文件（/dev/shm，不可用时为系统临时目录），只传路径，
+  服务器以写时复制方式内存映射读取，仅适用于服务器与翻译进程共享文件系统的情况
+  （服务器自己启动的翻译进程，或注册时声明 shared_filesystem 的实例；容器中的实例即使地址是 127.0.0.1 也不共享）
+- transport=inline：数据以原始字节追加在元数据之后，适用于远程翻译实例
+- 请求方可以通过 X-Result-Fields 请求头（或 TranslatorInstance.sent* 的 fields 参数）指定只返回需要的字段，
+  例如只需要结果图片时传 result
+
+请求头：
+    X-Result-Transport: local | inline   （不提供时保持旧的整包 pickle，兼容旧服务器）
+    X-Result-Fields: result,use_placeholder   （逗号分隔，不提供时返回全部字段）
+
+载荷格式：
+    MAGIC(4) | transport(1) | table_len(4) | table(JSON) | meta_len(4) | meta(pickle) | [inline 数据]
+"""
+
+import io
+import json
+import os
+import pickle
+import tempfile
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+from PIL import Image
+
+MAGIC = b'MTR1'
+
+TRANSPORT_INLINE = 'inline'
+TRANSPORT_LOCAL = 'local'
+
+TRANSPORT_HEADER = 'X-Result-Transport'
+FIELDS_HEADER = 'X-Result-Fields'
+
+# 小于该大小的数组直接留在 pickle 中（文本区域的坐标等），避免为大量小对象建立引用
+OOB_MIN_BYTES = 64 * 1024
+# 服务器未取走的本地数据文件（例如服务器在读取前退出）在该时间后由翻译进程清理
+LOCAL_FILE_TTL = 600
+
+_ALIGN = 64
+_PIL_MODES = ('RGB', 'RGBA', 'L')
+
+_KIND_INLINE = 0
+_KIND_LOCAL = 1
+
+
+def parse_fields(value: Optional[str]) -> Optional[List[str]]:
+    """解析 X-Result-Fields 请求头"""
+    if not value:
+        return None
+    fields = [f.strip() for f in value.split(',') if f.strip()]
+    return fields or None
+
+
+def select_fields(result: Any, fields: Optional[Sequence[str]]) -> Any:
+    """
+    只保留 Context 中指定的字段，批量结果（Context 列表）逐个处理
+
+    非 Context 结果原样返回。
+    """
+    if not fields:
+        return result
+    from manga_translator.utils import Context
+    if isinstance(result, Context):
+        return Context(**{name: result[name] for name in fields if name in result})
+    if isinstance(result, (list, tuple)):
+        return type(result)(select_fields(item, fields) for item in result)
+    return result
+
+
+class _OutOfBandPickler(pickle.Pickler):
+    """把大数组和图片替换为 buffers 中的引用"""
+
+    def __init__(self, file, buffers: List[np.ndarray]):
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.buffers = buffers
+        # persistent_id 返回的对象不经过 pickle 的 memo，需自行去重
+        # （Context 的 __getstate__ 与字典项会让同一个值被访问两次）
+        self._seen: Dict[int, tuple] = {}
+
+    def _add(self, obj, kind: str, array: np.ndarray) -> tuple:
+        self.buffers.append(np.ascontiguousarray(array))
+        pid = (kind, len(self.buffers) - 1)
+        self._seen[id(obj)] = pid
+        return pid
+
+    def persistent_id(self, obj):
+        if type(obj) is np.ndarray:
+            if obj.nbytes >= OOB_MIN_BYTES and not obj.dtype.hasobject:
+                return self._seen.get(id(obj)) or self._add(obj, 'nd', obj)
+        elif isinstance(obj, Image.Image):
+            if obj.mode in _PIL_MODES and obj.width * obj.height >= OOB_MIN_BYTES // 4:
+                return self._seen.get(id(obj)) or self._add(obj, 'pil', np.asarray(obj))
+        return None
+
+
+class _OutOfBandUnpickler(pickle.Unpickler):
+
+    def __init__(self, file, arrays: List[np.ndarray]):
+        super().__init__(file)
+        self.arrays = arrays
+        self._loaded: Dict[tuple, Any] = {}
+
+    def persistent_load(self, pid):
+        pid = tuple(pid)
+        if pid not in self._loaded:
+            kind, index = pid
+            array = self.arrays[index]
+            self._loaded[pid] = Image.fromarray(array) if kind == 'pil' else array
+        return self._loaded[pid]
+
+
+# 翻译进程创建、尚未确认被服务器取走的数据文件：{路径: 创建时间}
+_local_files: Dict[str, float] = {}
+_local_lock = threading.Lock()
+
+
+def _local_dir() -> str:
+    # Linux 上 /dev/shm 为内存文件系统，相当于命名共享内存；其他平台退回系统临时目录
+    if os.path.isdir('/dev/shm') and os.access('/dev/shm', os.W_OK):
+        return '/dev/shm'
+    return tempfile.gettempdir()
+
+
+def cleanup_local_files(max_age: float = LOCAL_FILE_TTL):
+    """删除超过 max_age 秒仍未被服务器取走的数据文件，max_age=0 时全部删除"""
+    now = time.monotonic()
+    with _local_lock:
+        expired = [path for path, created in _local_files.items() if now - created >= max_age]
+        for path in expired:
+            del _local_files[path]
+    for path in expired:
+        try:
+            os.remove(path)
+        except OSError:
+            # 已被服务器取走并删除
+            pass
+
+
+def _write_local(buffers: List[np.ndarray], offsets: List[int]) -> str:
+    fd, path = tempfile.mkstemp(prefix='mt_result_', suffix='.bin', dir=_local_dir())
+    with os.fdopen(fd, 'wb') as f:
+        for array, offset in zip(buffers, offsets):
+            f.seek(offset)
+            f.write(array.reshape(-1).view(np.uint8).data)
+    with _local_lock:
+        _local_files[path] = time.monotonic()
+    return path
+
+
+def encode_result(result: Any, transport: str = TRANSPORT_INLINE, fields: Optional[Sequence[str]] = None) -> bytes:
+    """
+    编码翻译结果
+
+    Args:
+        result: 方法返回值（通常为 Context 或 Context 列表）
+        transport: TRANSPORT_LOCAL 或 TRANSPORT_INLINE
+        fields: 只传输这些 Context 字段，None 表示全部
+    """
+    if transport == TRANSPORT_LOCAL:
+        cleanup_local_files()
+
+    buffers: List[np.ndarray] = []
+    meta = io.BytesIO()
+    _OutOfBandPickler(meta, buffers).dump(select_fields(result, fields))
+    meta_bytes = meta.getvalue()
+
+    offsets = []
+    total = 0
+    for array in buffers:
+        offsets.append(total)
+        total += (array.nbytes + _ALIGN - 1) // _ALIGN * _ALIGN
+
+    kind, path = _KIND_INLINE, None
+    if transport == TRANSPORT_LOCAL and buffers:
+        kind, path = _KIND_LOCAL, _write_local(buffers, offsets)
+
+    table = json.dumps({
+        'path': path,
+        'buffers': [[offset, array.dtype.str, list(array.shape)] for array, offset in zip(buffers, offsets)],
+    }).encode('utf-8')
+
+    parts = [MAGIC, kind.to_bytes(1, 'big'),
+             len(table).to_bytes(4, 'big'), table,
+             len(meta_bytes).to_bytes(4, 'big'), meta_bytes]
+    if kind == _KIND_INLINE:
+        for array in buffers:
+            parts.append(array.reshape(-1).view(np.uint8).data)
+            padding = -array.nbytes % _ALIGN
+            if padding:
+                parts.append(bytes(padding))
+    return b''.join(parts)
+
+
+def _read_arrays(kind: int, path: Optional[str], specs: list, data: memoryview) -> List[np.ndarray]:
+    if not specs:
+        return []
+    if kind == _KIND_INLINE:
+        # 复制一次得到可写数组（下游会在结果图上继续绘制）
+        buf = np.frombuffer(bytearray(data), np.uint8)
+    elif os.name == 'nt':
+        # Windows 上映射中的文件无法删除，直接读入内存
+        try:
+            buf = np.fromfile(path, np.uint8)
+        finally:
+            os.remove(path)
+    else:
+        # 写时复制映射：不拷贝数据，数组仍可写；删除文件后映射在数组释放前一直有效
+        buf = np.asarray(np.memmap(path, np.uint8, mode='c'))
+        os.remove(path)
+
+    arrays = []
+    for offset, dtype, shape in specs:
+        dtype = np.dtype(dtype)
+        nbytes = int(np.prod(shape)) * dtype.itemsize
+        arrays.append(buf[offset:offset + nbytes].view(dtype).reshape(shape))
+    return arrays
+
+
+def is_encoded_result(data: bytes) -> bool:
+    return data[:4] == MAGIC
+
+
+def decode_result(data: bytes) -> Any:
+    """解码 encode_result 的输出，旧协议（整包 pickle）的数据直接 pickle.loads"""
+    if not is_encoded_result(data):
+        return pickle.loads(data)
+    view = memoryview(data)
+    kind = view[4]
+    pos = 5
+    table_len = int.from_bytes(view[pos:pos + 4], 'big')
+    table = json.loads(bytes(view[pos + 4:pos + 4 + table_len]))
+    pos += 4 + table_len
+    meta_len = int.from_bytes(view[pos:pos + 4], 'big')
+    meta = view[pos + 4:pos + 4 + meta_len]
+    pos += 4 + meta_len
+
+    arrays = _read_arrays(kind, table['path'], table['buffers'], view[pos:])
+    return _OutOfBandUnpickler(io.BytesIO(meta), arrays).load()
@@ -1,5 +1,5 @@
 import numpy as np
-from typing import List, Optional
+from typing import List, Optional, Tuple
 from .common import CommonOCR, OfflineOCR
 from .model_32px import Model32pxOCR
 from .model_48px import Model48pxOCR
@@ -60,5 +60,13 @@ async def dispatch(ocr_key: Ocr, image: np.ndarray, regions: List[Quadrilateral]
     config = config or OcrConfig()
     return await ocr.recognize(image, regions, config, verbose)
 
+async def dispatch_pages(ocr_key: Ocr, pages: List[Tuple[np.ndarray, List[Quadrilateral]]], config: Optional[OcrConfig] = None, device: str = 'cpu', verbose: bool = False) -> List[List[Quadrilateral]]:
+    """跨页OCR：pages 为 (image, textlines) 列表，返回每页的识别结果"""
+    ocr = get_ocr(ocr_key)
+    if isinstance(ocr, OfflineOCR):
+        await ocr.load(device)
+    config = config or OcrConfig()
+    return await ocr.recognize_pages(pages, config, verbose)
+
 async def unload(ocr_key: Ocr):
     ocr_cache.pop(ocr_key, None)
\ No newline at end of file
@@ -1,6 +1,6 @@
 import numpy as np
 from abc import abstractmethod
-from typing import List, Union
+from typing import List, Tuple, Union
 from collections import Counter
 import networkx as nx
 import itertools
@@ -72,6 +72,14 @@ class CommonOCR(InfererModule):
         '''
         return await self._recognize(image, textlines, config, verbose)
 
+    async def recognize_pages(self, pages: List[Tuple[np.ndarray, List[Quadrilateral]]], config: OcrConfig, verbose: bool = False) -> List[List[Quadrilateral]]:
+        '''
+        Recognizes the textlines of several pages at once. `pages` is a list of `(image, textlines)` tuples,
+        the result contains one textline list per page.
+        Models that can batch crops across pages override this; the default runs the pages one by one.
+        '''
+        return [await self.recognize(image, textlines, config, verbose) for image, textlines in pages]
+
     @abstractmethod
     async def _recognize(self, image: np.ndarray, textlines: List[Quadrilateral], config: OcrConfig, verbose: bool = False) -> List[Quadrilateral]:
         pass
@@ -1,4 +1,5 @@
 import math
+import time
 from typing import Callable, List, Optional, Tuple, Union
 from collections import defaultdict
 import os
@@ -82,20 +83,46 @@ class Model48pxOCR(OfflineOCR):
         del self.model
     
     async def _infer(self, image: np.ndarray, textlines: List[Quadrilateral], config: OcrConfig, verbose: bool = False, ignore_bubble: int = 0) -> List[TextBlock]:
+        return (await self._infer_pages([(image, textlines)], config, verbose))[0]
+
+    async def recognize_pages(self, pages: List[Tuple[np.ndarray, List[Quadrilateral]]], config: OcrConfig, verbose: bool = False) -> List[List[Quadrilateral]]:
+        """
+        跨页批量OCR：把多页的文本行裁剪图按宽度统一排序、分批推理，再按页分发结果。
+        每页返回的文本行顺序与单页调用 `recognize` 时一致。
+        """
+        if not self.is_loaded():
+            raise Exception(f'{self._key}: Tried to forward pass without having loaded the model.')
+        return await self._infer_pages(pages, config, verbose)
+
+    async def _infer_pages(self, pages: List[Tuple[np.ndarray, List[Quadrilateral]]], config: OcrConfig, verbose: bool = False) -> List[List[TextBlock]]:
         text_height = 48
-        max_chunk_size = 16
+        max_chunk_size = max(1, config.ocr_batch_size)
+        beams_k = max(1, config.ocr_beam_size)
         ignore_bubble = config.ignore_bubble
         threshold = 0.2 if config.prob is None else config.prob
-
-        quadrilaterals = list(self._generate_text_direction(textlines))
-        region_imgs = [q.get_transformed_region(image, d, text_height) for q, d in quadrilaterals]
-        out_regions = []
-
+        start_time = time.perf_counter()
+
+        # 收集所有页的裁剪图，记录每张裁剪图所属的页
+        quadrilaterals = []
+        region_imgs = []
+        page_indices = []
+        for page_idx, (image, textlines) in enumerate(pages):
+            for q, d in self._generate_text_direction(textlines):
+                quadrilaterals.append((q, d))
+                region_imgs.append(q.get_transformed_region(image, d, text_height))
+                page_indices.append(page_idx)
+        out_regions = [[] for _ in pages]
+
+        # 稳定排序：每页内部的顺序与单页按宽度排序的结果相同
         perm = range(len(region_imgs))
-        is_quadrilaterals = False
         if len(quadrilaterals) > 0 and isinstance(quadrilaterals[0][0], Quadrilateral):
             perm = sorted(range(len(region_imgs)), key = lambda x: region_imgs[x].shape[1])
-            is_quadrilaterals = True
+
+        # 吞吐统计
+        total_lines = 0
+        total_batches = 0
+        content_pixels = 0
+        padded_pixels = 0
 
         ix = 0
         for indices in chunks(perm, max_chunk_size):
@@ -108,7 +135,7 @@ class Model48pxOCR(OfflineOCR):
                 # 使用基类的通用气泡过滤方法（支持高级检测）
                 if ignore_bubble > 0:
                     textline = quadrilaterals[idx][0]
-                    if self._should_ignore_region(region_imgs[idx], ignore_bubble, image, textline):
+                    if self._should_ignore_region(region_imgs[idx], ignore_bubble, pages[page_indices[idx]][0], textline):
                         self.logger.info(f'[FILTERED] Region {ix} ignored - Non-bubble area detected (ignore_bubble={ignore_bubble})')
                         ix += 1
                         continue
@@ -125,6 +152,10 @@ class Model48pxOCR(OfflineOCR):
             N = len(valid_indices)
             max_width = 4 * (max(valid_widths) + 7) // 4
             region = np.zeros((N, text_height, max_width, 3), dtype = np.uint8)
+            total_lines += N
+            total_batches += 1
+            content_pixels += sum(valid_widths)
+            padded_pixels += N * max_width
             for i, idx in enumerate(valid_indices):
                 W = valid_region_imgs[i].shape[1]
                 region[i, :, : W, :] = valid_region_imgs[i]
@@ -155,7 +186,7 @@ class Model48pxOCR(OfflineOCR):
             if self.use_gpu:
                 image_tensor = image_tensor.to(self.device)
             with torch.no_grad():
-                ret = self.model.infer_beam_batch_tensor(image_tensor, valid_widths, beams_k = 5, max_seq_length = 255)
+                ret = self.model.infer_beam_batch_tensor(image_tensor, valid_widths, beams_k = beams_k, max_seq_length = 255)
             for i, (pred_chars_index, prob, fg_pred, bg_pred, fg_ind_pred, bg_ind_pred) in enumerate(ret):
                 if prob < threshold:
                     # Decode text first to log it
@@ -185,7 +216,7 @@ class Model48pxOCR(OfflineOCR):
                     else:
                         cur_region.text.append('')
                         cur_region.update_font_colors(np.array([0, 0, 0]), np.array([255, 255, 255]))
-                    out_regions.append(cur_region)
+                    out_regions[page_indices[valid_indices[i]]].append(cur_region)
                     continue
                 has_fg = (fg_ind_pred[:, 1] > fg_ind_pred[:, 0])
                 has_bg = (bg_ind_pred[:, 1] > bg_ind_pred[:, 0])
@@ -239,13 +270,21 @@ class Model48pxOCR(OfflineOCR):
                     cur_region.text.append(txt)
                     cur_region.update_font_colors(np.array([fr, fg, fb]), np.array([br, bg, bb]))
 
-                out_regions.append(cur_region)
+                out_regions[page_indices[valid_indices[i]]].append(cur_region)
 
         # 清理 GPU 显存
         self._cleanup_ocr_memory(force_gpu_cleanup=False)
 
-        if is_quadrilaterals:
-            return out_regions
+        if total_lines > 0:
+            elapsed = time.perf_counter() - start_time
+            padding_ratio = 1 - content_pixels / padded_pixels if padded_pixels > 0 else 0.0
+            report = (f'OCR throughput: {total_lines} lines from {len(pages)} page(s) in {total_batches} batches '
+                      f'(batch size {max_chunk_size}), {total_lines / max(elapsed, 1e-6):.1f} lines/s, padding ratio {padding_ratio:.1%}')
+            if len(pages) > 1:
+                self.logger.info(report)
+            else:
+                self.logger.debug(report)
+
         return out_regions
 
 class ConvNeXtBlock(nn.Module):
@@ -407,7 +446,6 @@ class XposMultiheadAttention(nn.Module):
     ):
         assert not is_causal
         bsz, tgt_len, embed_dim = query.size()
-        src_len = tgt_len
         assert embed_dim == self.embed_dim, f"query dim {embed_dim} != {self.embed_dim}"
 
         key_bsz, src_len, _ = key.size()
@@ -415,20 +453,58 @@ class XposMultiheadAttention(nn.Module):
         assert value is not None
         assert bsz, src_len == value.shape[:2]
 
-        q = self.q_proj(query)
+        k, v = self.project_kv(key, value)
+        return self.attend(query, k, v, key_padding_mask, attn_mask, need_weights, k_offset, q_offset)
+
+    def project_kv(self, key, value):
+        """
+        Projects key/value into per-head tensors of shape (bsz, num_heads, src_len, head_dim).
+        xpos is not applied yet, so the result can be cached and extended step by step.
+        """
+        bsz, src_len, _ = key.size()
         k = self.k_proj(key)
         v = self.v_proj(value)
+        k = k.view(bsz, src_len, self.num_heads, self.head_dim).transpose(1, 2)
+        v = v.view(bsz, src_len, self.num_heads, self.head_dim).transpose(1, 2)
+        return k, v
+
+    def xpos_keys(self, k, k_offset = 0):
+        """Applies xpos to projected keys of shape (bsz, num_heads, src_len, head_dim)."""
+        bsz, _, src_len, _ = k.size()
+        k = k.reshape(bsz * self.num_heads, src_len, self.head_dim)
+        k = self.xpos(k, offset=k_offset, downscale=True)
+        return k.view(bsz, self.num_heads, src_len, self.head_dim)
+
+    def attend(
+        self,
+        query,
+        k,
+        v,
+        key_padding_mask=None,
+        attn_mask=None,
+        need_weights = False,
+        k_offset = 0,
+        q_offset = 0,
+        k_xpos_applied = False
+    ):
+        """
+        Attention over already projected keys/values from `project_kv`.
+        Pass `k_xpos_applied=True` if the keys went through `xpos_keys` already (e.g. cached encoder memory).
+        """
+        bsz, tgt_len, embed_dim = query.size()
+        src_len = k.size(2)
+
+        q = self.q_proj(query)
         q *= self.scaling
 
         q = q.view(bsz, tgt_len, self.num_heads, self.head_dim).transpose(1, 2)
-        k = k.view(bsz, src_len, self.num_heads, self.head_dim).transpose(1, 2)
-        v = v.view(bsz, src_len, self.num_heads, self.head_dim).transpose(1, 2)
         q = q.reshape(bsz * self.num_heads, tgt_len, self.head_dim)
         k = k.reshape(bsz * self.num_heads, src_len, self.head_dim)
         v = v.reshape(bsz * self.num_heads, src_len, self.head_dim)
 
         if self.xpos is not None:
-            k = self.xpos(k, offset=k_offset, downscale=True) # TODO: read paper
+            if not k_xpos_applied:
+                k = self.xpos(k, offset=k_offset, downscale=True) # TODO: read paper
             q = self.xpos(q, offset=q_offset, downscale=False)
 
         attn_weights = torch.bmm(q, k.transpose(1, 2))
@@ -571,6 +647,50 @@ def next_token_batch(
     # N, E
     return tgt.squeeze_(1)
 
+class DecoderKVCache:
+    """
+    Incremental decoding cache for `OCR.infer_beam_batch_tensor`: per layer self-attention keys/values
+    (projected, before xpos) and the last layer output of every step. Capacity grows on demand.
+    """
+    def __init__(self, batch_size: int, num_layers: int, num_heads: int, head_dim: int, device, capacity: int = 32):
+        self.keys = [torch.zeros(batch_size, num_heads, capacity, head_dim, device=device) for _ in range(num_layers)]
+        self.values = [torch.zeros(batch_size, num_heads, capacity, head_dim, device=device) for _ in range(num_layers)]
+        self.outputs = torch.zeros(batch_size, capacity, num_heads * head_dim, device=device)
+
+    @property
+    def capacity(self) -> int:
+        return self.outputs.size(1)
+
+    def reserve(self, length: int):
+        if length <= self.capacity:
+            return
+        extra = max(length, self.capacity * 2) - self.capacity
+
+        def grow(t: torch.Tensor, dim: int) -> torch.Tensor:
+            shape = list(t.shape)
+            shape[dim] = extra
+            return torch.cat([t, t.new_zeros(shape)], dim=dim)
+
+        self.keys = [grow(k, 2) for k in self.keys]
+        self.values = [grow(v, 2) for v in self.values]
+        self.outputs = grow(self.outputs, 1)
+
+    def append(self, layer: int, k: torch.Tensor, v: torch.Tensor, step: int):
+        """Stores K/V of the token at `step` and returns K/V of steps 0..step."""
+        self.keys[layer][:, :, step] = k[:, :, 0]
+        self.values[layer][:, :, step] = v[:, :, 0]
+        return self.keys[layer][:, :, :step + 1], self.values[layer][:, :, :step + 1]
+
+    def index_select(self, indices: torch.Tensor):
+        self.keys = [k.index_select(0, indices) for k in self.keys]
+        self.values = [v.index_select(0, indices) for v in self.values]
+        self.outputs = self.outputs.index_select(0, indices)
+
+    def repeat_interleave(self, repeats: int):
+        self.keys = [k.repeat_interleave(repeats, dim=0) for k in self.keys]
+        self.values = [v.repeat_interleave(repeats, dim=0) for v in self.values]
+        self.outputs = self.outputs.repeat_interleave(repeats, dim=0)
+
 class OCR(nn.Module):
     def __init__(self, dictionary, max_len):
         super(OCR, self).__init__()
@@ -616,29 +736,37 @@ class OCR(nn.Module):
 
     def decoder_forward(
         self,
-        embd: torch.Tensor,
-        cached_activations: torch.Tensor,  # Shape [N, L, T, E] where L=num_layers, T=sequence length, E=embedding size
-        memory: torch.Tensor,  # Shape [N, H, W, C] (Encoder memory output)
+        embd: torch.Tensor,  # Shape [N, 1, E], embedding of the last token
+        cache: 'DecoderKVCache',
+        memory_kv: List[Tuple[torch.Tensor, torch.Tensor]],  # Per layer encoder memory K (xpos applied) and V
         memory_mask: torch.BoolTensor,
         step: int
     ):
 
         layer: nn.TransformerDecoderLayer
         tgt = embd  # N, 1, E for the last token embedding
+        cache.reserve(step + 1)
 
         for l, layer in enumerate(self.decoders):
-            combined_activations = cached_activations[:, l, :step, :]  # N, T, E
-            combined_activations = torch.cat([combined_activations, tgt], dim=1)  # N, T+1, E
-            cached_activations[:, l, step, :] = tgt.squeeze(1)
-
-            # Update cache and perform self attention
-            tgt = tgt + layer.self_attn(layer.norm1(tgt), layer.norm1(combined_activations), layer.norm1(combined_activations), q_offset=step)[0]
-            tgt = tgt + layer.multihead_attn(layer.norm2(tgt), memory, memory, key_padding_mask=memory_mask, q_offset=step)[0]
+            # Only the new token is projected, keys/values of earlier steps come from the cache
+            query = layer.norm1(tgt)
+            k, v = cache.append(l, *layer.self_attn.project_kv(query, query), step)
+            tgt = tgt + layer.self_attn.attend(query, k, v, q_offset=step)[0]
+            memory_k, memory_v = memory_kv[l]
+            tgt = tgt + layer.multihead_attn.attend(layer.norm2(tgt), memory_k, memory_v, key_padding_mask=memory_mask, q_offset=step, k_xpos_applied=True)[0]
             tgt = tgt + layer._ff_block(layer.norm3(tgt))
 
-        cached_activations[:, l+1, step, :] = tgt.squeeze(1) # Append the new activations
+        cache.outputs[:, step, :] = tgt.squeeze(1) # Append the new activations
+
+        return tgt.squeeze_(1)
 
-        return tgt.squeeze_(1), cached_activations
+    def memory_kv(self, memory: torch.Tensor) -> List[Tuple[torch.Tensor, torch.Tensor]]:
+        """Projects the encoder memory once per decoder layer, instead of at every decoding step."""
+        memory_kv = []
+        for layer in self.decoders:
+            k, v = layer.multihead_attn.project_kv(memory, memory)
+            memory_kv.append((layer.multihead_attn.xpos_keys(k), v))
+        return memory_kv
 
     def forward(self,
         img: torch.FloatTensor,
@@ -766,22 +894,28 @@ class OCR(nn.Module):
         for i, l in enumerate(valid_feats_length):
             input_mask[i, l:] = True
         memory = self.encoders(memory, input_mask) # N, W, Dim
+        memory_kv = self.memory_kv(memory)
+        del memory
+
+        # Greedy decoding when beams_k == 1
+        max_finished_hypos = min(max_finished_hypos, beams_k)
 
         out_idx = torch.full((N, 1), start_tok, dtype=torch.long, device=img.device)  # Shape [N, 1]
-        cached_activations = torch.zeros(N, len(self.decoders)+1, max_seq_length, 320, device=img.device)  # [N, L, S, E]
+        attn = self.decoders[0].self_attn
+        cache = DecoderKVCache(N, len(self.decoders), attn.num_heads, attn.head_dim, img.device)
         log_probs = torch.zeros(N, 1, device=img.device)  # Shape [N, 1]        # N, E
         idx_embedded = self.embd(out_idx[:, -1:]) 
 
-        decoded, cached_activations = self.decoders(idx_embedded, cached_activations, memory, input_mask, 0)
+        decoded = self.decoders(idx_embedded, cache, memory_kv, input_mask, 0)
         pred_char_logprob = self.pred(self.pred1(decoded)).log_softmax(-1)   # N, n_chars
         pred_chars_values, pred_chars_index = torch.topk(pred_char_logprob, beams_k, dim = 1)  # N, k
 
         out_idx = torch.cat([out_idx.unsqueeze(1).expand(-1, beams_k, -1), pred_chars_index.unsqueeze(-1)], dim=-1).reshape(-1, 2)  # Shape [N * k, 2]
         log_probs = pred_chars_values.view(-1, 1)  # Shape [N * k, 1]
         
-        memory = memory.repeat_interleave(beams_k, dim=0)
+        memory_kv = [(k.repeat_interleave(beams_k, dim=0), v.repeat_interleave(beams_k, dim=0)) for k, v in memory_kv]
         input_mask = input_mask.repeat_interleave(beams_k, dim=0)
-        cached_activations = cached_activations.repeat_interleave(beams_k, dim=0)
+        cache.repeat_interleave(beams_k)
         batch_index = torch.arange(N).repeat_interleave(beams_k, dim=0).to(img.device)
 
         finished_hypos = defaultdict(list)
@@ -789,7 +923,7 @@ class OCR(nn.Module):
 
         for step in range(1, max_seq_length):
             idx_embedded = self.embd(out_idx[:, -1:])
-            decoded, cached_activations = self.decoders(idx_embedded, cached_activations, memory, input_mask, step)
+            decoded = self.decoders(idx_embedded, cache, memory_kv, input_mask, step)
             pred_char_logprob = self.pred(self.pred1(decoded)).log_softmax(-1)  # Shape [N * k, dict_size]
             pred_chars_values, pred_chars_index = torch.topk(pred_char_logprob, beams_k, dim=1)  # [N * k, k]
 
@@ -833,7 +967,7 @@ class OCR(nn.Module):
                 finished_hypos[batch_index[beams_k * idx].item()] = \
                     out_idx[idx * beams_k + best_beam_idx], \
                     torch.exp(batch_log_probs[best_beam_idx]).item(), \
-                    cached_activations[idx * beams_k + best_beam_idx] 
+                    cache.outputs[idx * beams_k + best_beam_idx] 
 
             remaining_indexs = []
             for i in range(N_remaining):
@@ -849,8 +983,8 @@ class OCR(nn.Module):
             
             out_idx = out_idx.index_select(0, remaining_tensor)
             log_probs = log_probs.index_select(0, remaining_tensor)
-            memory = memory.index_select(0, remaining_tensor)
-            cached_activations = cached_activations.index_select(0, remaining_tensor)
+            memory_kv = [(k.index_select(0, remaining_tensor), v.index_select(0, remaining_tensor)) for k, v in memory_kv]
+            cache.index_select(remaining_tensor)
             input_mask = input_mask.index_select(0, remaining_tensor)
             batch_index = batch_index.index_select(0, remaining_tensor)
 
@@ -862,10 +996,10 @@ class OCR(nn.Module):
                     sample_indices = (batch_index == i).nonzero(as_tuple=True)[0]
                     if sample_indices.numel() > 0:
                         best_hypo_index = sample_indices[0] # Take the first one as fallback
-                        finished_hypos[i] = out_idx[best_hypo_index], torch.exp(log_probs[best_hypo_index]).item(), cached_activations[best_hypo_index]
+                        finished_hypos[i] = out_idx[best_hypo_index], torch.exp(log_probs[best_hypo_index]).item(), cache.outputs[best_hypo_index]
                     else:
                         # If no hypothesis is available at all (very unlikely, but for robustness)
-                        finished_hypos[i] = (torch.tensor([end_tok], device=img.device), 0.0, torch.zeros(cached_activations.shape[1:], device=img.device)) # Dummy hypo
+                        finished_hypos[i] = (torch.tensor([end_tok], device=img.device), 0.0, torch.zeros(cache.outputs.shape[1:], device=img.device)) # Dummy hypo
 
         assert len(finished_hypos) == N
 
@@ -873,7 +1007,7 @@ class OCR(nn.Module):
         result = []
         for i in range(N):
             final_idx, prob, decoded = finished_hypos[i] 
-            color_feats = self.color_pred1(decoded[-1].unsqueeze(0))
+            color_feats = self.color_pred1(decoded.unsqueeze(0))
             fg_pred, bg_pred, fg_ind_pred, bg_ind_pred = \
                 self.color_pred_fg(color_feats), \
                 self.color_pred_bg(color_feats), \
@@ -882,7 +1016,7 @@ class OCR(nn.Module):
             result.append((final_idx[1:], prob, fg_pred[0], bg_pred[0], fg_ind_pred[0], bg_ind_pred[0]))
 
         # ✅ 清理 beam search 的大张量（必须在函数内部直接删除局部变量）
-        del memory, input_mask, cached_activations, finished_hypos
+        del memory_kv, input_mask, cache, finished_hypos
         if 'out_idx' in locals():
             del out_idx
         if 'log_probs' in locals():
@@ -1,8 +1,10 @@
 import os
 import re
+import time
 import cv2
 # import logging
 import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 from typing import List
 from shapely import affinity
 from shapely.geometry import Polygon
@@ -26,9 +28,6 @@ from ..config import Config
 
 logger = get_logger('render')
 
-# Global variable to store default font path for regions without specific fonts
-_global_default_font_path = ''
-
 def find_largest_inscribed_rect(mask: np.ndarray) -> tuple:
     """
     Find the largest axis-aligned rectangle that fits inside the mask.
@@ -422,6 +421,35 @@ def optimize_line_breaks_for_region(region: TextBlock, config: Config, target_fo
         # 即使数量相同，也返回标准化后的文本（全角变半角）
         return best_text, best_font_size
 
+def find_max_fitting_font_size(fits, min_font_size: int, max_font_size: int, monotone: bool = True) -> int:
+    """
+    查找 [min_font_size, max_font_size] 中 fits(font_size) 为真的最大字号，都放不下时返回 min_font_size - 1
+
+    monotone=True 时认为字号越小越容易放下，二分查找只需 O(log n) 次排版；
+    calc_horizontal 在文本放不下时会自动放大排版宽度，行数随字号并不单调，
+    此时从大到小逐个尝试，保证结果与逐像素缩小一致。初始字号能放下时都只排版一次。
+    """
+    if max_font_size < min_font_size:
+        return max_font_size
+    if fits(max_font_size):
+        return max_font_size
+    if not monotone:
+        for font_size in range(max_font_size - 1, min_font_size - 1, -1):
+            if fits(font_size):
+                return font_size
+        return min_font_size - 1
+    low, high = min_font_size, max_font_size - 1
+    best = min_font_size - 1
+    while low <= high:
+        mid = (low + high) // 2
+        if fits(mid):
+            best = mid
+            low = mid + 1
+        else:
+            high = mid - 1
+    return best
+
+
 def resize_regions_to_font_size(img: np.ndarray, text_regions: List['TextBlock'], config: Config, original_img: np.ndarray = None, return_debug_img: bool = False):
     """
     Resize text regions based on layout mode.
@@ -701,40 +729,16 @@ def resize_regions_to_font_size(img: np.ndarray, text_regions: List['TextBlock']
                 calc_max_width = region.unrotated_size[0]
                 calc_max_height = region.unrotated_size[1]
 
-            # Step 1: 先缩小字体直到文本能放进文本框
-            iteration_count = 0
-            while font_size >= min_shrink_font_size:
-                iteration_count += 1
-                if region.horizontal:
-                    lines, _ = text_render.calc_horizontal(font_size, region.translation, max_width=calc_max_width, max_height=calc_max_height, language=region.target_lang)
-                    if len(lines) <= len(region.texts):
-                        break
-                else:
-                    lines, _ = text_render.calc_vertical(font_size, region.translation, max_height=calc_max_height)
-                    if len(lines) <= len(region.texts):
-                        break
-                font_size -= 1
-
-            # Step 2: 尝试扩大字体以更好地填充空间（但不超过初始大小）
-            # 从当前能放下的字体大小开始，逐步增加
-            max_fitting_font_size = font_size
-            test_font_size = font_size + 1
-
-            while test_font_size <= target_font_size:
+            # 在 [最小字号, 初始字号] 中找能放进文本框（行数不超过原文行数）的最大字号
+            def fits(test_font_size: int) -> bool:
                 if region.horizontal:
                     test_lines, _ = text_render.calc_horizontal(test_font_size, region.translation, max_width=calc_max_width, max_height=calc_max_height, language=region.target_lang)
-                    if len(test_lines) <= len(region.texts):
-                        max_fitting_font_size = test_font_size
-                        test_font_size += 1
-                    else:
-                        break
                 else:
                     test_lines, _ = text_render.calc_vertical(test_font_size, region.translation, max_height=calc_max_height)
-                    if len(test_lines) <= len(region.texts):
-                        max_fitting_font_size = test_font_size
-                        test_font_size += 1
-                    else:
-                        break
+                return len(test_lines) <= len(region.texts)
+
+            # 竖排按字符累加高度换行，行数随字号单调，可以二分
+            max_fitting_font_size = find_max_fitting_font_size(fits, min_shrink_font_size, font_size, monotone=not region.horizontal)
 
             # Calculate total font scale (font_scale_ratio + max_font_size limit)
             final_font_size = int(max(max_fitting_font_size, min_shrink_font_size) * config.render.font_scale_ratio)
@@ -1258,14 +1262,14 @@ async def dispatch(
         from ..config import Config
         config = Config()
 
-    # Save global default font path for regions without specific fonts
-    global _global_default_font_path
-    _global_default_font_path = font_path
-    
+    # font_path 是未单独指定字体的区域使用的默认字体，通过参数传给每个区域的光栅化，
+    # 多个页面同时渲染时互不影响（不能放在模块全局变量里）
     text_render.set_font(font_path)
     text_regions = list(filter(lambda region: region.translation, text_regions))
 
+    layout_start = time.perf_counter()
     result = resize_regions_to_font_size(img, text_regions, config, original_img, return_debug_img)
+    logger.debug(f"[RESIZE] 排版完成: {len(text_regions)} 个区域, 模式 {config.render.layout_mode}, 耗时 {(time.perf_counter() - layout_start) * 1000:.1f} ms")
     
     # Handle return value (may be tuple if debug image is included)
     if return_debug_img and isinstance(result, tuple):
@@ -1274,7 +1278,8 @@ async def dispatch(
         dst_points_list = result
         debug_img = None
 
-    for region, dst_points in tqdm(zip(text_regions, dst_points_list), '[render]', total=len(text_regions)):
+    render_jobs = []
+    for region, dst_points in zip(text_regions, dst_points_list):
         # 保存缩放算法计算的 dst_points 到 region，供 PSD 导出使用
         # 注意：这是缩放后的真实文本区域，不是 render 函数中扩展后的区域
         region.dst_points = dst_points
@@ -1288,7 +1293,28 @@ async def dispatch(
         line_spacing_multiplier = getattr(region, 'line_spacing', 1.0)
         base_spacing = 0.01 if region.horizontal else 0.2
         line_spacing = base_spacing * line_spacing_multiplier
-        img = render(img, region, dst_points, not config.render.no_hyphenation, line_spacing, config.render.disable_font_border, config)
+        render_jobs.append((region, dst_points, line_spacing))
+
+    hyphenate = not config.render.no_hyphenation
+    disable_font_border = config.render.disable_font_border
+    workers = config.render.render_workers or os.cpu_count() or 1
+    workers = min(workers, len(render_jobs))
+    if workers > 1:
+        img_shape = img.shape[:2]
+
+        def rasterize(job):
+            region, dst_points, line_spacing = job
+            # rasterize_region 会写入 config._current_region，每个区域使用独立的副本
+            return rasterize_region(img_shape, region, dst_points, hyphenate, line_spacing, disable_font_border, config.model_copy(), font_path)
+
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='render') as executor:
+            # map 按提交顺序返回，按区域顺序合成，重叠区域的覆盖关系与串行渲染一致
+            for rendered in tqdm(executor.map(rasterize, render_jobs), '[render]', total=len(render_jobs)):
+                if rendered is not None:
+                    composite_region(img, rendered)
+    else:
+        for region, dst_points, line_spacing in tqdm(render_jobs, '[render]'):
+            img = render(img, region, dst_points, hyphenate, line_spacing, disable_font_border, config, font_path)
     
     if return_debug_img and debug_img is not None:
         return img, debug_img
@@ -1301,11 +1327,33 @@ def render(
     hyphenate,
     line_spacing,
     disable_font_border,
-    config: Config
+    config: Config,
+    default_font_path: str = ''
 ):
-    global _global_default_font_path
-    
-    # Set region-specific font if specified, otherwise use global default
+    rendered = rasterize_region(img.shape[:2], region, dst_points, hyphenate, line_spacing, disable_font_border, config, default_font_path)
+    if rendered is not None:
+        composite_region(img, rendered)
+    return img
+
+def rasterize_region(
+    img_shape,
+    region: TextBlock,
+    dst_points,
+    hyphenate,
+    line_spacing,
+    disable_font_border,
+    config: Config,
+    default_font_path: str = ''
+):
+    """
+    排版并光栅化单个区域，透视变换到页面坐标
+
+    只依赖页面尺寸而不读写页面像素，因此多个区域可以并行光栅化，再由 composite_region 按顺序贴回。
+
+    Returns:
+        (rgba, (y1, y2, x1, x2))：变换后的 RGBA 图块及其在页面中的位置，跳过该区域时返回 None
+    """
+    # Set region-specific font if specified, otherwise use the page default (default_font_path)
     if hasattr(region, 'font_path') and region.font_path:
         font_path = region.font_path
         
@@ -1334,11 +1382,11 @@ def render(
             text_render.set_font(font_path)
         else:
             logger.warning(f"Font path not found for region: {region.font_path}, using default font")
-            # Fall back to global default font
-            text_render.set_font(_global_default_font_path)
+            # Fall back to the page default font
+            text_render.set_font(default_font_path)
     else:
-        # No region-specific font, use global default font (from UI config)
-        text_render.set_font(_global_default_font_path)
+        # No region-specific font, use the page default font (from UI config)
+        text_render.set_font(default_font_path)
     
     # --- START BRUTEFORCE COLOR FIX ---
     fg = (0, 0, 0) # Default to black
@@ -1459,7 +1507,7 @@ def render(
     # 检测是否需要使用高质量渲染（针对低分辨率优化）
     use_hq_render = text_render_hq.should_use_hq_rendering(
         region.font_size, 
-        (img.shape[1], img.shape[0])
+        (img_shape[1], img_shape[0])
     )
     
     if use_hq_render:
@@ -1516,12 +1564,12 @@ def render(
     
     if temp_box is None:
         logger.warning(f"[RENDER SKIPPED] Text rendering returned None. Text: '{region.translation[:100]}...'")
-        return img
+        return None
     
     h, w, _ = temp_box.shape
     if h == 0 or w == 0:
         logger.warning(f"Skipping rendering for region with invalid dimensions (w={w}, h={h}). Text: '{region.translation}'")
-        return img
+        return None
     r_temp = w / h
 
     box = None
@@ -1573,7 +1621,7 @@ def render(
     src_points = np.array([[0, 0], [box.shape[1], 0], [box.shape[1], box.shape[0]], [0, box.shape[0]]]).astype(np.float32)
 
     # 智能边界调整：检查文本是否超出图片边界
-    img_h, img_w = img.shape[:2]
+    img_h, img_w = img_shape[:2]
     x, y, w, h = cv2.boundingRect(np.round(dst_points[0]).astype(np.int32))
     
     adjusted = False
@@ -1627,7 +1675,7 @@ def render(
     if box.shape[0] > SHRT_MAX or box.shape[1] > SHRT_MAX:
         logger.error(f"[RENDER SKIPPED] Text box size exceeds OpenCV limit (32767). "
                      f"box={box.shape[:2]}, text='{region.translation[:50] if hasattr(region, 'translation') else 'N/A'}...'")
-        return img
+        return None
     
     # 计算文字区域的边界框，添加边距
     x_adj, y_adj, w_adj, h_adj = cv2.boundingRect(np.round(adjusted_dst_points[0]).astype(np.int32))
@@ -1645,7 +1693,7 @@ def render(
     if local_w > SHRT_MAX or local_h > SHRT_MAX:
         logger.error(f"[RENDER SKIPPED] Local region still exceeds OpenCV limit. "
                      f"local_size=({local_w}, {local_h}), text='{region.translation[:50] if hasattr(region, 'translation') else 'N/A'}...'")
-        return img
+        return None
     
     # 调整目标点到局部坐标系
     local_dst_points = adjusted_dst_points.copy()
@@ -1659,7 +1707,7 @@ def render(
     if M_local is None:
         logger.warning(f"[RENDER SKIPPED] Failed to compute homography matrix for text: "
                       f"'{region.translation[:50] if hasattr(region, 'translation') else 'N/A'}...'")
-        return img
+        return None
 
     # 在局部区域进行变换
     rgba_region = cv2.warpPerspective(box, M_local, (local_w, local_h), flags=cv2.INTER_LANCZOS4, borderMode=cv2.BORDER_CONSTANT, borderValue=0)
@@ -1673,26 +1721,30 @@ def render(
     valid_x2 = min(local_w, local_text_x + w_adj)
     
     if valid_y2 > valid_y1 and valid_x2 > valid_x1:
-        canvas_region = rgba_region[valid_y1:valid_y2, valid_x1:valid_x2, :3]
-        mask_region = rgba_region[valid_y1:valid_y2, valid_x1:valid_x2, 3:4].astype(np.float32) / 255.0
-        
         # 计算在原图中的对应位置
         img_target_y1 = local_y1 + valid_y1
         img_target_y2 = local_y1 + valid_y2
         img_target_x1 = local_x1 + valid_x1
         img_target_x2 = local_x1 + valid_x2
-        
-        target_region = img[img_target_y1:img_target_y2, img_target_x1:img_target_x2]
-        if canvas_region.shape[:2] == target_region.shape[:2]:
-            img[img_target_y1:img_target_y2, img_target_x1:img_target_x2] = np.clip(
-                (target_region.astype(np.float32) * (1 - mask_region) + canvas_region.astype(np.float32) * mask_region), 
-                0, 255
-            ).astype(np.uint8)
-        else:
-            logger.warning(f"Text region size mismatch: canvas={canvas_region.shape[:2]}, target={target_region.shape[:2]}, skipping region")
+        return rgba_region[valid_y1:valid_y2, valid_x1:valid_x2], (img_target_y1, img_target_y2, img_target_x1, img_target_x2)
+
+    logger.warning(f"Text region completely outside image bounds: x={x_adj}, y={y_adj}, w={w_adj}, h={h_adj}, image_size=({img_w}, {img_h}). Text: '{region.translation[:50] if hasattr(region, 'translation') else 'N/A'}...'")
+    return None
+
+def composite_region(img: np.ndarray, rendered):
+    """把 rasterize_region 的结果按 alpha 混合贴到页面上（原地修改 img）"""
+    rgba, (img_target_y1, img_target_y2, img_target_x1, img_target_x2) = rendered
+    canvas_region = rgba[:, :, :3]
+    mask_region = rgba[:, :, 3:4].astype(np.float32) / 255.0
+
+    target_region = img[img_target_y1:img_target_y2, img_target_x1:img_target_x2]
+    if canvas_region.shape[:2] == target_region.shape[:2]:
+        img[img_target_y1:img_target_y2, img_target_x1:img_target_x2] = np.clip(
+            (target_region.astype(np.float32) * (1 - mask_region) + canvas_region.astype(np.float32) * mask_region), 
+            0, 255
+        ).astype(np.uint8)
     else:
-        logger.warning(f"Text region completely outside image bounds: x={x_adj}, y={y_adj}, w={w_adj}, h={h_adj}, image_size=({img_w}, {img_h}). Text: '{region.translation[:50] if hasattr(region, 'translation') else 'N/A'}...'")
-    
+        logger.warning(f"Text region size mismatch: canvas={canvas_region.shape[:2]}, target={target_region.shape[:2]}, skipping region")
     return img
 
 async def dispatch_eng_render(img_canvas: np.ndarray, original_img: np.ndarray, text_regions: List[TextBlock], font_path: str = '', line_spacing: int = 0, disable_font_border: bool = False) -> np.ndarray:
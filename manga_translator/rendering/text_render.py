@@ -1,10 +1,13 @@
 import os
 import re
+import ctypes
 import cv2
 import numpy as np
 import freetype
 import functools
 import logging
+import threading
+from collections import OrderedDict
 from pathlib import Path
 from typing import Tuple, Optional, List
 from hyphen import Hyphenator
@@ -116,11 +119,6 @@ logger = logging.getLogger(__name__)
 logger.addHandler(logging.NullHandler())  
 
 DEFAULT_FONT = os.path.join(BASE_PATH, 'fonts', 'Arial-Unicode-Regular.ttf')
-try:
-    FONT = freetype.Face(Path(DEFAULT_FONT).open('rb'))
-except Exception as e:
-    logger.error(f"Failed to initialize default font: {e}")
-    FONT = None  
 
 def CJK_Compatibility_Forms_translate(cdpt: str, direction: int):
     """direction: 0 - horizontal, 1 - vertical"""
@@ -318,72 +316,101 @@ FALLBACK_FONTS = [
     os.path.join(BASE_PATH, 'fonts/msyh.ttc'),
     os.path.join(BASE_PATH, 'fonts/msgothic.ttc'),
 ]
-FONT_SELECTION: List[freetype.Face] = []
 font_cache = {}
 _font_file_handles = {}  # 保存文件句柄，防止被垃圾回收
 
+# FreeType 的 Face/Library 不是线程安全的：加载字形（set_pixel_sizes + load_char 会修改 face.glyph）、
+# 描边和打开字体文件都在这把锁内进行。缓存命中时不需要这把锁
+_freetype_lock = threading.RLock()
+
+# 字形和描边位图缓存的内存上限（所有字体共享）
+GLYPH_CACHE_MAX_MB = 64
+STROKE_CACHE_MAX_MB = 64
+
+def _normalize_font_path(path: str) -> str:
+    return os.path.abspath(path).replace('\\', '/')
+
 def get_cached_font(path: str) -> freetype.Face:
     path = path.replace('\\', '/')
-    if not font_cache.get(path):
-        # 保存文件句柄引用，防止被关闭
-        file_handle = Path(path).open('rb')
-        _font_file_handles[path] = file_handle
-        font_cache[path] = freetype.Face(file_handle)
-    return font_cache[path]
-
-def update_font_selection():
-    global FONT_SELECTION
-    FONT_SELECTION = []
-    if FONT:
-        FONT_SELECTION.append(FONT)
-    for font_path in FALLBACK_FONTS:
-        try:
-            face = get_cached_font(font_path)
-            if face and face not in FONT_SELECTION:
-                FONT_SELECTION.append(face)
-        except Exception as e:
-            logger.error(f"Failed to load fallback font: {font_path} - {e}")
-
-
-def set_font(path: str):
-    global FONT
-    
-    # 处理相对路径：尝试在 BASE_PATH 下查找
-    resolved_path = path
-    if path and not os.path.isabs(path) and not os.path.exists(path):
-        # 尝试 BASE_PATH/fonts/filename 或 BASE_PATH/path
-        possible_paths = [
-            os.path.join(BASE_PATH, 'fonts', os.path.basename(path)),
-            os.path.join(BASE_PATH, path),
-        ]
-        for p in possible_paths:
-            if os.path.exists(p):
-                resolved_path = p
-                break
-    
-    if not resolved_path or not os.path.exists(resolved_path):
-        if path:
-            logger.error(f'Could not load font: {path}')
-        try:
-            FONT = freetype.Face(Path(DEFAULT_FONT).open('rb'))
-        except (freetype.ft_errors.FT_Exception, FileNotFoundError):
-            logger.critical("Default font could not be loaded. Please check your installation.")
-            FONT = None
-        update_font_selection()
-        get_char_glyph.cache_clear()
-        return
+    with _freetype_lock:
+        if not font_cache.get(path):
+            # 保存文件句柄引用，防止被关闭
+            file_handle = Path(path).open('rb')
+            _font_file_handles[path] = file_handle
+            font_cache[path] = freetype.Face(file_handle)
+        return font_cache[path]
+
+
+class _BoundedCache:
+    """按估算字节数限制大小的线程安全 LRU 缓存，记录命中率"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: 'OrderedDict[tuple, tuple]' = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def put(self, key, value, nbytes: int):
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._entries[key] = (value, nbytes)
+            self._bytes += nbytes
+            while self._bytes > self.max_bytes and len(self._entries) > 1:
+                _, (_, old_bytes) = self._entries.popitem(last=False)
+                self._bytes -= old_bytes
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self.hits = self.misses = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'size_mb': round(self._bytes / 1024 / 1024, 2),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / total, 4) if total else 0.0,
+            }
+
+
+# 键：(字体链, 字符, 字号, 方向)；描边缓存额外包含描边半径
+GLYPH_CACHE = _BoundedCache(GLYPH_CACHE_MAX_MB * 1024 * 1024)
+STROKE_CACHE = _BoundedCache(STROKE_CACHE_MAX_MB * 1024 * 1024)
+
+# 前进量缓存条目很小，超过该数量时整体清空
+_CHAR_OFFSET_CACHE_LIMIT = 100000
+
+
+def _bitmap_buffer(bitmap) -> bytes:
+    """
+    读取 FreeType 位图数据
+
+    freetype-py 的 Bitmap.buffer 在 Python 中逐字节索引 ctypes 指针生成列表，大字号时很慢且一直持有 GIL，
+    这里直接按指针一次性复制。
+    """
+    size = bitmap.rows * bitmap.pitch
+    if size <= 0:
+        return bytes(bitmap.buffer)
+    return ctypes.string_at(bitmap._FT_Bitmap.buffer, size)
 
-    try:
-        FONT = freetype.Face(Path(resolved_path).open('rb'))
-    except (freetype.ft_errors.FT_Exception, FileNotFoundError):
-        logger.error(f'Could not load font: {resolved_path}')
-        try:
-            FONT = freetype.Face(Path(DEFAULT_FONT).open('rb'))
-        except (freetype.ft_errors.FT_Exception, FileNotFoundError):
-            logger.critical("Default font could not be loaded. Please check your installation.")
-            FONT = None
-    update_font_selection()
-    get_char_glyph.cache_clear()
 
 class namespace:
     pass
@@ -391,7 +418,7 @@ class namespace:
 class Glyph:
     def __init__(self, glyph):
         self.bitmap = namespace()
-        self.bitmap.buffer = glyph.bitmap.buffer
+        self.bitmap.buffer = list(_bitmap_buffer(glyph.bitmap))
         self.bitmap.rows = glyph.bitmap.rows
         self.bitmap.width = glyph.bitmap.width
         self.advance = namespace()
@@ -407,66 +434,243 @@ class Glyph:
         self.metrics.horiAdvance = glyph.metrics.horiAdvance
         self.metrics.vertAdvance = glyph.metrics.vertAdvance
 
-@functools.lru_cache(maxsize = 1024, typed = True)
-def get_char_glyph(cdpt: str, font_size: int, direction: int) -> Glyph:
-    global FONT_SELECTION
-    for i, face in enumerate(FONT_SELECTION):
-        char_index = face.get_char_index(cdpt)
-        if char_index != 0:
-            # Character found, load and return glyph
-            if direction == 0:
-                face.set_pixel_sizes(0, font_size)
-            elif direction == 1:
-                face.set_pixel_sizes(font_size, 0)
-            face.load_char(cdpt)
-            return Glyph(face.glyph)
-        
-        # Log fallback attempt only on the primary font for clarity
-        if i == 0:
-            try:
-                font_name = face.family_name.decode('utf-8') if face.family_name else 'Unknown'
-                logger.debug(f"Character '{cdpt}' not found in primary font '{font_name}'. Trying fallbacks.")
-            except Exception:
-                pass # Avoid logging errors within logging
 
-    # If the loop completes, the character was not found in any font.
-    logger.error(f"FATAL: Character '{cdpt}' (U+{ord(cdpt):04X}) not found in any of the available fonts. Substituting with a placeholder.")
-    
-    # To prevent a crash, recursively call with a placeholder that is guaranteed to exist.
-    # Use '?' as placeholder instead of space - it's visible and indicates missing character
-    # Avoid infinite recursion if placeholder itself is not found
-    if cdpt in (' ', '?', '□'):
-        # This should never happen with valid fonts, but as a safeguard:
-        # We can't return a glyph, so we must raise an exception.
-        raise RuntimeError(f"Catastrophic failure: Placeholder character '{cdpt}' not found in any font.")
-    
-    # Try '?' first (visible placeholder), then '□' (replacement character), then space
-    for placeholder in ('?', '□', ' '):
-        if placeholder != cdpt:
-            try:
-                return get_char_glyph(placeholder, font_size, direction)
-            except RuntimeError:
+class FontContext:
+    """
+    字体链：主字体 + 回退字体，按顺序查找包含该字符的字体
+
+    字形、描边位图缓存在进程内共享（GLYPH_CACHE / STROKE_CACHE），键包含字体链，
+    所以按区域切换字体时不需要清空缓存，多个渲染线程也可以同时使用同一个 FontContext。
+    """
+
+    def __init__(self, font_path: Optional[str]):
+        paths = []
+        faces = []
+        for path in ([font_path] if font_path else []) + FALLBACK_FONTS:
+            key = _normalize_font_path(path)
+            if key in paths:
                 continue
-    
-    # Last resort - should never reach here
-    raise RuntimeError("Catastrophic failure: No placeholder character found in any font.")
+            try:
+                faces.append(get_cached_font(path))
+                paths.append(key)
+            except Exception as e:
+                if path == font_path:
+                    logger.error(f'Could not load font: {path} - {e}')
+                else:
+                    logger.error(f"Failed to load fallback font: {path} - {e}")
+        self.key = tuple(paths)
+        self.faces: List[freetype.Face] = faces
+        # (字号, 字符) -> 横排/竖排前进量，(字号, 字符串) -> 横排宽度
+        self._offset_x = {}
+        self._offset_y = {}
+        self._string_width = {}
+
+    def _load_glyph(self, cdpt: str, font_size: int, direction: int) -> Optional[Glyph]:
+        with _freetype_lock:
+            for i, face in enumerate(self.faces):
+                if face.get_char_index(cdpt) != 0:
+                    # Character found, load and return glyph
+                    if direction == 0:
+                        face.set_pixel_sizes(0, font_size)
+                    elif direction == 1:
+                        face.set_pixel_sizes(font_size, 0)
+                    face.load_char(cdpt)
+                    return Glyph(face.glyph)
+
+                # Log fallback attempt only on the primary font for clarity
+                if i == 0:
+                    try:
+                        font_name = face.family_name.decode('utf-8') if face.family_name else 'Unknown'
+                        logger.debug(f"Character '{cdpt}' not found in primary font '{font_name}'. Trying fallbacks.")
+                    except Exception:
+                        pass # Avoid logging errors within logging
+        return None
+
+    def get_glyph(self, cdpt: str, font_size: int, direction: int) -> Glyph:
+        key = (self.key, cdpt, font_size, direction)
+        glyph = GLYPH_CACHE.get(key)
+        if glyph is not None:
+            return glyph
+
+        glyph = self._load_glyph(cdpt, font_size, direction)
+        if glyph is None:
+            # If the loop completes, the character was not found in any font.
+            logger.error(f"FATAL: Character '{cdpt}' (U+{ord(cdpt):04X}) not found in any of the available fonts. Substituting with a placeholder.")
+
+            # To prevent a crash, recursively call with a placeholder that is guaranteed to exist.
+            # Use '?' as placeholder instead of space - it's visible and indicates missing character
+            # Avoid infinite recursion if placeholder itself is not found
+            if cdpt in (' ', '?', '□'):
+                # This should never happen with valid fonts, but as a safeguard:
+                # We can't return a glyph, so we must raise an exception.
+                raise RuntimeError(f"Catastrophic failure: Placeholder character '{cdpt}' not found in any font.")
+
+            # Try '?' first (visible placeholder), then '□' (replacement character), then space
+            for placeholder in ('?', '□', ' '):
+                if placeholder != cdpt:
+                    try:
+                        glyph = self.get_glyph(placeholder, font_size, direction)
+                        break
+                    except RuntimeError:
+                        continue
+            else:
+                # Last resort - should never reach here
+                raise RuntimeError("Catastrophic failure: No placeholder character found in any font.")
+
+        # 位图缓冲区是 Python 整数列表，每个元素按指针大小估算
+        GLYPH_CACHE.put(key, glyph, glyph.bitmap.rows * glyph.bitmap.width * 8 + 256)
+        return glyph
+
+    def get_border_glyph(self, cdpt: str, font_size: int, direction: int):
+        """未描边的矢量字形（调用方会 stroke 修改它，因此不缓存）"""
+        with _freetype_lock:
+            for i, face in enumerate(self.faces):
+                if face.get_char_index(cdpt) == 0 and i != len(self.faces) - 1:
+                    continue
+                if direction == 0:
+                    face.set_pixel_sizes(0, font_size)
+                elif direction == 1:
+                    face.set_pixel_sizes(font_size, 0)
+                face.load_char(cdpt, freetype.FT_LOAD_DEFAULT | freetype.FT_LOAD_NO_BITMAP)
+                slot_border = face.glyph
+                return slot_border.get_glyph()
+        return None
+
+    def get_border_bitmap(self, cdpt: str, font_size: int, direction: int, stroke_radius: int) -> Optional[np.ndarray]:
+        """
+        描边位图（只读 uint8 数组），描边结果为空时返回 None
+
+        Args:
+            stroke_radius: 描边半径（26.6 定点数，即像素 * 64）
+        """
+        key = (self.key, cdpt, font_size, direction, stroke_radius)
+        entry = STROKE_CACHE.get(key)
+        if entry is not None:
+            return entry[0]
+
+        bitmap_border = None
+        with _freetype_lock:
+            glyph_border = self.get_border_glyph(cdpt, font_size, direction)
+            if glyph_border is not None:
+                stroker = freetype.Stroker()
+                stroker.set(stroke_radius, freetype.FT_STROKER_LINEJOIN_ROUND, freetype.FT_STROKER_LINECAP_ROUND, 0)
+                glyph_border.stroke(stroker, destroy=True)
+                blyph = glyph_border.to_bitmap(freetype.FT_RENDER_MODE_NORMAL, freetype.Vector(0, 0), True)
+                bitmap_b = blyph.bitmap
+                rows, width = bitmap_b.rows, bitmap_b.width
+                buffer = _bitmap_buffer(bitmap_b)
+                if rows * width > 0 and len(buffer) == rows * width:
+                    # frombuffer 基于 bytes，数组本身只读
+                    bitmap_border = np.frombuffer(buffer, dtype=np.uint8).reshape((rows, width))
+
+        STROKE_CACHE.put(key, (bitmap_border,), (bitmap_border.nbytes if bitmap_border is not None else 0) + 256)
+        return bitmap_border
+
+    def char_offset_x(self, font_size: int, cdpt: str) -> int:
+        key = (font_size, cdpt)
+        offset = self._offset_x.get(key)
+        if offset is None:
+            if len(self._offset_x) > _CHAR_OFFSET_CACHE_LIMIT:
+                self._offset_x.clear()
+            offset = self._offset_x[key] = _calc_char_offset_x(font_size, cdpt)
+        return offset
+
+    def string_width(self, font_size: int, text: str) -> int:
+        # calc_horizontal 会反复计算同一批单词/音节的宽度
+        key = (font_size, text)
+        width = self._string_width.get(key)
+        if width is None:
+            if len(self._string_width) > _CHAR_OFFSET_CACHE_LIMIT:
+                self._string_width.clear()
+            cache = self._offset_x
+            width = 0
+            for c in text:
+                offset = cache.get((font_size, c))
+                width += offset if offset is not None else self.char_offset_x(font_size, c)
+            self._string_width[key] = width
+        return width
+
+    def char_offset_y(self, font_size: int, cdpt: str) -> int:
+        key = (font_size, cdpt)
+        offset = self._offset_y.get(key)
+        if offset is None:
+            if len(self._offset_y) > _CHAR_OFFSET_CACHE_LIMIT:
+                self._offset_y.clear()
+            cdpt_trans, _ = CJK_Compatibility_Forms_translate(cdpt, 1)
+            glyph = self.get_glyph(cdpt_trans, font_size, 1)
+            offset = glyph.metrics.vertAdvance >> 6 if glyph.metrics.vertAdvance != 0 else font_size
+            self._offset_y[key] = offset
+        return offset
+
+
+_font_contexts = {}
+_font_contexts_lock = threading.Lock()
+# set_font 设置当前线程的字体；未调用过 set_font 的线程使用最近一次设置的字体
+_thread_state = threading.local()
+_default_font_context: Optional[FontContext] = None
+
+def get_font_context(path: Optional[str]) -> FontContext:
+    """按字体路径获取（并缓存）FontContext，path 为空时只使用回退字体"""
+    key = _normalize_font_path(path) if path else None
+    with _font_contexts_lock:
+        context = _font_contexts.get(key)
+        if context is None:
+            context = _font_contexts[key] = FontContext(path)
+        return context
+
+def current_font_context() -> FontContext:
+    context = getattr(_thread_state, 'font_context', None) or _default_font_context
+    if context is None:
+        context = set_font(DEFAULT_FONT)
+    return context
+
+def glyph_cache_stats() -> dict:
+    """字形/描边位图缓存的命中率和占用"""
+    return {'glyph': GLYPH_CACHE.stats(), 'stroke': STROKE_CACHE.stats()}
+
+def _resolve_font_path(path: str) -> Optional[str]:
+    # 处理相对路径：尝试在 BASE_PATH 下查找
+    resolved_path = path
+    if path and not os.path.isabs(path) and not os.path.exists(path):
+        # 尝试 BASE_PATH/fonts/filename 或 BASE_PATH/path
+        possible_paths = [
+            os.path.join(BASE_PATH, 'fonts', os.path.basename(path)),
+            os.path.join(BASE_PATH, path),
+        ]
+        for p in possible_paths:
+            if os.path.exists(p):
+                resolved_path = p
+                break
+
+    if not resolved_path or not os.path.exists(resolved_path):
+        if path:
+            logger.error(f'Could not load font: {path}')
+        # 回退字体链以 DEFAULT_FONT 开头
+        return None
+    return resolved_path
+
+def set_font(path: str) -> FontContext:
+    """
+    切换当前线程使用的字体（同时作为未调用过 set_font 的线程的默认字体）
+
+    字体无法加载时只使用回退字体（以 DEFAULT_FONT 开头）。
+    """
+    global _default_font_context
+    context = get_font_context(_resolve_font_path(path))
+    if not context.faces:
+        logger.critical("Default font could not be loaded. Please check your installation.")
+    _thread_state.font_context = context
+    _default_font_context = context
+    return context
+
+def get_char_glyph(cdpt: str, font_size: int, direction: int) -> Glyph:
+    return current_font_context().get_glyph(cdpt, font_size, direction)
 
-# 缓存 glyph border 对象，避免重复创建导致内存泄漏
-# 注意：由于 stroke() 会修改 glyph，这里不缓存 glyph，而是直接返回新对象
-# 真正的优化在 _stroke_border_cache 中缓存最终的 bitmap 结果
-#@functools.lru_cache(maxsize = 1024, typed = True)
 def get_char_border(cdpt: str, font_size: int, direction: int):
-    global FONT_SELECTION
-    for i, face in enumerate(FONT_SELECTION):
-        if face.get_char_index(cdpt) == 0 and i != len(FONT_SELECTION) - 1:
-            continue
-        if direction == 0:
-            face.set_pixel_sizes(0, font_size)
-        elif direction == 1:
-            face.set_pixel_sizes(font_size, 0)
-        face.load_char(cdpt, freetype.FT_LOAD_DEFAULT | freetype.FT_LOAD_NO_BITMAP)
-        slot_border = face.glyph
-        return slot_border.get_glyph()
+    return current_font_context().get_border_glyph(cdpt, font_size, direction)
+
+def get_char_border_bitmap(cdpt: str, font_size: int, direction: int, stroke_radius: int) -> Optional[np.ndarray]:
+    return current_font_context().get_border_bitmap(cdpt, font_size, direction, stroke_radius)
 
 def calc_horizontal_block_height(font_size: int, content: str) -> int:
     """
@@ -539,6 +743,10 @@ def calc_horizontal_block_height(font_size: int, content: str) -> int:
         # 如果没有内容，返回默认高度
         return font_size
 
+def get_char_offset_y(font_size: int, cdpt: str) -> int:
+    """竖排时字符的纵向前进量（带缓存）"""
+    return current_font_context().char_offset_y(font_size, cdpt)
+
 def calc_vertical(font_size: int, text: str, max_height: int, config=None):
     """
     Line breaking logic for vertical text.
@@ -590,14 +798,7 @@ def calc_vertical(font_size: int, text: str, max_height: int, config=None):
                     if not cdpt:
                         continue
                     
-                    cdpt_trans, rot_degree = CJK_Compatibility_Forms_translate(cdpt, 1)
-                    ckpt = get_char_glyph(cdpt_trans, font_size, 1)
-                    bitmap = ckpt.bitmap
-
-                    if bitmap.rows * bitmap.width == 0 or len(bitmap.buffer) != bitmap.rows * bitmap.width:
-                        char_offset_y = ckpt.metrics.vertAdvance >> 6 if hasattr(ckpt.metrics, 'vertAdvance') and ckpt.metrics.vertAdvance != 0 else font_size
-                    else:
-                        char_offset_y = ckpt.metrics.vertAdvance >> 6 if hasattr(ckpt.metrics, 'vertAdvance') and ckpt.metrics.vertAdvance != 0 else font_size
+                    char_offset_y = get_char_offset_y(font_size, cdpt)
 
                     should_wrap = current_line_height + char_offset_y > max_height
 
@@ -696,22 +897,15 @@ def put_char_vertical(font_size: int, cdpt: str, pen_l: Tuple[int, int], canvas_
         if bitmap_char_slice.size > 0:
             canvas_text[paste_y_start:paste_y_end, paste_x_start:paste_x_end] = bitmap_char_slice
     if border_size > 0:
-        glyph_border = get_char_border(cdpt, font_size, 1)
-        stroker = freetype.Stroker()
         # Use passed stroke_width, fallback to config or default
         if stroke_width is None:
             stroke_ratio = config.render.stroke_width if (config and hasattr(config.render, 'stroke_width')) else 0.07
         else:
             stroke_ratio = stroke_width
         stroke_radius = 64 * max(int(stroke_ratio * font_size), 1)
-        stroker.set(stroke_radius, freetype.FT_STROKER_LINEJOIN_ROUND, freetype.FT_STROKER_LINECAP_ROUND, 0)
-        glyph_border.stroke(stroker, destroy=True)
-        blyph = glyph_border.to_bitmap(freetype.FT_RENDER_MODE_NORMAL, freetype.Vector(0, 0), True)
-        bitmap_b = blyph.bitmap
-        border_bitmap_rows = bitmap_b.rows
-        border_bitmap_width = bitmap_b.width
-        if border_bitmap_rows * border_bitmap_width > 0 and len(bitmap_b.buffer) == border_bitmap_rows * border_bitmap_width:
-            bitmap_border = np.array(bitmap_b.buffer, dtype=np.uint8).reshape((border_bitmap_rows, border_bitmap_width))
+        bitmap_border = get_char_border_bitmap(cdpt, font_size, 1, stroke_radius)
+        if bitmap_border is not None:
+            border_bitmap_rows, border_bitmap_width = bitmap_border.shape
 
             # 如果需要旋转90度，边框也要旋转
             if force_rotate_90:
@@ -1057,6 +1251,7 @@ def put_text_vertical(font_size: int, text: str, h: int, alignment: str, fg: Tup
 
     return result
 
+@functools.lru_cache(maxsize = None)
 def select_hyphenator(lang: str):
     # 处理空字符串或None的情况，使用英文作为默认值
     if not lang or not lang.strip():
@@ -1075,7 +1270,7 @@ def select_hyphenator(lang: str):
     except Exception:
         return None
 
-def get_char_offset_x(font_size: int, cdpt: str):
+def _calc_char_offset_x(font_size: int, cdpt: str):
     if cdpt == '＿':
         # Return the width of a full-width space for the placeholder
         return get_char_offset_x(font_size, '　')
@@ -1089,8 +1284,11 @@ def get_char_offset_x(font_size: int, cdpt: str):
         char_offset_x = glyph.metrics.horiAdvance >> 6
     return char_offset_x
 
+def get_char_offset_x(font_size: int, cdpt: str):
+    return current_font_context().char_offset_x(font_size, cdpt)
+
 def get_string_width(font_size: int, text: str):
-    return sum([get_char_offset_x(font_size, c) for c in text])
+    return current_font_context().string_width(font_size, text)
 
 def calc_horizontal_cjk(font_size: int, text: str, max_width: int) -> Tuple[List[str], List[int]]:
     """
@@ -1152,6 +1350,9 @@ def calc_horizontal(font_size: int, text: str, max_width: int, max_height: int,
 
     max_width = max(max_width, 2 * font_size)
 
+    # 排版期间字体不变，绑定一次避免每个单词/音节都查找当前字体
+    string_width = current_font_context().string_width
+
     whitespace_offset_x = get_char_offset_x(font_size, ' ')
     hyphen_offset_x = get_char_offset_x(font_size, '-')
 
@@ -1178,7 +1379,7 @@ def calc_horizontal(font_size: int, text: str, max_width: int, max_height: int,
 
     word_widths = []
     for i, word in enumerate(words):
-        width = get_string_width(font_size, word)
+        width = string_width(font_size, word)
         word_widths.append(width)
 
     while True:
@@ -1212,7 +1413,7 @@ def calc_horizontal(font_size: int, text: str, max_width: int, max_height: int,
 
         normalized_syls = []
         for syl in new_syls:
-            syl_width = get_string_width(font_size, syl)
+            syl_width = string_width(font_size, syl)
             if syl_width > max_width:
                 normalized_syls.extend(list(syl))
             else:
@@ -1272,7 +1473,7 @@ def calc_horizontal(font_size: int, text: str, max_width: int, max_height: int,
             hyphenation_idx = 0
             while j < len(syllables[i]):
                 syl = syllables[i][j]
-                syl_width = get_string_width(font_size, syl)
+                syl_width = string_width(font_size, syl)
 
                 if line_width + current_width + syl_width <= max_width:
                     current_width += syl_width
@@ -1325,7 +1526,7 @@ def calc_horizontal(font_size: int, text: str, max_width: int, max_height: int,
                 current_width = 0
                 for i in range(syl_start_idx, syl_end_idx):
                     syl = syllables[word_idx][i]
-                    syl_width = get_string_width(font_size, syl)
+                    syl_width = string_width(font_size, syl)
                     if left_space > current_width + syl_width:
                         current_width += syl_width
                     else:
@@ -1358,8 +1559,8 @@ def calc_horizontal(font_size: int, text: str, max_width: int, max_height: int,
         if line_words1[-1] == line_words2[0]:
             word1_text = ''.join(get_present_syllables(line_idx, -1))
             word2_text = ''.join(get_present_syllables(line_idx + 1, 0))
-            word1_width = get_string_width(font_size, word1_text)
-            word2_width = get_string_width(font_size, word2_text)
+            word1_width = string_width(font_size, word1_text)
+            word2_width = string_width(font_size, word2_text)
             if len(word2_text) == 1 or word2_width < font_size:
                 merged_word_idx = line_words1[-1]
                 line_words2.pop(0)
@@ -1400,7 +1601,7 @@ def calc_horizontal(font_size: int, text: str, max_width: int, max_height: int,
             elif use_hyphen_chars and syl_end_idx != len(syllables[word_idx]) and len(words[word_idx]) > 3 and line_text[-1] != '-' and not (syl_end_idx < len(syllables[word_idx]) and not re.search(r'\w', syllables[word_idx][syl_end_idx][0])):
                 line_text += '-'
                 line_width_list[i] += hyphen_offset_x
-        line_width_list[i] = get_string_width(font_size, line_text)
+        line_width_list[i] = string_width(font_size, line_text)
         line_text_list.append(line_text)
 
     return line_text_list, line_width_list
@@ -1459,28 +1660,15 @@ def put_char_horizontal(font_size: int, cdpt: str, pen_l: Tuple[int, int], canva
         canvas_text[paste_y_start:paste_y_end, 
                     paste_x_start:paste_x_end] = bitmap_char_slice
     if border_size > 0:
-        glyph_border = get_char_border(cdpt, font_size, 0)
-        stroker = freetype.Stroker()
         # Use passed stroke_width, fallback to config or default
         if stroke_width is None:
             stroke_ratio = config.render.stroke_width if (config and hasattr(config.render, 'stroke_width')) else 0.07
         else:
             stroke_ratio = stroke_width
         stroke_radius = 64 * max(int(stroke_ratio * font_size), 1)
-        stroker.set(stroke_radius, 
-                   freetype.FT_STROKER_LINEJOIN_ROUND,
-                   freetype.FT_STROKER_LINECAP_ROUND,
-                   0)
-        glyph_border.stroke(stroker, destroy=True)
-        blyph = glyph_border.to_bitmap(freetype.FT_RENDER_MODE_NORMAL, 
-                                      freetype.Vector(0, 0), True)
-        bitmap_b = blyph.bitmap
-        border_bitmap_rows = bitmap_b.rows
-        border_bitmap_width = bitmap_b.width
-        if (border_bitmap_rows * border_bitmap_width > 0 and 
-            len(bitmap_b.buffer) == border_bitmap_rows * border_bitmap_width):
-            bitmap_border = np.array(bitmap_b.buffer, dtype=np.uint8
-                                   ).reshape((border_bitmap_rows, border_bitmap_width))
+        bitmap_border = get_char_border_bitmap(cdpt, font_size, 0, stroke_radius)
+        if bitmap_border is not None:
+            border_bitmap_rows, border_bitmap_width = bitmap_border.shape
             char_bitmap_rows = bitmap.rows
             char_bitmap_width = bitmap.width
             
@@ -1650,7 +1838,7 @@ def test():
     imwrite_unicode('text_render_combined.png', canvas, logger)
 
 # Initialize font selection on module load
-update_font_selection()
+set_font(DEFAULT_FONT)
 
 if __name__ == '__main__':
     test()
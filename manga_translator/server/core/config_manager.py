@@ -56,6 +56,10 @@ DEFAULT_ADMIN_SETTINGS = {
         'cli.context_size',
         'cli.batch_size',
         'cli.batch_concurrent',
+        'cli.pipeline_queue_size',
+        'cli.pipeline_memory_budget_mb',
+        'cli.pipeline_inpaint_workers',
+        'cli.pipeline_render_workers',
         'cli.use_gpu',
         'cli.verbose',
         'cli.psd_script_only',  # Web UI隐藏PSD脚本模式参数
@@ -65,6 +69,10 @@ DEFAULT_ADMIN_SETTINGS = {
         'cli.inpaint_only',
         # Qt UI 专属参数（替换翻译模式相关）
         'cli.replace_translation',
+        # 阶段缓存为服务器级设置
+        'cli.stage_cache',
+        'cli.stage_cache_dir',
+        'cli.stage_cache_size_mb',
         'render.enable_template_alignment',
         'render.paste_mask_dilation_pixels',
         # 翻译器高级配置
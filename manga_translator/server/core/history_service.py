@@ -12,12 +12,13 @@ import os
 import uuid
 import shutil
 import logging
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 from datetime import datetime, timezone
 from pathlib import Path
 
 from manga_translator.server.models import TranslationResult
-from manga_translator.server.repositories.translation_repository import TranslationRepository
+from manga_translator.server.repositories.translation_repository import TranslationRepository, create_translation_repository
+from manga_translator.server.core.search_index import get_history_search_index
 
 logger = logging.getLogger(__name__)
 
@@ -38,9 +39,10 @@ class HistoryManagementService:
             translation_repo: Optional translation repository instance
         """
         self.result_directory = Path(result_directory)
-        self.translation_repo = translation_repo or TranslationRepository(
+        self.translation_repo = translation_repo or create_translation_repository(
             os.path.join('manga_translator', 'server', 'data', 'translation_history.json')
         )
+        self.search_index = get_history_search_index(self.translation_repo)
         
         # Ensure result directory exists
         self.result_directory.mkdir(parents=True, exist_ok=True)
@@ -124,6 +126,12 @@ class HistoryManagementService:
         # Save to repository
         self.translation_repo.add_session(result)
         
+        # 增量更新搜索索引（索引失败不影响保存结果）
+        try:
+            self.search_index.add_session(result.to_dict())
+        except Exception as e:
+            logger.warning(f"Failed to index translation session {session_token}: {e}")
+        
         return result
     
     def get_user_history(
@@ -255,7 +263,13 @@ class HistoryManagementService:
             shutil.rmtree(session_dir)
         
         # Delete from repository
-        return self.translation_repo.delete_session(session.id)
+        deleted = self.translation_repo.delete_session(session.id)
+        if deleted:
+            try:
+                self.search_index.remove_session(session.id)
+            except Exception as e:
+                logger.warning(f"Failed to remove session {session_token} from search index: {e}")
+        return deleted
     
     def get_session_files(
         self,
@@ -318,131 +332,83 @@ class HistoryManagementService:
         if not session:
             return False
         
-        return self.translation_repo.update_session(
+        updated = self.translation_repo.update_session(
             session.id,
             {'status': status}
         )
+        if updated:
+            try:
+                self.search_index.update_session(session.id, {'status': status})
+            except Exception as e:
+                logger.warning(f"Failed to update session {session_token} in search index: {e}")
+        return updated
     
-    def create_download_archive(
+    def get_download_entries(
         self,
         session_token: str,
         user_id: Optional[str] = None
-    ) -> Optional[str]:
+    ) -> Optional[List[Tuple[str, str]]]:
         """
-        Create a ZIP archive for a session's files.
+        Get the files to put in a session's download archive.
+        
+        The archive itself is streamed by the route (see zip_stream.iter_zip_files),
+        no temporary ZIP file is created.
         
         Args:
             session_token: Session token
             user_id: Optional user ID for ownership verification
         
         Returns:
-            Path to the created ZIP file, or None if failed
+            List of (file_path, arcname) tuples, or None if the session has no files
             
         Validates: Requirement 3.4
         """
-        import zipfile
-        import tempfile
-        
         # Get session files
         files = self.get_session_files(session_token, user_id)
         
         if not files:
             return None
         
-        # Create temporary ZIP file
-        temp_dir = tempfile.gettempdir()
-        zip_path = os.path.join(temp_dir, f"{session_token}.zip")
-        
-        try:
-            with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-                for file_path in files:
-                    if os.path.exists(file_path):
-                        # Add file to ZIP with just the filename (no path)
-                        arcname = os.path.basename(file_path)
-                        zipf.write(file_path, arcname)
-            
-            return zip_path
-        
-        except Exception as e:
-            logger.error(f"Failed to create ZIP archive: {e}")
-            return None
+        # Add file to ZIP with just the filename (no path)
+        return [
+            (file_path, os.path.basename(file_path))
+            for file_path in files
+            if os.path.exists(file_path)
+        ]
     
-    def create_batch_download_archive(
+    def get_batch_download_entries(
         self,
         session_tokens: List[str],
         user_id: Optional[str] = None
-    ) -> Optional[str]:
+    ) -> List[Tuple[str, str]]:
         """
-        Create a ZIP archive for multiple sessions' files.
+        Get the files to put in a multi-session download archive.
         
         Args:
             session_tokens: List of session tokens
             user_id: Optional user ID for ownership verification
         
         Returns:
-            Path to the created ZIP file, or None if failed
+            List of (file_path, arcname) tuples, files grouped in one folder per session
             
         Validates: Requirements 4.2, 4.3
         """
-        import zipfile
-        import tempfile
-        import logging
-        logger = logging.getLogger(__name__)
-        
         logger.info(f"Creating batch download for {len(session_tokens)} sessions, user_id={user_id}")
         
-        # Create temporary ZIP file
-        temp_dir = tempfile.gettempdir()
-        zip_filename = f"batch_download_{datetime.now(timezone.utc).strftime('%Y%m%d_%H%M%S')}.zip"
-        zip_path = os.path.join(temp_dir, zip_filename)
-        
-        try:
-            total_files = 0
-            with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-                for session_token in session_tokens:
-                    logger.info(f"Processing session: {session_token}")
-                    
-                    # Get session files
-                    files = self.get_session_files(session_token, user_id)
-                    logger.info(f"  Found {len(files)} files for session {session_token[:8]}")
-                    
-                    if not files:
-                        logger.warning(f"  No files found for session {session_token[:8]}")
-                        continue
-                    
-                    # Add files to ZIP with session token as folder
-                    for file_path in files:
-                        if os.path.exists(file_path):
-                            # Add file to ZIP with session token folder
-                            arcname = os.path.join(session_token[:8], os.path.basename(file_path))
-                            zipf.write(file_path, arcname)
-                            total_files += 1
-                            logger.info(f"  Added: {arcname}")
+        entries = []
+        for session_token in session_tokens:
+            # Get session files
+            files = self.get_session_files(session_token, user_id)
+            logger.info(f"  Found {len(files)} files for session {session_token[:8]}")
             
-            logger.info(f"Batch ZIP created with {total_files} files: {zip_path}")
-            return zip_path
-        
-        except Exception as e:
-            logger.error(f"Failed to create batch ZIP archive: {e}")
-            return None
-    
-    def cleanup_temp_file(self, file_path: str) -> None:
-        """
-        Clean up a temporary file.
-        
-        Args:
-            file_path: Path to the file to delete
-        """
-        import logging
-        import time
-        _logger = logging.getLogger(__name__)
-        
-        # 延迟删除，等待文件传输完成
-        time.sleep(1)
+            if not files:
+                logger.warning(f"  No files found for session {session_token[:8]}")
+                continue
+            
+            # Add files to ZIP with session token as folder
+            for file_path in files:
+                if os.path.exists(file_path):
+                    entries.append((file_path, f"{session_token[:8]}/{os.path.basename(file_path)}"))
         
-        try:
-            if os.path.exists(file_path):
-                os.remove(file_path)
-                _logger.debug(f"Cleaned up temp file: {file_path}")
-        except Exception as e:
-            _logger.warning(f"Failed to cleanup temp file {file_path}: {e}")
+        logger.info(f"Batch download prepared with {len(entries)} files")
+        return entries
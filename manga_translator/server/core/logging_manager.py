@@ -2,24 +2,146 @@
 日志管理模块
 
 负责日志队列管理、任务日志隔离和日志导出功能。
+
+日志存放在固定容量的环形缓冲区中，每条日志带全局递增的序号 seq：
+- 客户端用游标（最后收到的 seq）增量读取，每次只处理新日志，不再复制整个队列
+- iter_log_events 以 SSE 推送新日志：新日志写入时唤醒订阅者；
+  客户端接收慢时生成器随发送一起阻塞，不在内存中排队，落后太多时发送 gap 事件并从最旧的日志继续
 """
 
+import asyncio
+import itertools
+import json
 import logging
 import threading
 import uuid
-from collections import deque, defaultdict
+from collections import defaultdict
 from datetime import datetime, timezone
-from typing import Optional
+from typing import Awaitable, Callable, Iterator, List, Optional, Tuple
 import contextvars
 
+# 每个环形缓冲区保存的日志条数
+LOG_BUFFER_SIZE = 1000
+# SSE 每个事件最多包含的日志条数
+STREAM_BATCH_SIZE = 200
+# SSE 没有新日志时发送心跳的间隔（秒）
+STREAM_KEEPALIVE_SECONDS = 15.0
+
+
+class LogRingBuffer:
+    """
+    固定容量的日志环形缓冲区
+    
+    条目按 seq 递增存放（任务缓冲区中的 seq 不连续），since() 二分定位游标，
+    读取代价只与新日志数量有关。调用方需持有 task_logs_lock。
+    """
+    
+    def __init__(self, capacity: int = LOG_BUFFER_SIZE):
+        self.capacity = capacity
+        # 未写满时按需增长，任务日志通常远少于容量
+        self._slots = []
+        self._start = 0
+        # 已被覆盖的最新一条日志的 seq（游标小于它说明客户端错过了日志）
+        self.evicted_seq = 0
+    
+    def __len__(self) -> int:
+        return len(self._slots)
+    
+    def _at(self, index: int) -> dict:
+        return self._slots[(self._start + index) % self.capacity]
+    
+    def __iter__(self) -> Iterator[dict]:
+        for index in range(len(self._slots)):
+            yield self._at(index)
+    
+    def append(self, entry: dict):
+        if len(self._slots) < self.capacity:
+            self._slots.append(entry)
+            return
+        self.evicted_seq = self._slots[self._start]['seq']
+        self._slots[self._start] = entry
+        self._start = (self._start + 1) % self.capacity
+    
+    def clear(self):
+        if self._slots:
+            self.evicted_seq = self._at(len(self._slots) - 1)['seq']
+        self._slots = []
+        self._start = 0
+    
+    @property
+    def last_seq(self) -> int:
+        return self._at(len(self._slots) - 1)['seq'] if self._slots else self.evicted_seq
+    
+    def since(self, cursor: int, limit: Optional[int] = None) -> Tuple[List[dict], bool]:
+        """
+        读取 seq > cursor 的日志（从旧到新，最多 limit 条）
+        
+        Returns:
+            (日志列表, 是否有日志在读取前已被覆盖)
+        """
+        lo, hi = 0, len(self._slots)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._at(mid)['seq'] <= cursor:
+                lo = mid + 1
+            else:
+                hi = mid
+        end = len(self._slots) if limit is None else min(len(self._slots), lo + limit)
+        return [self._at(index) for index in range(lo, end)], cursor < self.evicted_seq
+    
+    def tail_cursor(self, count: int) -> int:
+        """使 since() 返回最新 count 条日志的游标"""
+        if count <= 0 or not self._slots:
+            return self.last_seq
+        if count >= len(self._slots):
+            return self.evicted_seq
+        return self._at(len(self._slots) - count - 1)['seq']
+
+
+class LogSubscription:
+    """流式日志订阅（一个 SSE 连接），有新日志时唤醒，多次写入只唤醒一次"""
+    
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self._loop = loop
+        self._event = asyncio.Event()
+        self._pending = False
+    
+    def notify(self):
+        # 可能在翻译线程中调用
+        if self._pending:
+            return
+        self._pending = True
+        try:
+            self._loop.call_soon_threadsafe(self._event.set)
+        except RuntimeError:
+            pass  # 事件循环已关闭
+    
+    def reset(self):
+        """读取新日志之前调用，之后写入的日志会再次唤醒"""
+        self._pending = False
+        self._event.clear()
+    
+    async def wait(self, timeout: float) -> bool:
+        try:
+            await asyncio.wait_for(self._event.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
 
 # 基于任务ID的日志队列（每个任务有独立的日志队列）
-task_logs = defaultdict(lambda: deque(maxlen=1000))  # 每个任务最多保存1000条日志
+task_logs = defaultdict(LogRingBuffer)  # 每个任务最多保存1000条日志
 task_logs_lock = threading.Lock()
 
 # 全局日志队列（用于管理员查看所有日志）
 # 限制为1000条，避免日志过多导致内存占用和卡顿
-global_log_queue = deque(maxlen=1000)
+global_log_queue = LogRingBuffer()
+
+# 全局递增的日志序号（任务日志与对应的全局日志序号相同）
+_log_seq = itertools.count(1)
+
+# 流式日志订阅者
+_subscribers = set()
 
 # 当前任务ID的线程本地存储
 current_task_id = contextvars.ContextVar('current_task_id', default=None)
@@ -83,6 +205,7 @@ def add_log(message: str, level: str = "INFO", task_id: Optional[str] = None, se
         log_entry['session_id'] = session_id
     
     with task_logs_lock:
+        log_entry['seq'] = next(_log_seq)
         # 添加到全局日志队列
         global_log_queue.append(log_entry)
         
@@ -91,6 +214,12 @@ def add_log(message: str, level: str = "INFO", task_id: Optional[str] = None, se
             log_entry_with_id = log_entry.copy()
             log_entry_with_id['task_id'] = task_id
             task_logs[task_id].append(log_entry_with_id)
+        subscribers = list(_subscribers) if _subscribers else None
+    
+    # 唤醒流式日志订阅者
+    if subscribers:
+        for subscription in subscribers:
+            subscription.notify()
     
     # 同时输出到控制台（除非 skip_print=True，避免与 logging handler 重复）
     if not skip_print:
@@ -120,13 +249,8 @@ def get_logs(level: Optional[str] = None, limit: int = 100, task_id: Optional[st
             # 返回全局日志
             logs = list(global_log_queue)
     
-    # 按会话ID过滤
-    if session_id:
-        logs = [log for log in logs if log.get('session_id') == session_id]
-    
-    # 按级别过滤
-    if level and level.lower() != 'all':
-        logs = [log for log in logs if log['level'].lower() == level.lower()]
+    # 按会话ID和级别过滤
+    logs = _filter_logs(logs, level, session_id)
     
     # 限制数量（返回最新的）
     if len(logs) > limit:
@@ -135,6 +259,106 @@ def get_logs(level: Optional[str] = None, limit: int = 100, task_id: Optional[st
     return logs
 
 
+def _filter_logs(logs: list, level: Optional[str] = None, session_id: Optional[str] = None) -> list:
+    if session_id:
+        logs = [log for log in logs if log.get('session_id') == session_id]
+    if level and level.lower() != 'all':
+        logs = [log for log in logs if log['level'].lower() == level.lower()]
+    return logs
+
+
+def get_logs_after(cursor: int, task_id: Optional[str] = None, session_id: Optional[str] = None,
+                   level: Optional[str] = None, limit: int = STREAM_BATCH_SIZE) -> Tuple[list, int, bool]:
+    """
+    增量读取游标之后的日志（从旧到新）
+    
+    Args:
+        cursor: 游标（上次收到的最后一条日志的 seq，0 表示从头开始）
+        task_id: 任务ID（如果指定，只读取该任务的日志）
+        session_id: 会话ID过滤
+        level: 日志级别过滤
+        limit: 最多扫描的日志条数（过滤前）
+    
+    Returns:
+        (日志列表, 新游标, 是否有日志在读取前已被覆盖)
+    """
+    with task_logs_lock:
+        if task_id:
+            buffer = task_logs.get(task_id)
+            if buffer is None:
+                return [], cursor, False
+        else:
+            buffer = global_log_queue
+        logs, missed = buffer.since(cursor, limit)
+        # 游标推进到扫描过的最后一条（包括被过滤掉的），下次不再重复扫描
+        next_cursor = logs[-1]['seq'] if logs else max(cursor, buffer.last_seq)
+    
+    return _filter_logs(logs, level, session_id), next_cursor, missed
+
+
+def get_log_cursor(task_id: Optional[str] = None, tail: int = 0) -> int:
+    """取得游标：之后的 get_logs_after 返回最新 tail 条日志（tail=0 时只返回新日志）"""
+    with task_logs_lock:
+        if task_id:
+            buffer = task_logs.get(task_id)
+            return buffer.tail_cursor(tail) if buffer is not None else 0
+        return global_log_queue.tail_cursor(tail)
+
+
+def _sse_event(event: str, data, event_id: Optional[int] = None) -> str:
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data, ensure_ascii=False)}")
+    return "\n".join(lines) + "\n\n"
+
+
+async def iter_log_events(
+    is_disconnected: Callable[[], Awaitable[bool]],
+    cursor: int = 0,
+    task_id: Optional[str] = None,
+    session_id: Optional[str] = None,
+    level: Optional[str] = None,
+):
+    """
+    以 SSE 格式推送游标之后的日志
+    
+    事件:
+        logs: 一批日志（JSON 数组），id 为新游标，断线重连时浏览器以 Last-Event-ID 带回
+        gap: 客户端落后太多，部分日志已被覆盖（之后从最旧的日志继续）
+    
+    Args:
+        is_disconnected: 检查客户端是否已断开（Request.is_disconnected）
+        cursor: 起始游标
+        task_id: 只推送该任务的日志
+        session_id: 只推送该会话的日志
+        level: 日志级别过滤
+    """
+    subscription = LogSubscription(asyncio.get_running_loop())
+    with task_logs_lock:
+        _subscribers.add(subscription)
+    try:
+        while True:
+            subscription.reset()
+            logs, next_cursor, missed = get_logs_after(cursor, task_id, session_id, level)
+            if missed:
+                yield _sse_event("gap", {"cursor": cursor})
+            if next_cursor != cursor:
+                cursor = next_cursor
+                if logs:
+                    # 发送慢时在这里阻塞（背压），期间的新日志留在环形缓冲区中
+                    yield _sse_event("logs", logs, cursor)
+                continue
+            if not await subscription.wait(STREAM_KEEPALIVE_SECONDS):
+                if await is_disconnected():
+                    break
+                yield ": keepalive\n\n"
+    finally:
+        with task_logs_lock:
+            _subscribers.discard(subscription)
+
+
 def get_task_logs(task_id: str, limit: int = 50) -> list:
     """
     获取指定任务的日志（简化接口）
@@ -0,0 +1,362 @@
+"""
+Persistent inverted index for translation history search.
+
+翻译历史的倒排索引（SQLite 存储）：
+- 词项：文件名、原文/译文、用户名、会话 token 的分词结果，按词项排序存储，
+  前缀查询是一次范围扫描；前缀无结果时按编辑距离做模糊匹配
+- 文档：每个会话一行，保存完整会话数据和 user_id / timestamp / status 等列，
+  日期范围、筛选、排序和分页都在索引内完成，不需要读取全部历史记录
+
+由 HistoryManagementService 在保存/删除/更新会话时增量维护，索引首次创建时从翻译仓库全量构建。
+"""
+
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+# 索引字段
+FIELD_FILENAME = 'filename'
+FIELD_TEXT = 'text'
+FIELD_USER = 'user'
+FIELD_TOKEN = 'token'
+
+# 前缀范围查询的上界
+_PREFIX_END = '\U0010ffff'
+# 模糊匹配时最多检查的候选词项数
+_FUZZY_MAX_CANDIDATES = 5000
+# 英文/数字按单词切分，其余文字（中日韩等无空格文字）按字切分并生成二元组
+_WORD_PATTERN = re.compile(r'[a-z0-9]+|[^\W\d_a-z]+')
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    将文本切分为索引词项。
+
+    英文和数字按单词切分；连续的其它文字输出单字和相邻二元组，
+    使得中日韩文本可以按任意连续片段检索。
+    """
+    tokens = []
+    for word in _WORD_PATTERN.findall((text or '').lower()):
+        if word.isascii():
+            tokens.append(word)
+        else:
+            tokens.extend(word)
+            tokens.extend(word[i:i + 2] for i in range(len(word) - 1))
+    return tokens
+
+
+def _query_terms(query: str) -> List[str]:
+    """
+    将查询切分为词项，所有词项都需要匹配（前缀匹配）。
+    无空格文字只需要二元组（单字时为单字）即可覆盖整个片段。
+    """
+    terms = []
+    for word in _WORD_PATTERN.findall((query or '').lower()):
+        if word.isascii() or len(word) == 1:
+            terms.append(word)
+        else:
+            terms.extend(word[i:i + 2] for i in range(len(word) - 1))
+    return list(dict.fromkeys(terms))
+
+
+def _within_distance(a: str, b: str, max_distance: int) -> bool:
+    """a 与 b 的编辑距离是否不超过 max_distance（带剪枝的动态规划）"""
+    if abs(len(a) - len(b)) > max_distance:
+        return False
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        if min(current) > max_distance:
+            return False
+        previous = current
+    return previous[-1] <= max_distance
+
+
+def session_terms(session: Dict[str, Any]) -> Set[Tuple[str, str]]:
+    """提取会话的 (词项, 字段) 集合"""
+    terms = set()
+    metadata = session.get('metadata') or {}
+
+    for filename in metadata.get('files', []) or []:
+        name = os.path.basename(str(filename)).lower()
+        terms.add((name, FIELD_FILENAME))
+        terms.update((token, FIELD_FILENAME) for token in tokenize(name))
+
+    for region in metadata.get('text_regions', []) or []:
+        if isinstance(region, dict):
+            for key in ('original', 'translated'):
+                terms.update((token, FIELD_TEXT) for token in tokenize(region.get(key) or ''))
+
+    user_id = str(session.get('user_id') or '').lower()
+    if user_id:
+        terms.add((user_id, FIELD_USER))
+        terms.update((token, FIELD_USER) for token in tokenize(user_id))
+
+    session_token = str(session.get('session_token') or '').lower()
+    if session_token:
+        terms.add((session_token, FIELD_TOKEN))
+        terms.update((token, FIELD_TOKEN) for token in tokenize(session_token))
+
+    return terms
+
+
+class HistorySearchIndex:
+    """
+    Persistent inverted index over translation history sessions.
+
+    Thread-safe: each thread uses its own SQLite connection (WAL mode), writes are serialized by a lock.
+    """
+
+    def __init__(self, db_path: str):
+        """
+        Initialize the index.
+
+        Args:
+            db_path: Path to the SQLite index file
+        """
+        self.db_path = db_path
+        self._lock = threading.RLock()
+        self._local = threading.local()
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self.is_new = not os.path.exists(db_path)
+        self._init_schema()
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def _init_schema(self) -> None:
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.execute(
+                    'CREATE TABLE IF NOT EXISTS docs ('
+                    ' session_id TEXT PRIMARY KEY, user_id TEXT, timestamp TEXT, status TEXT,'
+                    ' file_count INTEGER, total_size INTEGER, data TEXT NOT NULL)'
+                )
+                conn.execute('CREATE INDEX IF NOT EXISTS idx_docs_timestamp ON docs(timestamp)')
+                conn.execute('CREATE INDEX IF NOT EXISTS idx_docs_user ON docs(user_id, timestamp)')
+                # 按词项排序的倒排表，前缀查询即范围扫描
+                conn.execute(
+                    'CREATE TABLE IF NOT EXISTS terms ('
+                    ' term TEXT NOT NULL, field TEXT NOT NULL, session_id TEXT NOT NULL,'
+                    ' PRIMARY KEY (term, field, session_id)) WITHOUT ROWID'
+                )
+                conn.execute('CREATE INDEX IF NOT EXISTS idx_terms_session ON terms(session_id)')
+
+    def _write_session(self, conn: sqlite3.Connection, session: Dict[str, Any]) -> None:
+        session_id = session.get('id')
+        conn.execute('DELETE FROM terms WHERE session_id = ?', (session_id,))
+        conn.execute(
+            'INSERT OR REPLACE INTO docs (session_id, user_id, timestamp, status, file_count, total_size, data) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?)',
+            (session_id, session.get('user_id'), session.get('timestamp', ''), session.get('status'),
+             session.get('file_count', 0), session.get('total_size', 0), json.dumps(session, ensure_ascii=False))
+        )
+        conn.executemany(
+            'INSERT OR IGNORE INTO terms (term, field, session_id) VALUES (?, ?, ?)',
+            [(term, field, session_id) for term, field in session_terms(session)]
+        )
+
+    def add_session(self, session: Dict[str, Any]) -> None:
+        """添加或替换一个会话"""
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                self._write_session(conn, session)
+
+    def remove_session(self, session_id: str) -> None:
+        """删除一个会话"""
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.execute('DELETE FROM terms WHERE session_id = ?', (session_id,))
+                conn.execute('DELETE FROM docs WHERE session_id = ?', (session_id,))
+
+    def update_session(self, session_id: str, updates: Dict[str, Any]) -> bool:
+        """更新会话字段并重建该会话的索引"""
+        with self._lock:
+            row = self._connection().execute('SELECT data FROM docs WHERE session_id = ?', (session_id,)).fetchone()
+            if row is None:
+                return False
+            session = json.loads(row[0])
+            session.update(updates)
+            self.add_session(session)
+            return True
+
+    def rebuild(self, sessions: Iterable[Dict[str, Any]]) -> int:
+        """清空并重建索引，返回会话数"""
+        count = 0
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.execute('DELETE FROM terms')
+                conn.execute('DELETE FROM docs')
+                for session in sessions:
+                    self._write_session(conn, session)
+                    count += 1
+        return count
+
+    def _fuzzy_terms(self, term: str, fields: Optional[Sequence[str]]) -> List[str]:
+        """
+        前缀没有命中时，查找与 term 相近的词项（同首字母，词项前缀与 term 的编辑距离 <= 1，长词 <= 2）
+        """
+        if len(term) < 4:
+            return []
+        max_distance = 2 if len(term) >= 8 else 1
+        sql = 'SELECT DISTINCT term FROM terms WHERE term >= ? AND term < ?'
+        params: List[Any] = [term[0], term[0] + _PREFIX_END]
+        if fields:
+            sql += f' AND field IN ({",".join("?" * len(fields))})'
+            params.extend(fields)
+        sql += f' LIMIT {_FUZZY_MAX_CANDIDATES}'
+        matches = []
+        for (candidate,) in self._connection().execute(sql, params):
+            # 与词项的同长前缀（允许长度差）比较，保持前缀匹配语义
+            if any(_within_distance(term, candidate[:len(term) + delta], max_distance)
+                   for delta in range(-max_distance, max_distance + 1) if len(term) + delta > 0):
+                matches.append(candidate)
+        return matches
+
+    def _term_clause(self, term: str, fields: Optional[Sequence[str]],
+                     fuzzy: bool = True) -> Optional[Tuple[str, List[Any]]]:
+        """单个查询词项对应的候选会话子查询，无任何匹配时返回 None"""
+        field_sql = ''
+        field_params: List[Any] = []
+        if fields:
+            field_sql = f' AND field IN ({",".join("?" * len(fields))})'
+            field_params = list(fields)
+
+        prefix_sql = 'SELECT session_id FROM terms WHERE term >= ? AND term < ?' + field_sql
+        prefix_params = [term, term + _PREFIX_END] + field_params
+        if self._connection().execute(prefix_sql + ' LIMIT 1', prefix_params).fetchone():
+            return prefix_sql, prefix_params
+
+        similar = self._fuzzy_terms(term, fields) if fuzzy else []
+        if not similar:
+            return None
+        return (f'SELECT session_id FROM terms WHERE term IN ({",".join("?" * len(similar))})' + field_sql,
+                similar + field_params)
+
+    def _build_query(self, query: str, fields: Optional[Sequence[str]], user_id: Optional[str],
+                     start_date: Optional[str], end_date: Optional[str],
+                     status: Optional[str]) -> Optional[Tuple[str, List[Any]]]:
+        """构造 docs 表的 WHERE 子句，查询词无法匹配时返回 None"""
+        clauses = []
+        params: List[Any] = []
+
+        term_clauses = []
+        raw = (query or '').strip().lower()
+        terms = _query_terms(query)
+        if raw and len(terms) > 1 and not any(c.isspace() for c in raw):
+            # 带分隔符的整体查询（如 "naruto_012"）优先按完整文件名/用户名/token 的前缀匹配
+            whole = self._term_clause(raw, fields, fuzzy=False)
+            if whole is not None:
+                terms = []
+                term_clauses.append(whole)
+        for term in terms:
+            clause = self._term_clause(term, fields)
+            if clause is None:
+                return None
+            term_clauses.append(clause)
+        if term_clauses:
+            clauses.append('session_id IN (' + ' INTERSECT '.join(sql for sql, _ in term_clauses) + ')')
+            for _, term_params in term_clauses:
+                params.extend(term_params)
+        elif query and query.strip():
+            # 查询只包含标点等无法分词的字符
+            return None
+
+        if user_id:
+            clauses.append('user_id = ?')
+            params.append(user_id)
+        if start_date:
+            clauses.append('timestamp >= ?')
+            params.append(start_date)
+        if end_date:
+            clauses.append('timestamp <= ?')
+            params.append(end_date)
+        if status:
+            clauses.append('status = ?')
+            params.append(status)
+        return (' WHERE ' + ' AND '.join(clauses)) if clauses else '', params
+
+    def search(self, query: str = '', fields: Optional[Sequence[str]] = None,
+               user_id: Optional[str] = None, start_date: Optional[str] = None,
+               end_date: Optional[str] = None, status: Optional[str] = None,
+               offset: int = 0, limit: Optional[int] = None) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        搜索会话，结果按时间倒序。
+
+        Args:
+            query: 查询字符串，每个词项按前缀匹配（无结果时模糊匹配），所有词项都需要命中
+            fields: 限定匹配的字段（FIELD_*），None 表示全部字段
+            user_id: 限定用户
+            start_date: 开始时间（ISO 格式，包含）
+            end_date: 结束时间（ISO 格式，包含）
+            status: 状态筛选
+            offset: 分页偏移
+            limit: 每页数量，None 表示全部
+
+        Returns:
+            (当前页的会话列表, 匹配总数)
+        """
+        built = self._build_query(query, fields, user_id, start_date, end_date, status)
+        if built is None:
+            return [], 0
+        where, params = built
+        conn = self._connection()
+        total = conn.execute(f'SELECT COUNT(*) FROM docs{where}', params).fetchone()[0]
+        sql = f'SELECT data FROM docs{where} ORDER BY timestamp DESC LIMIT ? OFFSET ?'
+        rows = conn.execute(sql, params + [-1 if limit is None else limit, offset]).fetchall()
+        return [json.loads(data) for (data,) in rows], total
+
+    def stats(self, query: str = '', fields: Optional[Sequence[str]] = None,
+              user_id: Optional[str] = None, start_date: Optional[str] = None,
+              end_date: Optional[str] = None, status: Optional[str] = None) -> Dict[str, int]:
+        """匹配会话的数量、文件总数和总大小"""
+        built = self._build_query(query, fields, user_id, start_date, end_date, status)
+        if built is None:
+            return {'total_sessions': 0, 'total_files': 0, 'total_size': 0}
+        where, params = built
+        count, files, size = self._connection().execute(
+            f'SELECT COUNT(*), COALESCE(SUM(file_count), 0), COALESCE(SUM(total_size), 0) FROM docs{where}', params
+        ).fetchone()
+        return {'total_sessions': count, 'total_files': files, 'total_size': size}
+
+
+_history_search_index: Optional[HistorySearchIndex] = None
+_history_search_index_lock = threading.Lock()
+
+
+def get_history_search_index(translation_repo=None,
+                             db_path: str = 'manga_translator/server/data/history_search_index.db') -> HistorySearchIndex:
+    """
+    获取全局的历史搜索索引实例。
+
+    索引文件首次创建时，从 translation_repo 读取全部历史记录构建索引（仅此一次）。
+    """
+    global _history_search_index
+    with _history_search_index_lock:
+        if _history_search_index is None:
+            index = HistorySearchIndex(db_path)
+            if index.is_new and translation_repo is not None:
+                count = index.rebuild(translation_repo.get_all_sessions())
+                logger.info(f"Built history search index with {count} session(s)")
+            _history_search_index = index
+        return _history_search_index
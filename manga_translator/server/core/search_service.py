@@ -9,12 +9,13 @@ This service provides:
 """
 
 import logging
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 from datetime import datetime
 import re
 
 from manga_translator.server.models import TranslationResult
-from manga_translator.server.repositories.translation_repository import TranslationRepository
+from manga_translator.server.repositories.translation_repository import TranslationRepository, create_translation_repository
+from manga_translator.server.core.search_index import HistorySearchIndex, FIELD_FILENAME, get_history_search_index
 
 logger = logging.getLogger(__name__)
 
@@ -23,63 +24,78 @@ class SearchService:
     """
     Service for searching translation history.
     
+    Queries go through the persistent inverted index (see search_index.py),
+    which HistoryManagementService keeps up to date.
+    
     Validates: Requirements 13.1-13.5
     """
     
-    def __init__(self, translation_repo: Optional[TranslationRepository] = None):
+    def __init__(self, translation_repo: Optional[TranslationRepository] = None,
+                 search_index: Optional[HistorySearchIndex] = None):
         """
         Initialize the search service.
         
         Args:
             translation_repo: Optional translation repository instance
+            search_index: Optional search index instance
         """
-        self.translation_repo = translation_repo or TranslationRepository(
+        self.translation_repo = translation_repo or create_translation_repository(
             'manga_translator/server/data/translation_history.json'
         )
+        self.search_index = search_index or get_history_search_index(self.translation_repo)
     
     def search(
         self,
         query: str,
         filters: Optional[Dict[str, Any]] = None,
-        user_id: Optional[str] = None
+        user_id: Optional[str] = None,
+        page: int = 1,
+        page_size: Optional[int] = None
     ) -> List[TranslationResult]:
         """
         Search translation history with query and filters.
         
         Args:
-            query: Search query string
+            query: Search query string (each word is matched by prefix, fuzzy if no prefix matches)
             filters: Optional filters (start_date, end_date, status)
             user_id: Optional user ID to limit search scope
+            page: Page number (1-based)
+            page_size: Results per page, None for all results
         
         Returns:
-            List of matching TranslationResult objects
+            List of matching TranslationResult objects, newest first
             
         Validates: Requirement 13.1
         """
-        filters = filters or {}
+        results, _ = self.search_page(query, filters, user_id, page, page_size)
+        return results
+    
+    def search_page(
+        self,
+        query: str,
+        filters: Optional[Dict[str, Any]] = None,
+        user_id: Optional[str] = None,
+        page: int = 1,
+        page_size: Optional[int] = None
+    ) -> Tuple[List[TranslationResult], int]:
+        """
+        Same as search, also returning the total number of matches.
         
-        # Get base sessions
-        sessions = self.translation_repo.search_sessions(
+        Returns:
+            (results of the requested page, total match count)
+        """
+        filters = filters or {}
+        offset = (max(page, 1) - 1) * page_size if page_size else 0
+        sessions, total = self.search_index.search(
+            query,
             user_id=user_id,
             start_date=filters.get('start_date'),
-            end_date=filters.get('end_date')
+            end_date=filters.get('end_date'),
+            status=filters.get('status'),
+            offset=offset,
+            limit=page_size
         )
-        
-        # Apply status filter
-        if 'status' in filters:
-            sessions = [s for s in sessions if s.get('status') == filters['status']]
-        
-        # Apply query filter
-        if query:
-            sessions = self._filter_by_query(sessions, query)
-        
-        # Convert to TranslationResult objects
-        results = [TranslationResult.from_dict(s) for s in sessions]
-        
-        # Sort by relevance (for now, just by timestamp)
-        results.sort(key=lambda x: x.timestamp, reverse=True)
-        
-        return results
+        return [TranslationResult.from_dict(s) for s in sessions], total
     
     def fuzzy_search_filename(
         self,
@@ -90,7 +106,7 @@ class SearchService:
         Fuzzy search by filename.
         
         Args:
-            query: Filename query (supports partial matching)
+            query: Filename query (prefix match per word, fuzzy if no prefix matches)
             user_id: Optional user ID to limit search scope
         
         Returns:
@@ -98,30 +114,8 @@ class SearchService:
             
         Validates: Requirement 13.4
         """
-        # Get all sessions for user
-        sessions = self.translation_repo.search_sessions(user_id=user_id)
-        
-        # Filter by filename
-        query_lower = query.lower()
-        matching_sessions = []
-        
-        for session in sessions:
-            metadata = session.get('metadata', {})
-            files = metadata.get('files', [])
-            
-            # Check if any file matches the query
-            for filename in files:
-                if query_lower in filename.lower():
-                    matching_sessions.append(session)
-                    break
-        
-        # Convert to TranslationResult objects
-        results = [TranslationResult.from_dict(s) for s in matching_sessions]
-        
-        # Sort by timestamp (newest first)
-        results.sort(key=lambda x: x.timestamp, reverse=True)
-        
-        return results
+        sessions, _ = self.search_index.search(query, fields=(FIELD_FILENAME,), user_id=user_id)
+        return [TranslationResult.from_dict(s) for s in sessions]
     
     def search_by_date_range(
         self,
@@ -146,20 +140,8 @@ class SearchService:
         start_str = start_date.isoformat()
         end_str = end_date.isoformat()
         
-        # Search using repository
-        sessions = self.translation_repo.search_sessions(
-            user_id=user_id,
-            start_date=start_str,
-            end_date=end_str
-        )
-        
-        # Convert to TranslationResult objects
-        results = [TranslationResult.from_dict(s) for s in sessions]
-        
-        # Sort by timestamp (newest first)
-        results.sort(key=lambda x: x.timestamp, reverse=True)
-        
-        return results
+        sessions, _ = self.search_index.search(user_id=user_id, start_date=start_str, end_date=end_str)
+        return [TranslationResult.from_dict(s) for s in sessions]
     
     def search_by_session_token(
         self,
@@ -189,47 +171,6 @@ class SearchService:
         
         return TranslationResult.from_dict(session_data)
     
-    def _filter_by_query(self, sessions: List[Dict], query: str) -> List[Dict]:
-        """
-        Filter sessions by query string.
-        
-        Searches in:
-        - Session token
-        - Filenames in metadata
-        - User ID
-        
-        Args:
-            sessions: List of session dictionaries
-            query: Query string
-        
-        Returns:
-            Filtered list of sessions
-        """
-        query_lower = query.lower()
-        matching_sessions = []
-        
-        for session in sessions:
-            # Check session token
-            if query_lower in session.get('session_token', '').lower():
-                matching_sessions.append(session)
-                continue
-            
-            # Check user ID
-            if query_lower in session.get('user_id', '').lower():
-                matching_sessions.append(session)
-                continue
-            
-            # Check filenames in metadata
-            metadata = session.get('metadata', {})
-            files = metadata.get('files', [])
-            
-            for filename in files:
-                if query_lower in filename.lower():
-                    matching_sessions.append(session)
-                    break
-        
-        return matching_sessions
-    
     def get_search_stats(
         self,
         query: str,
@@ -249,17 +190,19 @@ class SearchService:
             
         Validates: Requirement 13.5
         """
-        results = self.search(query, filters, user_id)
-        
-        total_files = sum(r.file_count for r in results)
-        total_size = sum(r.total_size for r in results)
+        filters = filters or {}
+        stats = self.search_index.stats(
+            query,
+            user_id=user_id,
+            start_date=filters.get('start_date'),
+            end_date=filters.get('end_date'),
+            status=filters.get('status')
+        )
         
         return {
-            "total_sessions": len(results),
-            "total_files": total_files,
-            "total_size": total_size,
+            **stats,
             "query": query,
-            "filters": filters or {}
+            "filters": filters
         }
     
     def highlight_matches(
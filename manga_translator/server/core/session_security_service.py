@@ -10,14 +10,15 @@ Security Features:
 - Ownership-based access control
 """
 
+from collections import OrderedDict
 from datetime import datetime, timedelta
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple
 import uuid
 
 # Flask imports removed - using FastAPI now
 
 from manga_translator.server.models.session_models import SessionOwnership, SessionAccessAttempt
-from manga_translator.server.repositories.session_repository import SessionRepository
+from manga_translator.server.repositories.session_repository import create_session_repository
 from manga_translator.server.core.permission_service_v2 import EnhancedPermissionService
 from manga_translator.server.repositories.permission_repository import PermissionRepository
 
@@ -37,6 +38,9 @@ class SessionSecurityService:
     MAX_FAILED_ATTEMPTS = 10  # Maximum failed attempts per user
     RATE_LIMIT_WINDOW = timedelta(minutes=5)  # Time window for rate limiting
     
+    # Account role lookups cached per user (LRU), invalidated when accounts.json changes
+    ACCOUNT_CACHE_SIZE = 256
+    
     def __init__(self, data_dir: str = None):
         """
         Initialize the session security service.
@@ -46,7 +50,7 @@ class SessionSecurityService:
         """
         import os
         
-        self.repository = SessionRepository(data_dir)
+        self.repository = create_session_repository(data_dir)
         
         # Initialize permission repository with file path
         if data_dir is None:
@@ -59,6 +63,10 @@ class SessionSecurityService:
         
         # Track failed attempts for rate limiting
         self._failed_attempts: Dict[str, List[datetime]] = {}
+        
+        # username -> is_admin (None: not found in accounts files)
+        self._admin_cache: "OrderedDict[str, Optional[bool]]" = OrderedDict()
+        self._accounts_signature: Optional[Tuple] = None
     
     def create_session(self, user_id: str, metadata: Optional[Dict[str, Any]] = None) -> SessionOwnership:
         """
@@ -95,10 +103,34 @@ class SessionSecurityService:
         Returns:
             True if user is admin, False otherwise
         """
+        accounts_files = self._accounts_files()
+        
+        # accounts.json is rewritten on every account change (AccountService.update_user etc.),
+        # so its (mtime, size) invalidates the cache
+        signature = tuple(self._file_signature(path) for path in accounts_files)
+        if signature != self._accounts_signature:
+            self._admin_cache.clear()
+            self._accounts_signature = signature
+        
+        if user_id in self._admin_cache:
+            self._admin_cache.move_to_end(user_id)
+            is_admin = self._admin_cache[user_id]
+        else:
+            is_admin = self._read_admin_flag(accounts_files, user_id)
+            self._admin_cache[user_id] = is_admin
+            if len(self._admin_cache) > self.ACCOUNT_CACHE_SIZE:
+                self._admin_cache.popitem(last=False)
+        
+        if is_admin is not None:
+            return is_admin
+        
+        # Fallback to permission service
+        return self.permission_service.is_admin(user_id)
+    
+    def _accounts_files(self) -> List[str]:
+        """Candidate accounts.json paths, in lookup order."""
         import os
-        import json
         
-        # Try to read accounts file to get user's role
         # 首先尝试项目根目录的 accounts.json
         possible_paths = [
             'accounts.json',  # 项目根目录
@@ -106,8 +138,30 @@ class SessionSecurityService:
         
         if hasattr(self.repository, 'data_dir'):
             possible_paths.append(os.path.join(self.repository.data_dir, 'accounts.json'))
+        return possible_paths
+    
+    @staticmethod
+    def _file_signature(path: str) -> Optional[Tuple[int, int]]:
+        import os
+        
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+    
+    @staticmethod
+    def _read_admin_flag(accounts_files: List[str], user_id: str) -> Optional[bool]:
+        """
+        Read a user's admin flag from the accounts files.
         
-        for accounts_file in possible_paths:
+        Returns:
+            True/False if the user was found, None otherwise
+        """
+        import os
+        import json
+        
+        for accounts_file in accounts_files:
             if os.path.exists(accounts_file):
                 try:
                     with open(accounts_file, 'r', encoding='utf-8') as f:
@@ -126,9 +180,7 @@ class SessionSecurityService:
                                 return False
                 except Exception:
                     pass
-        
-        # Fallback to permission service
-        return self.permission_service.is_admin(user_id)
+        return None
     
     def _check_rate_limit(self, user_id: str) -> tuple[bool, Optional[str]]:
         """
@@ -2,10 +2,17 @@
 会话管理服务（SessionService）
 
 管理用户登录会话、令牌生成和验证。
+
+写回模式（write_behind=True）：
+- 每次请求只更新内存中的活动时间并标记为脏，由后台任务定期（flush_interval_seconds）写盘，关闭时再写一次
+- 活动时间按 activity_resolution_seconds 粗粒度更新，间隔内的重复请求不做任何修改
+- 创建/终止会话等结构性变化仍立即写盘，避免崩溃后已注销的会话复活
 """
 
+import asyncio
 import secrets
 import logging
+import threading
 from typing import Dict, List, Optional
 from datetime import datetime, timedelta
 from uuid import uuid4
@@ -23,7 +30,10 @@ class SessionService:
         self,
         sessions_file: Optional[str] = None,
         session_timeout_minutes: int = 60,
-        enable_persistence: bool = False
+        enable_persistence: bool = False,
+        write_behind: bool = False,
+        flush_interval_seconds: float = 30.0,
+        activity_resolution_seconds: float = 0.0
     ):
         """
         初始化会话管理服务
@@ -32,10 +42,21 @@ class SessionService:
             sessions_file: 会话存储文件路径（可选，用于持久化）
             session_timeout_minutes: 会话超时时间（分钟）
             enable_persistence: 是否启用会话持久化
+            write_behind: 活动时间更新是否延迟写盘（由 run_flush_loop / flush 写入）
+            flush_interval_seconds: 写回模式下的写盘间隔（秒）
+            activity_resolution_seconds: 活动时间的更新粒度（秒），0 表示每次请求都更新；
+                写回模式下配合使用（例如 30），减少重复请求产生的待写盘修改
         """
         self.sessions_file = sessions_file
         self.session_timeout_minutes = session_timeout_minutes
         self.enable_persistence = enable_persistence
+        self.write_behind = write_behind
+        self.flush_interval_seconds = flush_interval_seconds
+        self.activity_resolution = timedelta(seconds=activity_resolution_seconds)
+        
+        # 有未写盘的修改（仅写回模式）
+        self._dirty = False
+        self._save_lock = threading.Lock()
         
         # 内存中的会话存储: token -> Session
         self.sessions_by_token: Dict[str, Session] = {}
@@ -177,13 +198,19 @@ class SessionService:
             self._deactivate_session(session)
             return False
         
-        # 更新最后活动时间
+        # 更新最后活动时间（粗粒度：间隔内的重复请求不修改）
         from datetime import timezone
-        session.last_activity = datetime.now(timezone.utc)
+        now = datetime.now(timezone.utc)
+        if now - session.last_activity < self.activity_resolution:
+            return True
+        session.last_activity = now
         
         # 持久化（如果启用）
         if self.enable_persistence:
-            self._save_sessions()
+            if self.write_behind:
+                self._dirty = True
+            else:
+                self._save_sessions()
         
         return True
     
@@ -289,6 +316,31 @@ class SessionService:
         logger.info(f"Cleared all sessions (count: {count})")
         return count
     
+    def flush(self) -> bool:
+        """
+        把未写盘的修改写入持久化存储（写回模式）
+        
+        Returns:
+            bool: 是否进行了写盘
+        """
+        if not self.enable_persistence or not self._dirty:
+            return False
+        self._save_sessions()
+        return True
+    
+    async def run_flush_loop(self) -> None:
+        """写回模式的后台写盘循环，取消时写入剩余的修改"""
+        try:
+            while True:
+                await asyncio.sleep(self.flush_interval_seconds)
+                try:
+                    if self._dirty:
+                        await asyncio.to_thread(self.flush)
+                except Exception as e:
+                    logger.error(f"Failed to flush sessions: {e}")
+        finally:
+            self.flush()
+    
     def _is_session_expired(self, session: Session) -> bool:
         """
         检查会话是否过期
@@ -359,21 +411,26 @@ class SessionService:
             return
         
         try:
-            # 只保存活动会话
-            active_sessions = [
-                s for s in self.sessions_by_id.values()
-                if s.is_active
-            ]
-            
-            data = {
-                'version': '1.0',
-                'sessions': [session.to_dict() for session in active_sessions]
-            }
-            
-            success = atomic_write_json(self.sessions_file, data, create_backup=False)
+            with self._save_lock:
+                # 先清除脏标记：序列化期间的新修改会留到下一次写盘
+                self._dirty = False
+                # 只保存活动会话
+                active_sessions = [
+                    s for s in list(self.sessions_by_id.values())
+                    if s.is_active
+                ]
+                
+                data = {
+                    'version': '1.0',
+                    'sessions': [session.to_dict() for session in active_sessions]
+                }
+                
+                success = atomic_write_json(self.sessions_file, data, create_backup=False)
             if success:
                 logger.debug(f"Saved {len(active_sessions)} session(s)")
             else:
+                self._dirty = True
                 logger.error("Failed to save sessions")
         except Exception as e:
+            self._dirty = True
             logger.error(f"Failed to save sessions: {e}")
@@ -44,6 +44,7 @@ class SystemInitializer:
         # 后台任务
         self._session_cleanup_task: Optional[asyncio.Task] = None
         self._log_rotation_task: Optional[asyncio.Task] = None
+        self._session_flush_task: Optional[asyncio.Task] = None
     
     async def initialize(self) -> None:
         """
@@ -56,6 +57,7 @@ class SystemInitializer:
         4. 加载所有用户账号到内存
         5. 启动会话清理定时任务
         6. 启动审计日志轮转定时任务
+        7. 启动会话写盘任务（写回模式）
         """
         logger.info("=" * 60)
         logger.info("Starting system initialization...")
@@ -87,6 +89,13 @@ class SystemInitializer:
         # 4. 启动审计日志轮转定时任务
         await self._start_log_rotation_task()
         
+        # 5. 启动会话写盘任务（写回模式）
+        if self.session_service.enable_persistence and self.session_service.write_behind:
+            self._session_flush_task = asyncio.create_task(self.session_service.run_flush_loop())
+            logger.info(
+                f"Session flush task started (interval: {self.session_service.flush_interval_seconds}s)"
+            )
+        
         logger.info("=" * 60)
         logger.info("System initialization completed successfully")
         logger.info("=" * 60)
@@ -97,7 +106,8 @@ class SystemInitializer:
         
         包括：
         1. 停止后台任务
-        2. 清理会话（可选）
+        2. 写入未保存的会话修改
+        3. 清理会话（可选）
         """
         logger.info("Starting system shutdown...")
         
@@ -118,6 +128,16 @@ class SystemInitializer:
                 pass
             logger.info("Log rotation task stopped")
         
+        # 会话写盘任务取消时会写入剩余的修改
+        if self._session_flush_task:
+            self._session_flush_task.cancel()
+            try:
+                await self._session_flush_task
+            except asyncio.CancelledError:
+                pass
+            logger.info("Session flush task stopped")
+        self.session_service.flush()
+        
         logger.info("System shutdown completed")
     
     async def _create_default_admin(self) -> None:
@@ -22,8 +22,8 @@ logger = logging.getLogger('manga_translator.server')
 # 翻译线程池（根据 max_concurrent_tasks 动态创建）
 translation_executor: Optional[ThreadPoolExecutor] = None
 
-# 并发控制信号量（用于限制同时进行的翻译任务数）
-translation_semaphore: Optional[asyncio.Semaphore] = None
+# 并发控制（用于限制同时进行的翻译任务数）：按优先级和用户轮次排队的翻译槽位
+translation_semaphore = None  # Optional[TranslationSlots]
 
 # 全局翻译器实例（复用模型，避免重复加载）
 _global_translator = None
@@ -44,6 +44,10 @@ server_config = {
 active_tasks = {}
 active_tasks_lock = threading.Lock()
 
+# 翻译线程 -> 该线程长期使用的事件循环（跨请求复用，翻译器连接池中的会话随之保留）
+_thread_loops = {}
+_thread_loops_lock = threading.Lock()
+
 
 def init_semaphore():
     """初始化并发控制信号量和线程池"""
@@ -62,14 +66,18 @@ def init_semaphore():
         thread_name_prefix="translator_"
     )
     
-    # 创建信号量用于异步等待
-    translation_semaphore = asyncio.Semaphore(max_concurrent)
+    # 翻译槽位用于异步等待；热加载时只修改容量，正在排队的任务保持原来的位置
+    from manga_translator.server.myqueue import TranslationSlots, task_queue
+    if translation_semaphore is None:
+        translation_semaphore = TranslationSlots(max_concurrent, task_queue)
+    else:
+        translation_semaphore.resize(max_concurrent)
     
     logger.info(f"翻译线程池已初始化: 最大线程数 = {max_concurrent}")
 
 
-def get_semaphore() -> Optional[asyncio.Semaphore]:
-    """获取并发控制信号量"""
+def get_semaphore():
+    """获取并发控制的翻译槽位（TranslationSlots）"""
     return translation_semaphore
 
 
@@ -92,6 +100,40 @@ async def run_in_translator_thread(func: Callable, *args, **kwargs) -> Any:
     )
 
 
+def get_translator_loop() -> asyncio.AbstractEventLoop:
+    """
+    当前翻译线程的事件循环，同一线程的后续请求继续使用，不在请求结束时关闭。
+    
+    翻译器连接池（translators/http_pool.py）中的异步会话与事件循环绑定，
+    循环跨请求存活，连接（TCP/TLS）才能被后续请求复用。
+    线程池重建后已退出线程的事件循环在这里顺带关闭。
+    """
+    thread = threading.current_thread()
+    with _thread_loops_lock:
+        stale = [t for t in _thread_loops if not t.is_alive()]
+        stale_loops = [_thread_loops.pop(t) for t in stale]
+        loop = _thread_loops.get(thread)
+        if loop is None or loop.is_closed():
+            loop = _thread_loops[thread] = asyncio.new_event_loop()
+    for stale_loop in stale_loops:
+        _close_thread_loop(stale_loop)
+    asyncio.set_event_loop(loop)
+    return loop
+
+
+def _close_thread_loop(loop: asyncio.AbstractEventLoop):
+    """关闭绑定在该事件循环上的共享 HTTP 会话，再关闭事件循环（循环不能正在运行）"""
+    if loop.is_closed() or loop.is_running():
+        return
+    try:
+        from manga_translator.translators.http_pool import close_loop_sessions
+        close_loop_sessions(loop)
+        loop.run_until_complete(loop.shutdown_asyncgens())
+        loop.close()
+    except Exception as e:
+        logger.warning(f"关闭翻译线程事件循环时出错: {e}")
+
+
 def register_active_task(
     task_id: str, 
     task: Optional[asyncio.Task] = None,
@@ -266,6 +308,13 @@ def shutdown_executor():
         translation_executor.shutdown(wait=True)
         translation_executor = None
     
+    # 线程已全部退出，关闭它们的事件循环和其上的连接
+    with _thread_loops_lock:
+        loops = list(_thread_loops.values())
+        _thread_loops.clear()
+    for loop in loops:
+        _close_thread_loop(loop)
+    
     if _global_translator is not None:
         logger.info("正在卸载全局翻译器...")
         with _translator_lock:
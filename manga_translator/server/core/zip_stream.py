@@ -0,0 +1,134 @@
+"""
+流式 ZIP 模块
+
+边生成边发送 ZIP 数据，不需要临时文件，也不需要知道总大小（分块传输，无 Content-Length）。
+- 已压缩的图片格式（PNG/JPEG/WebP/GIF/AVIF）和压缩包以 STORED 存储，避免重复压缩浪费 CPU
+- 其他文件（JSON/TXT 等文本）使用 DEFLATE 压缩
+- 基于标准库 zipfile 的不可 seek 输出模式：每个条目后跟数据描述符，中央目录在最后发送
+"""
+
+import os
+import zipfile
+from typing import Iterable, Iterator, Optional, Tuple
+from urllib.parse import quote
+
+# 已经压缩过的格式，再 DEFLATE 几乎没有收益
+STORED_EXTENSIONS = frozenset({
+    '.png', '.jpg', '.jpeg', '.webp', '.gif', '.avif',
+    '.zip', '.cbz', '.7z', '.rar', '.gz',
+})
+
+# 从磁盘读取文件时每次读取的字节数
+FILE_CHUNK_SIZE = 1024 * 1024
+
+
+def compress_type_for(arcname: str) -> int:
+    """按扩展名选择压缩方式"""
+    ext = os.path.splitext(arcname)[1].lower()
+    return zipfile.ZIP_STORED if ext in STORED_EXTENSIONS else zipfile.ZIP_DEFLATED
+
+
+def content_disposition(filename: str) -> str:
+    """下载文件名的 Content-Disposition 头（非 ASCII 文件名使用 RFC 5987 编码）"""
+    quoted = quote(filename)
+    if quoted != filename:
+        return f"attachment; filename*=utf-8''{quoted}"
+    return f'attachment; filename="{filename}"'
+
+
+class _ChunkSink:
+    """zipfile 的输出目标：收集写入的字节，由 ZipStreamWriter 取走发送（没有 seek/tell，zipfile 会按流模式写入）"""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+class ZipStreamWriter:
+    """
+    流式 ZIP 写入器
+
+    用法:
+        writer = ZipStreamWriter()
+        yield writer.add('page1.png', png_bytes)
+        yield from writer.add_file('/path/to/file.json', 'file.json')
+        yield writer.close()
+    """
+
+    def __init__(self):
+        self._sink = _ChunkSink()
+        self._zip = zipfile.ZipFile(self._sink, 'w')
+        self._names = set()
+        self.entries = 0
+        self.bytes_written = 0
+
+    def _unique_name(self, arcname: str) -> str:
+        """同名条目追加序号（多张图片可能有相同的文件名）"""
+        name = arcname
+        base, ext = os.path.splitext(arcname)
+        counter = 1
+        while name in self._names:
+            name = f'{base}_{counter}{ext}'
+            counter += 1
+        self._names.add(name)
+        return name
+
+    def _drain(self) -> bytes:
+        data = self._sink.drain()
+        self.bytes_written += len(data)
+        return data
+
+    def add(self, arcname: str, data: bytes) -> bytes:
+        """添加内存中的数据，返回需要发送的字节"""
+        arcname = self._unique_name(arcname)
+        self._zip.writestr(arcname, data, compress_type=compress_type_for(arcname))
+        self.entries += 1
+        return self._drain()
+
+    def add_file(self, file_path: str, arcname: Optional[str] = None) -> Iterator[bytes]:
+        """分块读取磁盘文件并添加，逐块产出需要发送的字节"""
+        arcname = self._unique_name(arcname or os.path.basename(file_path))
+        zinfo = zipfile.ZipInfo.from_file(file_path, arcname)
+        zinfo.compress_type = compress_type_for(arcname)
+        with open(file_path, 'rb') as src, self._zip.open(zinfo, 'w') as dest:
+            while True:
+                chunk = src.read(FILE_CHUNK_SIZE)
+                if not chunk:
+                    break
+                dest.write(chunk)
+                data = self._drain()
+                if data:
+                    yield data
+        self.entries += 1
+        data = self._drain()
+        if data:
+            yield data
+
+    def close(self) -> bytes:
+        """写入中央目录，返回最后需要发送的字节"""
+        self._zip.close()
+        return self._drain()
+
+
+def iter_zip_files(entries: Iterable[Tuple[str, str]]) -> Iterator[bytes]:
+    """
+    把 (文件路径, 压缩包内名称) 列表流式打包成 ZIP
+
+    同步生成器，StreamingResponse 会在线程池中迭代，不阻塞事件循环
+    """
+    writer = ZipStreamWriter()
+    for file_path, arcname in entries:
+        if os.path.exists(file_path):
+            yield from writer.add_file(file_path, arcname)
+    yield writer.close()
@@ -1,35 +1,50 @@
 from asyncio import Event, Lock
-from typing import List
+from typing import List, Optional, Sequence
 
 from PIL import Image
 from pydantic import BaseModel
 
 from manga_translator import Config
+from manga_translator.mode.share_transport import TRANSPORT_INLINE, TRANSPORT_LOCAL
 from manga_translator.server.sent_data_internal import fetch_data_stream, NotifyType, fetch_data
 
 class ExecutorInstance(BaseModel):
     ip: str
     port: int
     busy: bool = False
+    # 实例与服务器能否访问同一个文件系统（/dev/shm）。只凭地址无法判断：
+    # Docker 中映射到 127.0.0.1 的实例写入的是容器自己的 /dev/shm，因此默认关闭，
+    # 由服务器自己启动的子进程或在 /register 时显式声明的实例才开启
+    shared_filesystem: bool = False
 
     def free_executor(self):
         self.busy = False
 
-    async def sent(self, image: Image, config: Config):
-        return await fetch_data("http://"+self.ip+":"+str(self.port)+"/simple_execute/translate", image, config)
+    @property
+    def result_transport(self) -> str:
+        """与服务器共享文件系统的实例通过共享内存传递结果图像，其余实例内联传输"""
+        return TRANSPORT_LOCAL if self.shared_filesystem else TRANSPORT_INLINE
 
-    async def sent_stream(self, image: Image, config: Config, sender: NotifyType):
-        await fetch_data_stream("http://"+self.ip+":"+str(self.port)+"/execute/translate", image, config, sender)
+    async def sent(self, image: Image, config: Config, fields: Optional[Sequence[str]] = None):
+        return await fetch_data("http://"+self.ip+":"+str(self.port)+"/simple_execute/translate", image, config,
+                                transport=self.result_transport, fields=fields)
 
-    async def sent_batch(self, images: List[Image.Image], config: Config, batch_size: int):
+    async def sent_stream(self, image: Image, config: Config, sender: NotifyType, fields: Optional[Sequence[str]] = None):
+        await fetch_data_stream("http://"+self.ip+":"+str(self.port)+"/execute/translate", image, config, sender,
+                                transport=self.result_transport, fields=fields)
+
+    async def sent_batch(self, images: List[Image.Image], config: Config, batch_size: int, fields: Optional[Sequence[str]] = None):
         """发送批量翻译请求"""
         return await fetch_data("http://"+self.ip+":"+str(self.port)+"/simple_execute/translate_batch", 
-                               {"images": images, "config": config, "batch_size": batch_size})
+                               {"images": images, "config": config, "batch_size": batch_size},
+                               transport=self.result_transport, fields=fields)
 
-    async def sent_batch_stream(self, images: List[Image.Image], config: Config, batch_size: int, sender: NotifyType):
+    async def sent_batch_stream(self, images: List[Image.Image], config: Config, batch_size: int, sender: NotifyType,
+                                fields: Optional[Sequence[str]] = None):
         """发送批量翻译流式请求"""
         await fetch_data_stream("http://"+self.ip+":"+str(self.port)+"/execute/translate_batch",
-                               {"images": images, "config": config, "batch_size": batch_size}, config, sender)
+                               {"images": images, "config": config, "batch_size": batch_size}, config, sender,
+                               transport=self.result_transport, fields=fields)
 
 class Executors:
     def __init__(self):
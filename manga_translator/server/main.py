@@ -115,7 +115,9 @@ async def startup_event():
     _session_service = SessionService(
         sessions_file=f"{DATA_DIR}/sessions.json",
         session_timeout_minutes=60,
-        enable_persistence=True
+        enable_persistence=True,
+        write_behind=True,
+        activity_resolution_seconds=30.0
     )
     _permission_service = PermissionService(_account_service)
     _audit_service = AuditService(audit_log_file=f"{DATA_DIR}/audit.log")
@@ -147,9 +149,9 @@ async def startup_event():
     # Initialize history management services
     from manga_translator.server.core.history_service import HistoryManagementService
     from manga_translator.server.core.search_service import SearchService
-    from manga_translator.server.repositories.translation_repository import TranslationRepository
+    from manga_translator.server.repositories.translation_repository import create_translation_repository
     
-    translation_repo = TranslationRepository("manga_translator/server/data/translation_history.json")
+    translation_repo = create_translation_repository("manga_translator/server/data/translation_history.json")
     history_service = HistoryManagementService(
         result_directory="manga_translator/server/data/results",
         translation_repo=translation_repo
@@ -162,9 +164,9 @@ async def startup_event():
     # Initialize quota management services
     from manga_translator.server.core.quota_service import QuotaManagementService
     from manga_translator.server.core.group_service import GroupService
-    from manga_translator.server.repositories.quota_repository import QuotaRepository
+    from manga_translator.server.repositories.quota_repository import create_quota_repository
     
-    quota_repo = QuotaRepository("manga_translator/server/data/quotas.json")
+    quota_repo = create_quota_repository("manga_translator/server/data/quotas.json")
     group_service = GroupService()
     quota_service = QuotaManagementService(quota_repo, permission_repo, group_service)
     
@@ -307,7 +309,8 @@ def start_translator_client_proc(host: str, port: int, nonce: str, params: Names
     base_path = os.path.dirname(os.path.abspath(__file__))
     parent = os.path.dirname(base_path)
     proc = subprocess.Popen(cmds, cwd=parent)
-    executor_instances.register(ExecutorInstance(ip=host, port=port))
+    # 本机子进程，与服务器共享 /dev/shm
+    executor_instances.register(ExecutorInstance(ip=host, port=port, shared_filesystem=True))
 
     def handle_exit_signals(signal, frame):
         proc.terminate()
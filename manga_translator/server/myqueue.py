@@ -1,6 +1,11 @@
 import asyncio
+import bisect
+import itertools
 import os
-from typing import List, Optional
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Dict, List, Optional, Sequence, Tuple
 
 from PIL import Image
 from fastapi import HTTPException
@@ -10,13 +15,59 @@ from manga_translator import Config
 from manga_translator.server.instance import executor_instances
 from manga_translator.server.sent_data_internal import NotifyType
 
+# 优先级：数值越小越先执行
+PRIORITY_ADMIN = 0
+PRIORITY_NORMAL = 1
+
+
+def get_queue_priority(group: Optional[str]) -> int:
+    """
+    根据用户组获取排队优先级
+    
+    用户组配置中的 queue_priority 字段优先（例如付费用户组可设为 0），
+    未配置时管理员组为 PRIORITY_ADMIN，其余为 PRIORITY_NORMAL。
+    """
+    if not group:
+        return PRIORITY_NORMAL
+    from manga_translator.server.core.group_service import get_group_service
+    group_config = get_group_service().get_group(group) or {}
+    priority = group_config.get('queue_priority')
+    if isinstance(priority, int):
+        return priority
+    return PRIORITY_ADMIN if group == 'admin' else PRIORITY_NORMAL
+
+
+def get_user_queue_priority(username: Optional[str]) -> int:
+    """根据用户名找到所属用户组，再由 get_queue_priority 得到排队优先级（管理员角色至少为 PRIORITY_ADMIN）"""
+    if not username:
+        return PRIORITY_NORMAL
+    try:
+        from manga_translator.server.core.middleware import get_services
+        account_service, _, _ = get_services()
+    except RuntimeError:
+        # 服务未初始化（例如未启用账号系统）
+        return PRIORITY_NORMAL
+    account = account_service.get_user(username)
+    if account is None:
+        return PRIORITY_NORMAL
+    priority = get_queue_priority(getattr(account, 'group', None))
+    if account.role == 'admin':
+        priority = min(priority, PRIORITY_ADMIN)
+    return priority
+
+
 class QueueElement:
     req: Request
     image: Image.Image | str
     config: Config
     allow_offline: bool  # 是否允许离线继续执行
+    username: Optional[str]
+    priority: int
+    result_fields: Optional[Sequence[str]]  # 只从翻译实例取回这些 Context 字段，None 表示全部
 
-    def __init__(self, req: Request, image: Image.Image, config: Config, length, allow_offline: bool = False):
+    def __init__(self, req: Request, image: Image.Image, config: Config, length, allow_offline: bool = False,
+                 username: Optional[str] = None, priority: int = PRIORITY_NORMAL,
+                 result_fields: Optional[Sequence[str]] = None):
         self.req = req
         if length > 10:
             #todo: store image in "upload-cache" folder
@@ -25,6 +76,9 @@ class QueueElement:
             self.image = image
         self.config = config
         self.allow_offline = allow_offline
+        self.username = username
+        self.priority = priority
+        self.result_fields = result_fields
 
     def get_image(self)-> Image:
         if isinstance(self.image, str):
@@ -52,13 +106,21 @@ class BatchQueueElement:
     config: Config
     batch_size: int
     allow_offline: bool  # 是否允许离线继续执行
+    username: Optional[str]
+    priority: int
+    result_fields: Optional[Sequence[str]]
 
-    def __init__(self, req: Request, images: List[Image.Image], config: Config, batch_size: int, allow_offline: bool = False):
+    def __init__(self, req: Request, images: List[Image.Image], config: Config, batch_size: int, allow_offline: bool = False,
+                 username: Optional[str] = None, priority: int = PRIORITY_NORMAL,
+                 result_fields: Optional[Sequence[str]] = None):
         self.req = req
         self.images = images
         self.config = config
         self.batch_size = batch_size
         self.allow_offline = allow_offline
+        self.username = username
+        self.priority = priority
+        self.result_fields = result_fields
 
     async def is_client_disconnected(self) -> bool:
         # 如果允许离线翻译，则永不断开
@@ -70,32 +132,219 @@ class BatchQueueElement:
 
 
 class TaskQueue:
+    """
+    带索引的翻译任务队列
+    
+    排序键为 (优先级, 轮次, 入队序号)：
+    - 优先级：见 get_queue_priority，管理员/付费用户组先执行
+    - 轮次：同一用户的排队任务依次占用连续的轮次，不同用户的任务按轮次交替执行，
+      避免单个用户一次提交大量任务占满队列。队列中没有任务的用户（新来或再次提交）
+      从该优先级队首当前所处的轮次开始（虚拟时钟），不会因为轮次从 0 开始而插到
+      已在等待的用户前面
+    - 入队序号：同一轮内先到先得
+    
+    键保存在有序列表中，get_pos 为二分查找；队列变化时只唤醒可能受影响的等待者，
+    客户端断开检测也只针对即将执行的队首任务（惰性清理），不再每次遍历整个队列。
+    """
+
+    # 用于统计平均/ P95 等待时间的最近出队记录数
+    WAIT_SAMPLES = 256
+
     def __init__(self):
-        self.queue: List[QueueElement | BatchQueueElement] = []
-        self.queue_event: asyncio.Event = asyncio.Event()
+        self._keys: List[Tuple[int, int, int]] = []
+        self._tasks: Dict[Tuple[int, int, int], QueueElement | BatchQueueElement] = {}
+        self._task_keys: Dict[int, Tuple[int, int, int]] = {}
+        self._enqueue_time: Dict[int, float] = {}
+        self._events: Dict[int, asyncio.Event] = {}
+        # (优先级, 用户名) -> 该用户在该优先级排队任务的轮次（有序）
+        self._user_rounds: Dict[Tuple[int, Optional[str]], List[int]] = {}
+        self._seq = itertools.count()
+        self._wait_samples: deque = deque(maxlen=self.WAIT_SAMPLES)
+        self._dispatched = 0
+        self._reaped = 0
+
+    @property
+    def queue(self) -> List[QueueElement | BatchQueueElement]:
+        """按执行顺序排列的任务列表（快照）"""
+        return [self._tasks[key] for key in self._keys]
+
+    def __len__(self) -> int:
+        return len(self._keys)
 
     def add_task(self, task: QueueElement | BatchQueueElement):
-        self.queue.append(task)
+        if id(task) in self._task_keys:
+            return
+        username = getattr(task, 'username', None)
+        priority = getattr(task, 'priority', PRIORITY_NORMAL)
+        rounds = self._user_rounds.setdefault((priority, username), [])
+        head_round = self._head_round(priority)
+        # 用户名未知时所有任务都排在当前轮次，退化为按优先级的先进先出
+        if rounds and username is not None:
+            task_round = max(rounds[-1] + 1, head_round)
+        else:
+            task_round = head_round
+        bisect.insort(rounds, task_round)
+        key = (priority, task_round, next(self._seq))
+        bisect.insort(self._keys, key)
+        self._tasks[key] = task
+        self._task_keys[id(task)] = key
+        self._enqueue_time[id(task)] = time.monotonic()
+        self._events[id(task)] = asyncio.Event()
+        self._wake_from(bisect.bisect_left(self._keys, key))
+
+    def _head_round(self, priority: int) -> int:
+        """该优先级队首任务所处的轮次（虚拟时钟），该优先级没有排队任务时为 0"""
+        pos = bisect.bisect_left(self._keys, (priority,))
+        if pos < len(self._keys) and self._keys[pos][0] == priority:
+            return self._keys[pos][1]
+        return 0
 
     def get_pos(self, task: QueueElement | BatchQueueElement) -> Optional[int]:
-        try:
-            return self.queue.index(task)
-        except ValueError:
+        key = self._task_keys.get(id(task))
+        if key is None:
+            return None
+        return bisect.bisect_left(self._keys, key)
+
+    def _discard(self, task: QueueElement | BatchQueueElement) -> Optional[Tuple[int, float]]:
+        """移除任务并返回 (原位置, 入队时间)，任务不在队列中时返回 None"""
+        key = self._task_keys.pop(id(task), None)
+        if key is None:
             return None
+        pos = bisect.bisect_left(self._keys, key)
+        del self._keys[pos]
+        del self._tasks[key]
+        user_key = (key[0], getattr(task, 'username', None))
+        rounds = self._user_rounds[user_key]
+        del rounds[bisect.bisect_left(rounds, key[1])]
+        if not rounds:
+            del self._user_rounds[user_key]
+        enqueue_time = self._enqueue_time.pop(id(task))
+        # 唤醒被移除的任务自身，让其发现已不在队列中
+        self._events.pop(id(task)).set()
+        return pos, enqueue_time
+
+    def _wake_from(self, start: int, stop: Optional[int] = None):
+        """唤醒位置在 [start, stop) 内的等待者"""
+        for key in self._keys[start:stop]:
+            self._events[id(self._tasks[key])].set()
+
+    async def reap_disconnected(self, limit: int) -> int:
+        """只检查队首 limit 个任务的客户端连接，移除已断开的任务"""
+        reaped = 0
+        for task in [self._tasks[key] for key in self._keys[:limit]]:
+            if await task.is_client_disconnected() and self._discard(task) is not None:
+                reaped += 1
+        self._reaped += reaped
+        return reaped
+
+    async def wake_head(self, free: int):
+        """有 free 个空闲位置时唤醒队首的任务，先清理其中已断开的客户端"""
+        free = max(1, free)
+        await self.reap_disconnected(free)
+        # 排队位置没有变化，只有队首可能可以开始执行
+        self._wake_from(0, free)
+
     async def update_event(self):
-        self.queue = [task for task in self.queue if not await task.is_client_disconnected()]
-        self.queue_event.set()
-        self.queue_event.clear()
+        # 执行器空闲时队首的任务可以开始执行
+        await self.wake_head(executor_instances.free_executors())
 
-    async def remove(self, task: QueueElement | BatchQueueElement):
-        self.queue.remove(task)
-        await self.update_event()
+    async def remove(self, task: QueueElement | BatchQueueElement, dispatched: bool = True):
+        removed = self._discard(task)
+        if removed is None:
+            return
+        pos, enqueue_time = removed
+        if dispatched:
+            self._dispatched += 1
+            self._wait_samples.append(time.monotonic() - enqueue_time)
+        # 之后的任务排队位置都前移了一位
+        self._wake_from(pos)
 
-    async def wait_for_event(self):
-        await self.queue_event.wait()
+    async def wait_for_event(self, task: QueueElement | BatchQueueElement):
+        """等待该任务的排队位置变化或可以开始执行"""
+        event = self._events.get(id(task))
+        if event is None:
+            return
+        await event.wait()
+        event.clear()
+
+    def metrics(self) -> dict:
+        """队列深度与等待时间统计"""
+        now = time.monotonic()
+        by_priority: Dict[int, int] = {}
+        for priority, _, _ in self._keys:
+            by_priority[priority] = by_priority.get(priority, 0) + 1
+        samples = sorted(self._wait_samples)
+        return {
+            'size': len(self._keys),
+            'by_priority': by_priority,
+            'users': len({user for _, user in self._user_rounds if user is not None}),
+            'oldest_wait_seconds': round(now - min(self._enqueue_time.values()), 3) if self._enqueue_time else 0.0,
+            'avg_wait_seconds': round(sum(samples) / len(samples), 3) if samples else 0.0,
+            'p95_wait_seconds': round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 3) if samples else 0.0,
+            'dispatched': self._dispatched,
+            'reaped': self._reaped,
+        }
 
 task_queue = TaskQueue()
 
+
+class TranslationSlots:
+    """
+    翻译槽位：最多 capacity 个任务同时执行，等待中的任务按 TaskQueue 的顺序
+    （优先级、用户轮次、先来后到）获得槽位，取代先进先出的 asyncio.Semaphore
+    """
+
+    def __init__(self, capacity: int, queue: Optional[TaskQueue] = None):
+        self.capacity = capacity
+        self.active = 0
+        self.queue = queue if queue is not None else TaskQueue()
+
+    @property
+    def waiting(self) -> int:
+        return len(self.queue)
+
+    def free(self) -> int:
+        return max(0, self.capacity - self.active)
+
+    def resize(self, capacity: int):
+        """修改并发数（热加载），扩容时立即唤醒队首任务"""
+        self.capacity = capacity
+        if not self.free() or not len(self.queue):
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        loop.create_task(self.queue.wake_head(self.free()))
+
+    @asynccontextmanager
+    async def acquire(self, task: QueueElement | BatchQueueElement):
+        """
+        排队并获得一个槽位
+        
+        Raises:
+            HTTPException: 排队期间客户端断开（任务已被移出队列）
+        """
+        self.queue.add_task(task)
+        try:
+            while True:
+                queue_pos = self.queue.get_pos(task)
+                if queue_pos is None:
+                    raise HTTPException(499, detail="User is no longer connected")
+                if queue_pos < self.free():
+                    break
+                await self.queue.wait_for_event(task)
+        except BaseException:
+            await self.queue.remove(task, dispatched=False)
+            raise
+        await self.queue.remove(task)
+        self.active += 1
+        try:
+            yield
+        finally:
+            self.active -= 1
+            await self.queue.wake_head(self.free())
+
 async def wait_in_queue(task: QueueElement | BatchQueueElement, notify: NotifyType):
     """Will get task position report it. If its in the range of translators then it will try to aquire an instance(blockig) and sent a task to it. when done the item will be removed from the queue and result will be returned"""
     global result
@@ -110,7 +359,7 @@ async def wait_in_queue(task: QueueElement | BatchQueueElement, notify: NotifyTy
             notify(3, str(queue_pos).encode('utf-8'))
         if queue_pos < executor_instances.free_executors():
             if await task.is_client_disconnected():
-                await task_queue.update_event()
+                await task_queue.remove(task, dispatched=False)
                 if notify:
                     return
                 else:
@@ -125,15 +374,15 @@ async def wait_in_queue(task: QueueElement | BatchQueueElement, notify: NotifyTy
                 # Process batch translation task
                 if isinstance(task, BatchQueueElement):
                     if notify:
-                        await instance.sent_batch_stream(task.images, task.config, task.batch_size, notify)
+                        await instance.sent_batch_stream(task.images, task.config, task.batch_size, notify, task.result_fields)
                     else:
-                        result = await instance.sent_batch(task.images, task.config, task.batch_size)
+                        result = await instance.sent_batch(task.images, task.config, task.batch_size, task.result_fields)
                 else:
                     # Process single translation task
                     if notify:
-                        await instance.sent_stream(task.image, task.config, notify)
+                        await instance.sent_stream(task.image, task.config, notify, task.result_fields)
                     else:
-                        result = await instance.sent(task.image, task.config)
+                        result = await instance.sent(task.image, task.config, task.result_fields)
 
                 await executor_instances.free_executor(instance)
 
@@ -158,4 +407,4 @@ async def wait_in_queue(task: QueueElement | BatchQueueElement, notify: NotifyTy
                 else:
                     raise HTTPException(500, detail=error_msg)
         else:
-            await task_queue.wait_for_event()
\ No newline at end of file
+            await task_queue.wait_for_event(task)
\ No newline at end of file
@@ -1,8 +1,9 @@
 """
-Data repository classes for JSON file storage.
+Data repository classes for JSON file storage (optionally SQLite, see MT_STORAGE_BACKEND).
 """
 
 from manga_translator.server.repositories.base_repository import BaseJSONRepository
+from manga_translator.server.repositories.sqlite_repository import SQLiteRepository, sqlite_enabled
 from manga_translator.server.repositories.resource_repository import ResourceRepository
 from manga_translator.server.repositories.translation_repository import TranslationRepository
 from manga_translator.server.repositories.permission_repository import PermissionRepository
@@ -13,6 +14,8 @@ from manga_translator.server.repositories.log_repository import LogRepository
 
 __all__ = [
     'BaseJSONRepository',
+    'SQLiteRepository',
+    'sqlite_enabled',
     'ResourceRepository',
     'TranslationRepository',
     'PermissionRepository',
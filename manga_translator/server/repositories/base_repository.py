@@ -223,3 +223,144 @@ class BaseJSONRepository:
             True if item exists, False otherwise
         """
         return self.find_by_id(collection_key, item_id) is not None
+    
+    def get_item(self, collection_key: str, key: str) -> Optional[Dict]:
+        """
+        Get an item from a dict-style collection (e.g. {"quotas": {user_id: {...}}}).
+        
+        Args:
+            collection_key: Key of the collection in the JSON structure
+            key: Key of the item inside the collection
+        
+        Returns:
+            The item if found, None otherwise
+        """
+        return self._read_data().get(collection_key, {}).get(key)
+    
+    def get_items(self, collection_key: str) -> Dict[str, Dict]:
+        """
+        Get all items of a dict-style collection.
+        
+        Args:
+            collection_key: Key of the collection in the JSON structure
+        
+        Returns:
+            Dictionary of key -> item
+        """
+        return self._read_data().get(collection_key, {})
+    
+    def set_item(self, collection_key: str, key: str, item: Dict) -> None:
+        """
+        Insert or replace an item in a dict-style collection.
+        
+        Args:
+            collection_key: Key of the collection in the JSON structure
+            key: Key of the item inside the collection
+            item: Item to store
+        """
+        with self._lock:
+            data = self._read_data()
+            data.setdefault(collection_key, {})[key] = item
+            self._write_data(data)
+    
+    def modify_item(self, collection_key: str, key: str,
+                    modify_func: Callable[[Dict], None]) -> bool:
+        """
+        Modify an item of a dict-style collection in place (read-modify-write under the lock).
+        
+        Args:
+            collection_key: Key of the collection in the JSON structure
+            key: Key of the item inside the collection
+            modify_func: Function that mutates the item
+        
+        Returns:
+            True if item was found and modified, False otherwise
+        """
+        with self._lock:
+            data = self._read_data()
+            item = data.get(collection_key, {}).get(key)
+            if item is None:
+                return False
+            modify_func(item)
+            self._write_data(data)
+            return True
+    
+    def delete_item(self, collection_key: str, key: str) -> bool:
+        """
+        Delete an item from a dict-style collection.
+        
+        Args:
+            collection_key: Key of the collection in the JSON structure
+            key: Key of the item inside the collection
+        
+        Returns:
+            True if item was found and deleted, False otherwise
+        """
+        with self._lock:
+            data = self._read_data()
+            if key not in data.get(collection_key, {}):
+                return False
+            del data[collection_key][key]
+            self._write_data(data)
+            return True
+    
+    def search(self, collection_key: str,
+               equals: Optional[Dict[str, Any]] = None,
+               start_time: Optional[str] = None,
+               end_time: Optional[str] = None,
+               filter_func: Optional[Callable[[Dict], bool]] = None) -> List[Dict]:
+        """
+        Query items by exact field values and an inclusive timestamp range.
+        
+        Args:
+            collection_key: Key of the collection in the JSON structure
+            equals: Field -> value pairs that must match exactly
+            start_time: Minimum timestamp (inclusive)
+            end_time: Maximum timestamp (inclusive)
+            filter_func: Optional additional filter
+        
+        Returns:
+            List of matching items
+        """
+        equals = equals or {}
+        
+        def match(item):
+            if any(item.get(field) != value for field, value in equals.items()):
+                return False
+            if start_time and item.get('timestamp', '') < start_time:
+                return False
+            if end_time and item.get('timestamp', '') > end_time:
+                return False
+            return filter_func is None or filter_func(item)
+        
+        return self.query(collection_key, match)
+    
+    def delete_matching(self, collection_key: str,
+                        equals: Optional[Dict[str, Any]] = None,
+                        before: Optional[str] = None) -> int:
+        """
+        Delete items by exact field values and/or timestamp older than `before`.
+        
+        Args:
+            collection_key: Key of the collection in the JSON structure
+            equals: Field -> value pairs that must match exactly
+            before: Delete only items whose timestamp is earlier than this
+        
+        Returns:
+            Count of deleted items
+        """
+        equals = equals or {}
+        
+        def match(item):
+            if any(item.get(field) != value for field, value in equals.items()):
+                return False
+            return before is None or item.get('timestamp', '') < before
+        
+        with self._lock:
+            data = self._read_data()
+            collection = data.get(collection_key, [])
+            data[collection_key] = [item for item in collection if not match(item)]
+            deleted_count = len(collection) - len(data[collection_key])
+            if deleted_count > 0:
+                self._write_data(data)
+            return deleted_count
@@ -4,11 +4,12 @@ Repository for log management.
 
 from typing import List, Optional
 from manga_translator.server.repositories.base_repository import BaseJSONRepository
+from manga_translator.server.repositories.sqlite_repository import SQLiteRepository, sqlite_enabled
 from manga_translator.server.models import LogEntry
 
 
-class LogRepository(BaseJSONRepository):
-    """Repository for managing logs."""
+class LogRepositoryMixin:
+    """Log operations shared by the JSON and SQLite backends."""
     
     def _get_default_structure(self):
         """Get default structure for log file."""
@@ -43,47 +44,34 @@ class LogRepository(BaseJSONRepository):
                    start_time: Optional[str] = None,
                    end_time: Optional[str] = None) -> List[dict]:
         """Search logs with filters."""
-        def filter_func(log):
-            if user_id and log.get('user_id') != user_id:
-                return False
-            if session_token and log.get('session_token') != session_token:
-                return False
-            if level and log.get('level') != level:
-                return False
-            if start_time and log.get('timestamp', '') < start_time:
-                return False
-            if end_time and log.get('timestamp', '') > end_time:
-                return False
-            return True
-        
-        return self.query("logs", filter_func)
+        equals = {}
+        if user_id:
+            equals['user_id'] = user_id
+        if session_token:
+            equals['session_token'] = session_token
+        if level:
+            equals['level'] = level
+        return self.search("logs", equals, start_time, end_time)
     
     def delete_session_logs(self, session_token: str) -> int:
         """Delete all logs for a specific session. Returns count of deleted logs."""
-        data = self._read_data()
-        logs = data.get("logs", [])
-        original_count = len(logs)
-        
-        data["logs"] = [log for log in logs 
-                       if log.get('session_token') != session_token]
-        
-        deleted_count = original_count - len(data["logs"])
-        if deleted_count > 0:
-            self._write_data(data)
-        
-        return deleted_count
+        return self.delete_matching("logs", {'session_token': session_token})
     
     def delete_old_logs(self, before_timestamp: str) -> int:
         """Delete logs older than specified timestamp. Returns count of deleted logs."""
-        data = self._read_data()
-        logs = data.get("logs", [])
-        original_count = len(logs)
-        
-        data["logs"] = [log for log in logs 
-                       if log.get('timestamp', '') >= before_timestamp]
-        
-        deleted_count = original_count - len(data["logs"])
-        if deleted_count > 0:
-            self._write_data(data)
-        
-        return deleted_count
+        return self.delete_matching("logs", before=before_timestamp)
+
+
+class LogRepository(LogRepositoryMixin, BaseJSONRepository):
+    """Repository for managing logs."""
+
+
+class SQLiteLogRepository(LogRepositoryMixin, SQLiteRepository):
+    """Repository for managing logs, stored in SQLite."""
+
+
+def create_log_repository(file_path: str) -> LogRepositoryMixin:
+    """Create the log repository for the configured storage backend (MT_STORAGE_BACKEND)."""
+    if sqlite_enabled():
+        return SQLiteLogRepository(file_path)
+    return LogRepository(file_path)
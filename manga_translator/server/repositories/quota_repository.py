@@ -4,11 +4,12 @@ Repository for quota management.
 
 from typing import Optional, Dict
 from manga_translator.server.repositories.base_repository import BaseJSONRepository
+from manga_translator.server.repositories.sqlite_repository import SQLiteRepository, sqlite_enabled
 from manga_translator.server.models import QuotaLimit
 
 
-class QuotaRepository(BaseJSONRepository):
-    """Repository for managing user quotas."""
+class QuotaRepositoryMixin:
+    """Quota operations shared by the JSON and SQLite backends."""
     
     def _get_default_structure(self):
         """Get default structure for quota file."""
@@ -19,39 +20,23 @@ class QuotaRepository(BaseJSONRepository):
     
     def get_user_quota(self, user_id: str) -> Optional[dict]:
         """Get quota for a specific user."""
-        data = self._read_data()
-        return data.get("quotas", {}).get(user_id)
+        return self.get_item("quotas", user_id)
     
     def set_user_quota(self, user_id: str, quota: QuotaLimit) -> None:
         """Set quota for a specific user."""
-        data = self._read_data()
-        if "quotas" not in data:
-            data["quotas"] = {}
-        data["quotas"][user_id] = quota.to_dict()
-        self._write_data(data)
+        self.set_item("quotas", user_id, quota.to_dict())
     
     def update_user_quota(self, user_id: str, updates: dict) -> bool:
         """Update quota for a specific user."""
-        data = self._read_data()
-        if user_id in data.get("quotas", {}):
-            data["quotas"][user_id].update(updates)
-            self._write_data(data)
-            return True
-        return False
+        return self.modify_item("quotas", user_id, lambda quota: quota.update(updates))
     
     def delete_user_quota(self, user_id: str) -> bool:
         """Delete quota for a specific user."""
-        data = self._read_data()
-        if user_id in data.get("quotas", {}):
-            del data["quotas"][user_id]
-            self._write_data(data)
-            return True
-        return False
+        return self.delete_item("quotas", user_id)
     
     def get_all_quotas(self) -> Dict[str, dict]:
         """Get all user quotas."""
-        data = self._read_data()
-        return data.get("quotas", {})
+        return self.get_items("quotas")
     
     def reset_daily_usage(self, user_id: str) -> bool:
         """Reset daily usage for a specific user."""
@@ -63,10 +48,21 @@ class QuotaRepository(BaseJSONRepository):
     
     def increment_usage(self, user_id: str, count: int) -> bool:
         """Increment usage counter for a specific user."""
-        data = self._read_data()
-        if user_id in data.get("quotas", {}):
-            current = data["quotas"][user_id].get("current_usage", 0)
-            data["quotas"][user_id]["current_usage"] = current + count
-            self._write_data(data)
-            return True
-        return False
+        def increment(quota):
+            quota["current_usage"] = quota.get("current_usage", 0) + count
+        return self.modify_item("quotas", user_id, increment)
+
+
+class QuotaRepository(QuotaRepositoryMixin, BaseJSONRepository):
+    """Repository for managing user quotas."""
+
+
+class SQLiteQuotaRepository(QuotaRepositoryMixin, SQLiteRepository):
+    """Repository for managing user quotas, stored in SQLite."""
+
+
+def create_quota_repository(file_path: str) -> QuotaRepositoryMixin:
+    """Create the quota repository for the configured storage backend (MT_STORAGE_BACKEND)."""
+    if sqlite_enabled():
+        return SQLiteQuotaRepository(file_path)
+    return QuotaRepository(file_path)
@@ -8,6 +8,7 @@ import os
 import json
 from typing import List, Optional
 from manga_translator.server.models.session_models import SessionOwnership, SessionAccessAttempt
+from manga_translator.server.repositories.sqlite_repository import SQLiteRepository, sqlite_enabled
 
 
 class SessionRepository:
@@ -220,3 +221,113 @@ class SessionRepository:
             List of unauthorized access attempts
         """
         return self.get_access_attempts(granted=False, limit=limit)
+
+
+class SQLiteSessionRepository(SQLiteRepository):
+    """Repository for managing session ownership data, stored in SQLite (sessions.db)."""
+    
+    # Keep only the most recent access attempts, same limit as the JSON repository
+    MAX_ACCESS_ATTEMPTS = 10000
+    
+    def __init__(self, data_dir: str = None):
+        """
+        Initialize the session repository.
+        
+        Args:
+            data_dir: Directory for data storage
+        """
+        if data_dir is None:
+            # Default to server/data directory
+            current_dir = os.path.dirname(os.path.abspath(__file__))
+            data_dir = os.path.join(os.path.dirname(current_dir), 'data')
+        
+        self.data_dir = data_dir
+        self.access_log_file = os.path.join(self.data_dir, 'session_access_log.json')
+        super().__init__(os.path.join(self.data_dir, 'sessions.json'))
+    
+    def _get_default_structure(self):
+        return {'sessions': {}, 'access_attempts': []}
+    
+    def _import_legacy_data(self) -> None:
+        """Import sessions.json and session_access_log.json."""
+        for file_path in (self.file_path, self.access_log_file):
+            if not os.path.exists(file_path):
+                continue
+            try:
+                data = self._read_json(file_path)
+            except (json.JSONDecodeError, OSError) as e:
+                print(f"Migration warning: {e}")
+                continue
+            sessions = data.get('sessions', {})
+            # 兼容 list 和 dict 两种格式
+            if isinstance(sessions, list):
+                data['sessions'] = {s.get('session_token'): s for s in sessions}
+            self.import_data(data)
+    
+    def _read_json(self, file_path: str) -> dict:
+        """Read JSON file."""
+        with open(file_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    
+    def create_session(self, session: SessionOwnership) -> SessionOwnership:
+        """Create a new session ownership record."""
+        self.set_item('sessions', session.session_token, session.to_dict())
+        return session
+    
+    def get_session(self, session_token: str) -> Optional[SessionOwnership]:
+        """Get session ownership by token."""
+        session_data = self.get_item('sessions', session_token)
+        if session_data:
+            return SessionOwnership.from_dict(session_data)
+        return None
+    
+    def get_user_sessions(self, user_id: str) -> List[SessionOwnership]:
+        """Get all sessions owned by a user."""
+        return [SessionOwnership.from_dict(s) for s in self.find_by_field('sessions', 'user_id', user_id)]
+    
+    def get_all_sessions(self) -> List[SessionOwnership]:
+        """Get all sessions (admin only)."""
+        return [SessionOwnership.from_dict(s) for s in self.query('sessions')]
+    
+    def update_session_status(self, session_token: str, status: str) -> bool:
+        """Update session status."""
+        return self.modify_item('sessions', session_token, lambda s: s.update(status=status))
+    
+    def delete_session(self, session_token: str) -> bool:
+        """Delete a session record."""
+        return self.delete_item('sessions', session_token)
+    
+    def log_access_attempt(self, attempt: SessionAccessAttempt) -> None:
+        """Log a session access attempt."""
+        with self._lock:
+            self.add('access_attempts', attempt.to_dict())
+            self.trim('access_attempts', self.MAX_ACCESS_ATTEMPTS)
+    
+    def get_access_attempts(
+        self,
+        session_token: Optional[str] = None,
+        user_id: Optional[str] = None,
+        granted: Optional[bool] = None,
+        limit: int = 100
+    ) -> List[SessionAccessAttempt]:
+        """Get session access attempts with optional filtering, newest first."""
+        equals = {}
+        if session_token:
+            equals['session_token'] = session_token
+        if user_id:
+            equals['user_id'] = user_id
+        if granted is not None:
+            equals['granted'] = granted
+        attempts = self.search('access_attempts', equals, limit=limit, newest_first=True)
+        return [SessionAccessAttempt.from_dict(a) for a in attempts]
+    
+    def get_unauthorized_attempts(self, limit: int = 100) -> List[SessionAccessAttempt]:
+        """Get unauthorized access attempts."""
+        return self.get_access_attempts(granted=False, limit=limit)
+
+
+def create_session_repository(data_dir: str = None):
+    """Create the session repository for the configured storage backend (MT_STORAGE_BACKEND)."""
+    if sqlite_enabled():
+        return SQLiteSessionRepository(data_dir)
+    return SessionRepository(data_dir)
@@ -0,0 +1,470 @@
+"""
+SQLite-backed repository with the same interface as BaseJSONRepository.
+
+通过环境变量 MT_STORAGE_BACKEND=sqlite 启用。JSON 仓库每次操作都要完整解析并重写整个文件，
+数据量大时（数万条历史记录/日志）开销很高；SQLite 仓库每个元素一行，
+常用的查询字段单独成列并建立索引，增删改查只涉及相关的行。
+"""
+
+import json
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+
+STORAGE_BACKEND_ENV = 'MT_STORAGE_BACKEND'
+
+
+def sqlite_enabled() -> bool:
+    """Whether repositories should use the SQLite backend (MT_STORAGE_BACKEND=sqlite)."""
+    return os.getenv(STORAGE_BACKEND_ENV, 'json').strip().lower() == 'sqlite'
+
+
+class SQLiteRepository:
+    """
+    Base class for SQLite-backed data repositories.
+
+    All collections live in a single `items` table, one row per item, with the item
+    stored as JSON. The fields in INDEXED_FIELDS are copied into indexed columns so
+    that lookups and deletes by id / user_id / session_token / timestamp run in SQL.
+    Collections whose default structure is a dict (e.g. {"quotas": {user_id: {...}}})
+    use the dict key as the `id` column.
+
+    The database is opened in WAL mode: reads never block, writes are serialized
+    by a repository-level lock. Each thread gets its own connection.
+    """
+
+    INDEXED_FIELDS = ('id', 'user_id', 'session_token', 'timestamp')
+
+    def __init__(self, file_path: str):
+        """
+        Initialize repository with the path of the JSON file it replaces.
+
+        Args:
+            file_path: Path to the JSON file; the database is stored next to it with a .db suffix
+        """
+        self.file_path = file_path
+        self.db_path = str(Path(file_path).with_suffix('.db'))
+        self._lock = threading.RLock()
+        self._local = threading.local()
+        self._dict_collections = {
+            key for key, value in self._get_default_structure().items() if isinstance(value, dict)
+        }
+
+        Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+        is_new = not os.path.exists(self.db_path)
+        self._init_schema()
+        if is_new:
+            self._import_legacy_data()
+
+    def _get_default_structure(self) -> Dict[str, Any]:
+        """
+        Get the default structure of the data (same as the JSON repository).
+        Should be overridden by subclasses.
+        """
+        return {}
+
+    def _connection(self) -> sqlite3.Connection:
+        """Get the connection of the current thread."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def _init_schema(self) -> None:
+        """Create the items table and its indexes."""
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.execute(
+                    'CREATE TABLE IF NOT EXISTS items ('
+                    ' seq INTEGER PRIMARY KEY AUTOINCREMENT,'
+                    ' collection TEXT NOT NULL,'
+                    ' id, user_id, session_token, timestamp,'
+                    ' data TEXT NOT NULL)'
+                )
+                for field in self.INDEXED_FIELDS:
+                    # 按用户查询通常同时带时间范围，user_id 索引附带 timestamp
+                    columns = f'{field}, timestamp' if field == 'user_id' else field
+                    conn.execute(
+                        f'CREATE INDEX IF NOT EXISTS idx_items_{field} ON items(collection, {columns})'
+                    )
+
+    def _import_legacy_data(self) -> None:
+        """
+        Import the existing JSON file when the database is first created.
+        Subclasses with a different legacy layout override this.
+        """
+        if not os.path.exists(self.file_path):
+            return
+        try:
+            with open(self.file_path, 'r', encoding='utf-8') as f:
+                self.import_data(json.load(f))
+        except (json.JSONDecodeError, OSError) as e:
+            print(f"Migration warning: {e}")
+
+    def _row_values(self, collection_key: str, item: Dict, key: Optional[str] = None) -> Tuple:
+        """Build the column values for an item."""
+        return (
+            collection_key,
+            key if key is not None else item.get('id'),
+            item.get('user_id'),
+            item.get('session_token'),
+            item.get('timestamp', ''),
+            json.dumps(item, ensure_ascii=False),
+        )
+
+    def _insert(self, conn: sqlite3.Connection, rows: Iterable[Tuple]) -> None:
+        conn.executemany(
+            'INSERT INTO items (collection, id, user_id, session_token, timestamp, data) '
+            'VALUES (?, ?, ?, ?, ?, ?)',
+            rows
+        )
+
+    @staticmethod
+    def _build_where(collection_key: str,
+                     equals: Optional[Dict[str, Any]] = None,
+                     start_time: Optional[str] = None,
+                     end_time: Optional[str] = None,
+                     before: Optional[str] = None) -> Tuple[str, List[Any], Dict[str, Any]]:
+        """
+        Build the WHERE clause. Conditions on indexed fields become SQL;
+        the remaining equality conditions are returned to be checked in Python.
+        """
+        clauses = ['collection = ?']
+        params: List[Any] = [collection_key]
+        residual = {}
+        for field, value in (equals or {}).items():
+            if field not in SQLiteRepository.INDEXED_FIELDS:
+                residual[field] = value
+            elif value is None:
+                clauses.append(f'{field} IS NULL')
+            else:
+                clauses.append(f'{field} = ?')
+                params.append(value)
+        if start_time:
+            clauses.append('timestamp >= ?')
+            params.append(start_time)
+        if end_time:
+            clauses.append('timestamp <= ?')
+            params.append(end_time)
+        if before is not None:
+            clauses.append('timestamp < ?')
+            params.append(before)
+        return ' AND '.join(clauses), params, residual
+
+    def _select(self, where: str, params: List[Any],
+                filter_func: Optional[Callable[[Dict], bool]] = None,
+                newest_first: bool = False,
+                limit: Optional[int] = None) -> List[Tuple[int, Dict]]:
+        """Select (seq, item) pairs in insertion order."""
+        sql = f'SELECT seq, data FROM items WHERE {where} ORDER BY seq {"DESC" if newest_first else "ASC"}'
+        if limit is not None and filter_func is None:
+            sql += f' LIMIT {int(limit)}'
+        result = []
+        for seq, data in self._connection().execute(sql, params):
+            item = json.loads(data)
+            if filter_func is None or filter_func(item):
+                result.append((seq, item))
+                if limit is not None and len(result) >= limit:
+                    break
+        return result
+
+    def _read_data(self) -> Dict[str, Any]:
+        """
+        Read the whole data structure (same shape as the JSON file).
+        Slow path kept for compatibility; prefer the query methods.
+        """
+        data = self._get_default_structure()
+        for collection_key, key, raw in self._connection().execute(
+                'SELECT collection, id, data FROM items ORDER BY seq'):
+            item = json.loads(raw)
+            if collection_key in self._dict_collections:
+                data.setdefault(collection_key, {})[key] = item
+            else:
+                data.setdefault(collection_key, []).append(item)
+        return data
+
+    def _write_data(self, data: Dict[str, Any]) -> None:
+        """
+        Replace the whole data structure.
+        Slow path kept for compatibility; prefer the query methods.
+        """
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.execute('DELETE FROM items')
+                self._insert(conn, self._iter_rows(data))
+
+    def _iter_rows(self, data: Dict[str, Any]) -> Iterable[Tuple]:
+        for collection_key, collection in data.items():
+            if isinstance(collection, dict):
+                for key, item in collection.items():
+                    yield self._row_values(collection_key, item, key)
+            elif isinstance(collection, list):
+                for item in collection:
+                    yield self._row_values(collection_key, item)
+
+    def import_data(self, data: Dict[str, Any]) -> int:
+        """
+        Append all collections of a JSON data structure to the database.
+
+        Args:
+            data: Data in the JSON file format
+
+        Returns:
+            Number of imported items
+        """
+        rows = list(self._iter_rows(data))
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                self._insert(conn, rows)
+        return len(rows)
+
+    def query(self, collection_key: str,
+              filter_func: Optional[Callable[[Dict], bool]] = None) -> List[Dict]:
+        """
+        Query items from a collection with optional filtering.
+
+        Args:
+            collection_key: Name of the collection
+            filter_func: Optional function to filter items
+
+        Returns:
+            List of matching items
+        """
+        where, params, _ = self._build_where(collection_key)
+        return [item for _, item in self._select(where, params, filter_func)]
+
+    def find_by_id(self, collection_key: str, item_id: str) -> Optional[Dict]:
+        """
+        Find an item by ID in a collection.
+
+        Args:
+            collection_key: Name of the collection
+            item_id: ID of the item to find
+
+        Returns:
+            The item if found, None otherwise
+        """
+        items = self.search(collection_key, {'id': item_id}, limit=1)
+        return items[0] if items else None
+
+    def find_by_field(self, collection_key: str, field: str,
+                      value: Any) -> List[Dict]:
+        """
+        Find items by a specific field value.
+
+        Args:
+            collection_key: Name of the collection
+            field: Field name to search
+            value: Value to match
+
+        Returns:
+            List of matching items
+        """
+        return self.search(collection_key, {field: value})
+
+    def add(self, collection_key: str, item: Dict) -> None:
+        """
+        Add an item to a collection.
+
+        Args:
+            collection_key: Name of the collection
+            item: Item to add
+        """
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                self._insert(conn, [self._row_values(collection_key, item)])
+
+    def update(self, collection_key: str, item_id: str,
+               updates: Dict) -> bool:
+        """
+        Update an item in a collection.
+
+        Args:
+            collection_key: Name of the collection
+            item_id: ID of the item to update
+            updates: Dictionary of fields to update
+
+        Returns:
+            True if item was found and updated, False otherwise
+        """
+        where, params, _ = self._build_where(collection_key, {'id': item_id})
+        with self._lock:
+            rows = self._select(where, params, limit=1)
+            if not rows:
+                return False
+            seq, item = rows[0]
+            item.update(updates)
+            self._replace(seq, collection_key, item, item_id)
+            return True
+
+    def _replace(self, seq: int, collection_key: str, item: Dict, key: Optional[str] = None) -> None:
+        values = self._row_values(collection_key, item, key)
+        conn = self._connection()
+        with conn:
+            conn.execute(
+                'UPDATE items SET id = ?, user_id = ?, session_token = ?, timestamp = ?, data = ? '
+                'WHERE seq = ?',
+                values[1:] + (seq,)
+            )
+
+    def delete(self, collection_key: str, item_id: str) -> bool:
+        """
+        Delete an item from a collection.
+
+        Args:
+            collection_key: Name of the collection
+            item_id: ID of the item to delete
+
+        Returns:
+            True if item was found and deleted, False otherwise
+        """
+        return self.delete_matching(collection_key, {'id': item_id}) > 0
+
+    def count(self, collection_key: str,
+              filter_func: Optional[Callable[[Dict], bool]] = None) -> int:
+        """
+        Count items in a collection with optional filtering.
+
+        Args:
+            collection_key: Name of the collection
+            filter_func: Optional function to filter items
+
+        Returns:
+            Count of matching items
+        """
+        if filter_func is not None:
+            return len(self.query(collection_key, filter_func))
+        row = self._connection().execute(
+            'SELECT COUNT(*) FROM items WHERE collection = ?', (collection_key,)
+        ).fetchone()
+        return row[0]
+
+    def exists(self, collection_key: str, item_id: str) -> bool:
+        """
+        Check if an item exists in a collection.
+
+        Args:
+            collection_key: Name of the collection
+            item_id: ID of the item to check
+
+        Returns:
+            True if item exists, False otherwise
+        """
+        return self.find_by_id(collection_key, item_id) is not None
+
+    def get_item(self, collection_key: str, key: str) -> Optional[Dict]:
+        """Get an item from a dict-style collection."""
+        return self.find_by_id(collection_key, key)
+
+    def get_items(self, collection_key: str) -> Dict[str, Dict]:
+        """Get all items of a dict-style collection."""
+        return {
+            key: json.loads(raw) for key, raw in self._connection().execute(
+                'SELECT id, data FROM items WHERE collection = ? ORDER BY seq', (collection_key,))
+        }
+
+    def set_item(self, collection_key: str, key: str, item: Dict) -> None:
+        """Insert or replace an item in a dict-style collection."""
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.execute('DELETE FROM items WHERE collection = ? AND id = ?', (collection_key, key))
+                self._insert(conn, [self._row_values(collection_key, item, key)])
+
+    def modify_item(self, collection_key: str, key: str,
+                    modify_func: Callable[[Dict], None]) -> bool:
+        """Modify an item of a dict-style collection in place (read-modify-write under the lock)."""
+        where, params, _ = self._build_where(collection_key, {'id': key})
+        with self._lock:
+            rows = self._select(where, params, limit=1)
+            if not rows:
+                return False
+            seq, item = rows[0]
+            modify_func(item)
+            self._replace(seq, collection_key, item, key)
+            return True
+
+    def delete_item(self, collection_key: str, key: str) -> bool:
+        """Delete an item from a dict-style collection."""
+        return self.delete(collection_key, key)
+
+    def search(self, collection_key: str,
+               equals: Optional[Dict[str, Any]] = None,
+               start_time: Optional[str] = None,
+               end_time: Optional[str] = None,
+               filter_func: Optional[Callable[[Dict], bool]] = None,
+               limit: Optional[int] = None,
+               newest_first: bool = False) -> List[Dict]:
+        """
+        Query items by exact field values and an inclusive timestamp range.
+
+        Args:
+            collection_key: Name of the collection
+            equals: Field -> value pairs that must match exactly
+            start_time: Minimum timestamp (inclusive)
+            end_time: Maximum timestamp (inclusive)
+            filter_func: Optional additional filter
+            limit: Maximum number of items to return
+            newest_first: Return the most recently added items first
+
+        Returns:
+            List of matching items
+        """
+        where, params, residual = self._build_where(collection_key, equals, start_time, end_time)
+        if residual:
+            extra_filter = filter_func
+
+            def filter_func(item):
+                if any(item.get(field) != value for field, value in residual.items()):
+                    return False
+                return extra_filter is None or extra_filter(item)
+
+        return [item for _, item in self._select(where, params, filter_func, newest_first, limit)]
+
+    def delete_matching(self, collection_key: str,
+                        equals: Optional[Dict[str, Any]] = None,
+                        before: Optional[str] = None) -> int:
+        """
+        Delete items by exact field values and/or timestamp older than `before`.
+
+        Returns:
+            Count of deleted items
+        """
+        where, params, residual = self._build_where(collection_key, equals, before=before)
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                if not residual:
+                    return conn.execute(f'DELETE FROM items WHERE {where}', params).rowcount
+                seqs = [
+                    (seq,) for seq, item in self._select(where, params)
+                    if all(item.get(field) == value for field, value in residual.items())
+                ]
+                conn.executemany('DELETE FROM items WHERE seq = ?', seqs)
+                return len(seqs)
+
+    def trim(self, collection_key: str, max_items: int) -> int:
+        """
+        Keep only the most recent `max_items` items of a collection.
+
+        Returns:
+            Count of deleted items
+        """
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                return conn.execute(
+                    'DELETE FROM items WHERE collection = ? AND seq <= ('
+                    ' SELECT seq FROM items WHERE collection = ? ORDER BY seq DESC LIMIT 1 OFFSET ?)',
+                    (collection_key, collection_key, max_items)
+                ).rowcount
@@ -11,6 +11,7 @@ from datetime import datetime, timezone
 from pathlib import Path
 
 from manga_translator.server.models import TranslationResult
+from manga_translator.server.repositories.sqlite_repository import SQLiteRepository, sqlite_enabled
 
 
 class TranslationRepository:
@@ -262,3 +263,66 @@ class TranslationRepository:
             # 查询所有用户
             all_sessions = self.get_all_sessions()
             return [s for s in all_sessions if filter_func(s)]
+
+
+class SQLiteTranslationRepository(SQLiteRepository):
+    """
+    Repository for managing translation history, stored in SQLite.
+    接口与 TranslationRepository 一致；user_id / session_token / timestamp 均有索引，
+    不需要额外的索引文件。首次创建数据库时自动导入按用户分片的 JSON 历史。
+    """
+    
+    def _get_default_structure(self):
+        return {'sessions': []}
+    
+    def _import_legacy_data(self) -> None:
+        """导入旧的单文件历史和 history/ 目录下的用户分片文件"""
+        super()._import_legacy_data()
+        history_dir = Path(self.file_path).parent / 'history'
+        for user_file in sorted(history_dir.glob('*.json')):
+            if user_file.name.startswith('_'):
+                continue
+            try:
+                with open(user_file, 'r', encoding='utf-8') as f:
+                    self.import_data({'sessions': json.load(f).get('sessions', [])})
+            except Exception as e:
+                print(f"Migration warning: {e}")
+    
+    def add_session(self, result: TranslationResult) -> None:
+        """添加翻译会话到历史"""
+        self.add('sessions', result.to_dict())
+    
+    def get_user_sessions(self, user_id: str) -> List[dict]:
+        """获取指定用户的所有会话"""
+        return self.find_by_field('sessions', 'user_id', user_id)
+    
+    def get_session_by_token(self, session_token: str) -> Optional[dict]:
+        """通过 token 获取会话"""
+        sessions = self.search('sessions', {'session_token': session_token}, limit=1)
+        return sessions[0] if sessions else None
+    
+    def get_all_sessions(self) -> List[dict]:
+        """获取所有会话（管理员用）"""
+        return self.query('sessions')
+    
+    def delete_session(self, session_id: str) -> bool:
+        """删除会话"""
+        return self.delete('sessions', session_id)
+    
+    def update_session(self, session_id: str, updates: dict) -> bool:
+        """更新会话"""
+        return self.update('sessions', session_id, updates)
+    
+    def search_sessions(self, user_id: Optional[str] = None, 
+                       start_date: Optional[str] = None,
+                       end_date: Optional[str] = None) -> List[dict]:
+        """搜索会话"""
+        equals = {'user_id': user_id} if user_id else None
+        return self.search('sessions', equals, start_date, end_date)
+
+
+def create_translation_repository(base_path: str):
+    """根据存储后端配置（MT_STORAGE_BACKEND）创建翻译历史仓库"""
+    if sqlite_enabled():
+        return SQLiteTranslationRepository(base_path)
+    return TranslationRepository(base_path)
@@ -6,7 +6,7 @@ import os
 import re
 import json
 from base64 import b64decode
-from typing import Union
+from typing import Optional, Union
 
 import requests
 from PIL import Image
@@ -142,7 +142,7 @@ def _run_translate_sync(pil_image, config: Config, task_id: str = None, cancel_c
     """
     import threading
 #     import gc
-    from manga_translator.server.core.task_manager import update_task_thread_id, get_global_translator
+    from manga_translator.server.core.task_manager import update_task_thread_id, get_global_translator, get_translator_loop
     
     # 更新任务的线程ID
     if task_id:
@@ -155,9 +155,8 @@ def _run_translate_sync(pil_image, config: Config, task_id: str = None, cancel_c
     if cancel_check_callback:
         translator.set_cancel_check_callback(cancel_check_callback)
     
-    # 在新线程中创建事件循环来运行异步翻译
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
+    # 使用本线程长期复用的事件循环运行异步翻译（连接池中的 HTTP 会话跨请求保留）
+    loop = get_translator_loop()
     try:
         result = loop.run_until_complete(translator.translate(pil_image, config))
         return result
@@ -167,18 +166,18 @@ def _run_translate_sync(pil_image, config: Config, task_id: str = None, cancel_c
             if cancel_check_callback:
                 translator.set_cancel_check_callback(None)
             
-            # 关闭事件循环前，取消所有待处理的任务
+            # 请求结束时取消所有待处理的任务（事件循环留给本线程的下一个请求），
+            # 连接池关闭退役会话的任务除外，等它们完成
+            from manga_translator.translators.http_pool import is_close_task
             pending = asyncio.all_tasks(loop)
             for task in pending:
-                task.cancel()
+                if not is_close_task(task):
+                    task.cancel()
             
             # 等待所有任务取消完成
             if pending:
                 loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
             
-            # 关闭事件循环
-            loop.close()
-            
             # 清除线程局部的事件循环引用（Docker环境关键）
             asyncio.set_event_loop(None)
             
@@ -190,7 +189,7 @@ def _run_translate_sync(pil_image, config: Config, task_id: str = None, cancel_c
             logger.warning(f"线程清理时出错: {e}")
 
 
-def _run_translate_batch_sync(images_with_configs: list, batch_size: int, task_id: str = None, cancel_check_callback=None):
+def _run_translate_batch_sync(images_with_configs: list, batch_size: int, task_id: str = None, cancel_check_callback=None, result_callback=None):
     """
     同步执行批量翻译操作的辅助函数。
     用于在线程池中运行，避免阻塞 FastAPI 事件循环。
@@ -201,10 +200,11 @@ def _run_translate_batch_sync(images_with_configs: list, batch_size: int, task_i
         batch_size: 批量大小
         task_id: 任务ID（用于更新线程信息）
         cancel_check_callback: 取消检查回调函数
+        result_callback: 单张图片完成回调函数 callback(ctx)，在本线程中调用
     """
     import threading
 #     import gc
-    from manga_translator.server.core.task_manager import update_task_thread_id, get_global_translator
+    from manga_translator.server.core.task_manager import update_task_thread_id, get_global_translator, get_translator_loop
     
     # 更新任务的线程ID
     if task_id:
@@ -216,10 +216,11 @@ def _run_translate_batch_sync(images_with_configs: list, batch_size: int, task_i
     # 设置取消检查回调
     if cancel_check_callback:
         translator.set_cancel_check_callback(cancel_check_callback)
+    if result_callback:
+        translator.set_result_callback(result_callback)
     
-    # 在新线程中创建事件循环来运行异步翻译
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
+    # 使用本线程长期复用的事件循环运行异步翻译（连接池中的 HTTP 会话跨请求保留）
+    loop = get_translator_loop()
     try:
         result = loop.run_until_complete(translator.translate_batch(images_with_configs, batch_size))
         return result
@@ -228,19 +229,21 @@ def _run_translate_batch_sync(images_with_configs: list, batch_size: int, task_i
             # 清除取消回调
             if cancel_check_callback:
                 translator.set_cancel_check_callback(None)
+            if result_callback:
+                translator.set_result_callback(None)
             
-            # 关闭事件循环前，取消所有待处理的任务
+            # 请求结束时取消所有待处理的任务（事件循环留给本线程的下一个请求），
+            # 连接池关闭退役会话的任务除外，等它们完成
+            from manga_translator.translators.http_pool import is_close_task
             pending = asyncio.all_tasks(loop)
             for task in pending:
-                task.cancel()
+                if not is_close_task(task):
+                    task.cancel()
             
             # 等待所有任务取消完成
             if pending:
                 loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
             
-            # 关闭事件循环
-            loop.close()
-            
             # 清除线程局部的事件循环引用（Docker环境关键）
             asyncio.set_event_loop(None)
             
@@ -314,7 +317,18 @@ def prepare_translator_params(config: Config, workflow: str = "normal") -> dict:
     return translator_params
 
 
-async def get_ctx(req: Request, config: Config, image: str|bytes, workflow: str = "normal"):
+def _queue_element(req: Request, config: Config, image=None, images=None, batch_size: int = 1, username: Optional[str] = None):
+    """创建排队元素：按用户所属用户组确定优先级，同一用户的任务参与轮转"""
+    from manga_translator.server.myqueue import QueueElement, BatchQueueElement, get_user_queue_priority
+    
+    username = username or getattr(config, '_username', None)
+    priority = get_user_queue_priority(username)
+    if images is not None:
+        return BatchQueueElement(req, images, config, batch_size, username=username, priority=priority)
+    return QueueElement(req, image, config, 0, username=username, priority=priority)
+
+
+async def get_ctx(req: Request, config: Config, image: str|bytes, workflow: str = "normal", username: Optional[str] = None):
     """Translate single image. 使用全局翻译器实例，复用已加载的模型。"""
     from manga_translator.server.core.task_manager import get_semaphore
     from manga_translator.server.core.logging_manager import add_log
@@ -331,15 +345,12 @@ async def get_ctx(req: Request, config: Config, image: str|bytes, workflow: str
         async with with_user_env_vars(config):
             # 等待获取翻译槽位
             if translation_semaphore:
-                try:
-                    waiters_count = len(translation_semaphore._waiters) if hasattr(translation_semaphore, '_waiters') and translation_semaphore._waiters else 0
-                except:
-                    waiters_count = 0
+                waiters_count = translation_semaphore.waiting
                 
                 if waiters_count > 0:
                     add_log(f"等待翻译槽位... (队列中有 {waiters_count} 个任务)", "INFO")
                 
-                async with translation_semaphore:
+                async with translation_semaphore.acquire(_queue_element(req, config, image=pil_image, username=username)):
                     add_log("获得翻译槽位，开始翻译", "INFO")
                     # 使用翻译线程池执行，复用全局翻译器
                     from manga_translator.server.core.task_manager import run_in_translator_thread
@@ -447,10 +458,7 @@ async def while_streaming(req: Request, transform, config: Config, image: bytes
             
             if translation_semaphore:
                 # 检查当前等待队列
-                try:
-                    waiters_count = len(translation_semaphore._waiters) if hasattr(translation_semaphore, '_waiters') and translation_semaphore._waiters else 0
-                except:
-                    waiters_count = 0
+                waiters_count = translation_semaphore.waiting
                 
                 if waiters_count > 0:
                     add_log(f"等待翻译槽位... (队列中有 {waiters_count} 个任务)", "INFO")
@@ -463,7 +471,7 @@ async def while_streaming(req: Request, transform, config: Config, image: bytes
                 
                 # 等待获取 semaphore（这里会真正排队）
                 print(f"[DEBUG] 准备获取 semaphore, task_id={task_id}, waiters={waiters_count}")
-                async with translation_semaphore:
+                async with translation_semaphore.acquire(_queue_element(req, config, image=image, username=username)):
                     # 获得槽位后，更新状态为 running
                     print(f"[DEBUG] 获得 semaphore! task_id={task_id}, 更新状态为 running")
                     update_task_status(task_id, "running")
@@ -643,11 +651,14 @@ def pack_message(status: int, data: bytes) -> bytes:
 
 
 
-async def get_batch_ctx(req: Request, config: Config, images: list[str|bytes], batch_size: int = 4, workflow: str = "normal", task_id: str = None):
+async def get_batch_ctx(req: Request, config: Config, images: list[str|bytes], batch_size: int = 4, workflow: str = "normal", task_id: str = None, result_callback=None, username: Optional[str] = None):
     """批量翻译（使用 UI 层逻辑）
     
     Args:
         task_id: 任务ID，用于检查取消状态
+        username: 用户名，用于确定排队优先级（默认取 config._username）
+        result_callback: 单张图片完成回调 callback(index, ctx)，在翻译线程中调用，
+            index 为该图片在 images 中的位置；无法对应到输入图片的结果不会回调（只在最终返回值中）
     """
     from manga_translator.server.core.task_manager import is_task_cancelled, get_semaphore
     from manga_translator.server.core.logging_manager import add_log
@@ -677,6 +688,19 @@ async def get_batch_ctx(req: Request, config: Config, images: list[str|bytes], b
         # 准备批量数据
         images_with_configs = [(img, config) for img in pil_images]
         
+        # 翻译器在构建 ctx 时写入 ctx.image_index（并发流水线会从磁盘重新加载图片，
+        # ctx.input 不再是原始对象）；缺失时才退回按原始图片对象查找
+        page_callback = None
+        if result_callback:
+            index_by_image = {id(img): i for i, img in enumerate(pil_images)}
+            
+            def page_callback(ctx):
+                index = getattr(ctx, 'image_index', None)
+                if index is None:
+                    index = index_by_image.get(id(getattr(ctx, 'input', None)))
+                if index is not None:
+                    result_callback(index, ctx)
+        
         # 使用统一的环境变量管理包装器
         async with with_user_env_vars(config):
             # 翻译前再次检查取消状态
@@ -686,16 +710,15 @@ async def get_batch_ctx(req: Request, config: Config, images: list[str|bytes], b
             # 等待获取翻译槽位（与流式端点保持一致）
             if translation_semaphore:
                 from manga_translator.server.core.task_manager import update_task_status
-                try:
-                    waiters_count = len(translation_semaphore._waiters) if hasattr(translation_semaphore, '_waiters') and translation_semaphore._waiters else 0
-                except:
-                    waiters_count = 0
+                waiters_count = translation_semaphore.waiting
                 
                 print(f"[DEBUG] get_batch_ctx 准备获取 semaphore, task_id={task_id}, waiters={waiters_count}")
                 if waiters_count > 0:
                     add_log(f"批量翻译等待槽位... (队列中有 {waiters_count} 个任务)", "INFO")
                 
-                async with translation_semaphore:
+                async with translation_semaphore.acquire(
+                    _queue_element(req, config, images=pil_images, batch_size=batch_size, username=username)
+                ):
                     print(f"[DEBUG] get_batch_ctx 获得 semaphore! task_id={task_id}")
                     if task_id:
                         update_task_status(task_id, "running")
@@ -705,14 +728,14 @@ async def get_batch_ctx(req: Request, config: Config, images: list[str|bytes], b
                     from manga_translator.server.core.task_manager import run_in_translator_thread
                     cancel_callback = (lambda: is_task_cancelled(task_id)) if task_id else None
                     contexts = await run_in_translator_thread(
-                        _run_translate_batch_sync, images_with_configs, batch_size, task_id, cancel_callback
+                        _run_translate_batch_sync, images_with_configs, batch_size, task_id, cancel_callback, page_callback
                     )
             else:
                 # 没有 semaphore 时直接执行
                 from manga_translator.server.core.task_manager import run_in_translator_thread
                 cancel_callback = (lambda: is_task_cancelled(task_id)) if task_id else None
                 contexts = await run_in_translator_thread(
-                    _run_translate_batch_sync, images_with_configs, batch_size, task_id, cancel_callback
+                    _run_translate_batch_sync, images_with_configs, batch_size, task_id, cancel_callback, page_callback
                 )
             
             # 翻译后检查取消状态
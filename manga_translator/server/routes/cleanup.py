@@ -321,11 +321,11 @@ async def preview_cleanup(
             filters['session_tokens'] = request.session_tokens
         
         # Get sessions that would be deleted
-        from manga_translator.server.repositories.translation_repository import TranslationRepository
+        from manga_translator.server.repositories.translation_repository import create_translation_repository
         from manga_translator.server.models import TranslationResult
         from datetime import datetime
         
-        translation_repo = TranslationRepository(
+        translation_repo = create_translation_repository(
             'manga_translator/server/data/translation_history.json'
         )
         
@@ -6,14 +6,16 @@
 
 import logging
 import os
+from datetime import datetime, timezone
 from typing import List, Optional
-from fastapi import APIRouter, HTTPException, Depends, Query, BackgroundTasks
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi.responses import FileResponse, StreamingResponse
 from pydantic import BaseModel
 
 from manga_translator.server.core.middleware import require_auth, require_admin
 from manga_translator.server.core.models import Session
 from manga_translator.server.core.history_service import HistoryManagementService
+from manga_translator.server.core.zip_stream import content_disposition, iter_zip_files
 from manga_translator.server.core.search_service import SearchService
 from manga_translator.server.core.permission_integration import IntegratedPermissionService
 
@@ -295,6 +297,8 @@ async def search_history(
     start_date: Optional[str] = Query(None, description="开始日期 (ISO格式)"),
     end_date: Optional[str] = Query(None, description="结束日期 (ISO格式)"),
     status: Optional[str] = Query(None, description="状态筛选"),
+    page: int = Query(1, ge=1, description="页码"),
+    page_size: Optional[int] = Query(None, ge=1, description="每页数量（不指定则返回全部）"),
     session: Session = Depends(require_auth),
     search_service: SearchService = Depends(get_search_service),
     permission_service: IntegratedPermissionService = Depends(get_permission_service)
@@ -309,6 +313,8 @@ async def search_history(
         start_date: 开始日期
         end_date: 结束日期
         status: 状态筛选
+        page: 页码
+        page_size: 每页数量
         session: 用户会话
         search_service: 搜索服务
         permission_service: 权限管理服务
@@ -343,7 +349,7 @@ async def search_history(
         user_id = None if is_admin else session.username
         
         # 执行搜索
-        results = search_service.search(q, filters, user_id)
+        results, total = search_service.search_page(q, filters, user_id, page, page_size)
         
         # 获取搜索统计
         stats = search_service.get_search_stats(q, filters, user_id)
@@ -353,6 +359,9 @@ async def search_history(
             "query": q,
             "results": [result.to_dict() for result in results],
             "count": len(results),
+            "total": total,
+            "page": page,
+            "page_size": page_size,
             "stats": stats
         }
     
@@ -368,7 +377,6 @@ async def search_history(
 @router.get("/{session_token}/download")
 async def download_session(
     session_token: str,
-    background_tasks: BackgroundTasks,
     filename: Optional[str] = Query(None, description="自定义下载文件名"),
     session: Session = Depends(require_auth),
     history_service: HistoryManagementService = Depends(get_history_service),
@@ -385,7 +393,7 @@ async def download_session(
         permission_service: 权限管理服务
     
     Returns:
-        FileResponse: ZIP文件
+        StreamingResponse: ZIP文件（边打包边发送）
     """
     # 检查查看权限
     view_permission = permission_service.get_view_history_permission(session.username)
@@ -401,28 +409,25 @@ async def download_session(
         is_admin = session.role == 'admin'
         user_id = None if is_admin else session.username
         
-        # 创建ZIP文件（history_service 会自动检查所有权）
-        zip_path = history_service.create_download_archive(session_token, user_id)
+        # 获取要打包的文件（history_service 会自动检查所有权）
+        entries = history_service.get_download_entries(session_token, user_id)
         
-        if not zip_path or not os.path.exists(zip_path):
+        if not entries:
             raise HTTPException(
                 status_code=404,
                 detail="会话不存在"
             )
         
-        # 添加后台任务清理临时文件
-        background_tasks.add_task(history_service.cleanup_temp_file, zip_path)
-        
         # 使用自定义文件名或默认文件名
         download_filename = filename if filename else f"history_{session_token[:8]}.zip"
         if not download_filename.endswith('.zip'):
             download_filename += '.zip'
         
-        # 返回文件
-        return FileResponse(
-            path=zip_path,
-            filename=download_filename,
-            media_type="application/zip"
+        # 边打包边发送，不生成临时文件
+        return StreamingResponse(
+            iter_zip_files(entries),
+            media_type="application/zip",
+            headers={"Content-Disposition": content_disposition(download_filename)}
         )
     
     except HTTPException:
@@ -435,7 +440,6 @@ async def download_session(
 @router.post("/batch-download")
 async def batch_download_sessions(
     request: BatchDownloadRequest,
-    background_tasks: BackgroundTasks,
     session: Session = Depends(require_auth),
     history_service: HistoryManagementService = Depends(get_history_service),
     permission_service: IntegratedPermissionService = Depends(get_permission_service)
@@ -450,7 +454,7 @@ async def batch_download_sessions(
         permission_service: 权限管理服务
     
     Returns:
-        FileResponse: ZIP文件
+        StreamingResponse: ZIP文件（边打包边发送）
     """
     # 检查查看权限
     view_permission = permission_service.get_view_history_permission(session.username)
@@ -473,26 +477,18 @@ async def batch_download_sessions(
         is_admin = session.role == 'admin'
         user_id = None if is_admin else session.username
         
-        # 创建批量ZIP文件
-        zip_path = history_service.create_batch_download_archive(
+        # 获取要打包的文件
+        entries = history_service.get_batch_download_entries(
             request.session_tokens,
             user_id
         )
         
-        if not zip_path or not os.path.exists(zip_path):
-            raise HTTPException(
-                status_code=404,
-                detail="无法创建下载文件或您没有访问权限"
-            )
-        
-        # 添加后台任务清理临时文件
-        background_tasks.add_task(history_service.cleanup_temp_file, zip_path)
-        
-        # 返回文件
-        return FileResponse(
-            path=zip_path,
-            filename=os.path.basename(zip_path),
-            media_type="application/zip"
+        # 边打包边发送，不生成临时文件
+        zip_filename = f"batch_download_{datetime.now(timezone.utc).strftime('%Y%m%d_%H%M%S')}.zip"
+        return StreamingResponse(
+            iter_zip_files(entries),
+            media_type="application/zip",
+            headers={"Content-Disposition": content_disposition(zip_filename)}
         )
     
     except HTTPException:
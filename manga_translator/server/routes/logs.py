@@ -6,14 +6,14 @@
 需求: 31.1-31.6, 32.1-32.8, 33.1-33.8
 """
 
-from fastapi import APIRouter, Query, HTTPException, Depends
+from fastapi import APIRouter, Query, HTTPException, Depends, Header, Request
 from fastapi.responses import StreamingResponse
 from typing import Optional, List
 from pydantic import BaseModel
 import io
 
 from manga_translator.server.core.log_management_service import LogManagementService
-from manga_translator.server.repositories.log_repository import LogRepository
+from manga_translator.server.repositories.log_repository import create_log_repository
 from manga_translator.server.core.session_security_service import SessionSecurityService
 from manga_translator.server.core.middleware import require_auth, require_admin
 from manga_translator.server.core.models import Session
@@ -22,7 +22,7 @@ from manga_translator.server.core.models import Session
 logs_router = APIRouter(prefix='/api/logs', tags=['logs'])
 
 # 初始化服务
-log_repo = LogRepository('manga_translator/server/data/logs.json')
+log_repo = create_log_repository('manga_translator/server/data/logs.json')
 log_service = LogManagementService(log_repo)
 session_security_service = SessionSecurityService()
 
@@ -226,17 +226,23 @@ async def get_logs(
     task_id: Optional[str] = Query(None, description='任务ID过滤'),
     limit: int = Query(50, description='返回数量限制'),
     level: Optional[str] = Query(None, description='日志级别过滤'),
+    after: Optional[int] = Query(None, description='游标：只返回 seq 大于该值的日志'),
     session: Session = Depends(require_auth)
 ):
     """
     获取日志（支持按任务ID过滤）
     
-    用于用户端实时查看翻译任务日志
+    用于用户端实时查看翻译任务日志。每条日志带递增的 seq，
+    轮询时传入 after=上次收到的最后一个 seq 只返回新日志。
     """
     try:
-        from manga_translator.server.core.logging_manager import get_task_logs
+        from manga_translator.server.core.logging_manager import get_task_logs, get_logs_after
         
         if task_id:
+            if after is not None:
+                # 按游标增量获取
+                logs, _, _ = get_logs_after(after, task_id=task_id, level=level, limit=limit)
+                return logs
             # 按任务ID获取日志
             logs = get_task_logs(task_id, limit)
             return logs
@@ -248,6 +254,40 @@ async def get_logs(
         raise HTTPException(status_code=500, detail=f'Failed to retrieve logs: {str(e)}')
 
 
+@logs_router.get('/stream')
+async def stream_logs(
+    request: Request,
+    task_id: Optional[str] = Query(None, description='任务ID过滤'),
+    session_id: Optional[str] = Query(None, description='会话ID过滤（仅管理员）'),
+    level: Optional[str] = Query(None, description='日志级别过滤'),
+    cursor: Optional[int] = Query(None, description='游标：只推送 seq 大于该值的日志'),
+    tail: int = Query(200, description='未指定游标时先推送的最近日志条数'),
+    last_event_id: Optional[str] = Header(None, alias='Last-Event-ID'),
+    session: Session = Depends(require_auth)
+):
+    """
+    以 SSE（text/event-stream）推送日志
+    
+    普通用户只能订阅指定任务的日志，管理员可以订阅全部日志或按会话过滤。
+    浏览器 EventSource 无法设置请求头，可用 ?token= 传递会话令牌；断线重连时以 Last-Event-ID 续传。
+    """
+    from manga_translator.server.core.logging_manager import iter_log_events, get_log_cursor
+    
+    if not task_id and session.role != 'admin':
+        raise HTTPException(status_code=403, detail='只有管理员可以订阅全部日志')
+    
+    if cursor is None and last_event_id and last_event_id.isdigit():
+        cursor = int(last_event_id)
+    if cursor is None:
+        cursor = get_log_cursor(task_id, tail)
+    
+    return StreamingResponse(
+        iter_log_events(request.is_disconnected, cursor, task_id, session_id, level),
+        media_type='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
 @logs_router.get('/user')
 async def get_user_logs(
     level: Optional[str] = Query(None, description='日志级别过滤'),
@@ -4,11 +4,13 @@ Translation routes module.
 This module contains all /translate/* endpoints for the manga translator server.
 """
 
+import asyncio
 import io
 import os
 import secrets
 import zipfile
 import tempfile
+from typing import Union
 from fastapi import APIRouter, Request, UploadFile, File, Form, HTTPException
 from fastapi.responses import StreamingResponse
 
@@ -21,6 +23,7 @@ from manga_translator.server.core.response_utils import (
     transform_to_image, transform_to_json, transform_to_bytes, apply_user_env_vars
 )
 from manga_translator.server.core.logging_manager import add_log
+from manga_translator.server.core.zip_stream import ZipStreamWriter
 from manga_translator.server.routes.translation_auth import (
     verify_translation_auth,
     log_translation_task_created,
@@ -55,7 +58,7 @@ async def translate_json(req: Request, data: TranslateRequest):
         log_translation_task_created(username, ip_address, translator, data.config)
         
         # Process translation
-        ctx = await get_ctx(req, data.config, data.image, "save_json")
+        ctx = await get_ctx(req, data.config, data.image, "save_json", username=username)
         return to_translation(ctx)
     finally:
         # Track task end (只有 track_task_start 成功后才会执行到这里)
@@ -82,7 +85,7 @@ async def bytes(req: Request, data: TranslateRequest):
         log_translation_task_created(username, ip_address, translator, data.config)
         
         # Process translation
-        ctx = await get_ctx(req, data.config, data.image, "save_json")
+        ctx = await get_ctx(req, data.config, data.image, "save_json", username=username)
         return StreamingResponse(content=to_translation(ctx).to_bytes())
     finally:
         # Track task end
@@ -109,7 +112,7 @@ async def image(req: Request, data: TranslateRequest) -> StreamingResponse:
         log_translation_task_created(username, ip_address, translator, data.config)
         
         # Process translation
-        ctx = await get_ctx(req, data.config, data.image, "normal")
+        ctx = await get_ctx(req, data.config, data.image, "normal", username=username)
         
         if not ctx.result:
             raise HTTPException(500, detail="Translation failed: no result image generated")
@@ -397,7 +400,7 @@ async def translate_batch_json(req: Request, data: BatchTranslateRequest):
         config._user_env_vars = env_vars
         
         # Process batch translation (pass task_id for cancel checking)
-        results = await get_batch_ctx(req, config, data.images, data.batch_size, "normal", task_id)
+        results = await get_batch_ctx(req, config, data.images, data.batch_size, "normal", task_id, username=username)
         
         # Save each result to history
         from manga_translator.server.request_extraction import save_translation_to_history
@@ -427,10 +430,82 @@ async def translate_batch_json(req: Request, data: BatchTranslateRequest):
         unregister_active_task(task_id)
 
 
+# 批量图片输出格式映射
+_BATCH_IMAGE_FORMATS = {
+    'jpg': ('JPEG', '.jpg'),
+    'jpeg': ('JPEG', '.jpg'),
+    'png': ('PNG', '.png'),
+    'webp': ('WEBP', '.webp'),
+    'gif': ('GIF', '.gif'),
+    'bmp': ('BMP', '.bmp'),
+}
+
+
+def _encode_batch_image(image, index: int, filenames: list, output_format: str = None):
+    """
+    把批量翻译的结果图片编码为 ZIP 条目
+    
+    Returns:
+        (压缩包内文件名, 图片字节)
+    """
+    from PIL import Image
+    
+    # 获取原始文件名
+    original_name = filenames[index] if index < len(filenames) else None
+    
+    # 确定输出格式和扩展名
+    if output_format and output_format in _BATCH_IMAGE_FORMATS:
+        save_format, ext = _BATCH_IMAGE_FORMATS[output_format]
+    elif original_name:
+        # 保持原始扩展名
+        orig_ext = os.path.splitext(original_name)[1].lower()
+        save_format, ext = _BATCH_IMAGE_FORMATS.get(orig_ext.lstrip('.'), ('PNG', '.png'))
+    else:
+        save_format, ext = 'PNG', '.png'
+    
+    # 生成输出文件名
+    if original_name:
+        base_name = os.path.splitext(os.path.basename(original_name))[0]
+        output_name = f"{base_name}{ext}"
+    else:
+        output_name = f"translated_{index+1}{ext}"
+    
+    img_to_save = image
+    # JPEG 不支持 RGBA，需要转换为 RGB
+    is_jpeg = save_format == 'JPEG'
+    if is_jpeg and img_to_save.mode == 'RGBA':
+        background = Image.new('RGB', img_to_save.size, (255, 255, 255))
+        background.paste(img_to_save, mask=img_to_save.split()[3])
+        img_to_save = background
+    elif is_jpeg and img_to_save.mode not in ('RGB', 'L'):
+        img_to_save = img_to_save.convert('RGB')
+    img_byte_arr = io.BytesIO()
+    img_to_save.save(img_byte_arr, format=save_format)
+    return output_name, img_byte_arr.getvalue()
+
+
+def _batch_error_to_http(error: BaseException) -> HTTPException:
+    """批量翻译失败 -> HTTP 错误（与同步返回时一致）"""
+    if isinstance(error, asyncio.CancelledError):
+        add_log("批量翻译被强制取消", "WARNING")
+        return HTTPException(499, detail="任务已被强制取消")
+    error_msg = str(error)
+    if "已被取消" in error_msg or "cancelled" in error_msg.lower():
+        add_log("批量翻译已取消", "WARNING")
+        return HTTPException(499, detail="任务已被取消")
+    add_log(f"批量翻译失败: {error}", "ERROR")
+    return HTTPException(500, detail=f"Batch translation failed: {error_msg}")
+
+
 @router.post("/batch/images", response_description="Zip file containing translated images", tags=["api", "batch"])
 async def batch_images(req: Request, data: BatchTranslateRequest):
-    """Batch translate images and return zip archive containing translated images"""
-    import asyncio
+    """
+    Batch translate images and return zip archive containing translated images
+    
+    The archive is streamed: each page is added to the response as soon as it is rendered
+    (chunked transfer, no Content-Length, no temp file). Errors before the first page
+    are returned as HTTP errors; errors after that abort the stream.
+    """
     from manga_translator.server.core.task_manager import register_active_task, unregister_active_task
     from manga_translator.server.core.logging_manager import generate_task_id
     
@@ -441,19 +516,12 @@ async def batch_images(req: Request, data: BatchTranslateRequest):
     
     task_id = generate_task_id()
     
-    # 获取当前 asyncio Task 用于强制取消
-    try:
-        current_task = asyncio.current_task()
-    except RuntimeError:
-        current_task = None
-    
     try:
         add_log(f"批量翻译请求: {len(data.images)} 张图片, batch_size={data.batch_size}", "INFO")
         
         # If config is dict, convert to Config object using parse_config for consistency
         if isinstance(data.config, dict):
             import json
-            from manga_translator.server.core.config_manager import parse_config
             config = parse_config(json.dumps(data.config))
         else:
             config = data.config
@@ -483,58 +551,14 @@ async def batch_images(req: Request, data: BatchTranslateRequest):
         translator = "unknown"
         if hasattr(config, 'translator') and hasattr(config.translator, 'translator'):
             translator = config.translator.translator
-        
-        # Register active task for admin panel visibility (with asyncio Task for force cancel)
-        register_active_task(task_id, current_task, username, translator)
-        
-        # Track task start
-        track_task_start(username)
-        
-        try:
-            # Log task creation
-            log_translation_task_created(username, ip_address, translator, config, f"batch_{len(data.images)}")
-            
-            # Process batch translation (pass task_id for cancel checking)
-            results = await get_batch_ctx(req, config, data.images, data.batch_size, "normal", task_id)
-            add_log(f"批量翻译完成: 收到 {len(results)} 个结果", "INFO")
-        finally:
-            # Track task end
-            track_task_end(username)
-            # Unregister active task
-            unregister_active_task(task_id)
-            
-    except asyncio.CancelledError:
-        add_log("批量翻译被强制取消", "WARNING")
-        raise HTTPException(499, detail="任务已被强制取消")
+    except HTTPException:
+        raise
     except Exception as e:
-        error_msg = str(e)
-        if "已被取消" in error_msg or "cancelled" in error_msg.lower():
-            add_log("批量翻译已取消", "WARNING")
-            raise HTTPException(499, detail="任务已被取消")
-        add_log(f"批量翻译失败: {e}", "ERROR")
-        import traceback
-        traceback.print_exc()
-        raise HTTPException(500, detail=f"Batch translation failed: {error_msg}")
+        raise _batch_error_to_http(e)
     
     # 获取原始文件名列表
     filenames = data.filenames if data.filenames else []
     
-    # 立即将结果图片转换为字节数据，避免图片被关闭后无法访问
-    from PIL import Image
-    result_images = []
-    for i, ctx in enumerate(results):
-        if ctx and ctx.result:
-            try:
-                # 复制图片数据到内存
-                result_images.append({
-                    'index': i,
-                    'image': ctx.result.copy(),
-                    'mode': ctx.result.mode,
-                    'size': ctx.result.size
-                })
-            except Exception as e:
-                add_log(f"复制图片 {i+1} 失败: {e}", "WARNING")
-    
     # 获取配置中的输出格式
     output_format = None
     if config and hasattr(config, 'cli') and hasattr(config.cli, 'format'):
@@ -542,119 +566,126 @@ async def batch_images(req: Request, data: BatchTranslateRequest):
         if fmt and fmt != '不指定':
             output_format = fmt.lower()
     
-    # 格式映射
-    format_map = {
-        'jpg': ('JPEG', '.jpg'),
-        'jpeg': ('JPEG', '.jpg'),
-        'png': ('PNG', '.png'),
-        'webp': ('WEBP', '.webp'),
-        'gif': ('GIF', '.gif'),
-        'bmp': ('BMP', '.bmp'),
-    }
-    
-    # Create temporary ZIP file
-    with tempfile.NamedTemporaryFile(delete=False, suffix='.zip') as tmp_file:
-        tmp_file_name = tmp_file.name
-    
-    # File handle is closed, now safe to write
-    image_count = 0
-    with zipfile.ZipFile(tmp_file_name, 'w') as zip_file:
-        for img_data in result_images:
-            i = img_data['index']
-            img_to_save = img_data['image']
-            
-            # 获取原始文件名
-            original_name = filenames[i] if i < len(filenames) else None
-            
-            # 确定输出格式和扩展名
-            if output_format and output_format in format_map:
-                save_format, ext = format_map[output_format]
-            elif original_name:
-                # 保持原始扩展名
-                orig_ext = os.path.splitext(original_name)[1].lower()
-                save_format, ext = format_map.get(orig_ext.lstrip('.'), ('PNG', '.png'))
-            else:
-                save_format, ext = 'PNG', '.png'
-            
-            # 生成输出文件名
-            if original_name:
-                base_name = os.path.splitext(os.path.basename(original_name))[0]
-                output_name = f"{base_name}{ext}"
-            else:
-                output_name = f"translated_{i+1}{ext}"
-            
-            img_byte_arr = io.BytesIO()
-            # JPEG 不支持 RGBA，需要转换为 RGB
-            is_jpeg = save_format == 'JPEG' or output_name.lower().endswith(('.jpg', '.jpeg'))
-            if is_jpeg and img_to_save.mode == 'RGBA':
-                background = Image.new('RGB', img_to_save.size, (255, 255, 255))
-                background.paste(img_to_save, mask=img_to_save.split()[3])
-                img_to_save = background
-            elif is_jpeg and img_to_save.mode not in ('RGB', 'L'):
-                img_to_save = img_to_save.convert('RGB')
-            img_to_save.save(img_byte_arr, format=save_format)
-            zip_file.writestr(output_name, img_byte_arr.getvalue())
-            image_count += 1
-    
-    add_log(f"ZIP文件创建完成: 包含 {image_count} 张图片", "INFO")
-    
-    # 保存历史记录（使用已复制的图片数据）
-    from manga_translator.server.request_extraction import save_translation_to_history
-    for img_data in result_images:
-        i = img_data['index']
-        original_name = filenames[i] if i < len(filenames) else f"batch_{i+1}.png"
+    # 翻译线程每渲染完一张就编码并放入队列，响应边收边发
+    loop = asyncio.get_running_loop()
+    pages: asyncio.Queue = asyncio.Queue()
+    done = object()
+    outcome = {'results': None, 'error': None}
+    
+    def on_page(index, ctx):
+        if ctx.result is None:
+            return
         try:
-            # 创建一个临时 ctx 对象用于保存历史
-            class TempCtx:
-                pass
-            temp_ctx = TempCtx()
-            temp_ctx.result = img_data['image']
-            temp_ctx.text_regions = results[i].text_regions if results[i] and hasattr(results[i], 'text_regions') else None
-            
-            await save_translation_to_history(
-                temp_ctx, username, f"{task_id}_{i}", "normal", 
-                original_name, config
-            )
+            entry = _encode_batch_image(ctx.result, index, filenames, output_format)
         except Exception as e:
-            add_log(f"保存历史失败 (图片 {i+1}): {e}", "WARNING")
+            add_log(f"编码图片 {index+1} 失败: {e}", "WARNING")
+            return
+        loop.call_soon_threadsafe(pages.put_nowait, (index, entry))
     
-    # 读取 ZIP 文件内容
-    with open(tmp_file_name, 'rb') as f:
-        zip_data = f.read()
+    async def run_translation():
+        # Track task start（在 try 之前，保证与 finally 中的 track_task_end 成对）
+        track_task_start(username)
+        try:
+            # Log task creation
+            log_translation_task_created(username, ip_address, translator, config, f"batch_{len(data.images)}")
+            
+            # Process batch translation (pass task_id for cancel checking)
+            results = await get_batch_ctx(req, config, data.images, data.batch_size, "normal", task_id, result_callback=on_page, username=username)
+            add_log(f"批量翻译完成: 收到 {len(results)} 个结果", "INFO")
+            outcome['results'] = results
+        except BaseException as e:
+            outcome['error'] = e
+            if not isinstance(e, Exception):
+                raise
+            return
+        finally:
+            # Track task end
+            track_task_end(username)
+            # Unregister active task
+            unregister_active_task(task_id)
+            pages.put_nowait(done)
+        
+        # 保存历史记录（不依赖客户端是否还在接收）
+        from manga_translator.server.request_extraction import save_translation_to_history
+        for i, ctx in enumerate(results):
+            if not ctx or ctx.result is None:
+                continue
+            original_name = filenames[i] if i < len(filenames) else f"batch_{i+1}.png"
+            try:
+                # 创建一个临时 ctx 对象用于保存历史
+                class TempCtx:
+                    pass
+                temp_ctx = TempCtx()
+                temp_ctx.result = ctx.result
+                temp_ctx.text_regions = ctx.text_regions if hasattr(ctx, 'text_regions') else None
+                
+                await save_translation_to_history(
+                    temp_ctx, username, f"{task_id}_{i}", "normal",
+                    original_name, config
+                )
+            except Exception as e:
+                add_log(f"保存历史失败 (图片 {i+1}): {e}", "WARNING")
     
-    # 清理临时文件
+    translation_task = asyncio.create_task(run_translation())
+    # Register active task for admin panel visibility (with asyncio Task for force cancel)
     try:
-        os.unlink(tmp_file_name)
-    except PermissionError:
-        import atexit
-        atexit.register(lambda: os.unlink(tmp_file_name) if os.path.exists(tmp_file_name) else None)
+        register_active_task(task_id, translation_task, username, translator)
+    except BaseException:
+        translation_task.cancel()
+        raise
     
-    # 显式清理复制的图片内存
-    for img_data in result_images:
-        try:
-            if img_data.get('image'):
-                img_data['image'].close()
-        except:
-            pass
-    result_images.clear()
+    # 等到第一张图片完成（或失败）再开始响应，这样提前失败时仍能返回正确的状态码
+    first = await pages.get()
+    if first is done and outcome['error'] is not None:
+        raise _batch_error_to_http(outcome['error'])
+    
+    async def stream_zip():
+        writer = ZipStreamWriter()
+        streamed = set()
+        item = first
+        while item is not done:
+            index, (name, image_bytes) = item
+            streamed.add(index)
+            yield writer.add(name, image_bytes)
+            item = await pages.get()
+        
+        if outcome['error'] is not None:
+            # 已经开始发送，无法再改状态码：中断响应，客户端会收到不完整的数据
+            add_log(f"批量翻译在发送过程中失败: {outcome['error']}", "ERROR")
+            raise RuntimeError(f"Batch translation failed: {outcome['error']}")
+        
+        # 没有通过回调发送的结果（无法对应到输入图片时）在最后补上
+        for i, ctx in enumerate(outcome['results'] or []):
+            if i in streamed or not ctx or ctx.result is None:
+                continue
+            try:
+                name, image_bytes = await asyncio.to_thread(_encode_batch_image, ctx.result, i, filenames, output_format)
+            except Exception as e:
+                add_log(f"编码图片 {i+1} 失败: {e}", "WARNING")
+                continue
+            yield writer.add(name, image_bytes)
+        
+        yield writer.close()
+        add_log(f"ZIP文件发送完成: 包含 {writer.entries} 张图片", "INFO")
     
-    # 返回 ZIP 数据，不使用 Content-Disposition: attachment（避免 IDM 拦截）
-    # 使用 inline 或不设置，让浏览器直接处理而不触发下载
+    # 不使用 Content-Disposition: attachment（避免 IDM 拦截）
+    # 使用通用二进制类型，避免 IDM 识别为 ZIP；不设置 Content-Length，使用分块传输
     return StreamingResponse(
-        io.BytesIO(zip_data),
-        media_type="application/octet-stream",  # 使用通用二进制类型，避免 IDM 识别为 ZIP
+        stream_zip(),
+        media_type="application/octet-stream",
         headers={
-            "Content-Length": str(len(zip_data)),
             "X-Content-Type": "application/zip"  # 自定义 header 告诉前端这是 ZIP
         }
     )
 
 
-@router.post("/queue-size", response_model=int, tags=["api", "json"])
-async def queue_size() -> int:
-    """Get current translation queue size"""
+@router.post("/queue-size", response_model=Union[int, dict], tags=["api", "json"])
+async def queue_size(detail: bool = False) -> Union[int, dict]:
+    """Get current translation queue size, or depth/wait-time metrics when detail=true"""
     from manga_translator.server.myqueue import task_queue
-    return len(task_queue.queue)
+    if detail:
+        return task_queue.metrics()
+    return len(task_queue)
 
 
 
@@ -677,7 +708,7 @@ async def export_original(req: Request, image: UploadFile = File(...), config: s
     conf._user_env_vars = env_vars
     
     # Use specified workflow for processing
-    ctx = await get_ctx(req, conf, img, "export_original")
+    ctx = await get_ctx(req, conf, img, "export_original", username=username)
     
     # Convert result to JSON format
     translation_data = to_translation(ctx)
@@ -767,7 +798,7 @@ async def export_translated(req: Request, image: UploadFile = File(...), config:
     conf._user_env_vars = env_vars
     
     # Use specified workflow for processing
-    ctx = await get_ctx(req, conf, img, "save_json")
+    ctx = await get_ctx(req, conf, img, "save_json", username=username)
     
     # Convert result to JSON format
     translation_data = to_translation(ctx)
@@ -893,7 +924,7 @@ async def upscale_only(req: Request, image: UploadFile = File(...), config: str
     env_vars = await apply_user_env_vars(user_env_vars, conf, admin_settings, username)
     conf._user_env_vars = env_vars
     
-    ctx = await get_ctx(req, conf, img, "upscale_only")
+    ctx = await get_ctx(req, conf, img, "upscale_only", username=username)
     
     if ctx.result:
         img_byte_arr = io.BytesIO()
@@ -916,7 +947,7 @@ async def colorize_only(req: Request, image: UploadFile = File(...), config: str
     env_vars = await apply_user_env_vars(user_env_vars, conf, admin_settings, username)
     conf._user_env_vars = env_vars
     
-    ctx = await get_ctx(req, conf, img, "colorize_only")
+    ctx = await get_ctx(req, conf, img, "colorize_only", username=username)
     
     if ctx.result:
         img_byte_arr = io.BytesIO()
@@ -939,7 +970,7 @@ async def inpaint_only(req: Request, image: UploadFile = File(...), config: str
     env_vars = await apply_user_env_vars(user_env_vars, conf, admin_settings, username)
     conf._user_env_vars = env_vars
     
-    ctx = await get_ctx(req, conf, img, "inpaint_only")
+    ctx = await get_ctx(req, conf, img, "inpaint_only", username=username)
     
     if ctx.result:
         img_byte_arr = io.BytesIO()
@@ -1050,7 +1081,7 @@ async def import_json_and_render(req: Request, image: UploadFile = File(...), js
         temp_image.name = temp_image_path
         
         # Use load_text workflow, call through get_ctx (supports task queue)
-        ctx = await get_ctx(req, conf, temp_image, "load_text")
+        ctx = await get_ctx(req, conf, temp_image, "load_text", username=username)
         
         if ctx.result:
             img_byte_arr = io.BytesIO()
@@ -1164,7 +1195,7 @@ async def import_txt_and_render(req: Request, image: UploadFile = File(...), txt
         temp_image.name = temp_image_path
         
         # Use load_text workflow, call through get_ctx (supports task queue)
-        ctx = await get_ctx(req, conf, temp_image, "load_text")
+        ctx = await get_ctx(req, conf, temp_image, "load_text", username=username)
         
         if ctx.result:
             img_byte_arr = io.BytesIO()
@@ -1376,7 +1407,7 @@ async def translate_complete(req: Request, image: UploadFile = File(...), config
     conf._user_env_vars = env_vars
     
     # Execute translation
-    ctx = await get_ctx(req, conf, img, "normal")
+    ctx = await get_ctx(req, conf, img, "normal", username=username)
     
     # Get JSON data
     translation_data = to_translation(ctx)
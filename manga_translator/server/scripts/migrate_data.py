@@ -0,0 +1,88 @@
+"""
+JSON -> SQLite 数据迁移脚本
+
+将翻译历史、日志、配额和会话数据从 JSON 文件导入到 SQLite 数据库（与 JSON 文件同目录，后缀为 .db）。
+迁移完成后设置环境变量 MT_STORAGE_BACKEND=sqlite 启动服务器即可使用 SQLite 存储。
+原 JSON 文件不会被修改或删除，可随时切换回 JSON 存储。
+
+用法：
+    python -m manga_translator.server.scripts.migrate_data [--data-dir DIR] [--force]
+"""
+
+import argparse
+import os
+import sys
+import time
+from typing import Callable, Dict, List, Tuple
+
+from manga_translator.server.repositories.sqlite_repository import SQLiteRepository
+from manga_translator.server.repositories.log_repository import SQLiteLogRepository
+from manga_translator.server.repositories.quota_repository import SQLiteQuotaRepository
+from manga_translator.server.repositories.session_repository import SQLiteSessionRepository
+from manga_translator.server.repositories.translation_repository import SQLiteTranslationRepository
+
+
+DEFAULT_DATA_DIR = "manga_translator/server/data"
+
+
+def _targets(data_dir: str) -> List[Tuple[str, str, Callable[[], SQLiteRepository]]]:
+    """(名称, 数据库路径, 创建仓库的函数)"""
+    return [
+        ('translation_history', os.path.join(data_dir, 'translation_history.db'),
+         lambda: SQLiteTranslationRepository(os.path.join(data_dir, 'translation_history.json'))),
+        ('logs', os.path.join(data_dir, 'logs.db'),
+         lambda: SQLiteLogRepository(os.path.join(data_dir, 'logs.json'))),
+        ('quotas', os.path.join(data_dir, 'quotas.db'),
+         lambda: SQLiteQuotaRepository(os.path.join(data_dir, 'quotas.json'))),
+        ('sessions', os.path.join(data_dir, 'sessions.db'),
+         lambda: SQLiteSessionRepository(data_dir)),
+    ]
+
+
+def migrate_data(data_dir: str = DEFAULT_DATA_DIR, force: bool = False) -> Dict[str, Dict[str, int]]:
+    """
+    将 JSON 数据导入 SQLite
+
+    Args:
+        data_dir: 数据目录路径
+        force: 数据库已存在时删除并重新导入
+
+    Returns:
+        {名称: {集合名: 条目数}}，已存在且未指定 force 的数据库会被跳过
+    """
+    result = {}
+    for name, db_path, create_repo in _targets(data_dir):
+        if os.path.exists(db_path):
+            if not force:
+                print(f"[skip] {name}: {db_path} already exists (use --force to re-import)")
+                continue
+            for suffix in ('', '-wal', '-shm'):
+                if os.path.exists(db_path + suffix):
+                    os.remove(db_path + suffix)
+
+        start = time.perf_counter()
+        # 数据库首次创建时会自动导入对应的 JSON 文件
+        repo = create_repo()
+        counts = {
+            collection: repo.count(collection)
+            for collection, default in repo._get_default_structure().items()
+            if isinstance(default, (list, dict))
+        }
+        result[name] = counts
+        summary = ', '.join(f"{collection}={count}" for collection, count in counts.items())
+        print(f"[done] {name}: {summary} ({time.perf_counter() - start:.2f}s) -> {db_path}")
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Migrate server JSON data files to SQLite.")
+    parser.add_argument('--data-dir', default=DEFAULT_DATA_DIR, help=f'Data directory (default: {DEFAULT_DATA_DIR})')
+    parser.add_argument('--force', action='store_true', help='Delete existing databases and re-import')
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.data_dir):
+        print(f"Data directory not found: {args.data_dir}")
+        sys.exit(1)
+
+    migrate_data(args.data_dir, args.force)
+    print("\nSet MT_STORAGE_BACKEND=sqlite to use the migrated data.")
@@ -1,17 +1,29 @@
 import pickle
-from typing import Mapping, Optional, Callable
+from typing import Mapping, Optional, Callable, Sequence
 
 import aiohttp
 from PIL.Image import Image
 from fastapi import HTTPException
 
 from manga_translator import Config
+from manga_translator.mode.share_transport import FIELDS_HEADER, TRANSPORT_HEADER, decode_result
 
 NotifyType = Optional[Callable[[int, Optional[bytes]], None]]
 
-async def fetch_data_stream(url, image: Image, config: Config, sender: NotifyType, headers: Mapping[str, str] = {}):
+def result_headers(headers: Mapping[str, str], transport: Optional[str], fields: Optional[Sequence[str]]) -> dict:
+    """附加结果传输方式和所需字段的请求头（见 manga_translator.mode.share_transport）"""
+    headers = dict(headers)
+    if transport:
+        headers[TRANSPORT_HEADER] = transport
+    if fields:
+        headers[FIELDS_HEADER] = ','.join(fields)
+    return headers
+
+async def fetch_data_stream(url, image: Image, config: Config, sender: NotifyType, headers: Mapping[str, str] = {},
+                            transport: Optional[str] = None, fields: Optional[Sequence[str]] = None):
     attributes = {"image": image, "config": config}
     data = pickle.dumps(attributes)
+    headers = result_headers(headers, transport, fields)
 
     async with aiohttp.ClientSession() as session:
         async with session.post(url, data=data, headers=headers) as response:
@@ -20,19 +32,22 @@ async def fetch_data_stream(url, image: Image, config: Config, sender: NotifyTyp
             else:
                 raise HTTPException(response.status, detail=await response.text())
 
-async def fetch_data(url, image: Image, config: Config, headers: Mapping[str, str] = {}):
+async def fetch_data(url, image: Image, config: Config, headers: Mapping[str, str] = {},
+                     transport: Optional[str] = None, fields: Optional[Sequence[str]] = None):
     attributes = {"image": image, "config": config}
     data = pickle.dumps(attributes)
+    headers = result_headers(headers, transport, fields)
 
     async with aiohttp.ClientSession() as session:
         async with session.post(url, data=data, headers=headers) as response:
             if response.status == 200:
-                return pickle.loads(await response.read())
+                return decode_result(await response.read())
             else:
                 raise HTTPException(response.status, detail=await response.text())
 
 async def process_stream(response, sender: NotifyType):
-    buffer = b''
+    # bytearray 原地追加/删除，避免大结果分块到达时反复拷贝整个缓冲区
+    buffer = bytearray()
 
     async for chunk in response.content.iter_any():
         if chunk:
@@ -41,14 +56,14 @@ async def process_stream(response, sender: NotifyType):
 
 
 
-def handle_buffer(buffer, sender: NotifyType):
+def handle_buffer(buffer: bytearray, sender: NotifyType):
     while len(buffer) >= 5:
         status, expected_size = extract_header(buffer)
 
         if len(buffer) >= 5 + expected_size:
-            data = buffer[5:5 + expected_size]
+            data = bytes(buffer[5:5 + expected_size])
             sender(status, data)
-            buffer = buffer[5 + expected_size:]
+            del buffer[:5 + expected_size]
         else:
             break
     return buffer
@@ -5,30 +5,20 @@ class LogsModule {
         this.autoScroll = true;
         this.logLevel = 'all';
         this.sessionFilter = ''; // 会话ID过滤
-        this.refreshInterval = null;
+        this.eventSource = null;
+        this.logs = []; // 最新的在前
+        this.maxLogs = 200;
     }
     
     async load() {
+        // 通过 SSE 推送新日志，不再定时轮询
         await this.loadLogs();
-        // 启动自动刷新（每5秒）
-        this.startAutoRefresh();
-    }
-    
-    startAutoRefresh() {
-        if (this.refreshInterval) {
-            clearInterval(this.refreshInterval);
-        }
-        this.refreshInterval = setInterval(() => {
-            if (this.autoScroll) {
-                this.loadLogs();
-            }
-        }, 5000);
     }
     
     stopAutoRefresh() {
-        if (this.refreshInterval) {
-            clearInterval(this.refreshInterval);
-            this.refreshInterval = null;
+        if (this.eventSource) {
+            this.eventSource.close();
+            this.eventSource = null;
         }
     }
     
@@ -36,24 +26,37 @@ class LogsModule {
         const container = document.getElementById('logs-container');
         if (!container) return;
         
-        try {
-            let url = `/admin/logs?level=${this.logLevel}&limit=200`;
-            if (this.sessionFilter) {
-                url += `&session_id=${encodeURIComponent(this.sessionFilter)}`;
+        this.stopAutoRefresh();
+        this.logs = [];
+        this.renderLogs(this.logs);
+        
+        let url = `/api/logs/stream?tail=${this.maxLogs}&token=${encodeURIComponent(this.app.sessionToken)}`;
+        if (this.logLevel && this.logLevel !== 'all') {
+            url += `&level=${encodeURIComponent(this.logLevel)}`;
+        }
+        if (this.sessionFilter) {
+            url += `&session_id=${encodeURIComponent(this.sessionFilter)}`;
+        }
+        
+        const source = new EventSource(url);
+        source.addEventListener('logs', (event) => {
+            const newLogs = JSON.parse(event.data);
+            this.logs = newLogs.reverse().concat(this.logs).slice(0, this.maxLogs);
+            // 暂停滚动时只收集，不刷新界面
+            if (this.autoScroll) {
+                this.renderLogs(this.logs);
             }
-            
-            const resp = await fetch(url, {
-                headers: { 'X-Session-Token': this.app.sessionToken }
-            });
-            
-            if (resp.ok) {
-                const data = await resp.json();
-                this.renderLogs(data.logs || []);
+        });
+        source.addEventListener('gap', () => {
+            console.warn('Log stream fell behind, some entries were dropped');
+        });
+        source.onerror = () => {
+            // EventSource 会自动重连（以 Last-Event-ID 续传）；连接被拒绝时停止
+            if (source.readyState === EventSource.CLOSED) {
+                container.innerHTML = '<div style="color:#ef4444;padding:20px;">加载日志失败</div>';
             }
-        } catch (e) {
-            console.error('Failed to load logs:', e);
-            container.innerHTML = '<div style="color:#ef4444;padding:20px;">加载日志失败</div>';
-        }
+        };
+        this.eventSource = source;
     }
     
     renderLogs(logs) {
@@ -148,6 +151,9 @@ class LogsModule {
         if (btn) {
             btn.textContent = this.autoScroll ? '⏸ 暂停滚动' : '▶ 自动滚动';
         }
+        if (this.autoScroll) {
+            this.renderLogs(this.logs);
+        }
     }
     
     async clearLogs() {
@@ -316,8 +316,6 @@ async function init() {
     // 加载翻译历史
     await loadTranslationHistory();
     
-    startLogPolling(); // Start polling logs
-    
     // 初始化移动端菜单
     initMobileMenu();
     
@@ -2435,6 +2433,7 @@ async function processStream(endpoint, formData, filename) {
                         if (msg.task_id && msg.stage === 'task_id') {
                             currentTaskId = msg.task_id;
                             log(`开始任务: ${msg.task_id.substring(0, 8)}...`, 'info');
+                            startTaskLogStream(msg.task_id);
                         }
                         if (msg.message) log(`${msg.message}`);
                     } catch (e) {
@@ -2469,34 +2468,26 @@ async function processStream(endpoint, formData, filename) {
         log(`${filename} 处理失败: ${error.message}`, 'error');
         throw error;
     } finally {
-        // 任务完成或失败后，获取所有任务日志
+        // 任务完成或失败后，获取推送流还没送到的剩余日志
         const finishedTaskId = currentTaskId;
+        stopTaskLogStream();
         if (finishedTaskId) {
-            // 获取该任务的所有日志（不使用时间戳过滤，获取完整日志）
             try {
-                const url = `/api/logs?limit=500&task_id=${finishedTaskId}`;
+                const url = `/api/logs?limit=1000&task_id=${finishedTaskId}&after=${lastLogSeq}`;
                 const res = await fetch(url, {
                     headers: { 'X-Session-Token': sessionToken }
                 });
-                const logs = await res.json();
-                if (logs.length > 0) {
-                    // 获取所有未显示的日志（使用时间戳过滤）
-                    const newLogs = lastLogTimestamp
-                        ? logs.filter(l => new Date(l.timestamp) > new Date(lastLogTimestamp))
-                        : logs;
-                    if (newLogs.length > 0) {
-                        log(`--- 详细日志 (${newLogs.length} 条) ---`, 'info', true);
-                        newLogs.forEach(l => {
-                            log(`[${l.level}] ${l.message}`, l.level.toLowerCase(), false);
-                        });
-                    }
+                const newLogs = await res.json();
+                if (newLogs.length > 0) {
+                    log(`--- 详细日志 (${newLogs.length} 条) ---`, 'info', true);
+                    appendRemoteLogs(newLogs);
                 }
             } catch (e) {
                 console.error('Failed to fetch final logs:', e);
             }
         }
         currentTaskId = null;
-        lastLogTimestamp = null;
+        lastLogSeq = 0;
     }
 }
 
@@ -2532,44 +2523,34 @@ function switchTab(tabId) {
 
 // --- Log Handling ---
 
-let lastLogTimestamp = null;
+let lastLogSeq = 0; // 已显示的最后一条任务日志的序号（游标）
 let currentTaskId = null; // 当前正在处理的任务ID
+let taskLogSource = null;
 
-function startLogPolling() {
-    setInterval(async () => {
-        try {
-            // 只有在有当前任务时才轮询日志
-            if (!currentTaskId) {
-                return; // 没有任务，不轮询
-            }
-            
-            // 获取当前任务的日志（增加限制到200条以获取更多详细日志）
-            const url = `/api/logs?limit=200&task_id=${currentTaskId}`;
-            const res = await fetch(url, {
-                headers: {
-                    'X-Session-Token': sessionToken
-                }
-            });
-            const logs = await res.json();
+function appendRemoteLogs(logs) {
+    logs.forEach(l => {
+        if (l.seq <= lastLogSeq) return;
+        log(`[${l.level}] ${l.message}`, l.level.toLowerCase(), false);
+        lastLogSeq = l.seq;
+    });
+}
 
-            if (logs.length > 0) {
-                // Filter new logs
-                const newLogs = lastLogTimestamp
-                    ? logs.filter(l => new Date(l.timestamp) > new Date(lastLogTimestamp))
-                    : logs;
+// 通过 SSE 接收当前任务的日志（服务器只推送新日志，不再轮询）
+function startTaskLogStream(taskId) {
+    stopTaskLogStream();
+    const token = localStorage.getItem('session_token') || '';
+    const url = `/api/logs/stream?task_id=${encodeURIComponent(taskId)}&cursor=${lastLogSeq}&token=${encodeURIComponent(token)}`;
+    taskLogSource = new EventSource(url);
+    taskLogSource.addEventListener('logs', (event) => {
+        appendRemoteLogs(JSON.parse(event.data));
+    });
+}
 
-                if (newLogs.length > 0) {
-                    newLogs.forEach(l => {
-                        // Avoid duplicates if possible, though timestamp check helps
-                        log(`[${l.level}] ${l.message}`, l.level.toLowerCase(), false);
-                    });
-                    lastLogTimestamp = newLogs[newLogs.length - 1].timestamp;
-                }
-            }
-        } catch (e) {
-            // console.error("Log poll failed", e);
-        }
-    }, 500); // Poll every 500ms for more responsive log updates
+function stopTaskLogStream() {
+    if (taskLogSource) {
+        taskLogSource.close();
+        taskLogSource = null;
+    }
 }
 
 function log(msg, type = 'normal', isLocal = true) {
@@ -1,5 +1,6 @@
 import asyncio
-import pickle
+
+from manga_translator.mode.share_transport import decode_result
 
 async def stream(messages):
     while True:
@@ -10,7 +11,7 @@ async def stream(messages):
 
 def notify(code: int, data: bytes, transform_to_bytes, messages: asyncio.Queue):
     if code == 0:
-        result_bytes = transform_to_bytes(pickle.loads(data))
+        result_bytes = transform_to_bytes(decode_result(data))
         encoded_result = b'\x00' + len(result_bytes).to_bytes(4, 'big') + result_bytes
         messages.put_nowait(encoded_result)
     else:
@@ -1,6 +1,6 @@
 import itertools
 import numpy as np
-from typing import List, Set
+from typing import List, Set, Tuple
 from collections import Counter
 import networkx as nx
 from shapely.geometry import Polygon
@@ -102,6 +102,73 @@ def split_text_region(
 #     box = np.array(box)
 #     return box
 
+# quadrilateral_can_merge_region 会直接拒绝多边形距离 > discard_connection_gap(默认2) * 1.5 * min(font_size) 的框对
+_MAX_MERGE_GAP_FONT_RATIO = 2 * 1.5
+
+
+def _candidate_merge_pairs(bboxes: List[Quadrilateral]) -> List[Tuple[int, int]]:
+    """
+    按AABB对文本行做扫描线预筛选，只返回几何上可能合并的框对 (u, v)，u < v，按字典序排列。
+
+    多边形位于自身AABB内，因此AABB间距是多边形距离的下界：
+    AABB间距已超过 quadrilateral_can_merge_region 的距离上限的框对一定不能合并，可以安全跳过。
+    """
+    n = len(bboxes)
+    if n < 2:
+        return []
+    aabb = np.array([np.concatenate([box.pts.min(axis=0), box.pts.max(axis=0)]) for box in bboxes], dtype=np.float64)
+    font_sizes = np.array([box.font_size for box in bboxes], dtype=np.float64)
+    reach = font_sizes * _MAX_MERGE_GAP_FONT_RATIO
+
+    # 按 min_y 排序后扫描：对于 min_y_i <= min_y_j 的框对，间距 >= min_y_j - max_y_i，
+    # 所以只需检查 min_y_j <= max_y_i + reach_i 的后续框
+    order = np.argsort(aabb[:, 1], kind='stable')
+    sorted_min_y = aabb[order, 1]
+    window_ends = np.searchsorted(sorted_min_y, aabb[order, 3] + reach[order], side='right')
+
+    pairs = []
+    for k in range(n - 1):
+        cand = order[k + 1:window_ends[k]]
+        if len(cand) == 0:
+            continue
+        i = order[k]
+        dx = np.maximum(0, np.maximum(aabb[i, 0], aabb[cand, 0]) - np.minimum(aabb[i, 2], aabb[cand, 2]))
+        dy = np.maximum(0, np.maximum(aabb[i, 1], aabb[cand, 1]) - np.minimum(aabb[i, 3], aabb[cand, 3]))
+        limit = np.minimum(font_sizes[i], font_sizes[cand]) * _MAX_MERGE_GAP_FONT_RATIO
+        # 留出少量浮点余量，只剔除确定超出距离上限的框对（NaN 不会被剔除）
+        too_far = np.hypot(dx, dy) > limit + 1e-6 * (1 + limit)
+        for j in cand[~too_far]:
+            pairs.append((min(i, j), max(i, j)))
+    pairs.sort()
+    return [(int(u), int(v)) for u, v in pairs]
+
+
+def _connected_components(neighbors: List[List[int]]) -> List[Set[int]]:
+    """
+    逐层BFS求连通分量（代替 networkx 图）。
+    分量按最小索引排序，集合内按BFS顺序插入，与 networkx.connected_components 的结果及迭代顺序一致，
+    保证 split_text_region 的输入顺序不变。
+    """
+    seen = set()
+    components = []
+    for source in range(len(neighbors)):
+        if source in seen:
+            continue
+        component = {source}
+        next_level = [source]
+        while next_level:
+            this_level = next_level
+            next_level = []
+            for v in this_level:
+                for w in neighbors[v]:
+                    if w not in component:
+                        component.add(w)
+                        next_level.append(w)
+        seen.update(component)
+        components.append(component)
+    return components
+
+
 def merge_bboxes_text_region(bboxes: List[Quadrilateral], width, height, debug=False, edge_ratio_threshold=0.0, config=None):
     # step 0: merge quadrilaterals that belong to the same textline
     # u = 0
@@ -120,33 +187,29 @@ def merge_bboxes_text_region(bboxes: List[Quadrilateral], width, height, debug=F
     #     u += 1
 
     # step 1: divide into multiple text region candidates
-    G = nx.Graph()
-    for i, box in enumerate(bboxes):
-        G.add_node(i, box=box)
+    # 只对扫描线预筛选出的候选框对做精确判断，邻接表按邻居索引升序排列
+    neighbors: List[List[int]] = [[] for _ in bboxes]
 
     # 记录边缘距离
     edge_distances = {}
-    edge_count = 0
-    for ((u, ubox), (v, vbox)) in itertools.combinations(enumerate(bboxes), 2):
-        # if quadrilateral_can_merge_region_coarse(ubox, vbox):
+    for u, v in _candidate_merge_pairs(bboxes):
+        ubox, vbox = bboxes[u], bboxes[v]
         can_merge = quadrilateral_can_merge_region(ubox, vbox, aspect_ratio_tol=1.3, font_size_ratio_tol=2,
                                           char_gap_tolerance=1, char_gap_tolerance2=3, debug=debug)
         if can_merge:
             # 计算边缘距离
-            poly_dist = ubox.poly_distance(vbox)
-            G.add_edge(u, v, distance=poly_dist)
-            edge_distances[(u, v)] = poly_dist
-            edge_count += 1
+            edge_distances[(u, v)] = ubox.poly_distance(vbox)
+            neighbors[u].append(v)
+            neighbors[v].append(u)
 
     # step 1.5: 边缘距离比例检测 - 断开距离差异过大的连接
     if edge_ratio_threshold > 0 and len(bboxes) > 2:
-        edges_to_remove = []
-        for node in G.nodes():
-            neighbors = list(G.neighbors(node))
-            if len(neighbors) >= 2:
+        edges_to_remove = set()
+        for node, node_neighbors in enumerate(neighbors):
+            if len(node_neighbors) >= 2:
                 # 获取该节点到所有邻居的距离
                 neighbor_distances = []
-                for neighbor in neighbors:
+                for neighbor in node_neighbors:
                     edge = (min(node, neighbor), max(node, neighbor))
                     dist = edge_distances.get(edge, 0)
                     neighbor_distances.append((neighbor, dist))
@@ -160,20 +223,17 @@ def merge_bboxes_text_region(bboxes: List[Quadrilateral], width, height, debug=F
                     for neighbor, dist in neighbor_distances[1:]:
                         ratio = dist / min_dist
                         if ratio > edge_ratio_threshold:
-                            edge_to_remove = (min(node, neighbor), max(node, neighbor))
-                            if edge_to_remove not in edges_to_remove:
-                                edges_to_remove.append(edge_to_remove)
+                            edges_to_remove.add((min(node, neighbor), max(node, neighbor)))
 
         # 移除边
-        for edge in edges_to_remove:
-            if G.has_edge(edge[0], edge[1]):
-                G.remove_edge(edge[0], edge[1])
+        for u, v in edges_to_remove:
+            neighbors[u].remove(v)
+            neighbors[v].remove(u)
 
     # step 2: postprocess - further split each region
     region_indices: List[Set[int]] = []
-    connected_components = list(nx.algorithms.components.connected_components(G))
 
-    for node_set in connected_components:
+    for node_set in _connected_components(neighbors):
          split_result = split_text_region(bboxes, node_set, width, height, debug=debug)
          region_indices.extend(split_result)
 
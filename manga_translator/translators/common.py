@@ -8,6 +8,7 @@ import numpy as np
 import cv2
 
 from ..utils import InfererModule, ModelWrapper, repeating_sequence, is_valuable_text
+from . import translation_memory, request_scheduler, http_pool
 
 try:
     import readline
@@ -162,7 +163,8 @@ class AsyncOpenAICurlCffi:
             data.update(kwargs)
 
             # 发送异步请求
-            response = await self.parent.session.post(
+            response = await self.parent._request(
+                'post',
                 url,
                 json=data,
                 headers=headers,
@@ -213,7 +215,8 @@ class AsyncOpenAICurlCffi:
                 headers.update(self.parent.default_headers)
 
             # 发送异步请求
-            response = await self.parent.session.get(
+            response = await self.parent._request(
+                'get',
                 url,
                 headers=headers,
                 timeout=self.parent.timeout
@@ -270,15 +273,16 @@ class AsyncOpenAICurlCffi:
         is_local = any(indicator in base_url.lower() for indicator in local_indicators)
 
         # 延迟导入 curl_cffi，避免在不需要时导入
+        # 实际的 AsyncSession 由 http_pool 按 (API 地址, 代理, API Key) 和事件循环共享，重建客户端不会重新握手
         try:
-            from curl_cffi.requests import AsyncSession
+            import curl_cffi.requests  # noqa: F401
             if is_local:
                 # 本地连接：不使用 impersonate，避免 HTTP/2 兼容性问题
-                self.session = AsyncSession()
+                self._session_kwargs = {}
                 print(f"[AsyncOpenAICurlCffi] Local address detected, disabled impersonate for: {base_url}")
             else:
                 # 云端连接：使用 impersonate 绕过 TLS 指纹检测
-                self.session = AsyncSession(impersonate=impersonate)
+                self._session_kwargs = {'impersonate': impersonate}
         except ImportError:
             raise ImportError(
                 "curl_cffi is required for TLS fingerprint bypass. "
@@ -290,10 +294,13 @@ class AsyncOpenAICurlCffi:
         # 创建模型列表接口
         self.models = self.Models(self)
 
+    async def _request(self, method: str, url: str, **kwargs):
+        """通过共享连接池发送请求"""
+        return await http_pool.curl_request(self.base_url, self.api_key, self._session_kwargs, method, url, **kwargs)
+
     async def close(self):
-        """关闭 session"""
-        if hasattr(self.session, 'close'):
-            await self.session.close()
+        """释放客户端（连接归共享连接池所有，保持 keep-alive 供后续请求复用）"""
+        pass
 
     async def __aenter__(self):
         """异步上下文管理器入口"""
@@ -467,7 +474,8 @@ class AsyncGeminiCurlCffi:
             data.update(kwargs)
 
             # 发送异步请求
-            response = await self.parent.session.post(
+            response = await self.parent._request(
+                'post',
                 url,
                 json=data,
                 headers=request_headers,
@@ -514,7 +522,8 @@ class AsyncGeminiCurlCffi:
                 headers.update(self.parent.default_headers)
 
             # 发送异步请求
-            response = await self.parent.session.get(
+            response = await self.parent._request(
+                'get',
                 url,
                 headers=headers,
                 timeout=self.parent.timeout
@@ -570,15 +579,16 @@ class AsyncGeminiCurlCffi:
         is_local = any(indicator in base_url.lower() for indicator in local_indicators)
 
         # 延迟导入 curl_cffi，避免在不需要时导入
+        # 实际的 AsyncSession 由 http_pool 按 (API 地址, 代理, API Key) 和事件循环共享，重建客户端不会重新握手
         try:
-            from curl_cffi.requests import AsyncSession
+            import curl_cffi.requests  # noqa: F401
             if is_local:
                 # 本地连接：不使用 impersonate，避免 HTTP/2 兼容性问题
-                self.session = AsyncSession()
+                self._session_kwargs = {}
                 print(f"[AsyncGeminiCurlCffi] Local address detected, disabled impersonate for: {base_url}")
             else:
                 # 云端连接：使用 impersonate 绕过 TLS 指纹检测
-                self.session = AsyncSession(impersonate=impersonate)
+                self._session_kwargs = {'impersonate': impersonate}
         except ImportError:
             raise ImportError(
                 "curl_cffi is required for TLS fingerprint bypass. "
@@ -588,10 +598,13 @@ class AsyncGeminiCurlCffi:
         # 创建模型接口
         self.models = self.Models(self)
 
+    async def _request(self, method: str, url: str, **kwargs):
+        """通过共享连接池发送请求"""
+        return await http_pool.curl_request(self.base_url, self.api_key, self._session_kwargs, method, url, **kwargs)
+
     async def close(self):
-        """关闭 session"""
-        if hasattr(self.session, 'close'):
-            await self.session.close()
+        """释放客户端（连接归共享连接池所有，保持 keep-alive 供后续请求复用）"""
+        pass
 
     async def __aenter__(self):
         """异步上下文管理器入口"""
@@ -925,6 +938,9 @@ class CommonTranslator(InfererModule):
     # Will sleep for the rest of the minute if the request count is over this number.
     _MAX_REQUESTS_PER_MINUTE = -1
 
+    # Whether results of this translator may be stored in / served from the translation memory.
+    _TRANSLATION_MEMORY = True
+
     def __init__(self):
         super().__init__()
         self.mtpe_adapter = MTPEAdapter()
@@ -939,6 +955,10 @@ class CommonTranslator(InfererModule):
         self._max_total_attempts = -1  # 全局最大尝试次数
         self._cancel_check_callback = None  # 取消检查回调
         self._custom_api_params = {}  # 存储自定义API参数
+        self.translation_memory = False  # 是否使用翻译记忆（复用重复原文的译文，需显式开启）
+        self.max_concurrent_requests = request_scheduler.DEFAULT_MAX_CONCURRENCY  # 同时进行中的API请求数上限
+        self.max_tokens_per_minute = 0  # 每分钟token数上限（0 = 不限制）
+        self.request_chunk_size = 0  # 每个请求最多包含的文本数，超出时分块并发请求（0 = 不分块）
     
     def _load_custom_api_params(self):
         """从固定目录加载自定义API参数配置文件"""
@@ -1446,11 +1466,66 @@ class CommonTranslator(InfererModule):
             self.logger.error(f"Translation failed with exception at split_level={split_level}: {e}")
             raise e
 
+    def _get_request_scheduler(self) -> 'request_scheduler.RequestScheduler':
+        """当前 API 地址 + 模型共享的请求调度器（同步当前配置的 RPM/TPM/并发上限）"""
+        model = getattr(self, 'model', None) or getattr(self, 'model_name', None)
+        scheduler = request_scheduler.get_request_scheduler(getattr(self, 'base_url', None), model)
+        scheduler.configure(max_concurrency=self.max_concurrent_requests,
+                            rpm=max(self._MAX_REQUESTS_PER_MINUTE, 0),
+                            tpm=self.max_tokens_per_minute)
+        return scheduler
+
+    async def _scheduled_request(self, request_func, *args, prompt_tokens: int = 0, **kwargs):
+        """
+        经过请求调度器发送一次API请求：等待并发名额和RPM/TPM配额，
+        429/5xx 时通知调度器暂停同一端点的所有请求，异常照常抛出由调用方重试
+        """
+        scheduler = self._get_request_scheduler()
+        async with scheduler.slot(prompt_tokens):
+            try:
+                response = await request_func(*args, **kwargs)
+            except Exception as e:
+                scheduler.report_failure(e)
+                raise
+        scheduler.report_success()
+        return response
+
+    @staticmethod
+    def _is_rate_limited_error(error: BaseException) -> bool:
+        """是否为 HTTP 429（请求过多）错误"""
+        return request_scheduler.classify_error(error)[0] == 429
+
+    async def _translate_in_chunks(self, translator_func, texts: List[str], **kwargs) -> List[str]:
+        """
+        按 request_chunk_size 把文本分块，各块并发翻译（每块独立分割重试），结果按原顺序拼接。
+        AI断句模式下提示词按序号对应文本区域，不分块。
+        """
+        chunk_size = self.request_chunk_size
+        ctx = kwargs.get('ctx')
+        config = getattr(ctx, 'config', None) if ctx is not None else None
+        ai_break = config is not None and getattr(getattr(config, 'render', None), 'disable_auto_wrap', False)
+        if chunk_size <= 0 or len(texts) <= chunk_size or ai_break:
+            return await self._translate_with_split(translator_func, texts, split_level=0, **kwargs)
+
+        chunks = [texts[i:i + chunk_size] for i in range(0, len(texts), chunk_size)]
+        # 每个请求都计入全局尝试次数，分块后按块数放大上限，使每块的重试次数与不分块时相同
+        if self._max_total_attempts != -1:
+            self._max_total_attempts = self.attempts * len(chunks)
+        self.logger.info(f"分块并发翻译: {len(texts)} 个文本 -> {len(chunks)} 个请求 (每块最多 {chunk_size} 个)")
+        results = await asyncio.gather(*[
+            self._translate_with_split(translator_func, chunk, split_level=0, **kwargs) for chunk in chunks
+        ])
+        return [translation for chunk_translations in results for translation in chunk_translations]
+
     def parse_args(self, config):
         self.enable_post_translation_check = getattr(config, 'enable_post_translation_check', self.enable_post_translation_check)
         self.post_check_repetition_threshold = getattr(config, 'post_check_repetition_threshold', self.post_check_repetition_threshold)
         self.post_check_max_retry_attempts = getattr(config, 'post_check_max_retry_attempts', self.post_check_max_retry_attempts)
         self.attempts = getattr(config, 'attempts', self.attempts)
+        self.translation_memory = getattr(config, 'translation_memory', self.translation_memory)
+        self.max_concurrent_requests = getattr(config, 'max_concurrent_requests', self.max_concurrent_requests)
+        self.max_tokens_per_minute = getattr(config, 'max_tokens_per_minute', self.max_tokens_per_minute)
+        self.request_chunk_size = getattr(config, 'request_chunk_size', self.request_chunk_size)
 
     def supports_languages(self, from_lang: str, to_lang: str, fatal: bool = False) -> bool:
         supported_src_languages = ['auto'] + list(self._LANGUAGE_CODE_MAP)
@@ -1513,7 +1588,12 @@ class CommonTranslator(InfererModule):
             await self._ratelimit_sleep()
 
             # Translate
-            _translations = await self._translate(*self.parse_language_codes(from_lang, to_lang, fatal=True), queries, ctx=ctx)
+            # 无效译文重试会再次翻译全部查询，此时不使用翻译记忆，避免把无效译文存入记忆
+            _from_lang, _to_lang = self.parse_language_codes(from_lang, to_lang, fatal=True)
+            if self._INVALID_REPEAT_COUNT == 0:
+                _translations = await self._translate_with_memory(_from_lang, _to_lang, queries, ctx=ctx)
+            else:
+                _translations = await self._translate(_from_lang, _to_lang, queries, ctx=ctx)
 
             # Strict validation: translation count must match query count
             if len(_translations) != len(queries):
@@ -1562,6 +1642,86 @@ class CommonTranslator(InfererModule):
     async def _translate(self, from_lang: str, to_lang: str, queries: List[str], ctx=None) -> List[str]:
         pass
 
+    def _use_translation_memory(self, ctx=None) -> bool:
+        """当前请求能否使用翻译记忆（译文只取决于原文和提示词时才能复用）"""
+        if not (self._TRANSLATION_MEMORY and self.translation_memory):
+            return False
+        # 高质量模式按图片批量翻译：译文依赖图片内容，且查询必须与 batch_data 一一对应
+        if ctx is not None and getattr(ctx, 'high_quality_batch_data', None):
+            return False
+        # AI 断句模式：提示词按序号附带区域信息，查询不能去重或跳过
+        config = getattr(ctx, 'config', None) if ctx is not None else None
+        if config is not None and getattr(getattr(config, 'render', None), 'disable_auto_wrap', False):
+            return False
+        # 多页上下文：译文依赖前几页内容，且命中的句子会从提示词中移除，改变模型看到的页内上下文
+        if getattr(self, 'prev_context', None):
+            return False
+        if config is not None and getattr(getattr(config, 'cli', None), 'context_size', 0) > 0:
+            return False
+        return True
+
+    def _translation_memory_prompt_hash(self, from_lang: str, to_lang: str, ctx=None) -> str:
+        """影响译文的提示词和参数的哈希：系统提示词、自定义提示词、断句提示词、温度和自定义 API 参数"""
+        custom_prompt_json = getattr(ctx, 'custom_prompt_json', None) if ctx is not None else None
+        line_break_prompt_json = getattr(ctx, 'line_break_prompt_json', None) if ctx is not None else None
+        system_prompt = None
+        build_system_prompt = getattr(self, '_build_system_prompt', None)
+        if build_system_prompt is not None:
+            try:
+                system_prompt = build_system_prompt(from_lang, to_lang, custom_prompt_json=custom_prompt_json,
+                                                    line_break_prompt_json=line_break_prompt_json)
+            except Exception:
+                system_prompt = None
+        return translation_memory.prompt_hash(from_lang, system_prompt, custom_prompt_json, line_break_prompt_json,
+                                              getattr(self, 'temperature', None), self._custom_api_params)
+
+    async def _translate_with_memory(self, from_lang: str, to_lang: str, queries: List[str], ctx=None) -> List[str]:
+        """
+        带翻译记忆的 _translate：
+        已在记忆中的原文直接返回记忆中的译文，同一请求中重复的原文只翻译一次，新译文写入记忆。
+        """
+        if not queries or not self._use_translation_memory(ctx):
+            return await self._translate(from_lang, to_lang, queries, ctx=ctx)
+
+        memory = translation_memory.get_translation_memory()
+        translator_name = self.__class__.__name__
+        model = getattr(self, 'model', None) or getattr(self, 'model_name', None)
+        prompt = self._translation_memory_prompt_hash(from_lang, to_lang, ctx)
+        keys = [translation_memory.make_key(q, to_lang, translator_name, model, prompt) for q in queries]
+
+        found = {} if translation_memory.is_bypassed() else memory.get_many(keys)
+
+        # 未命中的原文去重后作为一次请求发送
+        pending = {}  # key -> 在 unique_queries 中的位置
+        unique_queries = []
+        for key, query in zip(keys, queries):
+            if key not in found and key not in pending:
+                pending[key] = len(unique_queries)
+                unique_queries.append(query)
+
+        hits = sum(1 for key in keys if key in found)
+        coalesced = len(queries) - hits - len(unique_queries)
+        memory.record(len(queries), hits, coalesced)
+        if hits or coalesced:
+            self.logger.info(f'[翻译记忆] 命中 {hits}/{len(queries)}，合并重复 {coalesced} 条，'
+                             f'实际翻译 {len(unique_queries)} 条 (累计命中率 {memory.stats()["hit_rate"]:.0%})')
+
+        if unique_queries:
+            translations = await self._translate(from_lang, to_lang, unique_queries, ctx=ctx)
+            if len(translations) != len(unique_queries):
+                # 数量不一致时交给调用方按原逻辑报错，不写入记忆
+                return translations
+            new_entries = []
+            for key, index in pending.items():
+                translation = translations[index]
+                found[key] = translation
+                # 空译文通常是翻译失败或被过滤，不写入记忆
+                if translation:
+                    new_entries.append((key, unique_queries[index], translation, to_lang, translator_name, model))
+            memory.put_many(new_entries)
+
+        return [found[key] for key in keys]
+
     async def _ratelimit_sleep(self):
         if self._MAX_REQUESTS_PER_MINUTE > 0:
             now = time.time()
@@ -7,6 +7,8 @@ from google import genai
 from google.genai import types
 
 from .common import CommonTranslator, VALID_LANGUAGES, parse_json_or_text_response, parse_hq_response, get_glossary_extraction_prompt, merge_glossary_to_file, validate_gemini_response, AsyncGeminiCurlCffi
+from .request_scheduler import estimate_tokens
+from . import http_pool
 from .keys import GEMINI_API_KEY
 from ..utils import Context
 
@@ -48,9 +50,6 @@ class GeminiTranslator(CommonTranslator):
     """
     _LANGUAGE_CODE_MAP = VALID_LANGUAGES
     
-    # 类变量: 跨实例共享的RPM限制时间戳
-    _GLOBAL_LAST_REQUEST_TS = {}  # {model_name: timestamp}
-    
     def __init__(self):
         super().__init__()
         self.client = None
@@ -67,11 +66,7 @@ class GeminiTranslator(CommonTranslator):
         self.model_name = os.getenv('GEMINI_MODEL', "gemini-1.5-flash")
         self.max_tokens = None  # 不限制，使用模型默认最大值
         self.temperature = 0.1
-        self._MAX_REQUESTS_PER_MINUTE = 0  # 默认无限制
-        # 使用全局时间戳,跨实例共享
-        if self.model_name not in GeminiTranslator._GLOBAL_LAST_REQUEST_TS:
-            GeminiTranslator._GLOBAL_LAST_REQUEST_TS[self.model_name] = 0
-        self._last_request_ts_key = self.model_name
+        self._MAX_REQUESTS_PER_MINUTE = 0  # 默认无限制（RPM/TPM/并发由共享的请求调度器控制）
         # 新版 SDK 的安全设置
         self.safety_settings = [
             types.SafetySetting(
@@ -135,10 +130,6 @@ class GeminiTranslator(CommonTranslator):
         user_api_model = getattr(args, 'user_api_model', None)
         if user_api_model:
             self.model_name = user_api_model
-            # 更新全局时间戳的 key
-            if self.model_name not in GeminiTranslator._GLOBAL_LAST_REQUEST_TS:
-                GeminiTranslator._GLOBAL_LAST_REQUEST_TS[self.model_name] = 0
-            self._last_request_ts_key = self.model_name
             self.logger.info(f"[UserAPIKey] Using user-provided model: {user_api_model}")
         
         # 如果 API Key 或 Base URL 变化，重建客户端
@@ -170,12 +161,17 @@ class GeminiTranslator(CommonTranslator):
                     self.logger.info(f"Gemini客户端初始化完成（自定义API Base + curl_cffi TLS 指纹伪装）。Base URL: {self.base_url}")
                 except ImportError:
                     # 回退到标准客户端
-                    self.client = genai.Client(
-                        api_key=self.api_key,
-                        http_options=types.HttpOptions(
-                            base_url=self.base_url,
-                            headers=BROWSER_HEADERS
-                        )
+                    # 同一 API 地址 + Key 共享一个 genai.Client（及其连接池）
+                    self.client = http_pool.shared_client(
+                        'genai', self.base_url, self.api_key,
+                        lambda: genai.Client(
+                            api_key=self.api_key,
+                            http_options=types.HttpOptions(
+                                base_url=self.base_url,
+                                headers=BROWSER_HEADERS
+                            )
+                        ),
+                        extra=('custom_base',)
                     )
                     self._use_curl_cffi = False
                     self.logger.info(f"Gemini客户端初始化完成（自定义API Base，标准模式）。Base URL: {self.base_url}")
@@ -192,7 +188,10 @@ class GeminiTranslator(CommonTranslator):
                     self.logger.info("Gemini客户端初始化完成（使用 curl_cffi TLS 指纹伪装）")
                 except ImportError:
                     # 回退到标准客户端
-                    self.client = genai.Client(api_key=self.api_key)
+                    self.client = http_pool.shared_client(
+                        'genai', self.base_url, self.api_key,
+                        lambda: genai.Client(api_key=self.api_key)
+                    )
                     self._use_curl_cffi = False
                     self.logger.info("Gemini客户端初始化完成（标准模式）")
 
@@ -374,24 +373,16 @@ class GeminiTranslator(CommonTranslator):
 
 
             try:
-                # RPM限制
-                if self._MAX_REQUESTS_PER_MINUTE > 0:
-                    import time
-                    now = time.time()
-                    delay = 60.0 / self._MAX_REQUESTS_PER_MINUTE
-                    elapsed = now - GeminiTranslator._GLOBAL_LAST_REQUEST_TS[self._last_request_ts_key]
-                    if elapsed < delay:
-                        sleep_time = delay - elapsed
-                        self.logger.info(f'Ratelimit sleep: {sleep_time:.2f}s')
-                        await asyncio.sleep(sleep_time)
-                
                 if retry_attempt > 0 and current_temperature != self.temperature:
                     self.logger.info(f"[重试] 温度调整: {self.temperature} -> {current_temperature}")
 
-                # 根据客户端类型调用不同的 API
+                # 根据客户端类型调用不同的 API，经过共享调度器发送（RPM/TPM限制、并发上限、429/5xx退避）
+                prompt_tokens = estimate_tokens(combined_prompt)
                 if getattr(self, '_use_curl_cffi', False):
                     # 使用 curl_cffi 异步客户端
-                    response = await self.client.models.generate_content(
+                    response = await self._scheduled_request(
+                        self.client.models.generate_content,
+                        prompt_tokens=prompt_tokens,
                         model=self.model_name,
                         contents=combined_prompt,
                         generation_config=generation_config,
@@ -399,16 +390,14 @@ class GeminiTranslator(CommonTranslator):
                     )
                 else:
                     # 使用标准 SDK（同步调用包装为异步）
-                    response = await asyncio.to_thread(
+                    response = await self._scheduled_request(
+                        asyncio.to_thread,
                         self.client.models.generate_content,
+                        prompt_tokens=prompt_tokens,
                         model=self.model_name,
                         contents=combined_prompt,
                         config=generation_config
                     )
-                
-                if self._MAX_REQUESTS_PER_MINUTE > 0:
-                    import time
-                    GeminiTranslator._GLOBAL_LAST_REQUEST_TS[self._last_request_ts_key] = time.time()
 
                 # 验证响应对象是否有效
                 validate_gemini_response(response, self.logger)
@@ -566,11 +555,10 @@ class GeminiTranslator(CommonTranslator):
         custom_prompt_json = getattr(ctx, 'custom_prompt_json', None) if ctx else None
         line_break_prompt_json = getattr(ctx, 'line_break_prompt_json', None) if ctx else None
 
-        # 使用分割包装器进行翻译
-        translations = await self._translate_with_split(
+        # 使用分割包装器进行翻译（request_chunk_size > 0 时分块并发）
+        translations = await self._translate_in_chunks(
             self._translate_batch,
             queries,
-            split_level=0,
             source_lang=from_lang,
             target_lang=to_lang,
             custom_prompt_json=custom_prompt_json,
@@ -10,6 +10,8 @@ from google import genai
 from google.genai import types
 
 from .common import CommonTranslator, VALID_LANGUAGES, draw_text_boxes_on_image, parse_json_or_text_response, parse_hq_response, get_glossary_extraction_prompt, merge_glossary_to_file, validate_gemini_response, AsyncGeminiCurlCffi
+from .request_scheduler import estimate_tokens, IMAGE_TOKEN_ESTIMATE
+from . import http_pool
 from .keys import GEMINI_API_KEY
 from ..utils import Context
 
@@ -93,9 +95,6 @@ class GeminiHighQualityTranslator(CommonTranslator):
     """
     _LANGUAGE_CODE_MAP = VALID_LANGUAGES
     
-    # 类变量: 跨实例共享的RPM限制时间戳
-    _GLOBAL_LAST_REQUEST_TS = {}  # {model_name: timestamp}
-    
     def __init__(self):
         super().__init__()
         self.client = None
@@ -112,11 +111,7 @@ class GeminiHighQualityTranslator(CommonTranslator):
         self.model_name = os.getenv('GEMINI_MODEL', "gemini-1.5-flash")
         self.max_tokens = None  # 不限制，使用模型默认最大值
         self.temperature = 0.1
-        self._MAX_REQUESTS_PER_MINUTE = 0  # 默认无限制
-        # 使用全局时间戳,跨实例共享
-        if self.model_name not in GeminiHighQualityTranslator._GLOBAL_LAST_REQUEST_TS:
-            GeminiHighQualityTranslator._GLOBAL_LAST_REQUEST_TS[self.model_name] = 0
-        self._last_request_ts_key = self.model_name
+        self._MAX_REQUESTS_PER_MINUTE = 0  # 默认无限制（RPM/TPM/并发由共享的请求调度器控制）
         # 新版 SDK 的安全设置
         self.safety_settings = [
             types.SafetySetting(
@@ -180,10 +175,6 @@ class GeminiHighQualityTranslator(CommonTranslator):
         user_api_model = getattr(args, 'user_api_model', None)
         if user_api_model:
             self.model_name = user_api_model
-            # 更新全局时间戳的 key
-            if self.model_name not in GeminiHighQualityTranslator._GLOBAL_LAST_REQUEST_TS:
-                GeminiHighQualityTranslator._GLOBAL_LAST_REQUEST_TS[self.model_name] = 0
-            self._last_request_ts_key = self.model_name
             self.logger.info(f"[UserAPIKey] Using user-provided model: {user_api_model}")
         
         # 如果 API Key 或 Base URL 变化，重建客户端
@@ -215,12 +206,17 @@ class GeminiHighQualityTranslator(CommonTranslator):
                     self.logger.info(f"Gemini HQ客户端初始化完成（自定义API Base + curl_cffi TLS 指纹伪装）。Base URL: {self.base_url}")
                 except ImportError:
                     # 回退到标准客户端
-                    self.client = genai.Client(
-                        api_key=self.api_key,
-                        http_options=types.HttpOptions(
-                            base_url=self.base_url,
-                            headers=BROWSER_HEADERS
-                        )
+                    # 同一 API 地址 + Key 共享一个 genai.Client（及其连接池）
+                    self.client = http_pool.shared_client(
+                        'genai', self.base_url, self.api_key,
+                        lambda: genai.Client(
+                            api_key=self.api_key,
+                            http_options=types.HttpOptions(
+                                base_url=self.base_url,
+                                headers=BROWSER_HEADERS
+                            )
+                        ),
+                        extra=('custom_base',)
                     )
                     self._use_curl_cffi = False
                     self.logger.info(f"Gemini HQ客户端初始化完成（自定义API Base，标准模式）。Base URL: {self.base_url}")
@@ -237,7 +233,10 @@ class GeminiHighQualityTranslator(CommonTranslator):
                     self.logger.info("Gemini HQ客户端初始化完成（使用 curl_cffi TLS 指纹伪装）")
                 except ImportError:
                     # 回退到标准客户端
-                    self.client = genai.Client(api_key=self.api_key)
+                    self.client = http_pool.shared_client(
+                        'genai', self.base_url, self.api_key,
+                        lambda: genai.Client(api_key=self.api_key)
+                    )
                     self._use_curl_cffi = False
                     self.logger.info("Gemini HQ客户端初始化完成（标准模式）")
 
@@ -468,24 +467,16 @@ class GeminiHighQualityTranslator(CommonTranslator):
                 self.logger.debug(f"使用自定义API参数: {self._custom_api_params}")
 
             try:
-                # RPM限制
-                if self._MAX_REQUESTS_PER_MINUTE > 0:
-                    import time
-                    now = time.time()
-                    delay = 60.0 / self._MAX_REQUESTS_PER_MINUTE
-                    elapsed = now - GeminiHighQualityTranslator._GLOBAL_LAST_REQUEST_TS[self._last_request_ts_key]
-                    if elapsed < delay:
-                        sleep_time = delay - elapsed
-                        self.logger.info(f'Ratelimit sleep: {sleep_time:.2f}s')
-                        await asyncio.sleep(sleep_time)
-                
                 if retry_attempt > 0 and current_temperature != self.temperature:
                     self.logger.info(f"[重试] 温度调整: {self.temperature} -> {current_temperature}")
 
-                # 根据客户端类型调用不同的 API
+                # 根据客户端类型调用不同的 API，经过共享调度器发送（RPM/TPM限制、并发上限、429/5xx退避）
+                prompt_tokens = estimate_tokens(combined_prompt) + IMAGE_TOKEN_ESTIMATE * (len(content_parts) - 1)
                 if getattr(self, '_use_curl_cffi', False):
                     # 使用 curl_cffi 异步客户端
-                    response = await self.client.models.generate_content(
+                    response = await self._scheduled_request(
+                        self.client.models.generate_content,
+                        prompt_tokens=prompt_tokens,
                         model=self.model_name,
                         contents=content_parts,
                         generation_config=generation_config,
@@ -493,17 +484,15 @@ class GeminiHighQualityTranslator(CommonTranslator):
                     )
                 else:
                     # 使用标准 SDK（同步调用包装为异步）
-                    response = await asyncio.to_thread(
+                    response = await self._scheduled_request(
+                        asyncio.to_thread,
                         self.client.models.generate_content,
+                        prompt_tokens=prompt_tokens,
                         model=self.model_name,
                         contents=content_parts,
                         config=generation_config
                     )
                 
-                # 在API调用成功后立即更新时间戳，确保所有请求（包括重试）都被计入速率限制
-                if self._MAX_REQUESTS_PER_MINUTE > 0:
-                    import time
-                    GeminiHighQualityTranslator._GLOBAL_LAST_REQUEST_TS[self._last_request_ts_key] = time.time()
 
                 # 验证响应对象是否有效
                 validate_gemini_response(response, self.logger)
@@ -751,22 +740,13 @@ class GeminiHighQualityTranslator(CommonTranslator):
                         setattr(generation_config, key, value)
                 self.logger.debug(f"使用自定义API参数: {self._custom_api_params}")
 
-            # RPM限制
-            if self._MAX_REQUESTS_PER_MINUTE > 0:
-                import time
-                now = time.time()
-                delay = 60.0 / self._MAX_REQUESTS_PER_MINUTE
-                elapsed = now - GeminiHighQualityTranslator._GLOBAL_LAST_REQUEST_TS[self._last_request_ts_key]
-                if elapsed < delay:
-                    sleep_time = delay - elapsed
-                    self.logger.info(f'Ratelimit sleep: {sleep_time:.2f}s')
-                    await asyncio.sleep(sleep_time)
-            
             try:
                 # 根据客户端类型调用不同的 API
                 if getattr(self, '_use_curl_cffi', False):
                     # 使用 curl_cffi 异步客户端
-                    response = await self.client.models.generate_content(
+                    response = await self._scheduled_request(
+                        self.client.models.generate_content,
+                        prompt_tokens=estimate_tokens(simple_prompt),
                         model=self.model_name,
                         contents=simple_prompt,
                         generation_config=generation_config,
@@ -774,8 +754,10 @@ class GeminiHighQualityTranslator(CommonTranslator):
                     )
                 else:
                     # 使用标准 SDK（同步调用包装为异步）
-                    response = await asyncio.to_thread(
+                    response = await self._scheduled_request(
+                        asyncio.to_thread,
                         self.client.models.generate_content,
+                        prompt_tokens=estimate_tokens(simple_prompt),
                         model=self.model_name,
                         contents=simple_prompt,
                         config=generation_config
@@ -790,7 +772,9 @@ class GeminiHighQualityTranslator(CommonTranslator):
                 if is_safety_error:
                     self.logger.warning(f"后备翻译检测到安全设置错误，移除安全设置后重试: {error_message}")
                     if getattr(self, '_use_curl_cffi', False):
-                        response = await self.client.models.generate_content(
+                        response = await self._scheduled_request(
+                            self.client.models.generate_content,
+                            prompt_tokens=estimate_tokens(simple_prompt),
                             model=self.model_name,
                             contents=simple_prompt,
                             generation_config=generation_config,
@@ -808,8 +792,10 @@ class GeminiHighQualityTranslator(CommonTranslator):
                             config_params_no_safety["max_output_tokens"] = self.max_tokens
                         
                         generation_config_no_safety = types.GenerateContentConfig(**config_params_no_safety)
-                        response = await asyncio.to_thread(
+                        response = await self._scheduled_request(
+                            asyncio.to_thread,
                             self.client.models.generate_content,
+                            prompt_tokens=estimate_tokens(simple_prompt),
                             model=self.model_name,
                             contents=simple_prompt,
                             config=generation_config_no_safety
@@ -817,10 +803,6 @@ class GeminiHighQualityTranslator(CommonTranslator):
                 else:
                     raise
             
-            # 在API调用成功后立即更新时间戳，确保所有请求（包括重试）都被计入速率限制
-            if self._MAX_REQUESTS_PER_MINUTE > 0:
-                import time
-                GeminiHighQualityTranslator._GLOBAL_LAST_REQUEST_TS[self._last_request_ts_key] = time.time()
             
             # 验证响应对象是否有效
             validate_gemini_response(response, self.logger)
@@ -0,0 +1,362 @@
+"""
+翻译器共享的 HTTP 连接池
+
+OpenAI / Gemini 翻译器（包括高质量版本）的客户端对象很轻，真正昂贵的是底层连接（TLS 握手、代理 CONNECT）。
+这里按 (API 地址, 代理, API Key 哈希) 在进程内复用底层会话：
+- curl_cffi AsyncSession / httpx 异步传输层与事件循环绑定，因此异步会话按事件循环分别缓存
+  （流水线的每个线程有自己的事件循环）
+- 会话只能活到所属事件循环关闭（关闭前调用 close_loop_sessions）：
+  服务器的翻译线程使用跨请求复用的事件循环（task_manager.get_translator_loop），连接在请求之间保留；
+  并发流水线和桌面端每次运行新建事件循环，连接只在一次运行（一批图片及其重试）内复用
+- 重建客户端（重试、parse_args 切换 Key/地址）只重建轻量包装对象，连接保持 keep-alive
+- 健康检查：连接级错误（连接失败、断开、超时）后该会话退役，下次请求使用新会话；
+  空闲超过 IDLE_TIMEOUT 或使用超过 MAX_LIFETIME 的会话也会退役
+- 退役的会话等进行中的请求全部结束后才关闭，不会打断其他并发请求
+- 安装了 h2 时 httpx 传输层启用 HTTP/2；curl_cffi 模拟浏览器时由 ALPN 协商 HTTP/2
+"""
+
+import asyncio
+import hashlib
+import threading
+import time
+import urllib.request
+from typing import Any, Callable, Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+import httpx
+
+from ..utils.log import get_logger
+
+logger = get_logger('HttpPool')
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# 空闲超过该秒数的会话在下次使用前重建（服务端/代理通常早已关闭空闲连接）
+IDLE_TIMEOUT = 120.0
+# 会话最长使用时间，定期重建以跟随 DNS 变化
+MAX_LIFETIME = 1800.0
+# 每个 httpx 传输层的连接数上限
+MAX_CONNECTIONS = 32
+MAX_KEEPALIVE_CONNECTIONS = 16
+# 关闭退役会话的后台任务名（事件循环跨请求复用时，清理请求的任务不应取消它们）
+CLOSE_TASK_NAME = 'http_pool_close'
+
+
+def api_key_hash(api_key: Optional[str]) -> str:
+    """API Key 的哈希（只用于区分连接池，不保存明文）"""
+    return hashlib.blake2b((api_key or '').encode('utf-8'), digest_size=8).hexdigest()
+
+
+def _origin(base_url: Optional[str]) -> str:
+    parts = urlsplit(base_url or '')
+    return f'{parts.scheme}://{parts.netloc}'.lower()
+
+
+def _proxy_for(base_url: Optional[str]) -> str:
+    """环境变量中对该地址生效的代理（httpx / curl_cffi 默认都会读取环境变量代理）"""
+    parts = urlsplit(base_url or '')
+    if parts.hostname and urllib.request.proxy_bypass(parts.hostname):
+        return ''
+    proxies = urllib.request.getproxies()
+    return proxies.get(parts.scheme or 'https') or proxies.get('all') or ''
+
+
+def is_connection_error(error: BaseException) -> bool:
+    """是否为连接级错误（连接失败、断开、超时），HTTP 状态码错误不算"""
+    if isinstance(error, (httpx.TransportError, ConnectionError, TimeoutError, asyncio.TimeoutError)):
+        return True
+    try:
+        from curl_cffi.requests.exceptions import RequestException as CurlRequestException
+    except ImportError:
+        return False
+    # curl_cffi 对 HTTP 状态码不抛异常（由调用方检查 status_code），这里的异常都是传输层错误
+    return isinstance(error, CurlRequestException)
+
+
+class PoolEntry:
+    """一个被共享的会话及其使用情况"""
+
+    def __init__(self, key: Tuple, session: Any, close: Callable, loop: Optional[asyncio.AbstractEventLoop]):
+        self.key = key
+        self.session = session
+        self._close = close
+        self.loop = loop
+        self.created = time.monotonic()
+        self.last_used = self.created
+        self.active = 0
+        self.requests = 0
+        self.retired = False
+        self.closed = False
+
+    def expired(self, now: float) -> bool:
+        return (self.active == 0 and now - self.last_used > IDLE_TIMEOUT) or now - self.created > MAX_LIFETIME
+
+
+class ClientPool:
+    """按 (类型, 事件循环, API 地址, 代理, API Key 哈希, 附加参数) 缓存会话"""
+
+    def __init__(self):
+        self._entries: Dict[Tuple, PoolEntry] = {}
+        self._lock = threading.Lock()
+        self.created = 0
+        self.reused = 0
+        self.retired = 0
+
+    def acquire(self, kind: str, base_url: Optional[str], api_key: Optional[str],
+                factory: Callable[[], Any], close: Callable, extra: Tuple = (), per_loop: bool = True) -> PoolEntry:
+        """
+        取得可用的会话（没有或已失效时用 factory 创建），使用完后必须调用 release()
+
+        Args:
+            per_loop: 会话是否与当前事件循环绑定（异步会话为 True，线程安全的同步客户端为 False）
+        """
+        loop = asyncio.get_running_loop() if per_loop else None
+        key = (kind, id(loop) if loop else None, _origin(base_url), _proxy_for(base_url), api_key_hash(api_key), extra)
+        to_close = []
+        now = time.monotonic()
+        with self._lock:
+            to_close.extend(self._sweep_locked(now))
+            entry = self._entries.get(key)
+            if entry is not None and (entry.loop is not loop or entry.expired(now)):
+                to_close.extend(self._retire_locked(entry))
+                entry = None
+            if entry is None:
+                entry = PoolEntry(key, factory(), close, loop)
+                self._entries[key] = entry
+                self.created += 1
+            else:
+                self.reused += 1
+            entry.active += 1
+            entry.requests += 1
+            entry.last_used = now
+        for old in to_close:
+            self._close_entry(old)
+        return entry
+
+    def release(self, entry: PoolEntry, healthy: bool = True):
+        """归还会话；healthy=False 时该会话退役，之后的请求会使用新会话"""
+        to_close = []
+        with self._lock:
+            entry.active -= 1
+            entry.last_used = time.monotonic()
+            if not healthy and not entry.retired:
+                logger.info(f'Retiring HTTP session for {entry.key[2]} after a connection error')
+                to_close.extend(self._retire_locked(entry))
+            elif entry.retired and entry.active == 0 and not entry.closed:
+                entry.closed = True
+                to_close.append(entry)
+        for old in to_close:
+            self._close_entry(old)
+
+    def _retire_locked(self, entry: PoolEntry):
+        """从池中移除；没有进行中的请求时立即关闭，否则等最后一个请求归还时关闭"""
+        if self._entries.get(entry.key) is entry:
+            del self._entries[entry.key]
+        if entry.retired:
+            return []
+        entry.retired = True
+        self.retired += 1
+        if entry.active == 0 and not entry.closed:
+            entry.closed = True
+            return [entry]
+        return []
+
+    def _sweep_locked(self, now: float):
+        to_close = []
+        for entry in list(self._entries.values()):
+            if entry.loop is not None and entry.loop.is_closed():
+                # 事件循环已关闭，会话无法再使用也无法异步关闭，只能丢弃引用。
+                # 关闭事件循环的地方应先调用 close_loop_sessions()，走到这里说明漏掉了
+                del self._entries[entry.key]
+                entry.retired = entry.closed = True
+                logger.warning(f'Detached HTTP session for {entry.key[2]}: its event loop was closed '
+                               f'without close_loop_sessions(), connections are left to the GC')
+            elif entry.expired(now):
+                to_close.extend(self._retire_locked(entry))
+        return to_close
+
+    def _close_entry(self, entry: PoolEntry):
+        try:
+            result = entry._close(entry.session)
+        except Exception as e:
+            logger.debug(f'Error closing HTTP session: {e}')
+            return
+        if not asyncio.iscoroutine(result):
+            return
+        loop = entry.loop
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        try:
+            if loop is None or loop is running:
+                if running is None:
+                    result.close()
+                    return
+                running.create_task(self._await_close(result), name=CLOSE_TASK_NAME)
+            elif not loop.is_closed():
+                loop.call_soon_threadsafe(lambda: loop.create_task(self._await_close(result), name=CLOSE_TASK_NAME))
+            else:
+                result.close()
+        except RuntimeError:
+            result.close()
+
+    @staticmethod
+    async def _await_close(coro):
+        try:
+            await coro
+        except Exception as e:
+            logger.debug(f'Error closing HTTP session: {e}')
+
+    async def aclose_loop(self, loop: Optional[asyncio.AbstractEventLoop] = None):
+        """关闭绑定在指定（默认当前）事件循环上的会话，在关闭事件循环前调用"""
+        loop = loop or asyncio.get_running_loop()
+        with self._lock:
+            entries = [entry for entry in self._entries.values() if entry.loop is loop]
+            for entry in entries:
+                del self._entries[entry.key]
+                entry.retired = entry.closed = True
+        for entry in entries:
+            try:
+                result = entry._close(entry.session)
+                if asyncio.iscoroutine(result):
+                    await result
+            except Exception as e:
+                logger.debug(f'Error closing HTTP session: {e}')
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'sessions': len(self._entries),
+                'created': self.created,
+                'reused': self.reused,
+                'retired': self.retired,
+            }
+
+
+_pool = ClientPool()
+
+
+def get_client_pool() -> ClientPool:
+    return _pool
+
+
+def is_close_task(task: asyncio.Task) -> bool:
+    """是否为关闭退役会话的后台任务（应等待完成而不是取消，否则连接泄漏）"""
+    return task.get_name() == CLOSE_TASK_NAME
+
+
+def close_loop_sessions(loop: asyncio.AbstractEventLoop):
+    """
+    同步关闭绑定在该事件循环上的共享会话，在 loop.close() 之前调用（事件循环不能正在运行）。
+    只能在事件循环还可用时关闭连接，循环关闭后的会话只能被丢弃
+    """
+    if loop.is_closed():
+        return
+    try:
+        loop.run_until_complete(_pool.aclose_loop(loop))
+    except Exception as e:
+        logger.debug(f'Error closing HTTP sessions of event loop: {e}')
+
+
+async def curl_request(base_url: str, api_key: Optional[str], session_kwargs: Dict[str, Any], method: str, url: str, **kwargs):
+    """用共享的 curl_cffi AsyncSession 发送请求（连接级错误后该会话退役）"""
+    from curl_cffi.requests import AsyncSession
+
+    entry = _pool.acquire(
+        'curl_cffi', base_url, api_key,
+        factory=lambda: AsyncSession(**session_kwargs),
+        close=lambda session: session.close(),
+        extra=tuple(sorted(session_kwargs.items())),
+    )
+    healthy = True
+    try:
+        return await getattr(entry.session, method)(url, **kwargs)
+    except Exception as e:
+        healthy = not is_connection_error(e)
+        raise
+    finally:
+        _pool.release(entry, healthy)
+
+
+class _ReleasingStream(httpx.AsyncByteStream):
+    """响应体读完（或关闭）时才把会话归还给连接池"""
+
+    def __init__(self, stream: httpx.AsyncByteStream, on_close: Callable[[bool], None]):
+        self._stream = stream
+        self._on_close = on_close
+        self._healthy = True
+
+    async def __aiter__(self):
+        try:
+            async for chunk in self._stream:
+                yield chunk
+        except Exception as e:
+            self._healthy = not is_connection_error(e)
+            raise
+
+    async def aclose(self):
+        try:
+            await self._stream.aclose()
+        finally:
+            on_close, self._on_close = self._on_close, None
+            if on_close is not None:
+                on_close(self._healthy)
+
+
+class PooledTransport(httpx.AsyncBaseTransport):
+    """
+    httpx 传输层：实际请求交给连接池中当前事件循环的 AsyncHTTPTransport，
+    因此同一个 httpx.AsyncClient 可以在不同事件循环中使用，且重建客户端不会断开连接
+    """
+
+    def __init__(self, base_url: str, api_key: Optional[str]):
+        self.base_url = base_url
+        self.api_key = api_key
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        entry = _pool.acquire(
+            'httpx', self.base_url, self.api_key,
+            factory=lambda: httpx.AsyncHTTPTransport(
+                http2=HTTP2_AVAILABLE,
+                limits=httpx.Limits(max_connections=MAX_CONNECTIONS,
+                                    max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+                                    keepalive_expiry=IDLE_TIMEOUT),
+            ),
+            close=lambda transport: transport.aclose(),
+        )
+        try:
+            response = await entry.session.handle_async_request(request)
+        except Exception as e:
+            _pool.release(entry, not is_connection_error(e))
+            raise
+        return httpx.Response(
+            status_code=response.status_code,
+            headers=response.headers,
+            stream=_ReleasingStream(response.stream, lambda healthy: _pool.release(entry, healthy)),
+            extensions=response.extensions,
+            request=request,
+        )
+
+    async def aclose(self):
+        # 连接归连接池所有，关闭客户端不关闭连接
+        pass
+
+
+def pooled_httpx_client(base_url: str, api_key: Optional[str], **kwargs) -> httpx.AsyncClient:
+    """创建使用共享连接池的 httpx.AsyncClient（创建和关闭都不涉及网络连接）"""
+    return httpx.AsyncClient(transport=PooledTransport(base_url, api_key), **kwargs)
+
+
+def shared_client(kind: str, base_url: Optional[str], api_key: Optional[str], factory: Callable[[], Any], extra: Tuple = ()) -> Any:
+    """
+    进程内共享的线程安全同步客户端（如 google-genai 的 genai.Client），
+    按 (类型, API 地址, 代理, API Key 哈希, 附加参数) 复用，不随事件循环区分
+    """
+    entry = _pool.acquire(kind, base_url, api_key, factory=factory, close=lambda client: None, extra=extra, per_loop=False)
+    _pool.release(entry)
+    return entry.session
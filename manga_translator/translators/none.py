@@ -3,6 +3,7 @@ from typing import List
 from .common import CommonTranslator
 
 class NoneTranslator(CommonTranslator):
+    _TRANSLATION_MEMORY = False
     
     def supports_languages(self, from_lang: str, to_lang: str, fatal: bool = False) -> bool:
         return True
@@ -8,6 +8,8 @@ import httpx
 from openai import AsyncOpenAI
 
 from .common import CommonTranslator, VALID_LANGUAGES, parse_json_or_text_response, parse_hq_response, get_glossary_extraction_prompt, merge_glossary_to_file, validate_openai_response, AsyncOpenAICurlCffi
+from .request_scheduler import estimate_tokens
+from . import http_pool
 from .keys import OPENAI_API_KEY, OPENAI_MODEL
 from ..utils import Context
 
@@ -52,9 +54,6 @@ class OpenAITranslator(CommonTranslator):
     """
     _LANGUAGE_CODE_MAP = VALID_LANGUAGES
     
-    # 类变量: 跨实例共享的RPM限制时间戳
-    _GLOBAL_LAST_REQUEST_TS = {}  # {model_name: timestamp}
-    
     def __init__(self):
         super().__init__()
         self.client = None
@@ -70,11 +69,7 @@ class OpenAITranslator(CommonTranslator):
         self.model = os.getenv('OPENAI_MODEL', "gpt-4o")
         self.max_tokens = None  # 不限制，使用模型默认最大值
         self.temperature = 0.1
-        self._MAX_REQUESTS_PER_MINUTE = 0  # 默认无限制
-        # 使用全局时间戳,跨实例共享
-        if self.model not in OpenAITranslator._GLOBAL_LAST_REQUEST_TS:
-            OpenAITranslator._GLOBAL_LAST_REQUEST_TS[self.model] = 0
-        self._last_request_ts_key = self.model
+        self._MAX_REQUESTS_PER_MINUTE = 0  # 默认无限制（RPM/TPM/并发由共享的请求调度器控制）
         self._setup_client()
     
     def set_prev_context(self, context: str):
@@ -165,7 +160,10 @@ class OpenAITranslator(CommonTranslator):
                     api_key=self.api_key,
                     base_url=self.base_url,
                     default_headers=BROWSER_HEADERS,
-                    http_client=httpx.AsyncClient(
+                    # 底层连接由共享连接池管理（keep-alive，重建客户端不重新握手）
+                    http_client=http_pool.pooled_httpx_client(
+                        self.base_url,
+                        self.api_key,
                         headers=BROWSER_HEADERS,
                         timeout=httpx.Timeout(300.0, connect=60.0)
                     )
@@ -330,17 +328,6 @@ class OpenAITranslator(CommonTranslator):
             ]
 
             try:
-                # RPM限制
-                if self._MAX_REQUESTS_PER_MINUTE > 0:
-                    import time
-                    now = time.time()
-                    delay = 60.0 / self._MAX_REQUESTS_PER_MINUTE
-                    elapsed = now - OpenAITranslator._GLOBAL_LAST_REQUEST_TS[self._last_request_ts_key]
-                    if elapsed < delay:
-                        sleep_time = delay - elapsed
-                        self.logger.info(f'Ratelimit sleep: {sleep_time:.2f}s')
-                        await asyncio.sleep(sleep_time)
-                
                 # 动态调整温度：质量检查或BR检查失败时提高温度帮助跳出错误模式
                 current_temperature = self._get_retry_temperature(self.temperature, retry_attempt, retry_reason)
                 if retry_attempt > 0 and current_temperature != self.temperature:
@@ -360,11 +347,12 @@ class OpenAITranslator(CommonTranslator):
                     api_params.update(self._custom_api_params)
                     self.logger.debug(f"使用自定义API参数: {self._custom_api_params}")
 
-                response = await self.client.chat.completions.create(**api_params)
-                
-                # 在API调用成功后立即更新时间戳，确保所有请求（包括重试）都被计入速率限制
-                if self._MAX_REQUESTS_PER_MINUTE > 0:
-                    OpenAITranslator._GLOBAL_LAST_REQUEST_TS[self._last_request_ts_key] = time.time()
+                # 经过共享调度器发送（RPM/TPM限制、并发上限、429/5xx退避），所有请求（包括重试）都计入速率限制
+                response = await self._scheduled_request(
+                    self.client.chat.completions.create,
+                    prompt_tokens=estimate_tokens(system_prompt, user_prompt),
+                    **api_params
+                )
 
                 # 验证响应对象是否有效
                 validate_openai_response(response, self.logger)
@@ -531,6 +519,10 @@ class OpenAITranslator(CommonTranslator):
                     self.logger.error("OpenAI翻译在多次重试后仍然失败。即将终止程序。")
                     raise last_exception
                 
+                # 429 由请求调度器统一退避，不重建客户端，以免中断共用该客户端的其他并发请求
+                if self._is_rate_limited_error(e):
+                    continue
+                
                 # 重试前断开连接，重建客户端
                 self.logger.info("重试前断开旧连接，重建客户端...")
                 self._setup_client(force_recreate=True)
@@ -551,11 +543,10 @@ class OpenAITranslator(CommonTranslator):
         custom_prompt_json = getattr(ctx, 'custom_prompt_json', None) if ctx else None
         line_break_prompt_json = getattr(ctx, 'line_break_prompt_json', None) if ctx else None
 
-        # 使用分割包装器进行翻译
-        translations = await self._translate_with_split(
+        # 使用分割包装器进行翻译（request_chunk_size > 0 时分块并发）
+        translations = await self._translate_in_chunks(
             self._translate_batch,
             queries,
-            split_level=0,
             source_lang=from_lang,
             target_lang=to_lang,
             custom_prompt_json=custom_prompt_json,
@@ -12,6 +12,8 @@ import openai
 from openai import AsyncOpenAI
 
 from .common import CommonTranslator, VALID_LANGUAGES, draw_text_boxes_on_image, parse_json_or_text_response, merge_glossary_to_file, get_glossary_extraction_prompt, parse_hq_response, validate_openai_response, AsyncOpenAICurlCffi
+from .request_scheduler import estimate_tokens, IMAGE_TOKEN_ESTIMATE
+from . import http_pool
 from .keys import OPENAI_API_KEY, OPENAI_MODEL
 from ..utils import Context
 
@@ -100,9 +102,6 @@ class OpenAIHighQualityTranslator(CommonTranslator):
     """
     _LANGUAGE_CODE_MAP = VALID_LANGUAGES
     
-    # 类变量: 跨实例共享的RPM限制时间戳
-    _GLOBAL_LAST_REQUEST_TS = {}  # {model_name: timestamp}
-    
     def __init__(self):
         super().__init__()
         self.client = None
@@ -120,11 +119,7 @@ class OpenAIHighQualityTranslator(CommonTranslator):
         self.model = os.getenv('OPENAI_MODEL', "gpt-4o")
         self.max_tokens = None  # 不限制，使用模型默认最大值
         self.temperature = 0.1
-        self._MAX_REQUESTS_PER_MINUTE = 0  # 默认无限制
-        # 使用全局时间戳,跨实例共享
-        if self.model not in OpenAIHighQualityTranslator._GLOBAL_LAST_REQUEST_TS:
-            OpenAIHighQualityTranslator._GLOBAL_LAST_REQUEST_TS[self.model] = 0
-        self._last_request_ts_key = self.model
+        self._MAX_REQUESTS_PER_MINUTE = 0  # 默认无限制（RPM/TPM/并发由共享的请求调度器控制）
         self._setup_client()
     
     def set_prev_context(self, context: str):
@@ -215,7 +210,10 @@ class OpenAIHighQualityTranslator(CommonTranslator):
                     api_key=self.api_key,
                     base_url=self.base_url,
                     default_headers=BROWSER_HEADERS,
-                    http_client=httpx.AsyncClient(
+                    # 底层连接由共享连接池管理（keep-alive，重建客户端不重新握手）
+                    http_client=http_pool.pooled_httpx_client(
+                        self.base_url,
+                        self.api_key,
                         headers=BROWSER_HEADERS,
                         timeout=httpx.Timeout(300.0, connect=60.0)
                     )
@@ -455,17 +453,6 @@ This is an incorrect response because it includes extra text and explanations.
             ]
 
             try:
-                # RPM限制
-                if self._MAX_REQUESTS_PER_MINUTE > 0:
-                    import time
-                    now = time.time()
-                    delay = 60.0 / self._MAX_REQUESTS_PER_MINUTE
-                    elapsed = now - OpenAIHighQualityTranslator._GLOBAL_LAST_REQUEST_TS[self._last_request_ts_key]
-                    if elapsed < delay:
-                        sleep_time = delay - elapsed
-                        self.logger.info(f'Ratelimit sleep: {sleep_time:.2f}s')
-                        await asyncio.sleep(sleep_time)
-                
                 # 动态调整温度：质量检查或BR检查失败时提高温度帮助跳出错误模式
                 current_temperature = self._get_retry_temperature(self.temperature, retry_attempt, retry_reason)
                 if retry_attempt > 0 and current_temperature != self.temperature:
@@ -485,11 +472,15 @@ This is an incorrect response because it includes extra text and explanations.
                     api_params.update(self._custom_api_params)
                     self.logger.debug(f"使用自定义API参数: {self._custom_api_params}")
 
-                response = await self.client.chat.completions.create(**api_params)
-                
-                # 在API调用成功后立即更新时间戳，确保所有请求（包括重试）都被计入速率限制
-                if self._MAX_REQUESTS_PER_MINUTE > 0:
-                    OpenAIHighQualityTranslator._GLOBAL_LAST_REQUEST_TS[self._last_request_ts_key] = time.time()
+                # 经过共享调度器发送（RPM/TPM限制、并发上限、429/5xx退避），所有请求（包括重试）都计入速率限制
+                prompt_tokens = estimate_tokens(system_prompt, user_prompt)
+                if send_images:
+                    prompt_tokens += IMAGE_TOKEN_ESTIMATE * len(image_contents)
+                response = await self._scheduled_request(
+                    self.client.chat.completions.create,
+                    prompt_tokens=prompt_tokens,
+                    **api_params
+                )
 
                 # 验证响应对象是否有效
                 validate_openai_response(response, self.logger)
@@ -694,6 +685,10 @@ This is an incorrect response because it includes extra text and explanations.
                     self.logger.error("OpenAI翻译在多次重试后仍然失败。即将终止程序。")
                     raise last_exception
                 
+                # 429 由请求调度器统一退避，不重建客户端，以免中断共用该客户端的其他并发请求
+                if self._is_rate_limited_error(e):
+                    continue
+                
                 # 重试前断开连接，重建客户端
                 self.logger.info("重试前断开旧连接，重建客户端...")
                 self._setup_client(force_recreate=True)
@@ -742,17 +737,6 @@ This is an incorrect response because it includes extra text and explanations.
         try:
             simple_prompt = f"Translate the following {from_lang} text to {to_lang}. Provide only the translation:\n\n" + "\n".join(queries)
             
-            # RPM限制
-            if self._MAX_REQUESTS_PER_MINUTE > 0:
-                import time
-                now = time.time()
-                delay = 60.0 / self._MAX_REQUESTS_PER_MINUTE
-                elapsed = now - OpenAIHighQualityTranslator._GLOBAL_LAST_REQUEST_TS[self._last_request_ts_key]
-                if elapsed < delay:
-                    sleep_time = delay - elapsed
-                    self.logger.info(f'Ratelimit sleep: {sleep_time:.2f}s')
-                    await asyncio.sleep(sleep_time)
-            
             # 构建API参数，只有当max_tokens有值时才传递（新模型如o1/gpt-4.1不支持null值）
             api_params = {
                 "model": self.model,
@@ -767,11 +751,11 @@ This is an incorrect response because it includes extra text and explanations.
                 api_params.update(self._custom_api_params)
                 self.logger.debug(f"使用自定义API参数: {self._custom_api_params}")
 
-            response = await self.client.chat.completions.create(**api_params)
-            
-            # 在API调用成功后立即更新时间戳，确保所有请求（包括重试）都被计入速率限制
-            if self._MAX_REQUESTS_PER_MINUTE > 0:
-                OpenAIHighQualityTranslator._GLOBAL_LAST_REQUEST_TS[self._last_request_ts_key] = time.time()
+            response = await self._scheduled_request(
+                self.client.chat.completions.create,
+                prompt_tokens=estimate_tokens(simple_prompt),
+                **api_params
+            )
             
             if response.choices and response.choices[0].message.content:
                 result = response.choices[0].message.content.strip()
@@ -0,0 +1,301 @@
+"""
+LLM 翻译请求调度器
+
+同一 API 地址 + 模型的所有翻译器实例共享一个调度器（跨实例、跨线程、跨事件循环）：
+- 令牌桶限制每分钟请求数 (RPM) 和每分钟 token 数 (TPM)
+- 限制同时进行中的请求数
+- 遇到 429 / 5xx 时所有请求一起暂停（优先使用服务端返回的 Retry-After，否则指数退避），
+  429 时并发上限减半，之后每连续成功一轮恢复 1
+"""
+
+import asyncio
+import contextlib
+import random
+import re
+import threading
+import time
+from collections import deque
+from typing import Dict, Optional, Tuple
+
+from ..utils.log import get_logger
+
+logger = get_logger('RequestScheduler')
+
+# 默认同时进行中的请求数
+DEFAULT_MAX_CONCURRENCY = 4
+# 没有 Retry-After 时的退避：BACKOFF_BASE * 2^(连续失败次数)，最多 BACKOFF_MAX 秒
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 60.0
+# 令牌桶的突发容量：最多积攒多少秒的配额
+BURST_SECONDS = 10.0
+# 估计 TPM 时每张图片按多少 token 计
+IMAGE_TOKEN_ESTIMATE = 1000
+
+_STATUS_RE = re.compile(r'(?:status(?: code)?|error code)[\s:=]+(\d{3})', re.IGNORECASE)
+
+
+def estimate_tokens(*texts: str) -> int:
+    """粗略估计 token 数：CJK 字符按 1 个 token，其他字符按 4 个字符 1 个 token"""
+    total = 0
+    for text in texts:
+        if not text:
+            continue
+        cjk = sum(1 for ch in text if ord(ch) >= 0x2E80)
+        total += cjk + (len(text) - cjk + 3) // 4
+    return max(1, total)
+
+
+def classify_error(error: BaseException) -> Tuple[Optional[int], Optional[float]]:
+    """
+    从异常中提取 HTTP 状态码和 Retry-After 秒数
+
+    支持 openai SDK（status_code / response.headers）、google-genai（code）、
+    以及 curl_cffi 客户端包装器抛出的 "... status 429 ..." 文本异常
+    """
+    status = getattr(error, 'status_code', None)
+    if not isinstance(status, int):
+        status = getattr(error, 'code', None)
+    if not isinstance(status, int):
+        match = _STATUS_RE.search(str(error))
+        status = int(match.group(1)) if match else None
+
+    retry_after = getattr(error, 'retry_after', None)
+    if retry_after is None:
+        headers = getattr(getattr(error, 'response', None), 'headers', None)
+        if headers is not None:
+            try:
+                retry_after = headers.get('retry-after')
+            except Exception:
+                retry_after = None
+    try:
+        retry_after = float(retry_after) if retry_after is not None else None
+    except (TypeError, ValueError):
+        # HTTP 日期格式的 Retry-After 不解析，回退到指数退避
+        retry_after = None
+    return status, retry_after
+
+
+def is_retryable_status(status: Optional[int]) -> bool:
+    return status is not None and (status == 429 or status >= 500)
+
+
+class _TokenBucket:
+    """每分钟配额的令牌桶（预约式：令牌不足时余额为负，返回需要等待的秒数），调用方需持有锁"""
+
+    def __init__(self, per_minute: int):
+        self.per_minute = per_minute
+        self.rate = per_minute / 60.0
+        self.capacity = max(1.0, self.rate * BURST_SECONDS)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def reserve(self, amount: float) -> float:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        # 单个请求超过突发容量时按容量计，否则永远等不到
+        self.tokens -= min(amount, self.capacity)
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+
+class _CrossLoopSemaphore:
+    """
+    可调整上限的信号量，可在不同线程的事件循环之间共享
+    （asyncio.Semaphore 绑定在单个事件循环上，流水线的每个线程都有自己的循环）
+    """
+
+    def __init__(self, limit: int):
+        self._limit = max(1, limit)
+        self._in_flight = 0
+        self._waiters = deque()
+        self._lock = threading.Lock()
+
+    @property
+    def limit(self) -> int:
+        return self._limit
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    async def acquire(self):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._in_flight < self._limit and not self._waiters:
+                self._in_flight += 1
+                return
+            fut = loop.create_future()
+            waiter = (loop, fut)
+            self._waiters.append(waiter)
+        try:
+            await fut
+        except asyncio.CancelledError:
+            with self._lock:
+                try:
+                    self._waiters.remove(waiter)
+                    granted = False
+                except ValueError:
+                    granted = True
+            # 已经分到名额：结果已送达则自己归还，否则由 _wake 看到取消后归还
+            if granted and fut.done() and not fut.cancelled():
+                self.release()
+            raise
+
+    def release(self):
+        with self._lock:
+            self._in_flight -= 1
+            self._grant_locked()
+
+    def set_limit(self, limit: int):
+        with self._lock:
+            self._limit = max(1, limit)
+            self._grant_locked()
+
+    def _grant_locked(self):
+        while self._waiters and self._in_flight < self._limit:
+            loop, fut = self._waiters.popleft()
+            self._in_flight += 1
+            try:
+                loop.call_soon_threadsafe(self._wake, fut)
+            except RuntimeError:
+                # 等待者的事件循环已关闭
+                self._in_flight -= 1
+
+    def _wake(self, fut: asyncio.Future):
+        if fut.cancelled():
+            self.release()
+        else:
+            fut.set_result(None)
+
+
+class RequestScheduler:
+    """
+    单个 API 端点（API 地址 + 模型）的请求调度器
+
+    用法:
+        async with scheduler.slot(estimate_tokens(prompt)):
+            response = await client.chat.completions.create(...)
+    """
+
+    def __init__(self, name: str, max_concurrency: int = DEFAULT_MAX_CONCURRENCY):
+        self.name = name
+        self._lock = threading.Lock()
+        self._max_concurrency = max(1, max_concurrency)
+        self._semaphore = _CrossLoopSemaphore(self._max_concurrency)
+        self._rpm: Optional[_TokenBucket] = None
+        self._tpm: Optional[_TokenBucket] = None
+        self._cooldown_until = 0.0
+        self._consecutive_failures = 0
+        self._successes_since_change = 0
+        self.requests = 0
+        self.throttled = 0
+        self.wait_seconds = 0.0
+
+    def configure(self, max_concurrency: int = DEFAULT_MAX_CONCURRENCY, rpm: int = 0, tpm: int = 0):
+        """更新限制（值未变化时保留令牌桶状态）"""
+        with self._lock:
+            max_concurrency = max(1, max_concurrency)
+            if max_concurrency != self._max_concurrency:
+                self._max_concurrency = max_concurrency
+                self._semaphore.set_limit(max_concurrency)
+            if (self._rpm.per_minute if self._rpm else 0) != max(rpm, 0):
+                self._rpm = _TokenBucket(rpm) if rpm > 0 else None
+            if (self._tpm.per_minute if self._tpm else 0) != max(tpm, 0):
+                self._tpm = _TokenBucket(tpm) if tpm > 0 else None
+
+    @contextlib.asynccontextmanager
+    async def slot(self, tokens: int = 0):
+        """占用一个请求名额：等待并发名额、暂停期和 RPM/TPM 配额"""
+        start = time.monotonic()
+        await self._semaphore.acquire()
+        try:
+            await self._wait_for_turn(tokens)
+            waited = time.monotonic() - start
+            with self._lock:
+                self.requests += 1
+                self.wait_seconds += waited
+            if waited >= 1.0:
+                logger.info(f'[{self.name}] Ratelimit wait: {waited:.2f}s')
+            yield
+        finally:
+            self._semaphore.release()
+
+    async def _wait_for_turn(self, tokens: int):
+        reserved = False
+        while True:
+            with self._lock:
+                wait = self._cooldown_until - time.monotonic()
+                if wait <= 0:
+                    if reserved:
+                        return
+                    reserved = True
+                    wait = max(
+                        self._rpm.reserve(1) if self._rpm else 0.0,
+                        self._tpm.reserve(tokens) if self._tpm and tokens > 0 else 0.0,
+                    )
+                    if wait <= 0:
+                        return
+            await asyncio.sleep(wait)
+
+    def report_success(self):
+        """请求成功：重置退避，并逐步恢复被减半的并发上限"""
+        with self._lock:
+            self._consecutive_failures = 0
+            limit = self._semaphore.limit
+            if limit < self._max_concurrency:
+                self._successes_since_change += 1
+                if self._successes_since_change >= limit:
+                    self._successes_since_change = 0
+                    self._semaphore.set_limit(limit + 1)
+
+    def report_failure(self, error: BaseException) -> Optional[float]:
+        """
+        请求失败：429 / 5xx 时让该端点的所有请求暂停一段时间
+
+        Returns:
+            暂停的秒数；其他错误返回 None（由调用方按原有逻辑重试）
+        """
+        status, retry_after = classify_error(error)
+        if not is_retryable_status(status):
+            return None
+        with self._lock:
+            if retry_after is not None:
+                delay = min(max(retry_after, 0.0), BACKOFF_MAX)
+            else:
+                delay = min(BACKOFF_BASE * (2 ** self._consecutive_failures), BACKOFF_MAX)
+                delay *= random.uniform(0.8, 1.2)
+            self._consecutive_failures += 1
+            self.throttled += 1
+            self._cooldown_until = max(self._cooldown_until, time.monotonic() + delay)
+            limit = self._semaphore.limit
+            if status == 429 and limit > 1:
+                self._successes_since_change = 0
+                self._semaphore.set_limit(limit // 2)
+                limit //= 2
+        logger.warning(f'[{self.name}] HTTP {status}, backing off {delay:.1f}s (max in-flight requests: {limit})')
+        return delay
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'requests': self.requests,
+                'throttled': self.throttled,
+                'wait_seconds': self.wait_seconds,
+                'in_flight': self._semaphore.in_flight,
+                'max_in_flight': self._semaphore.limit,
+            }
+
+
+_schedulers: Dict[str, RequestScheduler] = {}
+_schedulers_lock = threading.Lock()
+
+
+def get_request_scheduler(base_url: Optional[str], model: Optional[str]) -> RequestScheduler:
+    """进程内共享的调度器，按 API 地址 + 模型区分"""
+    key = f"{(base_url or '').rstrip('/')}|{model or ''}"
+    with _schedulers_lock:
+        scheduler = _schedulers.get(key)
+        if scheduler is None:
+            scheduler = RequestScheduler(model or base_url or 'default')
+            _schedulers[key] = scheduler
+        return scheduler
@@ -0,0 +1,202 @@
+"""
+翻译记忆：持久化的译文缓存
+
+以 (原文, 目标语言, 翻译器, 模型, 提示词哈希) 为键保存译文，章节内反复出现的台词
+（人名、拟声词、"……"、章节标题）以及重新翻译同一章节时直接复用已有译文，不再请求翻译接口。
+
+- 存储在 SQLite 数据库中（cache/translation_memory.sqlite3），多线程/多进程共享
+- 条目数超过上限时按最近使用时间淘汰
+- 译后检查触发的重译通过 bypass() 跳过查询，新译文会覆盖记忆中的旧条目
+"""
+
+import contextlib
+import contextvars
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from ..utils import BASE_PATH
+from ..utils.log import get_logger
+
+logger = get_logger('TranslationMemory')
+
+DEFAULT_DB_PATH = os.path.join(BASE_PATH, 'cache', 'translation_memory.sqlite3')
+# 条目数上限，超出时淘汰最久未使用的条目
+MAX_ENTRIES = 200000
+
+# 键格式变化时递增，使旧条目自然失效
+_KEY_VERSION = 1
+# SQLite 单条语句的参数数量限制
+_SQL_CHUNK = 500
+
+# 为 True 时跳过记忆查询（仍会写入），用于译后检查的重译
+_bypass = contextvars.ContextVar('translation_memory_bypass', default=False)
+
+
+@contextlib.contextmanager
+def bypass():
+    """在此范围内的翻译不使用翻译记忆中的译文（新译文仍会写入并覆盖旧条目）"""
+    token = _bypass.set(True)
+    try:
+        yield
+    finally:
+        _bypass.reset(token)
+
+
+def is_bypassed() -> bool:
+    return _bypass.get()
+
+
+def prompt_hash(*parts) -> str:
+    """提示词/参数的哈希，任意可 JSON 序列化的内容"""
+    data = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.blake2b(data.encode('utf-8'), digest_size=16).hexdigest()
+
+
+def make_key(text: str, target_lang: str, translator: str, model: Optional[str], prompt: str) -> str:
+    data = json.dumps([_KEY_VERSION, text, target_lang, translator, model or '', prompt], ensure_ascii=False)
+    return hashlib.blake2b(data.encode('utf-8'), digest_size=20).hexdigest()
+
+
+class TranslationMemory:
+    """
+    基于 SQLite 的翻译记忆
+
+    Args:
+        db_path: 数据库路径
+        max_entries: 条目数上限
+    """
+
+    def __init__(self, db_path: str = DEFAULT_DB_PATH, max_entries: int = MAX_ENTRIES):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = None
+        self._puts_since_trim = 0
+        self.lookups = 0
+        self.hits = 0
+        self.coalesced = 0
+        self.stored = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        """懒加载连接（调用方需持有 _lock）"""
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.db_path) or '.', exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+            try:
+                conn.execute('PRAGMA journal_mode=WAL')
+            except sqlite3.DatabaseError:
+                pass
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS memory ('
+                'key TEXT PRIMARY KEY, source TEXT NOT NULL, translation TEXT NOT NULL, '
+                'target_lang TEXT, translator TEXT, model TEXT, '
+                'hits INTEGER NOT NULL DEFAULT 0, last_used REAL NOT NULL)'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS memory_last_used ON memory(last_used)')
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, str]:
+        """批量查询，返回 {key: translation}（只包含命中的键）"""
+        keys = list(dict.fromkeys(keys))
+        if not keys:
+            return {}
+        found = {}
+        try:
+            with self._lock:
+                conn = self._connect()
+                for i in range(0, len(keys), _SQL_CHUNK):
+                    chunk = keys[i:i + _SQL_CHUNK]
+                    placeholders = ','.join('?' * len(chunk))
+                    rows = conn.execute(f'SELECT key, translation FROM memory WHERE key IN ({placeholders})', chunk)
+                    found.update(rows.fetchall())
+                if found:
+                    hit_keys = list(found)
+                    now = time.time()
+                    for i in range(0, len(hit_keys), _SQL_CHUNK):
+                        chunk = hit_keys[i:i + _SQL_CHUNK]
+                        placeholders = ','.join('?' * len(chunk))
+                        conn.execute(f'UPDATE memory SET hits = hits + 1, last_used = ? WHERE key IN ({placeholders})',
+                                     [now, *chunk])
+                    conn.commit()
+        except sqlite3.Error as e:
+            logger.warning(f'Translation memory lookup failed: {e}')
+            return {}
+        return found
+
+    def put_many(self, entries: List[Tuple[str, str, str, str, str, Optional[str]]]):
+        """批量写入 (key, source, translation, target_lang, translator, model)，已存在的键会被覆盖"""
+        if not entries:
+            return
+        now = time.time()
+        try:
+            with self._lock:
+                conn = self._connect()
+                conn.executemany(
+                    'INSERT OR REPLACE INTO memory (key, source, translation, target_lang, translator, model, hits, last_used) '
+                    'VALUES (?, ?, ?, ?, ?, ?, 0, ?)',
+                    [(*entry, now) for entry in entries]
+                )
+                self.stored += len(entries)
+                self._puts_since_trim += len(entries)
+                if self.max_entries > 0 and self._puts_since_trim >= 1000:
+                    self._puts_since_trim = 0
+                    self._trim(conn)
+                conn.commit()
+        except sqlite3.Error as e:
+            logger.warning(f'Translation memory write failed: {e}')
+
+    def _trim(self, conn: sqlite3.Connection):
+        """淘汰最久未使用的条目，使条目数不超过上限（调用方需持有 _lock）"""
+        count = conn.execute('SELECT COUNT(*) FROM memory').fetchone()[0]
+        excess = count - self.max_entries
+        if excess > 0:
+            conn.execute('DELETE FROM memory WHERE key IN (SELECT key FROM memory ORDER BY last_used LIMIT ?)', (excess,))
+            logger.info(f'Translation memory trimmed {excess} least recently used entries')
+
+    def record(self, lookups: int, hits: int, coalesced: int):
+        with self._lock:
+            self.lookups += lookups
+            self.hits += hits
+            self.coalesced += coalesced
+
+    def stats(self) -> dict:
+        """本进程内的命中统计"""
+        return {
+            'lookups': self.lookups,
+            'hits': self.hits,
+            'hit_rate': self.hits / self.lookups if self.lookups else 0.0,
+            'coalesced': self.coalesced,
+            'stored': self.stored,
+        }
+
+    def clear(self):
+        with self._lock:
+            conn = self._connect()
+            conn.execute('DELETE FROM memory')
+            conn.commit()
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+_memory = None
+_memory_lock = threading.Lock()
+
+
+def get_translation_memory() -> TranslationMemory:
+    """进程内共享的翻译记忆实例"""
+    global _memory
+    with _memory_lock:
+        if _memory is None:
+            _memory = TranslationMemory()
+        return _memory
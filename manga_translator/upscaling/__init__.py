@@ -30,6 +30,8 @@ def get_upscaler(key: Upscaler, *args, **kwargs) -> CommonUpscaler:
         cache_key_parts.append(kwargs['model_name'])
     if 'tile_size' in kwargs:
         cache_key_parts.append(f"tile{kwargs['tile_size']}")
+    if 'tile_batch_size' in kwargs:
+        cache_key_parts.append(f"batch{kwargs['tile_batch_size']}")
     cache_key = '_'.join(cache_key_parts)
     
     if cache_key not in upscaler_cache:
@@ -59,6 +61,8 @@ async def unload(upscaler_key: Upscaler, **kwargs):
         cache_key_parts.append(kwargs['model_name'])
     if 'tile_size' in kwargs:
         cache_key_parts.append(f"tile{kwargs['tile_size']}")
+    if 'tile_batch_size' in kwargs:
+        cache_key_parts.append(f"batch{kwargs['tile_batch_size']}")
     cache_key = '_'.join(cache_key_parts)
     
     if cache_key in upscaler_cache:
@@ -8,7 +8,7 @@ from typing import List
 
 from .common import OfflineUpscaler
 from .esrgan_pytorch import RRDBNet, infer_params
-from .tile_utils import split_image_into_tiles, merge_tiles_into_image
+from .tile_utils import resolve_tile_batch_size, upscale_tiled
 from ..utils import get_logger
 
 logger = get_logger('MangaJaNaiUpscaler')
@@ -207,7 +207,7 @@ class MangaJaNaiUpscaler(OfflineUpscaler):
     MODE_X4 = 'x4'
     MODE_DAT2 = 'DAT2 x4'
 
-    def __init__(self, *args, model_name: str = '', tile_size: int = 400, **kwargs):
+    def __init__(self, *args, model_name: str = '', tile_size: int = 400, tile_batch_size: int = 0, **kwargs):
         # Default fallback if model_name is empty
         if not model_name:
             model_name = self.MODE_X4
@@ -218,6 +218,7 @@ class MangaJaNaiUpscaler(OfflineUpscaler):
         self.device = None
         self.scale = 4 # default assumption
         self.tile_size = tile_size
+        self.tile_batch_size = tile_batch_size  # 每个推理 batch 的 tile 数（0 = 自动）
         
         # Configure modes
         self.is_auto_mode = False
@@ -517,57 +518,62 @@ class MangaJaNaiUpscaler(OfflineUpscaler):
         # 统一确保输入是 PIL Image
         if isinstance(img, np.ndarray):
             img = Image.fromarray(img)
+        img_np = np.asarray(img.convert('RGB'))
+        return Image.fromarray(self._process_batch(img_np[None], device)[0])
+
+    def _process_batch(self, batch: np.ndarray, device: torch.device) -> np.ndarray:
+        """
+        批量处理尺寸相同的图片
+        
+        Args:
+            batch: (B, H, W, 3) uint8 RGB
+            device: torch 设备
+            
+        Returns:
+            (B, H*scale, W*scale, 3) uint8
+        """
         # Check minimum size requirement
         min_size = 40
-        original_size = img.size
-        padded = False
+        height, width = batch.shape[1:3]
         
         # 计算需要的 padding：尺寸必须是 2 的倍数（pixel_unshuffle 要求）
-        pad_w = (2 - img.size[0] % 2) % 2
-        pad_h = (2 - img.size[1] % 2) % 2
+        pad_w = (2 - width % 2) % 2
+        pad_h = (2 - height % 2) % 2
         
         # 同时检查最小尺寸要求
-        if img.size[0] + pad_w < min_size:
-            pad_w = min_size - img.size[0]
-        if img.size[1] + pad_h < min_size:
-            pad_h = min_size - img.size[1]
+        if width + pad_w < min_size:
+            pad_w = min_size - width
+        if height + pad_h < min_size:
+            pad_h = min_size - height
         
         # 确保 padding 后仍是 2 的倍数
-        if (img.size[0] + pad_w) % 2 != 0:
+        if (width + pad_w) % 2 != 0:
             pad_w += 1
-        if (img.size[1] + pad_h) % 2 != 0:
+        if (height + pad_h) % 2 != 0:
             pad_h += 1
         
         if pad_w > 0 or pad_h > 0:
-            new_size = (img.size[0] + pad_w, img.size[1] + pad_h)
-            padded_img = Image.new('RGB', new_size, (0, 0, 0))
-            padded_img.paste(img, (0, 0))
-            img = padded_img
-            padded = True
-            logger.debug(f'Padded image from {original_size} to {new_size} for pixel_unshuffle compatibility')
+            batch = np.pad(batch, ((0, 0), (0, pad_h), (0, pad_w), (0, 0)))
+            logger.debug(f'Padded image from {(width, height)} to {(width + pad_w, height + pad_h)} for pixel_unshuffle compatibility')
         
         # Convert to tensor: B C H W
-        img_np = np.array(img.convert('RGB'))
-        tensor = einops.rearrange(torch.from_numpy(img_np).float() / 255.0, 'h w c -> 1 c h w').to(device)
+        tensor = einops.rearrange(torch.from_numpy(np.ascontiguousarray(batch)).to(device).float() / 255.0, 'b h w c -> b c h w')
         
         with torch.no_grad():
             output = self.model(tensor)
         
-        # Convert back to PIL
-        output_np = (einops.rearrange(output.squeeze(0).clamp(0, 1), 'c h w -> h w c').cpu().numpy() * 255.0).astype(np.uint8)
-        result_img = Image.fromarray(output_np)
-        
         # If image was padded, crop back to original scaled size
-        if padded:
-            scaled_width = original_size[0] * self.scale
-            scaled_height = original_size[1] * self.scale
-            result_img = result_img.crop((0, 0, scaled_width, scaled_height))
+        output = output[:, :, :height * self.scale, :width * self.scale]
         
-        return result_img
+        # Convert back to numpy（在设备上转为 uint8 再拷贝，截断取整与原先的 astype 一致）
+        output = output.clamp_(0, 1).mul_(255.0).to(torch.uint8)
+        output_np = einops.rearrange(output, 'b c h w -> b h w c').cpu().numpy()
+        del tensor, output
+        return output_np
 
     def _process_with_tiles(self, img, device: torch.device, tile_size: int) -> Image.Image:
         """
-        使用分块处理图片
+        使用分块处理图片（尺寸相同的 tile 组成 batch，结果直接写入输出图像）
         
         Args:
             img: PIL Image 或 numpy array
@@ -580,11 +586,12 @@ class MangaJaNaiUpscaler(OfflineUpscaler):
         # 统一确保输入是 PIL Image
         if isinstance(img, np.ndarray):
             img = Image.fromarray(img)
-        tiles_with_pos = split_image_into_tiles(img, tile_size, overlap=16)
-        
-        processed_tiles = []
-        for tile, pos in tiles_with_pos:
-            processed_tile = self._process_single(tile, device)
-            processed_tiles.append((processed_tile, pos))
-        
-        return merge_tiles_into_image(processed_tiles, img.size, self.scale, overlap=16)
+        output_np = upscale_tiled(
+            img.convert('RGB'),
+            self.scale,
+            lambda batch: self._process_batch(batch, device),
+            tile_size=tile_size,
+            overlap=16,
+            batch_size=resolve_tile_batch_size(self.tile_batch_size, device),
+        )
+        return Image.fromarray(output_np)
@@ -15,7 +15,7 @@ from typing import List
 from PIL import Image
 
 from .common import OfflineUpscaler
-from .tile_utils import split_image_into_tiles, merge_tiles_into_image
+from .tile_utils import resolve_tile_batch_size, upscale_tiled
 from ..utils import get_logger
 
 
@@ -81,13 +81,14 @@ class RealCUGANUpscaler(OfflineUpscaler):
     # Note: This is populated in __init__ to only include the selected model
     _MODEL_MAPPING = {}
     
-    def __init__(self, *args, model_name: str = '4x-denoise3x', tile_size: int = 400, **kwargs):
+    def __init__(self, *args, model_name: str = '4x-denoise3x', tile_size: int = 400, tile_batch_size: int = 0, **kwargs):
         """
         Initialize Real-CUGAN PyTorch upscaler
         
         Args:
             model_name: Model name (e.g. '4x-denoise3x', '2x-conservative-pro')
             tile_size: Tile size for splitting large images (default: 400, 0 = process full image)
+            tile_batch_size: Number of equally sized tiles per inference batch (default: 0 = auto, 4 on GPU / 1 on CPU)
         """
         if model_name not in self._VALID_MODELS:
             raise ValueError(
@@ -97,6 +98,7 @@ class RealCUGANUpscaler(OfflineUpscaler):
         
         self.model_name = model_name
         self.tile_size = tile_size
+        self.tile_batch_size = tile_batch_size
         self.scale = self._VALID_MODELS[model_name]['scale']
         self.model_file = self._VALID_MODELS[model_name]['file']
         self.model = None
@@ -119,7 +121,7 @@ class RealCUGANUpscaler(OfflineUpscaler):
         
         logger.info(
             f'Initialized RealCUGAN PyTorch: model={model_name}, '
-            f'scale={self.scale}x, tile_size={tile_size}'
+            f'scale={self.scale}x, tile_size={tile_size}, tile_batch_size={self.tile_batch_size}'
         )
 
     def _migrate_old_models(self):
@@ -260,51 +262,53 @@ class RealCUGANUpscaler(OfflineUpscaler):
         
         return results
     
+    def _to_rgb(self, img: Image.Image) -> Image.Image:
+        """Convert grayscale / RGBA images to RGB"""
+        if img.mode in ('L', 'LA'):
+            img = img.convert('RGB')
+        elif img.mode == 'RGBA':
+            # Convert RGBA to RGB by compositing over white background
+            rgb = Image.new('RGB', img.size, (255, 255, 255))
+            rgb.paste(img, mask=img.split()[3])  # Use alpha channel as mask
+            img = rgb
+        elif img.mode != 'RGB':
+            img = img.convert('RGB')
+        return img
+    
     def _process_single(self, img: Image.Image, device: torch.device) -> Image.Image:
         """Process a single image without tiling"""
+        np_img = np.asarray(self._to_rgb(img))
+        output_np = self._process_batch(np_img[None], device)[0]
+        return Image.fromarray(output_np, mode='RGB')
+    
+    def _process_batch(self, batch: np.ndarray, device: torch.device) -> np.ndarray:
+        """
+        Process a batch of equally sized RGB images
+        
+        Args:
+            batch: (B, H, W, 3) uint8
+        
+        Returns:
+            (B, H*scale, W*scale, 3) uint8
+        """
         # Check minimum size requirement for RealCUGAN
         # RealCUGAN uses padding=18/14/19 and then crops -20, requires minimum dimensions
         min_size = 40  # Minimum size to allow padding and cropping
-        original_size = img.size
-        padded = False
+        height, width = batch.shape[1:3]
         
-        if img.size[0] < min_size or img.size[1] < min_size:
+        if width < min_size or height < min_size:
             logger.warning(
-                f'Image size ({img.size[0]}x{img.size[1]}) is too small for RealCUGAN. '
+                f'Image size ({width}x{height}) is too small for RealCUGAN. '
                 f'Minimum size is {min_size}x{min_size}. '
                 f'Adding black padding to reach minimum size.'
             )
-            # Calculate padding needed
-            pad_w = max(0, min_size - img.size[0])
-            pad_h = max(0, min_size - img.size[1])
-            
-            # Create new image with black background
-            new_size = (img.size[0] + pad_w, img.size[1] + pad_h)
-            padded_img = Image.new('RGB', new_size, (0, 0, 0))
-            
-            # Paste original image in top-left corner
-            padded_img.paste(img, (0, 0))
-            img = padded_img
-            padded = True
-        
-        # Convert grayscale to RGB if necessary
-        if img.mode in ('L', 'LA'):
-            img = img.convert('RGB')
-        elif img.mode == 'RGBA':
-            # Convert RGBA to RGB by compositing over white background
-            rgb = Image.new('RGB', img.size, (255, 255, 255))
-            rgb.paste(img, mask=img.split()[3])  # Use alpha channel as mask
-            img = rgb
+            # Pad with black on the right / bottom
+            pad_w = max(0, min_size - width)
+            pad_h = max(0, min_size - height)
+            batch = np.pad(batch, ((0, 0), (0, pad_h), (0, pad_w), (0, 0)))
         
         # Convert to tensor
-        np_img = np.array(img).astype(np.float32) / 255.0
-        
-        # Ensure 3D tensor (H, W, C)
-        if len(np_img.shape) == 2:
-            # Grayscale: expand to 3 channels
-            np_img = np.stack([np_img] * 3, axis=2)
-        
-        tensor = torch.from_numpy(np_img).permute(2, 0, 1).unsqueeze(0).to(device)
+        tensor = torch.from_numpy(np.ascontiguousarray(batch)).to(device).permute(0, 3, 1, 2).float() / 255.0
         
         # Determine model parameters
         is_pro = '-pro' in self.model_name
@@ -329,11 +333,14 @@ class RealCUGANUpscaler(OfflineUpscaler):
                 pro=is_pro        # PRO model flag
             )
         
-        # Convert back to PIL (output is already uint8 from model)
+        # If image was padded, crop back to original scaled size
+        output = output[:, :, :height * self.scale, :width * self.scale]
+        
+        # Convert back to numpy (output is already uint8 from model)
         if output.dtype == torch.uint8:
-            output_np = output.squeeze(0).permute(1, 2, 0).cpu().numpy()
+            output_np = output.permute(0, 2, 3, 1).cpu().numpy()
         else:
-            output_np = output.squeeze(0).permute(1, 2, 0).cpu().numpy()
+            output_np = output.permute(0, 2, 3, 1).cpu().numpy()
             output_np = np.clip(output_np, 0, 255).astype(np.uint8)
         
         # ✅ 清理中间张量以释放显存
@@ -342,38 +349,27 @@ class RealCUGANUpscaler(OfflineUpscaler):
         if torch.cuda.is_available():
             torch.cuda.empty_cache()
         
-        result_img = Image.fromarray(output_np, mode='RGB')
-        
-        # If image was padded, crop back to original scaled size
-        if padded:
-            # Calculate the original region after upscaling
-            scaled_width = original_size[0] * self.scale
-            scaled_height = original_size[1] * self.scale
-            result_img = result_img.crop((0, 0, scaled_width, scaled_height))
-            logger.info(f'Cropped upscaled image from {output_np.shape[1]}x{output_np.shape[0]} to {scaled_width}x{scaled_height}')
-        
-        return result_img
+        return output_np
     
     def _process_with_tiles(self, img: Image.Image, device: torch.device, tile_size: int) -> Image.Image:
-        """Process image with external tiling"""
-        # Split into tiles
-        tiles_with_pos = split_image_into_tiles(img, tile_size, overlap=16)
-        
-        logger.info(f'Split image ({img.size[0]}x{img.size[1]}) into {len(tiles_with_pos)} tiles (tile_size={tile_size})')
-        
-        # Process each tile
-        processed_tiles = []
-        for i, (tile, pos) in enumerate(tiles_with_pos):
-            processed_tile = self._process_single(tile, device)
-            processed_tiles.append((processed_tile, pos))
-        
-        # Merge tiles
-        output_img = merge_tiles_into_image(
-            processed_tiles,
-            img.size,
+        """Process image with external tiling (equal-size tiles are batched)"""
+        img = self._to_rgb(img)
+        batch_size = resolve_tile_batch_size(self.tile_batch_size, device)
+        
+        logger.info(
+            f'Upscaling image ({img.size[0]}x{img.size[1]}) in tiles '
+            f'(tile_size={tile_size}, batch_size={batch_size})'
+        )
+        
+        output_np = upscale_tiled(
+            img,
             self.scale,
-            overlap=16
+            lambda batch: self._process_batch(batch, device),
+            tile_size=tile_size,
+            overlap=16,
+            batch_size=batch_size
         )
+        output_img = Image.fromarray(output_np, mode='RGB')
         
         logger.info(f'Merged tiles into final image: {output_img.size[0]}x{output_img.size[1]} (scale={self.scale}x)')
         
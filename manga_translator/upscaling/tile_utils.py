@@ -3,10 +3,14 @@ Tile-based image processing utilities for upscaling
 Simple external tiling to reduce memory usage
 """
 
-from typing import List, Tuple, Union
+from typing import Callable, Dict, Iterator, List, Tuple, Union
 from PIL import Image
 import numpy as np
 
+from ..utils import get_logger
+
+logger = get_logger('TileUtils')
+
 
 def split_image_into_tiles(
     image: Union[Image.Image, np.ndarray],
@@ -112,3 +116,173 @@ def merge_tiles_into_image(
     
     return output
 
+
+
+def iter_tile_boxes(
+    width: int,
+    height: int,
+    tile_size: int = 512,
+    overlap: int = 16
+) -> Iterator[Tuple[int, int, int, int]]:
+    """
+    Yield tile positions (x, y, w, h) in raster order, same layout as split_image_into_tiles
+    """
+    step = tile_size - overlap
+    for y in range(0, height, step):
+        for x in range(0, width, step):
+            yield x, y, min(x + tile_size, width) - x, min(y + tile_size, height) - y
+
+
+def _axis_weights(starts: List[int], ends: List[int], index: int, scale: int) -> np.ndarray:
+    """
+    一维羽化权重：与相邻 tile 重叠的部分线性渐变，两个相邻 tile 在重叠区的权重之和恰好为 1
+    """
+    length = (ends[index] - starts[index]) * scale
+    weights = np.ones(length, dtype=np.float32)
+    if index > 0:
+        ramp = min(ends[index - 1], ends[index]) - starts[index]
+        if ramp > 0:
+            n = ramp * scale
+            weights[:n] = (np.arange(n, dtype=np.float32) + 0.5) / n
+    if index < len(starts) - 1:
+        ramp = min(ends[index], ends[index + 1]) - starts[index + 1]
+        if ramp > 0:
+            n = ramp * scale
+            offset = (starts[index + 1] - starts[index]) * scale
+            weights[offset:offset + n] *= 1.0 - (np.arange(n, dtype=np.float32) + 0.5) / n
+    return weights
+
+
+def _blend_into(region: np.ndarray, tile: np.ndarray, weight_y: np.ndarray, weight_x: np.ndarray):
+    """region += tile * (weight_y ⊗ weight_x)（饱和加法）"""
+    weight = np.multiply.outer(weight_y, weight_x)[..., None]
+    blended = region.astype(np.uint16) + np.rint(tile * weight).astype(np.uint16)
+    np.minimum(blended, 255, out=blended)
+    region[...] = blended
+
+
+class TileMerger:
+    """
+    把放大后的 tile 直接写入预分配的输出数组
+
+    重叠区使用线性羽化权重，各 tile 的权重在每个像素上之和为 1，
+    因此写入顺序无关（可以按尺寸分组批量处理后乱序写入），也不需要保存其他 tile
+    """
+
+    def __init__(self, width: int, height: int, scale: int, tile_size: int, overlap: int):
+        self.scale = scale
+        step = tile_size - overlap
+        self._x_starts = list(range(0, width, step))
+        self._y_starts = list(range(0, height, step))
+        self._x_ends = [min(x + tile_size, width) for x in self._x_starts]
+        self._y_ends = [min(y + tile_size, height) for y in self._y_starts]
+        self.output = np.zeros((height * scale, width * scale, 3), dtype=np.uint8)
+
+    def add(self, box: Tuple[int, int, int, int], tile: np.ndarray):
+        """写入一个放大后的 tile（box 为原图中的 (x, y, w, h)）"""
+        x, y = box[0], box[1]
+        s = self.scale
+        ix = self._x_starts.index(x)
+        iy = self._y_starts.index(y)
+        weight_x = _axis_weights(self._x_starts, self._x_ends, ix, s)
+        weight_y = _axis_weights(self._y_starts, self._y_ends, iy, s)
+        th, tw = len(weight_y), len(weight_x)
+        tile = tile[:th, :tw]
+        region = self.output[y * s:y * s + th, x * s:x * s + tw]
+
+        # 权重为 1 的中心部分只属于这个 tile，直接复制；其余部分按权重累加
+        full_x = np.flatnonzero(weight_x == 1.0)
+        full_y = np.flatnonzero(weight_y == 1.0)
+        if len(full_x) == 0 or len(full_y) == 0:
+            _blend_into(region, tile, weight_y, weight_x)
+            return
+        x0, x1 = full_x[0], full_x[-1] + 1
+        y0, y1 = full_y[0], full_y[-1] + 1
+        region[y0:y1, x0:x1] = tile[y0:y1, x0:x1]
+        for ys, xs in ((slice(0, y0), slice(0, tw)), (slice(y1, th), slice(0, tw)),
+                       (slice(y0, y1), slice(0, x0)), (slice(y0, y1), slice(x1, tw))):
+            if ys.stop > ys.start and xs.stop > xs.start:
+                _blend_into(region[ys, xs], tile[ys, xs], weight_y[ys], weight_x[xs])
+
+
+# tile_batch_size 为 0（自动）时 GPU 上每批的 tile 数；CPU 上批处理不提速，只增加内存，固定为 1
+DEFAULT_GPU_TILE_BATCH_SIZE = 4
+
+
+def resolve_tile_batch_size(batch_size: int, device) -> int:
+    """tile_batch_size 配置值 -> 实际批大小（0 = 自动）"""
+    if batch_size and batch_size > 0:
+        return batch_size
+    return 1 if str(device).startswith('cpu') else DEFAULT_GPU_TILE_BATCH_SIZE
+
+
+def _run_batch(process_batch: Callable[[np.ndarray], np.ndarray], batch: np.ndarray) -> List[np.ndarray]:
+    """执行一批 tile，显存不足时对半拆分重试"""
+    try:
+        return list(process_batch(batch))
+    except RuntimeError as e:
+        if 'out of memory' not in str(e).lower() or len(batch) == 1:
+            raise
+    try:
+        import torch
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+    except Exception:
+        pass
+    half = len(batch) // 2
+    logger.warning(f'Out of memory with a batch of {len(batch)} tiles, retrying with {half}')
+    return _run_batch(process_batch, batch[:half]) + _run_batch(process_batch, batch[half:])
+
+
+def upscale_tiled(
+    image: Union[Image.Image, np.ndarray],
+    scale: int,
+    process_batch: Callable[[np.ndarray], np.ndarray],
+    tile_size: int = 512,
+    overlap: int = 16,
+    batch_size: int = 4
+) -> np.ndarray:
+    """
+    分块放大：相同尺寸的 tile 组成 batch 推理，结果直接羽化写入预分配的输出数组
+
+    与 split_image_into_tiles + merge_tiles_into_image 相比，不会同时持有全部放大后的 tile，
+    峰值内存约为输出图像加一个 batch
+
+    Args:
+        image: Input PIL image or numpy array (H, W, 3), RGB
+        scale: Upscale factor of process_batch
+        process_batch: (B, h, w, 3) uint8 -> (B, h*scale, w*scale, 3) uint8
+        tile_size: Size of each tile (width and height)
+        overlap: Overlap between tiles
+        batch_size: Max number of tiles per inference batch
+
+    Returns:
+        Upscaled image as (H*scale, W*scale, 3) uint8 array
+    """
+    if isinstance(image, Image.Image):
+        image = np.asarray(image.convert('RGB'))
+    height, width = image.shape[:2]
+    # 重叠不超过 tile 的一半，保证每个像素最多被两个相邻 tile 覆盖
+    overlap = max(0, min(overlap, tile_size // 2))
+    batch_size = max(1, batch_size)
+
+    merger = TileMerger(width, height, scale, tile_size, overlap)
+    pending: Dict[Tuple[int, int], List[Tuple[int, int, int, int]]] = {}
+
+    def flush(shape: Tuple[int, int]):
+        boxes = pending.pop(shape)
+        batch = np.stack([image[y:y + h, x:x + w] for x, y, w, h in boxes])
+        outputs = _run_batch(process_batch, batch)
+        del batch
+        for box, output in zip(boxes, outputs):
+            merger.add(box, output)
+
+    for box in iter_tile_boxes(width, height, tile_size, overlap):
+        shape = (box[3], box[2])
+        pending.setdefault(shape, []).append(box)
+        if len(pending[shape]) >= batch_size:
+            flush(shape)
+    for shape in list(pending):
+        flush(shape)
+
+    return merger.output
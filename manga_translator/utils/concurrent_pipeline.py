@@ -4,11 +4,14 @@
 每个线程拥有独立的事件循环，互不阻塞
 """
 import asyncio
+import contextlib
 import logging
 import traceback
 import os
 import queue
 import threading
+import time
+from collections import deque
 from typing import List
 from datetime import datetime, timezone
 from concurrent.futures import ThreadPoolExecutor, wait
@@ -18,12 +21,146 @@ from . import Context, load_image
 # 使用 manga_translator 的主 logger，确保日志能被UI捕获
 logger = logging.getLogger('manga_translator')
 
+# Context 中保存页面图像的字段，用于估算驻留内存
+_IMAGE_FIELDS = ('input', 'img_colorized', 'upscaled', 'img_rgb', 'img_alpha',
+                 'mask_raw', 'mask', 'img_inpainted', 'img_rendered')
+
+# 队列关闭（且已取空）或中止时 get() 返回的哨兵
+_CLOSED = object()
+# 通知翻译线程立即提交当前未满批次的标记
+_FLUSH = object()
+
+
+def _image_nbytes(image) -> int:
+    """估算单张图像（numpy 数组或 PIL 图像）占用的字节数"""
+    nbytes = getattr(image, 'nbytes', None)
+    if isinstance(nbytes, int):
+        return nbytes
+    size = getattr(image, 'size', None)
+    getbands = getattr(image, 'getbands', None)
+    if isinstance(size, tuple) and len(size) == 2 and getbands is not None:
+        return size[0] * size[1] * len(getbands())
+    return 0
+
+
+def _context_nbytes(ctx) -> int:
+    """估算一个 Context 中所有页面图像占用的字节数（同一对象只计算一次）"""
+    seen = set()
+    total = 0
+    for field in _IMAGE_FIELDS:
+        image = getattr(ctx, field, None)
+        if image is None or id(image) in seen:
+            continue
+        seen.add(id(image))
+        total += _image_nbytes(image)
+    return total
+
+
+def _resolve_workers(workers) -> int:
+    """阶段线程数，0 表示 CPU 核心数"""
+    workers = int(workers or 0)
+    return workers if workers > 0 else (os.cpu_count() or 1)
+
+
+class _StageQueue:
+    """
+    阶段间的交接队列，基于 threading.Condition 阻塞等待，元素到达后立即唤醒消费者
+    
+    - put() 在队列满时阻塞（背压），get() 在队列空时阻塞
+    - close() 表示上游不再放入元素，消费者取完剩余元素后 get() 返回 _CLOSED
+    - abort() 立即唤醒所有等待中的线程（出错或取消时），之后 get() 返回 _CLOSED、put() 返回 False
+    同时统计峰值深度、按时间加权的平均深度和 put() 阻塞时间
+    """
+    
+    def __init__(self, maxsize: int = 0):
+        self.maxsize = maxsize
+        self._items = deque()
+        self._cond = threading.Condition()
+        self._closed = False
+        self._aborted = False
+        self.peak = 0
+        self.blocked_puts = 0
+        self.blocked_seconds = 0.0
+        self._start = time.perf_counter()
+        self._last_change = self._start
+        self._depth_area = 0.0
+    
+    def _account(self):
+        """累计深度对时间的积分（调用方需持有 _cond）"""
+        now = time.perf_counter()
+        self._depth_area += len(self._items) * (now - self._last_change)
+        self._last_change = now
+    
+    def put(self, item, force: bool = False) -> bool:
+        """
+        放入元素，队列满时阻塞等待下游消费
+        
+        Args:
+            force: 忽略容量限制（用于控制标记，不能被背压阻塞）
+        
+        Returns:
+            是否放入成功（队列中止时返回 False）
+        """
+        with self._cond:
+            if not force and self.maxsize > 0 and len(self._items) >= self.maxsize and not self._aborted:
+                start = time.perf_counter()
+                while len(self._items) >= self.maxsize and not self._aborted:
+                    self._cond.wait()
+                self.blocked_puts += 1
+                self.blocked_seconds += time.perf_counter() - start
+            if self._aborted:
+                return False
+            self._account()
+            self._items.append(item)
+            self.peak = max(self.peak, len(self._items))
+            self._cond.notify_all()
+            return True
+    
+    def get(self):
+        """取出元素，队列空时阻塞；队列关闭且已取空或中止时返回 _CLOSED"""
+        with self._cond:
+            while not self._items and not self._closed and not self._aborted:
+                self._cond.wait()
+            if self._aborted or not self._items:
+                return _CLOSED
+            self._account()
+            item = self._items.popleft()
+            self._cond.notify_all()
+            return item
+    
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+    
+    def abort(self):
+        with self._cond:
+            self._aborted = True
+            self._cond.notify_all()
+    
+    def qsize(self) -> int:
+        return len(self._items)
+    
+    def empty(self) -> bool:
+        return not self._items
+    
+    def stats(self) -> dict:
+        with self._cond:
+            self._account()
+            elapsed = self._last_change - self._start
+            return {
+                'peak': self.peak,
+                'mean': self._depth_area / elapsed if elapsed > 0 else 0.0,
+                'blocked_puts': self.blocked_puts,
+                'blocked_seconds': self.blocked_seconds,
+            }
+
 
 class ConcurrentPipeline:
     """
     流水线并发处理器 - 真正的并行架构
     
-    4个独立线程，每个拥有自己的事件循环，互不阻塞：
+    4个阶段，每个线程拥有自己的事件循环，互不阻塞：
     1. 检测+OCR线程 → 完成后放入翻译队列和修复队列
     2. 翻译线程 → 批量处理翻译队列（HTTP 请求不会被 GPU 操作阻塞）
     3. 修复线程 → 处理修复队列（GPU 推理不会阻塞翻译）
@@ -31,10 +168,16 @@ class ConcurrentPipeline:
     
     batch_size 控制翻译批量大小（一次翻译多少个文本块）
     
-    使用 queue.Queue 和 threading.Lock 进行线程间通信和同步。
+    阶段之间通过 _StageQueue 交接：元素到达立即唤醒下游，上游结束后关闭队列，无需轮询。
+    queue_size 限制每个阶段队列的容量，队列满时上游阶段阻塞等待（背压）；
+    memory_budget_mb 限制尚未渲染完成的页面图片总内存，超出时暂停检测新图片。
+    修复和渲染阶段可以使用多个线程（inpaint_workers / render_workers）；
+    检测和翻译保持单线程（检测模型常驻 GPU，翻译批次需要按顺序携带上下文）。
     """
     
-    def __init__(self, translator_instance, batch_size: int = 3, max_workers: int = 4):
+    def __init__(self, translator_instance, batch_size: int = 3, max_workers: int = 4,
+                 queue_size: int = 0, memory_budget_mb: int = 0,
+                 inpaint_workers: int = 1, render_workers: int = 1):
         """
         初始化并发流水线
         
@@ -42,30 +185,45 @@ class ConcurrentPipeline:
             translator_instance: MangaTranslator实例
             batch_size: 批量大小（一次翻译多少个文本块）
             max_workers: 每个步骤的线程池大小
+            queue_size: 每个阶段队列的容量，0 为不限
+            memory_budget_mb: 未完成页面图片的内存上限（MB），0 为不限
+            inpaint_workers: 修复阶段线程数，0 为 CPU 核心数
+            render_workers: 渲染阶段线程数，0 为 CPU 核心数
         """
         self.translator = translator_instance
         self.batch_size = batch_size
+        self.queue_size = max(0, int(queue_size or 0))
+        self.memory_budget = max(0, int(memory_budget_mb or 0)) * 1024 * 1024
+        self.inpaint_workers = _resolve_workers(inpaint_workers)
+        self.render_workers = _resolve_workers(render_workers)
         
         # ✅ 为每个步骤创建独立的线程池，实现真正的并行处理
         # 每个线程拥有独立的事件循环，互不阻塞
         self._detection_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='DetectionThread')
         self._translation_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='TranslationThread')
-        self._inpaint_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='InpaintThread')
-        self._render_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='RenderThread')
-        
-        # 线程安全的队列
-        self.translation_queue = queue.Queue()  # 翻译队列
-        self.inpaint_queue = queue.Queue()      # 修复队列
-        self.render_queue = queue.Queue()       # 渲染队列
+        self._inpaint_executor = ThreadPoolExecutor(max_workers=self.inpaint_workers, thread_name_prefix='InpaintThread')
+        self._render_executor = ThreadPoolExecutor(max_workers=self.render_workers, thread_name_prefix='RenderThread')
         
         # 结果存储 {image_name: ctx}
         # 使用线程锁保护共享数据
         self._lock = threading.Lock()
+        # 内存上限模式下检测线程在此等待，页面内存变化时唤醒
+        self._memory_cond = threading.Condition(self._lock)
         self.translation_done = {}  # 翻译完成的ctx（包含翻译后的text_regions）
         self.inpaint_done = {}      # 修复完成的ctx（包含img_inpainted）
         
         # 存储基础ctx（检测+OCR的结果），供翻译和修复使用
         self.base_contexts = {}     # {image_name: ctx}
+        # 每个未完成页面的图像字节数 {image_name: bytes}，由 _lock 保护
+        self._resident_bytes = {}
+        # 尚未结束的渲染队列生产者数量（检测、翻译、各修复线程），归零时关闭渲染队列
+        self._render_producers = 0
+        
+        # 修复模型实例在修复线程间共享：GPU 推理串行执行，CPU 推理仅首次加载时串行
+        self._inpaint_lock = threading.Lock()
+        self._loaded_inpainters = set()
+        # 保存翻译 JSON（可能写同一个 text_output_file）和导出 PSD 时串行
+        self._save_lock = threading.Lock()
         
         # 控制标志
         self.stop_workers = False
@@ -84,16 +242,159 @@ class ConcurrentPipeline:
             'rendering': 0
         }
         
+        # 线程安全的队列
+        self._create_queues()
+        self._reset_occupancy_stats()
+        
         # 结果列表（线程安全）
         self._results = []
         self._results_lock = threading.Lock()
         
         # ✅ 线程安全的状态消息队列（用于向主线程报告关键日志）
         self._status_queue = queue.Queue()
+        # 主线程事件循环及唤醒事件，子线程有状态更新时唤醒主线程
+        self._loop = None
+        self._wakeup = None
+    
+    def _create_queues(self):
+        """创建阶段队列（maxsize=0 表示不限容量）"""
+        self.translation_queue = _StageQueue(self.queue_size)  # 翻译队列
+        self.inpaint_queue = _StageQueue(self.queue_size)      # 修复队列
+        self.render_queue = _StageQueue(self.queue_size)       # 渲染队列
+        self._queues = {
+            'translation': self.translation_queue,
+            'inpaint': self.inpaint_queue,
+            'render': self.render_queue,
+        }
+    
+    def _reset_occupancy_stats(self):
+        """重置阶段占用统计"""
+        workers = {'detection_ocr': 1, 'translation': 1,
+                   'inpaint': self.inpaint_workers, 'rendering': self.render_workers}
+        self.stage_stats = {
+            stage: {'workers': count, 'busy_seconds': 0.0, 'idle_seconds': 0.0}
+            for stage, count in workers.items()
+        }
+        self.memory_stats = {'peak_bytes': 0, 'throttle_count': 0, 'throttle_seconds': 0.0}
+    
+    def _record_stage_time(self, stage: str, busy: float = 0.0, idle: float = 0.0):
+        """累计阶段的工作/空闲时间（线程安全）"""
+        with self._lock:
+            stats = self.stage_stats[stage]
+            stats['busy_seconds'] += busy
+            stats['idle_seconds'] += idle
+    
+    def occupancy_stats(self) -> dict:
+        """
+        返回阶段占用统计
+        
+        Returns:
+            {'queues': {name: {peak, mean, blocked_puts, blocked_seconds}},
+             'stages': {stage: {workers, items, throughput, busy_seconds, idle_seconds, utilization}},
+             'memory': {peak_mb, throttle_count, throttle_seconds}}
+        """
+        elapsed = (datetime.now(timezone.utc) - self.start_time).total_seconds() if self.start_time else 0.0
+        stages = {}
+        for stage, stats in self.stage_stats.items():
+            items = self.stats[stage]
+            capacity = stats['workers'] * elapsed
+            stages[stage] = {
+                'workers': stats['workers'],
+                'items': items,
+                'throughput': items / elapsed if elapsed > 0 else 0.0,
+                'busy_seconds': stats['busy_seconds'],
+                'idle_seconds': stats['idle_seconds'],
+                'utilization': stats['busy_seconds'] / capacity if capacity > 0 else 0.0,
+            }
+        return {
+            'queues': {name: q.stats() for name, q in self._queues.items()},
+            'stages': stages,
+            'memory': {
+                'peak_mb': self.memory_stats['peak_bytes'] / (1024 * 1024),
+                'throttle_count': self.memory_stats['throttle_count'],
+                'throttle_seconds': self.memory_stats['throttle_seconds'],
+            },
+        }
+    
+    def _update_resident(self, ctx):
+        """更新页面的驻留内存统计并唤醒等待内存的检测线程（调用方需持有 _lock）"""
+        if ctx.image_name in self.base_contexts:
+            self._resident_bytes[ctx.image_name] = _context_nbytes(ctx)
+        else:
+            self._resident_bytes.pop(ctx.image_name, None)
+        total = sum(self._resident_bytes.values())
+        self.memory_stats['peak_bytes'] = max(self.memory_stats['peak_bytes'], total)
+        self._memory_cond.notify_all()
+    
+    def _wait_for_memory_budget(self) -> bool:
+        """
+        内存上限模式：未完成页面的图像总量超过上限时暂停检测，直到渲染释放内存
+        至少保证一张图片在处理中，避免单张大图超过上限时死锁
+        
+        Returns:
+            是否可以继续检测（流水线停止时返回 False）
+        """
+        if not self.memory_budget:
+            return True
+        start = None
+        with self._memory_cond:
+            while True:
+                if self.stop_workers or self.has_critical_error:
+                    can_continue = False
+                    break
+                resident = sum(self._resident_bytes.values())
+                if resident < self.memory_budget or not self.base_contexts:
+                    can_continue = True
+                    break
+                if start is None:
+                    start = time.perf_counter()
+                    self.memory_stats['throttle_count'] += 1
+                    logger.debug(f"[检测+OCR] 未完成页面占用 {resident / 1024 / 1024:.1f}MB，"
+                                 f"超过上限 {self.memory_budget / 1024 / 1024:.0f}MB，暂停检测")
+                    # 等不到凑满批次，让翻译线程先翻译已有图片，以便渲染释放内存
+                    self.translation_queue.put(_FLUSH, force=True)
+                self._memory_cond.wait()
+        if start is not None:
+            waited = time.perf_counter() - start
+            self.memory_stats['throttle_seconds'] += waited
+            self._record_stage_time('detection_ocr', idle=waited)
+        return can_continue
+    
+    def _render_producer_done(self):
+        """渲染队列的一个生产者结束，全部结束后关闭渲染队列"""
+        with self._lock:
+            self._render_producers -= 1
+            last = self._render_producers <= 0
+        if last:
+            self.render_queue.close()
+    
+    def _request_stop(self):
+        """通知所有阶段停止：设置停止标志，唤醒阻塞在队列和内存等待上的线程"""
+        self.stop_workers = True
+        for q in self._queues.values():
+            q.abort()
+        with self._memory_cond:
+            self._memory_cond.notify_all()
+        self._notify_main()
+    
+    def _notify_main(self):
+        """唤醒主线程的等待循环（线程安全）"""
+        loop, wakeup = self._loop, self._wakeup
+        if loop is None or wakeup is None:
+            return
+        try:
+            loop.call_soon_threadsafe(wakeup.set)
+        except RuntimeError:
+            # 事件循环已关闭
+            pass
+    
+    def _worker_label(self, stage: str, worker_id: int, workers: int) -> str:
+        return f"{stage}#{worker_id + 1}" if workers > 1 else stage
     
     def _emit_status(self, message: str):
         """向主线程发送状态消息（线程安全）"""
         self._status_queue.put(message)
+        self._notify_main()
     
     def _flush_status_to_logger(self):
         """将队列中的状态消息输出到 logger（在主线程调用）"""
@@ -111,6 +412,9 @@ class ConcurrentPipeline:
         try:
             return loop.run_until_complete(coro)
         finally:
+            # 关闭绑定在该事件循环上的共享 HTTP 会话（翻译器连接池）
+            from ..translators.http_pool import close_loop_sessions
+            close_loop_sessions(loop)
             loop.close()
     
     def _detection_ocr_thread(self, file_paths: List[str], configs: List):
@@ -122,6 +426,11 @@ class ConcurrentPipeline:
         try:
             self._run_async_in_thread(self._detection_ocr_async(file_paths, configs))
         finally:
+            # 通知下游不会再有新图片
+            self.detection_ocr_done = True
+            self.translation_queue.close()
+            self.inpaint_queue.close()
+            self._render_producer_done()
             self._emit_status(f"[检测+OCR] 线程完成 ({self.stats['detection_ocr']}/{self.total_images})")
     
     async def _detection_ocr_async(self, file_paths: List[str], configs: List):
@@ -146,6 +455,12 @@ class ConcurrentPipeline:
                 logger.warning(f"[检测+OCR] 收到停止信号，已处理 {idx}/{len(file_paths)} 张图片")
                 break
             
+            # 内存上限：等待已有页面渲染完成释放内存后再加载下一张
+            if not self._wait_for_memory_budget():
+                logger.warning(f"[检测+OCR] 收到停止信号，已处理 {idx}/{len(file_paths)} 张图片")
+                break
+            
+            busy_start = time.perf_counter()
             try:
                 # 分批加载：只在需要时加载图片
                 logger.debug(f"[检测+OCR] 加载图片: {file_path}")
@@ -158,6 +473,7 @@ class ConcurrentPipeline:
                 ctx = Context()
                 ctx.input = image
                 ctx.image_name = file_path
+                ctx.image_index = idx
                 ctx.verbose = self.translator.verbose
                 ctx.save_quality = self.translator.save_quality
                 ctx.config = config
@@ -168,7 +484,7 @@ class ConcurrentPipeline:
                 try:
                     self.translator._check_cancelled()
                 except:
-                    self.stop_workers = True
+                    self._request_stop()
                     logger.warning(f"[检测+OCR] 用户取消，已处理 {idx}/{len(file_paths)} 张图片")
                     break
                 
@@ -177,20 +493,20 @@ class ConcurrentPipeline:
                     ctx.img_colorized = await self.translator._run_colorizer(config, ctx)
                 else:
                     ctx.img_colorized = ctx.input
-
+                
                 # 检查取消
                 try:
                     self.translator._check_cancelled()
                 except:
-                    self.stop_workers = True
+                    self._request_stop()
                     logger.warning(f"[检测+OCR] 用户取消，已处理 {idx}/{len(file_paths)} 张图片")
                     break
-
+                
                 if config.upscale.upscale_ratio:
                     ctx.upscaled = await self.translator._run_upscaling(config, ctx)
                 else:
                     ctx.upscaled = ctx.img_colorized
-
+                
                 # 统一转换为 numpy
                 ctx.img_rgb, ctx.img_alpha = load_image(ctx.upscaled)
                 
@@ -198,7 +514,7 @@ class ConcurrentPipeline:
                 try:
                     self.translator._check_cancelled()
                 except:
-                    self.stop_workers = True
+                    self._request_stop()
                     logger.warning(f"[检测+OCR] 用户取消，已处理 {idx}/{len(file_paths)} 张图片")
                     break
                 
@@ -209,7 +525,7 @@ class ConcurrentPipeline:
                 try:
                     self.translator._check_cancelled()
                 except:
-                    self.stop_workers = True
+                    self._request_stop()
                     logger.warning(f"[检测+OCR] 用户取消，已处理 {idx}/{len(file_paths)} 张图片")
                     break
                 
@@ -220,7 +536,7 @@ class ConcurrentPipeline:
                 try:
                     self.translator._check_cancelled()
                 except:
-                    self.stop_workers = True
+                    self._request_stop()
                     logger.warning(f"[检测+OCR] 用户取消，已处理 {idx}/{len(file_paths)} 张图片")
                     break
                 
@@ -239,14 +555,23 @@ class ConcurrentPipeline:
                 
                 ctx.input = image
                 
+                # 上色/超分的中间图已转换为 img_rgb，后续阶段不再需要
+                if ctx.img_colorized is not ctx.input:
+                    ctx.img_colorized = None
+                if ctx.upscaled is not ctx.input:
+                    ctx.upscaled = None
+                
                 # 保存基础ctx
                 with self._lock:
                     self.base_contexts[ctx.image_name] = ctx
+                    self._update_resident(ctx)
+                self._record_stage_time('detection_ocr', busy=time.perf_counter() - busy_start)
                 
-                # 放入翻译队列和修复队列
+                # 放入翻译队列和修复队列（队列满时阻塞，等待下游消费）
                 if ctx.text_regions:
-                    self.translation_queue.put((ctx.image_name, config))
-                    self.inpaint_queue.put((ctx.image_name, config))
+                    if not self.translation_queue.put((ctx.image_name, config)) \
+                            or not self.inpaint_queue.put((ctx.image_name, config)):
+                        break
                     logger.info(f"[检测+OCR] {ctx.image_name} 已加入翻译队列和修复队列 (翻译队列大小: {self.translation_queue.qsize()})")
                 else:
                     # 无文本，直接标记完成并放入渲染队列
@@ -254,9 +579,10 @@ class ConcurrentPipeline:
                         self.translation_done[ctx.image_name] = []
                         self.inpaint_done[ctx.image_name] = True
                     ctx.text_regions = []
-                    self.render_queue.put((ctx, config))
+                    if not self.render_queue.put((ctx, config)):
+                        break
                     logger.debug(f"[检测+OCR] {ctx.image_name} 无文本，直接进入渲染队列")
-                
+            
             except Exception as e:
                 try:
                     error_msg = str(e)
@@ -268,7 +594,7 @@ class ConcurrentPipeline:
                 self.has_critical_error = True
                 self.critical_error_msg = f"检测+OCR失败: {error_msg}"
                 self.critical_error_exception = e
-                self.stop_workers = True
+                self._request_stop()
                 break
         
         # 标记检测+OCR全部完成
@@ -281,6 +607,7 @@ class ConcurrentPipeline:
         try:
             self._run_async_in_thread(self._translation_async())
         finally:
+            self._render_producer_done()
             self._emit_status(f"[翻译] 线程完成 ({self.stats['translation']}/{self.total_images})")
     
     async def _translation_async(self):
@@ -296,57 +623,40 @@ class ConcurrentPipeline:
         
         while not self.stop_workers:
             try:
-                if self.has_critical_error:
-                    logger.warning(f"[翻译] 检测到严重错误，停止翻译 (已完成 {self.stats['translation']}/{self.total_images})")
+                # 阻塞等待下一张图片；检测结束且队列取空后返回 _CLOSED
+                idle_start = time.perf_counter()
+                item = self.translation_queue.get()
+                self._record_stage_time('translation', idle=time.perf_counter() - idle_start)
+                if item is _CLOSED:
                     break
                 
-                # 从队列获取任务（非阻塞）
-                try:
-                    image_name, config = self.translation_queue.get(timeout=0.1)
+                # 判断是否应该翻译当前批次
+                should_translate = False
+                reason = ""
+                
+                if item is _FLUSH:
+                    # 检测因内存上限暂停，等不到凑满批次，先翻译已有图片以便渲染释放内存
+                    if batch:
+                        should_translate = True
+                        reason = f"检测已暂停（内存上限），翻译当前 {len(batch)} 张图片"
+                else:
+                    image_name, config = item
                     with self._lock:
                         ctx = self.base_contexts.get(image_name)
                     if ctx:
                         batch.append((ctx, config))
                     else:
                         logger.error(f"[翻译] 找不到 {image_name} 的基础上下文")
-                except queue.Empty:
-                    if not batch:
-                        if self.detection_ocr_done and self.translation_queue.empty():
-                            break
-                        if self.has_critical_error:
-                            logger.warning("[翻译] 检测到严重错误，停止等待")
-                            break
-                        continue
-                
-                # 收集更多图片直到达到batch_size
-                while len(batch) < self.batch_size:
-                    try:
-                        image_name, config = self.translation_queue.get(timeout=0.05)
-                        with self._lock:
-                            ctx = self.base_contexts.get(image_name)
-                        if ctx:
-                            batch.append((ctx, config))
-                        else:
-                            logger.error(f"[翻译] 找不到 {image_name} 的基础上下文")
-                    except queue.Empty:
-                        break
-                
-                # 判断是否应该翻译当前批次
-                should_translate = False
-                reason = ""
-                
-                if len(batch) >= self.batch_size:
-                    should_translate = True
-                    reason = f"批次已满 ({len(batch)}/{self.batch_size})"
-                elif batch and self.detection_ocr_done:
-                    should_translate = True
-                    reason = f"OCR完成，翻译剩余 {len(batch)} 张图片"
+                    
+                    if len(batch) >= self.batch_size:
+                        should_translate = True
+                        reason = f"批次已满 ({len(batch)}/{self.batch_size})"
                 
                 if should_translate:
                     logger.info(f"[翻译] {reason}，开始翻译")
                     await self._process_translation_batch(batch)
                     batch = []
-                
+            
             except Exception as e:
                 try:
                     error_msg = str(e)
@@ -358,12 +668,12 @@ class ConcurrentPipeline:
                 self.has_critical_error = True
                 self.critical_error_msg = f"翻译线程错误: {error_msg}"
                 self.critical_error_exception = e
-                self.stop_workers = True
+                self._request_stop()
                 break
         
         # 处理剩余批次
         if batch and not self.stop_workers:
-            logger.info(f"[翻译] 翻译剩余 {len(batch)} 张图片")
+            logger.info(f"[翻译] OCR完成，翻译剩余 {len(batch)} 张图片")
             await self._process_translation_batch(batch)
         
         if self.stats['translation'] >= self.total_images:
@@ -377,6 +687,7 @@ class ConcurrentPipeline:
             return
         
         logger.info(f"[翻译] 批量翻译 {len(batch)} 张图片")
+        busy_start = time.perf_counter()
         
         try:
             # 直接调用翻译（已经在独立线程的事件循环中）
@@ -386,7 +697,7 @@ class ConcurrentPipeline:
             # ✅ 发送状态日志
             self._emit_status(f"[翻译] 批次完成 ({self.stats['translation']}/{self.total_images})")
             
-            ready_to_render = 0
+            ready = []
             for ctx, config in translated_batch:
                 with self._lock:
                     self.translation_done[ctx.image_name] = ctx.text_regions
@@ -395,15 +706,22 @@ class ConcurrentPipeline:
                     
                     # 检查修复是否也完成
                     if ctx.image_name in self.inpaint_done:
-                        self.render_queue.put((ctx, config))
-                        ready_to_render += 1
-                        logger.info(f"[翻译] {ctx.image_name} 翻译+修复都完成，立即加入渲染队列")
+                        ready.append((ctx, config))
+            self._record_stage_time('translation', busy=time.perf_counter() - busy_start)
+            
+            # 在锁外放入渲染队列：队列满时会阻塞，而渲染线程需要获取 _lock
+            ready_to_render = 0
+            for ctx, config in ready:
+                if not self.render_queue.put((ctx, config)):
+                    break
+                ready_to_render += 1
+                logger.info(f"[翻译] {ctx.image_name} 翻译+修复都完成，立即加入渲染队列")
             
             if ready_to_render > 0:
                 logger.info(f"[翻译] 批次中 {ready_to_render}/{len(batch)} 张图片立即加入渲染队列")
             else:
                 logger.debug(f"[翻译] 批次中 0/{len(batch)} 张图片完成修复，等待修复完成后加入渲染队列")
-            
+        
         except Exception as e:
             try:
                 error_msg = str(e)
@@ -418,7 +736,7 @@ class ConcurrentPipeline:
             self.has_critical_error = True
             self.critical_error_msg = f"翻译批次失败: {error_msg}"
             self.critical_error_exception = e
-            self.stop_workers = True
+            self._request_stop()
             
             for ctx, config in batch:
                 ctx.translation_error = error_msg
@@ -426,13 +744,31 @@ class ConcurrentPipeline:
                     self.translation_done[ctx.image_name] = []
                 ctx.text_regions = []
     
-    def _inpaint_thread(self):
+    def _inpaint_thread(self, worker_id: int = 0):
         """修复工作线程（在独立线程中运行）"""
-        self._emit_status("[修复] 线程启动")
+        label = self._worker_label('修复', worker_id, self.inpaint_workers)
+        self._emit_status(f"[{label}] 线程启动")
         try:
             self._run_async_in_thread(self._inpaint_async())
         finally:
-            self._emit_status(f"[修复] 线程完成 ({self.stats['inpaint']}/{self.total_images})")
+            self._render_producer_done()
+            self._emit_status(f"[{label}] 线程完成 ({self.stats['inpaint']}/{self.total_images})")
+    
+    async def _run_inpainting(self, config, ctx):
+        """
+        调用修复模型
+        修复模型实例在各修复线程间共享：GPU 上推理串行执行；CPU 上首次调用（加载模型）串行，之后并行
+        """
+        if self.inpaint_workers <= 1:
+            return await self.translator._run_inpainting(config, ctx)
+        key = config.inpainter.inpainter
+        on_gpu = not str(getattr(self.translator, 'device', 'cpu')).startswith('cpu')
+        if on_gpu or key not in self._loaded_inpainters:
+            with self._inpaint_lock:
+                img_inpainted = await self.translator._run_inpainting(config, ctx)
+                self._loaded_inpainters.add(key)
+            return img_inpainted
+        return await self.translator._run_inpainting(config, ctx)
     
     async def _inpaint_async(self):
         """修复的异步实现"""
@@ -443,30 +779,16 @@ class ConcurrentPipeline:
         
         logger.info("[修复线程] 启动")
         
-        inpaint_count = 0
-        
         while not self.stop_workers:
             try:
-                if self.has_critical_error:
-                    logger.warning(f"[修复] 检测到严重错误，停止修复 (已完成 {inpaint_count}/{self.total_images})")
+                # 阻塞等待下一张图片；检测结束且队列取空后返回 _CLOSED
+                idle_start = time.perf_counter()
+                item = self.inpaint_queue.get()
+                self._record_stage_time('inpaint', idle=time.perf_counter() - idle_start)
+                if item is _CLOSED:
+                    logger.info(f"[修复线程] 所有任务已完成 ({self.stats['inpaint']}/{self.total_images})")
                     break
-                
-                # 检查是否完成所有任务
-                if self.detection_ocr_done and self.inpaint_queue.empty():
-                    import time
-                    time.sleep(0.5)
-                    if self.inpaint_queue.empty():
-                        logger.info(f"[修复线程] 所有任务已完成 ({inpaint_count}/{self.total_images})")
-                        break
-                
-                # 尝试获取任务
-                try:
-                    image_name, config = self.inpaint_queue.get(timeout=1.0)
-                except queue.Empty:
-                    if self.has_critical_error:
-                        logger.warning("[修复] 检测到严重错误，停止等待")
-                        break
-                    continue
+                image_name, config = item
                 
                 with self._lock:
                     ctx = self.base_contexts.get(image_name)
@@ -475,6 +797,7 @@ class ConcurrentPipeline:
                     continue
                 
                 logger.info(f"[修复] 处理: {ctx.image_name}")
+                busy_start = time.perf_counter()
                 
                 # Mask refinement
                 if ctx.mask is None and ctx.text_regions:
@@ -482,16 +805,20 @@ class ConcurrentPipeline:
                 
                 # Inpainting
                 if ctx.text_regions:
-                    ctx.img_inpainted = await self.translator._run_inpainting(config, ctx)
+                    ctx.img_inpainted = await self._run_inpainting(config, ctx)
                 
-                self.stats['inpaint'] += 1
-                inpaint_count += 1
-                # ✅ 发送状态日志
-                self._emit_status(f"[修复] 完成 {inpaint_count}/{self.total_images}: {os.path.basename(ctx.image_name)}")
+                # 原始蒙版只用于蒙版细化；细化后的蒙版只在保存蒙版或调试时需要
+                ctx.mask_raw = None
+                if not (self.translator.save_mask or self.translator.verbose):
+                    ctx.mask = None
                 
                 # 标记修复完成
+                render_item = None
                 with self._lock:
+                    self.stats['inpaint'] += 1
+                    inpaint_count = self.stats['inpaint']
                     self.inpaint_done[ctx.image_name] = True
+                    self._update_resident(ctx)
                     
                     # 如果翻译也完成了，放入渲染队列
                     if ctx.image_name in self.translation_done:
@@ -505,11 +832,20 @@ class ConcurrentPipeline:
                                 render_ctx.text_regions = []
                             else:
                                 render_ctx.text_regions = []
-                            self.render_queue.put((render_ctx, config))
-                            logger.info(f"[修复] {ctx.image_name} 翻译+修复都完成，加入渲染队列")
+                            render_item = (render_ctx, config)
                         else:
                             logger.error(f"[修复] 找不到 {ctx.image_name} 的基础上下文")
+                self._record_stage_time('inpaint', busy=time.perf_counter() - busy_start)
+                
+                # ✅ 发送状态日志
+                self._emit_status(f"[修复] 完成 {inpaint_count}/{self.total_images}: {os.path.basename(ctx.image_name)}")
                 
+                # 在锁外放入渲染队列（队列满时阻塞等待渲染线程消费）
+                if render_item is not None:
+                    if not self.render_queue.put(render_item):
+                        break
+                    logger.info(f"[修复] {ctx.image_name} 翻译+修复都完成，加入渲染队列")
+            
             except Exception as e:
                 try:
                     error_msg = str(e)
@@ -521,18 +857,19 @@ class ConcurrentPipeline:
                 self.has_critical_error = True
                 self.critical_error_msg = f"修复线程错误: {error_msg}"
                 self.critical_error_exception = e
-                self.stop_workers = True
+                self._request_stop()
                 break
         
         logger.info("[修复线程] 停止")
     
-    def _render_thread(self):
+    def _render_thread(self, worker_id: int = 0):
         """渲染工作线程（在独立线程中运行）"""
-        self._emit_status("[渲染] 线程启动")
+        label = self._worker_label('渲染', worker_id, self.render_workers)
+        self._emit_status(f"[{label}] 线程启动")
         try:
             self._run_async_in_thread(self._render_async())
         finally:
-            self._emit_status(f"[渲染] 线程完成 ({self.stats['rendering']}/{self.total_images})")
+            self._emit_status(f"[{label}] 线程完成 ({self.stats['rendering']}/{self.total_images})")
     
     async def _render_async(self):
         """渲染的异步实现"""
@@ -543,28 +880,15 @@ class ConcurrentPipeline:
         
         logger.info("[渲染线程] 启动")
         
-        rendered_count = 0
-        
-        while not self.stop_workers or rendered_count < self.total_images:
+        while not self.stop_workers:
             try:
-                if self.has_critical_error:
-                    logger.warning(f"[渲染] 检测到严重错误，停止渲染 (已完成 {rendered_count}/{self.total_images})")
+                # 阻塞等待下一张图片；所有上游结束且队列取空后返回 _CLOSED
+                idle_start = time.perf_counter()
+                item = self.render_queue.get()
+                self._record_stage_time('rendering', idle=time.perf_counter() - idle_start)
+                if item is _CLOSED:
                     break
-                
-                # 尝试获取任务
-                try:
-                    ctx, config = self.render_queue.get(timeout=1.0)
-                except queue.Empty:
-                    # 检查是否应该退出
-                    if self.stop_workers:
-                        logger.info(f"[渲染] 收到停止信号，已渲染 {rendered_count}/{self.total_images} 张图片")
-                        break
-                    if rendered_count >= self.total_images:
-                        break
-                    if self.has_critical_error:
-                        logger.warning("[渲染] 检测到严重错误，停止等待")
-                        break
-                    continue
+                ctx, config = item
                 
                 logger.info(f"[渲染] 从队列获取任务: {ctx.image_name} (队列剩余: {self.render_queue.qsize()})")
                 
@@ -577,6 +901,7 @@ class ConcurrentPipeline:
                 
                 ctx = verified_ctx
                 logger.info(f"[渲染] 开始处理: {ctx.image_name}")
+                busy_start = time.perf_counter()
                 
                 # 检查渲染所需的数据是否完整
                 if not hasattr(ctx, 'img_rgb') or ctx.img_rgb is None:
@@ -599,8 +924,9 @@ class ConcurrentPipeline:
                     from .generic import dump_image
                     ctx.result = dump_image(ctx.input, ctx.img_rendered, ctx.img_alpha)
                 
-                self.stats['rendering'] += 1
-                rendered_count += 1
+                with self._lock:
+                    self.stats['rendering'] += 1
+                    rendered_count = self.stats['rendering']
                 
                 # ✅ 发送状态日志（每完成一张图）
                 self._emit_status(f"[渲染] 完成 {rendered_count}/{self.total_images}: {os.path.basename(ctx.image_name)}")
@@ -629,16 +955,19 @@ class ConcurrentPipeline:
                                     del img_inpainted_copy
                                     img_inpainted_copy = None
                             
-                            # 保存翻译结果和导出PSD
-                            self.translator._save_and_cleanup_context(ctx, save_info, config, "CONCURRENT")
+                            # 保存翻译结果和导出PSD（PSD 导出驱动 Photoshop，多个渲染线程时串行）
+                            export_psd = getattr(getattr(config, 'cli', None), 'export_editable_psd', False)
+                            with self._save_lock if export_psd else contextlib.nullcontext():
+                                self.translator._save_and_cleanup_context(ctx, save_info, config, "CONCURRENT")
                             
                             if (self.translator.save_text or self.translator.text_output_file) and ctx.text_regions is not None:
-                                self.translator._save_text_to_file(ctx.image_name, ctx, config)
+                                with self._save_lock:
+                                    self.translator._save_text_to_file(ctx.image_name, ctx, config)
                         else:
                             logger.warning("[渲染] 无save_info，跳过保存")
                         
                         ctx.success = True
-                                
+                    
                     except Exception as save_err:
                         logger.error(f"[渲染] 保存失败 {os.path.basename(ctx.image_name)}: {save_err}")
                         logger.error(traceback.format_exc())
@@ -647,19 +976,22 @@ class ConcurrentPipeline:
                     logger.error("[渲染] ctx.result 为 None！")
                 
                 # 添加到结果列表
+                self.translator._notify_result(ctx)
                 with self._results_lock:
                     self._results.append(ctx)
-
+                
                 # 清理内存 - 调用统一清理函数
                 logger.debug(f"[渲染] 清理内存: {ctx.image_name}")
                 self.translator._cleanup_context_memory(ctx, keep_result=True)
-
+                
                 # 清理base_contexts
                 with self._lock:
                     if ctx.image_name in self.base_contexts:
                         del self.base_contexts[ctx.image_name]
                         logger.debug(f"[渲染] 已清理 {ctx.image_name} 的基础上下文")
-                
+                    self._update_resident(ctx)
+                self._record_stage_time('rendering', busy=time.perf_counter() - busy_start)
+            
             except Exception as e:
                 try:
                     error_msg = str(e)
@@ -671,11 +1003,33 @@ class ConcurrentPipeline:
                 self.has_critical_error = True
                 self.critical_error_msg = f"渲染线程错误: {error_msg}"
                 self.critical_error_exception = e
-                self.stop_workers = True
+                self._request_stop()
                 break
         
+        if self.has_critical_error:
+            logger.warning(f"[渲染] 检测到严重错误，停止渲染 (已完成 {self.stats['rendering']}/{self.total_images})")
         logger.info("[渲染线程] 停止")
     
+    def _log_occupancy_stats(self):
+        """输出阶段吞吐、空闲时间和队列占用统计"""
+        occupancy = self.occupancy_stats()
+        stage_names = {'detection_ocr': '检测+OCR', 'translation': '翻译', 'inpaint': '修复', 'rendering': '渲染'}
+        for stage, stats in occupancy['stages'].items():
+            logger.info(f"  {stage_names[stage]} ({stats['workers']}线程): {stats['items']}张, "
+                        f"{stats['throughput']:.2f}张/秒, 工作={stats['busy_seconds']:.2f}秒, "
+                        f"空闲={stats['idle_seconds']:.2f}秒, 利用率={stats['utilization']:.0%}")
+        queue_names = {'translation': '翻译', 'inpaint': '修复', 'render': '渲染'}
+        capacity = self.queue_size if self.queue_size else '不限'
+        parts = []
+        for name, stats in occupancy['queues'].items():
+            parts.append(f"{queue_names[name]} 峰值={stats['peak']} 平均={stats['mean']:.1f} "
+                         f"阻塞={stats['blocked_puts']}次/{stats['blocked_seconds']:.2f}秒")
+        logger.info(f"  队列占用 (容量: {capacity}): " + ", ".join(parts))
+        memory = occupancy['memory']
+        budget = f"{self.memory_budget / 1024 / 1024:.0f}MB" if self.memory_budget else '不限'
+        logger.info(f"  页面内存 (上限: {budget}): 峰值={memory['peak_mb']:.1f}MB, "
+                    f"检测暂停={memory['throttle_count']}次/{memory['throttle_seconds']:.2f}秒")
+    
     async def process_batch(self, file_paths: List[str], configs: List) -> List[Context]:
         """
         并发处理一批图片（流水线模式，分批加载）
@@ -683,7 +1037,7 @@ class ConcurrentPipeline:
         Args:
             file_paths: 图片文件路径列表
             configs: 配置列表
-            
+        
         Returns:
             处理完成的Context列表
         """
@@ -691,7 +1045,7 @@ class ConcurrentPipeline:
         self.start_time = datetime.now(timezone.utc)
         
         logger.info(f"[并发流水线] 开始处理 {self.total_images} 张图片")
-        logger.info(f"[并发流水线] 真正并行模式: 4个独立线程（检测+OCR / 翻译 / 修复 / 渲染）")
+        logger.info(f"[并发流水线] 真正并行模式: 检测+OCR / 翻译 / 修复({self.inpaint_workers}线程) / 渲染({self.render_workers}线程)")
         
         # 重置统计
         for key in self.stats:
@@ -699,26 +1053,41 @@ class ConcurrentPipeline:
         self.translation_done.clear()
         self.inpaint_done.clear()
         self.base_contexts.clear()
+        self._resident_bytes.clear()
+        self._loaded_inpainters.clear()
+        self._create_queues()
+        self._reset_occupancy_stats()
+        # 渲染队列的生产者：检测（无文本的图片）、翻译、每个修复线程
+        self._render_producers = 2 + self.inpaint_workers
         self.detection_ocr_done = False
         self.stop_workers = False
         self.has_critical_error = False
         self.critical_error_msg = None
         self.critical_error_exception = None
         self._results = []
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
         
-        # 提交4个独立线程任务
+        # 提交各阶段线程任务
         futures = [
             self._detection_executor.submit(self._detection_ocr_thread, file_paths, configs),
             self._translation_executor.submit(self._translation_thread),
-            self._inpaint_executor.submit(self._inpaint_thread),
-            self._render_executor.submit(self._render_thread),
         ]
+        thread_names = ["检测+OCR", "翻译"]
+        for worker_id in range(self.inpaint_workers):
+            futures.append(self._inpaint_executor.submit(self._inpaint_thread, worker_id))
+            thread_names.append(self._worker_label('修复', worker_id, self.inpaint_workers))
+        for worker_id in range(self.render_workers):
+            futures.append(self._render_executor.submit(self._render_thread, worker_id))
+            thread_names.append(self._worker_label('渲染', worker_id, self.render_workers))
+        for future in futures:
+            future.add_done_callback(lambda _: self._notify_main())
         
         try:
-            # 等待所有线程完成（在外部循环中检查以便响应取消）
+            # 等待所有线程完成：子线程发送状态或线程结束时唤醒，无需轮询
             last_rendered = 0
             while True:
-                done, not_done = wait(futures, timeout=0.5)
+                self._wakeup.clear()
                 
                 # ✅ 刷新子线程的状态日志到主线程
                 self._flush_status_to_logger()
@@ -732,42 +1101,40 @@ class ConcurrentPipeline:
                         pass
                     last_rendered = current_rendered
                 
-                if len(not_done) == 0:
-                    break
                 # 检查是否有异常
-                for f in done:
-                    if f.exception():
+                for f in futures:
+                    if f.done() and f.exception():
                         raise f.exception()
-                # 让出控制权，检查取消
-                await asyncio.sleep(0)
+                if all(f.done() for f in futures):
+                    break
                 
+                await self._wakeup.wait()
+        
         except asyncio.CancelledError:
             # 用户取消了任务
             logger.warning(f"[并发流水线] 用户取消任务")
-            self.stop_workers = True
+            self._request_stop()
             # 等待所有线程停止（最多等待10秒）
             logger.info("[并发流水线] 等待所有线程停止...")
             done, not_done = wait(futures, timeout=10.0)
             if not_done:
                 # 显示哪些线程没有停止
-                thread_names = []
-                for i, future in enumerate(futures):
-                    if future in not_done:
-                        names = ["检测+OCR", "翻译", "修复", "渲染"]
-                        thread_names.append(names[i])
-                logger.warning(f"[并发流水线] {len(not_done)} 个线程未能在10秒内停止: {', '.join(thread_names)}")
+                names = [name for name, future in zip(thread_names, futures) if future in not_done]
+                logger.warning(f"[并发流水线] {len(not_done)} 个线程未能在10秒内停止: {', '.join(names)}")
             else:
                 logger.info("[并发流水线] 所有线程已停止")
             raise
         except Exception as e:
             logger.error(f"[并发流水线] 错误: {e}")
             logger.error(traceback.format_exc())
-            self.stop_workers = True
+            self._request_stop()
             raise
         finally:
-            self.stop_workers = True
+            self._request_stop()
+            self._loop = None
+            self._wakeup = None
             # 关闭所有线程池
-            for executor in [self._detection_executor, self._translation_executor, 
+            for executor in [self._detection_executor, self._translation_executor,
                            self._inpaint_executor, self._render_executor]:
                 if executor:
                     executor.shutdown(wait=False)
@@ -789,5 +1156,6 @@ class ConcurrentPipeline:
         logger.info(f"  处理统计: 检测+OCR={self.stats['detection_ocr']}, "
                    f"翻译={self.stats['translation']}, 修复={self.stats['inpaint']}, "
                    f"渲染={self.stats['rendering']}")
+        self._log_occupancy_stats()
         
         return self._results
@@ -0,0 +1,227 @@
+"""
+流水线阶段结果的磁盘缓存
+
+以 (输入内容哈希, 阶段, 相关配置, 模型版本) 为键缓存检测、OCR、蒙版细化和修复的结果，
+同一章节换翻译器或字体重新翻译时可以跳过这些与翻译无关的阶段。
+
+- 每个条目一个 pickle 文件：<cache_dir>/<stage>/<key[:2]>/<key>.pkl
+- 总大小超过上限时按最近使用时间（LRU）淘汰，命中时更新文件的修改时间，重启后仍保持顺序
+- 键只包含阶段真正依赖的输入，例如蒙版细化只看文本框坐标而不看译文
+"""
+
+import hashlib
+import json
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional
+
+import numpy as np
+
+from .log import get_logger
+
+logger = get_logger('StageCache')
+
+STAGES = ('detection', 'ocr', 'mask_refinement', 'inpainting')
+
+# 键格式变化时递增，使旧条目自然失效
+_KEY_VERSION = 1
+# 临时文件超过该秒数未修改才视为写入中途退出的残留（其他进程可能正在写入）
+_STALE_TMP_SECONDS = 3600
+
+
+def hash_array(array: Optional[np.ndarray]) -> str:
+    """numpy 数组内容哈希（包含形状和类型）"""
+    if array is None:
+        return 'none'
+    array = np.ascontiguousarray(array)
+    h = hashlib.blake2b(digest_size=16)
+    h.update(f'{array.dtype.str}{array.shape}'.encode('utf-8'))
+    h.update(array.data)
+    return h.hexdigest()
+
+
+def hash_polygons(polygons: Iterable[np.ndarray]) -> str:
+    """文本框/文本行坐标的哈希"""
+    h = hashlib.blake2b(digest_size=16)
+    for pts in polygons:
+        pts = np.ascontiguousarray(pts)
+        h.update(f'{pts.dtype.str}{pts.shape}'.encode('utf-8'))
+        h.update(pts.data)
+    return h.hexdigest()
+
+
+def model_version(model_class) -> str:
+    """
+    模型版本标识：类名 + 下载映射（_MODEL_MAPPING 中的文件哈希/地址）
+
+    模型文件更新时映射中的 hash 会变化，对应的缓存条目随之失效。
+    """
+    if model_class is None:
+        return 'none'
+    mapping = getattr(model_class, '_MODEL_MAPPING', None) or {}
+    digest = hashlib.blake2b(json.dumps(mapping, sort_keys=True, default=str).encode('utf-8'), digest_size=8)
+    return f'{model_class.__name__}:{digest.hexdigest()}'
+
+
+class StageCache:
+    """
+    带大小上限的磁盘缓存
+
+    Args:
+        cache_dir: 缓存目录
+        max_size_mb: 缓存总大小上限（MB），超过时淘汰最久未使用的条目
+    """
+
+    def __init__(self, cache_dir: str, max_size_mb: int = 2048):
+        self.cache_dir = cache_dir
+        self.max_bytes = max(0, int(max_size_mb)) * 1024 * 1024
+        self._lock = threading.Lock()
+        # 路径 -> 文件大小，按最近使用排序（末尾最新）
+        self._entries: 'OrderedDict[str, int]' = OrderedDict()
+        self._total_bytes = 0
+        self._stats: Dict[str, Dict[str, int]] = {stage: {'hits': 0, 'misses': 0, 'stores': 0} for stage in STAGES}
+        self._evictions = 0
+        self._load_index()
+
+    def _load_index(self):
+        entries = []
+        now = time.time()
+        for stage in STAGES:
+            stage_dir = os.path.join(self.cache_dir, stage)
+            if not os.path.isdir(stage_dir):
+                continue
+            for root, _, files in os.walk(stage_dir):
+                for name in files:
+                    path = os.path.join(root, name)
+                    if not name.endswith(('.pkl', '.tmp')):
+                        # 不认识的文件不动
+                        continue
+                    try:
+                        st = os.stat(path)
+                    except OSError:
+                        continue
+                    if name.endswith('.tmp'):
+                        # 写入中途退出留下的临时文件；较新的可能是其他进程正在写入的
+                        if now - st.st_mtime > _STALE_TMP_SECONDS:
+                            try:
+                                os.remove(path)
+                            except OSError:
+                                pass
+                        continue
+                    entries.append((st.st_mtime, path, st.st_size))
+        entries.sort()
+        for _, path, size in entries:
+            self._entries[path] = size
+            self._total_bytes += size
+        # 上限调小后启动时先淘汰到上限以内
+        self._delete(self._evict_over_limit())
+        if entries:
+            logger.info(f'Stage cache: {len(entries)} entries, {self._total_bytes / 1024 / 1024:.1f} MB in {self.cache_dir}')
+
+    @staticmethod
+    def make_key(*parts: Any) -> str:
+        """由若干可 JSON 序列化的部分（字符串、数字、哈希等）生成缓存键"""
+        payload = json.dumps([_KEY_VERSION, *parts], sort_keys=True, default=str, ensure_ascii=False)
+        return hashlib.blake2b(payload.encode('utf-8'), digest_size=20).hexdigest()
+
+    def _path(self, stage: str, key: str) -> str:
+        return os.path.join(self.cache_dir, stage, key[:2], f'{key}.pkl')
+
+    def get(self, stage: str, key: str) -> Optional[Any]:
+        """读取缓存，未命中或读取失败时返回 None"""
+        path = self._path(stage, key)
+        with self._lock:
+            known = path in self._entries
+        value = None
+        if known:
+            try:
+                with open(path, 'rb') as f:
+                    value = pickle.load(f)
+            except Exception as e:
+                logger.warning(f'Failed to read stage cache entry {path}: {e}')
+                self._remove(path)
+        with self._lock:
+            stats = self._stats.setdefault(stage, {'hits': 0, 'misses': 0, 'stores': 0})
+            if value is None:
+                stats['misses'] += 1
+                return None
+            stats['hits'] += 1
+            if path in self._entries:
+                self._entries.move_to_end(path)
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return value
+
+    def put(self, stage: str, key: str, value: Any):
+        """写入缓存（先写临时文件再替换，避免并发读到不完整的文件）"""
+        if value is None or self.max_bytes == 0:
+            return
+        path = self._path(stage, key)
+        tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+            size = os.path.getsize(path)
+        except Exception as e:
+            logger.warning(f'Failed to write stage cache entry for {stage}: {e}')
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            return
+
+        with self._lock:
+            self._total_bytes += size - self._entries.pop(path, 0)
+            self._entries[path] = size
+            self._stats.setdefault(stage, {'hits': 0, 'misses': 0, 'stores': 0})['stores'] += 1
+            evicted = self._evict_over_limit()
+        self._delete(evicted)
+
+    def _evict_over_limit(self) -> list:
+        """从索引中移除最久未使用的条目直到不超过上限（保留最新一条），返回待删除的路径"""
+        evicted = []
+        while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+            old_path, old_size = self._entries.popitem(last=False)
+            self._total_bytes -= old_size
+            evicted.append(old_path)
+        self._evictions += len(evicted)
+        return evicted
+
+    @staticmethod
+    def _delete(paths: Iterable[str]):
+        for path in paths:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def _remove(self, path: str):
+        with self._lock:
+            self._total_bytes -= self._entries.pop(path, 0)
+        self._delete([path])
+
+    def clear(self):
+        """删除所有缓存条目"""
+        with self._lock:
+            paths = list(self._entries)
+            self._entries.clear()
+            self._total_bytes = 0
+        self._delete(paths)
+
+    def stats(self) -> Dict[str, Any]:
+        """命中/未命中统计和缓存占用"""
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'size_mb': round(self._total_bytes / 1024 / 1024, 2),
+                'max_size_mb': self.max_bytes // (1024 * 1024),
+                'evictions': self._evictions,
+                'stages': {stage: dict(counts) for stage, counts in self._stats.items()},
+            }
@@ -0,0 +1,82 @@
+"""
+字形/描边缓存基准：模拟一章混合字体的页面，输出渲染耗时和缓存命中率
+
+每页若干随机气泡，区域字体在 fonts/ 下的字体之间轮换，横排竖排混合。
+输出哈希用于对比修改前后的渲染结果是否一致。
+
+用法（在仓库根目录）：
+    python test/benchmark_glyph_cache.py --pages 10 --regions 30
+"""
+
+import argparse
+import asyncio
+import glob
+import hashlib
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from manga_translator.config import Config
+from manga_translator.rendering import dispatch
+from manga_translator.rendering import text_render
+from manga_translator.utils import BASE_PATH, TextBlock
+
+WORDS = ('the quick brown fox jumps over lazy dog manga translation bubble speech '
+         'wonderful incredible absolutely ridiculous what?! no way... huh').split()
+
+
+def make_region(rnd: random.Random, index: int, fonts: list) -> TextBlock:
+    width, height = rnd.randint(100, 300), rnd.randint(100, 300)
+    x, y = rnd.randint(0, 1100), rnd.randint(0, 1600)
+    line_count = rnd.randint(1, 5)
+    lines = [
+        np.array([[x, y + k * height // line_count], [x + width, y + k * height // line_count],
+                  [x + width, y + (k + 1) * height // line_count], [x, y + (k + 1) * height // line_count]])
+        for k in range(line_count)
+    ]
+    region = TextBlock(lines, texts=['x'] * line_count, font_size=rnd.randint(18, 40), target_lang='ENG',
+                       direction='h' if index % 4 else 'v', fg_color=(0, 0, 0), bg_color=(255, 255, 255))
+    region.translation = ' '.join(rnd.choice(WORDS) for _ in range(rnd.randint(3, 25)))
+    region.font_path = rnd.choice(fonts)
+    return region
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Glyph cache benchmark on a mixed-font chapter')
+    parser.add_argument('--pages', type=int, default=10)
+    parser.add_argument('--regions', type=int, default=30, help='regions per page')
+    parser.add_argument('--workers', type=int, default=1, help='render.render_workers')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    fonts = sorted(glob.glob(os.path.join(BASE_PATH, 'fonts', '*.tt[fc]')))
+    if not fonts:
+        sys.exit('No fonts found in fonts/')
+    rnd = random.Random(args.seed)
+    pages = [[make_region(rnd, i, fonts) for i in range(args.regions)] for _ in range(args.pages)]
+
+    config = Config()
+    config.render.render_workers = args.workers
+    # 断词词典需要联网下载，基准只关心字形缓存
+    config.render.no_hyphenation = True
+
+    digest = hashlib.sha1()
+    start = time.perf_counter()
+    for regions in pages:
+        img = np.full((2000, 1500, 3), 255, np.uint8)
+        digest.update(asyncio.run(dispatch(img, regions, fonts[0], config)).tobytes())
+    elapsed = time.perf_counter() - start
+
+    print(f'{args.pages} pages x {args.regions} regions, {len(fonts)} fonts: {elapsed:.2f} s, output {digest.hexdigest()[:12]}')
+    for name, stats in text_render.glyph_cache_stats().items():
+        print(f"{name:>6} cache: hit rate {stats['hit_rate']:.1%}, {stats['entries']} entries, "
+              f"{stats['size_mb']} MB ({stats['hits']} hits / {stats['misses']} misses)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,175 @@
+import asyncio
+import threading
+import time
+
+import aiohttp
+import pytest
+from aiohttp import web
+
+from manga_translator.translators import request_scheduler
+from manga_translator.translators.request_scheduler import RequestScheduler
+
+
+class _HttpError(Exception):
+    """模拟 SDK 的状态码异常（status_code + response.headers）"""
+
+    def __init__(self, status_code, headers):
+        super().__init__(f'HTTP status {status_code}')
+        self.status_code = status_code
+        self.response = type('Response', (), {'headers': headers})()
+
+
+class _StubServer:
+    """在独立线程的事件循环中运行的 aiohttp 桩服务，记录到达时间和并发峰值"""
+
+    def __init__(self, delay=0.0, responses=()):
+        self.delay = delay
+        # 依次返回的 (状态码, 响应头)，用完后返回 200
+        self.responses = list(responses)
+        self.arrivals = []
+        self.in_flight = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+        self._loop = asyncio.new_event_loop()
+        self._ready = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    async def _handle(self, request):
+        with self._lock:
+            self.arrivals.append(time.monotonic())
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+            status, headers = self.responses.pop(0) if self.responses else (200, {})
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+        return web.Response(status=status, headers=headers, text='ok')
+
+    def _run(self):
+        asyncio.set_event_loop(self._loop)
+        app = web.Application()
+        app.router.add_post('/v1/chat/completions', self._handle)
+        self._runner = web.AppRunner(app)
+        self._loop.run_until_complete(self._runner.setup())
+        site = web.TCPSite(self._runner, '127.0.0.1', 0)
+        self._loop.run_until_complete(site.start())
+        port = self._runner.addresses[0][1]
+        self.url = f'http://127.0.0.1:{port}/v1/chat/completions'
+        self._ready.set()
+        self._loop.run_forever()
+        self._loop.run_until_complete(self._runner.cleanup())
+        self._loop.close()
+
+    def __enter__(self):
+        self._thread.start()
+        assert self._ready.wait(5)
+        return self
+
+    def __exit__(self, *exc):
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(5)
+
+
+async def _post(session, scheduler, url, retries=3):
+    """按翻译器的方式通过调度器发送请求：429 / 5xx 时报告失败并重试"""
+    for _ in range(retries + 1):
+        async with scheduler.slot(10):
+            async with session.post(url, json={}) as response:
+                await response.read()
+                if response.status < 400:
+                    scheduler.report_success()
+                    return response.status
+                error = _HttpError(response.status, response.headers)
+        if scheduler.report_failure(error) is None:
+            raise error
+    raise error
+
+
+def _run_client(scheduler, url, count, start_delay=0.0):
+    async def main():
+        await asyncio.sleep(start_delay)
+        async with aiohttp.ClientSession() as session:
+            return await asyncio.gather(*(_post(session, scheduler, url) for _ in range(count)))
+    return asyncio.run(main())
+
+
+def _run_in_threads(scheduler, url, threads, count, start_delays=()):
+    """每个线程有自己的事件循环（与并发流水线相同），共享同一个调度器"""
+    results = []
+    delays = list(start_delays) + [0.0] * (threads - len(start_delays))
+    workers = [
+        threading.Thread(target=lambda delay=delay: results.extend(_run_client(scheduler, url, count, delay)))
+        for delay in delays
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(30)
+    return results
+
+
+def test_token_bucket_limits_request_rate(monkeypatch):
+    # 600 RPM = 10 req/s，突发容量 0.5 秒 = 5 个请求
+    monkeypatch.setattr(request_scheduler, 'BURST_SECONDS', 0.5)
+    scheduler = RequestScheduler('stub', max_concurrency=16)
+    scheduler.configure(max_concurrency=16, rpm=600)
+    with _StubServer() as server:
+        statuses = _run_client(scheduler, server.url, 15)
+
+    assert statuses == [200] * 15
+    arrivals = sorted(server.arrivals)
+    # 突发容量内的请求立即发出，其余 10 个按 10 req/s 放行
+    assert arrivals[4] - arrivals[0] < 0.3
+    assert 0.85 <= arrivals[-1] - arrivals[0] <= 2.0
+
+
+def test_concurrency_cap_is_shared_across_event_loops():
+    scheduler = RequestScheduler('stub', max_concurrency=3)
+    with _StubServer(delay=0.05) as server:
+        statuses = _run_in_threads(scheduler, server.url, threads=3, count=4)
+
+    assert statuses == [200] * 12
+    assert server.peak == 3
+    stats = scheduler.stats()
+    assert stats['requests'] == 12 and stats['in_flight'] == 0
+
+
+def test_429_pauses_other_loops_and_halves_concurrency():
+    scheduler = RequestScheduler('stub', max_concurrency=4)
+    with _StubServer(responses=[(429, {'Retry-After': '0.3'})]) as server:
+        # 第二个事件循环在 429 之后、暂停期结束之前发起请求，也要等到暂停期结束
+        statuses = _run_in_threads(scheduler, server.url, threads=2, count=1, start_delays=(0.0, 0.1))
+
+    assert statuses == [200, 200]
+    first, *later = server.arrivals
+    assert len(later) == 2
+    assert all(arrival - first >= 0.29 for arrival in later)
+    stats = scheduler.stats()
+    assert stats['throttled'] == 1
+    # 429 时并发上限减半，之后连续成功 2 次恢复 1
+    assert stats['max_in_flight'] == 3
+
+
+def test_backoff_grows_exponentially_without_retry_after(monkeypatch):
+    monkeypatch.setattr(request_scheduler, 'BACKOFF_BASE', 0.05)
+    scheduler = RequestScheduler('stub', max_concurrency=4)
+    with _StubServer(responses=[(429, {})] * 3) as server:
+        assert _run_client(scheduler, server.url, 1) == [200]
+
+    gaps = [b - a for a, b in zip(server.arrivals, server.arrivals[1:])]
+    # 0.05 * 2^n，抖动 ±20%
+    for n, gap in enumerate(gaps):
+        assert gap >= 0.05 * 2 ** n * 0.8 - 0.01
+    assert gaps[2] > gaps[0]
+    # 上限 4 -> 2 -> 1，之后一次成功恢复到 2
+    assert scheduler.stats()['max_in_flight'] == 2
+
+
+def test_non_retryable_status_is_not_throttled():
+    scheduler = RequestScheduler('stub')
+    with _StubServer(responses=[(400, {})]) as server:
+        with pytest.raises(_HttpError):
+            _run_client(scheduler, server.url, 1)
+    assert scheduler.stats()['throttled'] == 0
@@ -0,0 +1,104 @@
+import asyncio
+
+from manga_translator.server.myqueue import PRIORITY_ADMIN, PRIORITY_NORMAL, QueueElement, TaskQueue, TranslationSlots
+
+
+class _ConnectedRequest:
+    async def is_disconnected(self):
+        return False
+
+
+def _element(username, priority=PRIORITY_NORMAL):
+    return QueueElement(_ConnectedRequest(), None, None, 0, username=username, priority=priority)
+
+
+async def _run_order(submissions):
+    """占住唯一的槽位，按顺序提交 (名称, 元素)，释放后返回获得槽位的顺序"""
+    slots = TranslationSlots(1)
+    order = []
+    release = asyncio.Event()
+
+    async def blocker():
+        async with slots.acquire(_element('blocker')):
+            await release.wait()
+
+    async def worker(name, element):
+        async with slots.acquire(element):
+            order.append(name)
+            await asyncio.sleep(0)
+
+    tasks = [asyncio.create_task(blocker())]
+    await asyncio.sleep(0)
+    for name, element in submissions:
+        tasks.append(asyncio.create_task(worker(name, element)))
+        await asyncio.sleep(0)
+
+    metrics = slots.queue.metrics()
+    release.set()
+    await asyncio.wait_for(asyncio.gather(*tasks), 5)
+    return order, metrics
+
+
+def test_admin_task_overtakes_queued_normal_task():
+    order, metrics = asyncio.run(_run_order([
+        ('normal', _element('alice')),
+        ('admin', _element('root', PRIORITY_ADMIN)),
+    ]))
+    assert order == ['admin', 'normal']
+    assert metrics['by_priority'] == {PRIORITY_ADMIN: 1, PRIORITY_NORMAL: 1}
+
+
+def test_users_alternate_within_priority_class():
+    order, metrics = asyncio.run(_run_order([
+        ('a1', _element('alice')),
+        ('a2', _element('alice')),
+        ('a3', _element('alice')),
+        ('b1', _element('bob')),
+        ('b2', _element('bob')),
+    ]))
+    assert order == ['a1', 'b1', 'a2', 'b2', 'a3']
+    assert metrics['users'] == 2
+
+
+def test_late_user_joins_current_round():
+    async def run():
+        queue = TaskQueue()
+        names = {}
+        for i in range(1, 7):
+            for user in ('alice', 'bob'):
+                element = _element(user)
+                names[id(element)] = f'{user[0]}{i}'
+                queue.add_task(element)
+        # 前三轮已经执行完，carol 这时才开始提交
+        for _ in range(6):
+            await queue.remove(queue.queue[0])
+        for i in range(1, 7):
+            element = _element('carol')
+            names[id(element)] = f'c{i}'
+            queue.add_task(element)
+        return [names[id(task)] for task in queue.queue]
+
+    order = asyncio.run(run())
+    assert order == ['a4', 'b4', 'c1', 'a5', 'b5', 'c2', 'a6', 'b6', 'c3', 'c4', 'c5', 'c6']
+
+
+def test_capacity_limits_concurrent_tasks():
+    async def run():
+        slots = TranslationSlots(2)
+        running = 0
+        peak = 0
+
+        async def worker(i):
+            nonlocal running, peak
+            async with slots.acquire(_element(f'user{i % 3}')):
+                running += 1
+                peak = max(peak, running)
+                await asyncio.sleep(0.01)
+                running -= 1
+
+        await asyncio.wait_for(asyncio.gather(*(worker(i) for i in range(8))), 5)
+        return peak, slots
+
+    peak, slots = asyncio.run(run())
+    assert peak == 2
+    assert slots.active == 0 and slots.waiting == 0